@@ -0,0 +1,172 @@
+import struct
+import time
+from typing import Callable, Optional, Union
+
+from domain.genome import Genome
+from domain.graph import Node
+
+PROTOCOLS = ("full", "delta")
+
+
+def pack(value) -> bytes:
+    """
+    Encodes a JSON-like value (None, bool, int, float, str, list/tuple and dict) in the MessagePack format,
+    so binary frames can be decoded by any MessagePack library on the client.
+    Args:
+        value: Value to be encoded.
+
+    Returns:
+        The encoded bytes.
+    Raises:
+        TypeError: If the value has a type that cannot be encoded.
+    """
+    chunks: list[bytes] = []
+    _pack_into(value, chunks)
+    return b"".join(chunks)
+
+
+def _pack_into(value, chunks: list[bytes]) -> None:
+    if value is None:
+        chunks.append(b"\xc0")
+    elif value is True or value is False:
+        chunks.append(b"\xc3" if value else b"\xc2")
+    elif isinstance(value, int):
+        if 0 <= value < 0x80:
+            chunks.append(struct.pack("B", value))
+        elif -0x20 <= value < 0:
+            chunks.append(struct.pack("b", value))
+        elif 0 <= value <= 0xFFFFFFFF:
+            chunks.append(b"\xce" + struct.pack(">I", value))
+        elif -0x80000000 <= value < 0:
+            chunks.append(b"\xd2" + struct.pack(">i", value))
+        else:
+            chunks.append(b"\xd3" + struct.pack(">q", value))
+    elif isinstance(value, float):
+        chunks.append(b"\xcb" + struct.pack(">d", value))
+    elif isinstance(value, str):
+        encoded = value.encode("utf-8")
+        if len(encoded) < 32:
+            chunks.append(struct.pack("B", 0xA0 | len(encoded)))
+        else:
+            chunks.append(b"\xdb" + struct.pack(">I", len(encoded)))
+        chunks.append(encoded)
+    elif isinstance(value, (list, tuple)):
+        chunks.append(struct.pack("B", 0x90 | len(value)) if len(value) < 16 else b"\xdd" + struct.pack(">I", len(value)))
+        for item in value:
+            _pack_into(item, chunks)
+    elif isinstance(value, dict):
+        chunks.append(struct.pack("B", 0x80 | len(value)) if len(value) < 16 else b"\xdf" + struct.pack(">I", len(value)))
+        for key, item in value.items():
+            _pack_into(key, chunks)
+            _pack_into(item, chunks)
+    else:
+        raise TypeError(f"Cannot encode value of type {type(value).__name__}")
+
+
+class SolutionEventStream:
+    """
+    Serializes the solutions sent to a WebSocket client.
+    The map of customer identifiers to nodes is built once per run. In the "full" protocol every new_best_solution
+    event carries the whole solution with coordinates (Solution.to_dict). In the "delta" protocol the nodes are
+    sent once in the started event and the solution events only carry the identifier sequences of the vehicles
+    that changed since the last event sent. Events arriving before min_interval seconds since the last one are
+    held back: the latest of them is sent once the interval expires or the run ends (see flush), unless a newer
+    event is sent first, and the next event sent carries every change.
+    With binary enabled the solution events are sent as MessagePack frames.
+    """
+
+    def __init__(self, nodes: list[Node], protocol: str = "full", min_interval: float = 0.0, binary: bool = False,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        if protocol not in PROTOCOLS:
+            raise ValueError(f"Protocol must be one of {PROTOCOLS}.")
+        if min_interval < 0:
+            raise ValueError("Minimum event interval must not be negative.")
+        self.nodes = nodes
+        self.customer_id_to_node = {node.identifier: node for node in nodes}
+        self.protocol = protocol
+        self.min_interval = min_interval
+        self.binary = binary
+        self.__clock = clock
+        self.__last_sent_at: Optional[float] = None
+        self.__sent_routes: list[list[int]] = []
+        # Latest event held back by min_interval, with its solution
+        self.__pending: Optional[tuple[dict, Genome]] = None
+
+    def started_event(self) -> dict:
+        event = {"event": "started", "protocol": self.protocol, "binary": self.binary}
+        if self.protocol == "delta":
+            event["nodes"] = [{"identifier": node.identifier, "x": node.x, "y": node.y, "priority": node.priority,
+                               "demand": node.demand} for node in self.nodes]
+        return event
+
+    def updated_event(self, event: dict, nodes: list[Node], solution: Genome) -> dict:
+        """
+        Builds the message of an instance_updated event (customers of the run added, removed or changed): the nodes
+        of the stream are replaced and the message carries the best solution of the changed problem, with the
+        nodes in the delta protocol. The next delta events are relative to that solution.
+        Args:
+            event: Event produced by the runner.
+            nodes: Nodes of the changed problem.
+            solution: Best solution of the changed problem.
+
+        Returns:
+            The JSON message.
+        """
+        self.nodes = nodes
+        self.customer_id_to_node = {node.identifier: node for node in nodes}
+        message = {**event, "solution": self.solution_dict(solution)}
+        if self.protocol == "delta":
+            message["nodes"] = self.started_event()["nodes"]
+            self.__sent_routes = [solution.route(index).tolist() for index in range(solution.number_vehicles)]
+        return message
+
+    def solution_dict(self, solution: Optional[Genome]) -> Optional[dict]:
+        return solution.to_dict(customer_id_to_node=self.customer_id_to_node) if solution else None
+
+    def encode(self, event: dict, solution: Genome) -> Union[dict, bytes, None]:
+        """
+        Builds the message of a new_best_solution event.
+        Args:
+            event: Event produced by the runner.
+            solution: Best solution of the runner.
+
+        Returns:
+            The JSON message (dict) or binary frame (bytes) to be sent, or None when the event is throttled.
+        """
+        now = self.__clock()
+        if self.__last_sent_at is not None and now - self.__last_sent_at < self.min_interval:
+            self.__pending = (event, solution)
+            return None
+        return self.__message(event, solution, now)
+
+    def pending_delay(self) -> Optional[float]:
+        """Seconds until the event held back can be sent, or None when no event is held back."""
+        if self.__pending is None:
+            return None
+        return max(0.0, self.__last_sent_at + self.min_interval - self.__clock())
+
+    def flush(self) -> Union[dict, bytes, None]:
+        """
+        Builds the message of the event held back by min_interval, whether or not the interval expired.
+        Returns:
+            The JSON message (dict) or binary frame (bytes) to be sent, or None when no event is held back.
+        """
+        if self.__pending is None:
+            return None
+        event, solution = self.__pending
+        return self.__message(event, solution, self.__clock())
+
+    def __message(self, event: dict, solution: Genome, now: float) -> Union[dict, bytes]:
+        self.__pending = None
+        self.__last_sent_at = now
+        message = dict(event)
+        if self.protocol == "full":
+            message["solution"] = self.solution_dict(solution)
+        else:
+            routes = [solution.route(index).tolist() for index in range(solution.number_vehicles)]
+            message["number_vehicles"] = len(routes)
+            message["vehicles"] = [{"vehicle": index, "route": route, "distance": float(solution.distances[index])}
+                                   for index, route in enumerate(routes)
+                                   if index >= len(self.__sent_routes) or self.__sent_routes[index] != route]
+            self.__sent_routes = routes
+        return pack(message) if self.binary else message
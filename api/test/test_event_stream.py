@@ -0,0 +1,114 @@
+import struct
+
+import pytest
+
+from api.event_stream import SolutionEventStream, pack
+from domain.genome import Genome
+from domain.graph import Node
+
+NODES = [Node(identifier=i, x=float(i), y=float(2 * i), demand=1) for i in range(5)]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def genome(sequence, offsets):
+    return Genome(sequence, offsets, 10, 100, distances=[1.0] * (len(offsets) - 1), fitness=5.0)
+
+
+def test_pack_follows_messagepack_format():
+    assert pack(None) == b"\xc0"
+    assert pack(True) == b"\xc3"
+    assert pack(5) == b"\x05"
+    assert pack(-1) == b"\xff"
+    assert pack(300) == b"\xce" + struct.pack(">I", 300)
+    assert pack(1.5) == b"\xcb" + struct.pack(">d", 1.5)
+    assert pack("ab") == b"\xa2ab"
+    assert pack([1, 2]) == b"\x92\x01\x02"
+    assert pack({"a": 1}) == b"\x81\xa1a\x01"
+    assert pack(list(range(20)))[:5] == b"\xdd\x00\x00\x00\x14"
+    with pytest.raises(TypeError):
+        pack(object())
+
+
+def test_delta_protocol_sends_nodes_once_and_only_changed_vehicles():
+    stream = SolutionEventStream(NODES, protocol="delta")
+    assert [node["identifier"] for node in stream.started_event()["nodes"]] == [0, 1, 2, 3, 4]
+
+    first = stream.encode({"event": "new_best_solution"}, genome([0, 1, 2, 0, 0, 3, 4, 0], [0, 4, 8]))
+    assert [vehicle["vehicle"] for vehicle in first["vehicles"]] == [0, 1]
+    assert "solution" not in first
+
+    second = stream.encode({"event": "new_best_solution"}, genome([0, 1, 2, 0, 0, 4, 3, 0], [0, 4, 8]))
+    assert second["number_vehicles"] == 2
+    assert second["vehicles"] == [{"vehicle": 1, "route": [0, 4, 3, 0], "distance": 1.0}]
+
+
+def test_updated_event_replaces_the_nodes():
+    stream = SolutionEventStream(NODES, protocol="delta")
+    stream.encode({"event": "new_best_solution"}, genome([0, 1, 2, 0, 0, 3, 4, 0], [0, 4, 8]))
+    nodes = NODES[:4] + [Node(identifier=9, x=1.0, y=1.0, demand=2)]
+
+    message = stream.updated_event({"event": "instance_updated"}, nodes, genome([0, 1, 9, 0, 0, 3, 0], [0, 4, 7]))
+
+    assert [node["identifier"] for node in message["nodes"]] == [0, 1, 2, 3, 9]
+    assert message["solution"]["vehicles"][0]["route"] is not None
+    # The next delta is relative to the solution of the update
+    second = stream.encode({"event": "new_best_solution"}, genome([0, 1, 9, 0, 0, 3, 0], [0, 4, 7]))
+    assert second["vehicles"] == []
+
+
+def test_full_protocol_keeps_the_whole_solution():
+    stream = SolutionEventStream(NODES)
+    message = stream.encode({"event": "new_best_solution"}, genome([0, 1, 0], [0, 3]))
+    assert message["solution"]["vehicles"][0]["route"] is not None
+    assert "nodes" not in stream.started_event()
+
+
+def test_events_are_throttled_by_minimum_interval():
+    clock = FakeClock()
+    stream = SolutionEventStream(NODES, protocol="delta", min_interval=1.0, clock=clock)
+    assert stream.encode({"event": "new_best_solution"}, genome([0, 1, 0], [0, 3])) is not None
+    clock.now = 0.5
+    assert stream.encode({"event": "new_best_solution"}, genome([0, 2, 0], [0, 3])) is None
+    clock.now = 1.5
+    # The dropped event is not remembered: the next delta compares with what the client received
+    assert stream.encode({"event": "new_best_solution"}, genome([0, 2, 0], [0, 3]))["vehicles"][0]["route"] == [0, 2, 0]
+
+
+def test_event_held_back_is_flushed_after_the_interval():
+    clock = FakeClock()
+    stream = SolutionEventStream(NODES, protocol="delta", min_interval=1.0, clock=clock)
+    assert stream.pending_delay() is None
+    stream.encode({"event": "new_best_solution", "generation": 1}, genome([0, 1, 0], [0, 3]))
+    clock.now = 0.25
+    assert stream.encode({"event": "new_best_solution", "generation": 2}, genome([0, 2, 0], [0, 3])) is None
+    clock.now = 0.5
+    assert stream.encode({"event": "new_best_solution", "generation": 3}, genome([0, 3, 0], [0, 3])) is None
+    assert stream.pending_delay() == 0.5
+
+    # The latest event held back is sent, once
+    message = stream.flush()
+    assert message["generation"] == 3 and message["vehicles"][0]["route"] == [0, 3, 0]
+    assert stream.flush() is None and stream.pending_delay() is None
+    # The interval restarts at the flushed event
+    clock.now = 1.2
+    assert stream.encode({"event": "new_best_solution"}, genome([0, 4, 0], [0, 3])) is None
+
+
+def test_binary_frames():
+    stream = SolutionEventStream(NODES, protocol="delta", binary=True)
+    frame = stream.encode({"event": "new_best_solution"}, genome([0, 1, 0], [0, 3]))
+    assert isinstance(frame, bytes)
+    assert frame == pack({"event": "new_best_solution", "number_vehicles": 1,
+                          "vehicles": [{"vehicle": 0, "route": [0, 1, 0], "distance": 1.0}]})
+
+
+def test_invalid_protocol():
+    with pytest.raises(ValueError):
+        SolutionEventStream(NODES, protocol="xml")
@@ -1,7 +1,12 @@
+import os
+
 import pytest
 from fastapi.testclient import TestClient
 
-from api.websocket import app
+# Island and decomposition runs need as many workers as processes, whatever the CPUs of the test machine
+os.environ.setdefault("SOLVER_WORKERS", "2")
+
+from api.websocket import app  # noqa: E402
 
 client = TestClient(app)
 
@@ -106,3 +111,324 @@ def test_websocket_multiple_connections():
         data2 = receive_until(ws2, "stopped")
         assert data1["event"] == "stopped"
         assert data2["event"] == "stopped"
+
+@pytest.mark.timeout(10)
+def test_websocket_delta_protocol_sends_nodes_at_start():
+    """
+    Test that the delta protocol sends the nodes once in the started event and route sequences afterwards.
+    """
+    with client.websocket_connect("/ws/genetic") as websocket:
+        websocket.send_json({"command": "start", "protocol": "delta"})
+        data = receive_until(websocket, "started")
+        assert data["protocol"] == "delta"
+        assert len(data["nodes"]) > 0
+        data = receive_until(websocket, "new_best_solution")
+        assert "solution" not in data
+        assert data["vehicles"]
+        websocket.send_json({"command": "stop"})
+        data = receive_until(websocket, "stopped")
+        assert data["solution"] is not None
+
+@pytest.mark.timeout(30)
+def test_websocket_sends_the_last_throttled_solution_before_the_end():
+    """
+    Test that the last solution event held back by the minimum interval is sent before run_finished.
+    """
+    with client.websocket_connect("/ws/genetic") as websocket:
+        websocket.send_json({"command": "start", "max_generations": 40, "min_event_interval": 60})
+        receive_until(websocket, "started")
+        events = []
+        while not events or events[-1]["event"] != "run_finished":
+            events.append(websocket.receive_json())
+        solutions = [event for event in events if event["event"] == "new_best_solution"]
+        websocket.send_json({"command": "status"})
+        status = receive_until(websocket, "status")
+        assert solutions[-1]["best_fitness"] == status["best_fitness"]
+
+
+@pytest.mark.timeout(20)
+def test_websocket_reconnects_to_run_by_id():
+    """
+    Test that a run keeps going after the connection closes and can be attached again by its run id.
+    """
+    with client.websocket_connect("/ws/genetic") as websocket:
+        websocket.send_json({"command": "start", "population_size": 20, "max_time": 5})
+        run_id = receive_until(websocket, "started")["run_id"]
+        receive_until(websocket, "new_best_solution")
+    with client.websocket_connect("/ws/genetic") as websocket:
+        websocket.send_json({"command": "attach", "run_id": run_id})
+        data = receive_until(websocket, "attached")
+        assert data["run_id"] == run_id
+        assert data["best_solution"] is not None
+        websocket.send_json({"command": "stop"})
+        assert receive_until(websocket, "stopped")["solution"] is not None
+        websocket.send_json({"command": "attach", "run_id": "unknown"})
+        assert receive_until(websocket, "error")["message"] == "Run unknown does not exist."
+
+@pytest.mark.timeout(20)
+def test_websocket_start_twice_stops_previous_run():
+    """
+    Test that starting again on the same connection stops the run it was following.
+    """
+    with client.websocket_connect("/ws/genetic") as websocket:
+        websocket.send_json({"command": "start", "population_size": 20})
+        first = receive_until(websocket, "started")["run_id"]
+        websocket.send_json({"command": "start", "population_size": 20})
+        second = receive_until(websocket, "started")["run_id"]
+        assert first != second
+        websocket.send_json({"command": "runs"})
+        states = {run["run_id"]: run["state"] for run in receive_until(websocket, "runs")["runs"]}
+        assert states[first] == "stopped"
+        websocket.send_json({"command": "stop"})
+        receive_until(websocket, "stopped")
+
+@pytest.mark.timeout(30)
+def test_websocket_island_mode():
+    """
+    Test that the island settings of the start command run the island model.
+    """
+    with client.websocket_connect("/ws/genetic") as websocket:
+        websocket.send_json({"command": "start", "population_size": 20, "islands": 2, "migration_interval": 2,
+                             "max_time": 10})
+        receive_until(websocket, "started")
+        data = receive_until(websocket, "new_best_solution", timeout=20)
+        assert data["island"] in (0, 1)
+        websocket.send_json({"command": "status"})
+        assert receive_until(websocket, "status")["islands"] == 2
+        websocket.send_json({"command": "stop"})
+        receive_until(websocket, "stopped")
+
+@pytest.mark.timeout(30)
+def test_websocket_process_mode():
+    """
+    Test that the execution_mode and workers settings of the start command spread the run over worker processes.
+    """
+    with client.websocket_connect("/ws/genetic") as websocket:
+        websocket.send_json({"command": "start", "population_size": 20, "execution_mode": "process", "workers": 2,
+                             "max_time": 10})
+        receive_until(websocket, "started")
+        receive_until(websocket, "new_best_solution", timeout=20)
+        websocket.send_json({"command": "status"})
+        assert receive_until(websocket, "status")["workers"] == 2
+        websocket.send_json({"command": "stop"})
+        receive_until(websocket, "stopped")
+
+@pytest.mark.timeout(10)
+def test_websocket_start_with_malformed_settings():
+    """
+    Test that the websocket returns an error event for settings of the wrong type or shape.
+    """
+    with client.websocket_connect("/ws/genetic") as websocket:
+        websocket.send_json({"command": "start", "execution_mode": "threads"})
+        assert websocket.receive_json()["event"] == "error"
+        websocket.send_json({"command": "start", "fleet": [{"count": 2}]})
+        assert websocket.receive_json()["event"] == "error"
+        websocket.send_json({"command": "start", "population_size": "20"})
+        assert websocket.receive_json()["event"] == "error"
+
+@pytest.mark.timeout(20)
+def test_websocket_metrics_command_and_prometheus_text():
+    """
+    Test that a run started with profiling reports its metrics, also in the Prometheus format.
+    """
+    import asyncio
+    from api.websocket import metrics
+    with client.websocket_connect("/ws/genetic") as websocket:
+        websocket.send_json({"command": "start", "profiling": True, "max_generations": 5})
+        started = receive_until(websocket, "started")
+        receive_until(websocket, "run_finished")
+        websocket.send_json({"command": "metrics"})
+        data = receive_until(websocket, "metrics")
+        assert data["run_id"] == started["run_id"]
+        assert data["enabled"] is True
+        assert data["generations"] == 5
+        assert set(data["sections"]) >= {"fitness", "selection", "crossover", "mutation", "adjustment"}
+
+    text = asyncio.run(metrics()).body.decode()
+    assert "# TYPE vrp_generation_seconds histogram" in text
+    assert f'vrp_generations_total{{run_id="{started["run_id"]}"}} 5' in text
+
+@pytest.mark.timeout(30)
+def test_websocket_resumes_run_from_checkpoint(tmp_path, monkeypatch):
+    """
+    Test that a run started with checkpoints can be continued by a new run with resume_from.
+    """
+    import api.websocket
+    monkeypatch.setattr(api.websocket, "CHECKPOINT_DIRECTORY", str(tmp_path))
+    with client.websocket_connect("/ws/genetic") as websocket:
+        websocket.send_json({"command": "start", "seed": 4, "max_generations": 5, "checkpoint_interval": 60})
+        started = receive_until(websocket, "started")
+        receive_until(websocket, "run_finished")
+    assert (tmp_path / f"{started['run_id']}.npz").exists()
+
+    with client.websocket_connect("/ws/genetic") as websocket:
+        websocket.send_json({"command": "start", "max_generations": 8, "resume_from": started["run_id"]})
+        resumed = receive_until(websocket, "started")
+        assert resumed["resumed_from"] == started["run_id"]
+        assert resumed["generation"] == 5
+        assert resumed["best_solution"] is not None
+        finished = receive_until(websocket, "run_finished")
+        assert finished["generation"] == 8
+
+        websocket.send_json({"command": "start", "resume_from": "../etc/passwd"})
+        assert receive_until(websocket, "error")["message"].startswith("Invalid run id")
+
+        # Same number of customers, other cities
+        from api.websocket import nodes
+        cities = [{"identifier": node.identifier, "x": node.x + 1, "y": node.y, "priority": node.priority,
+                   "demand": node.demand} for node in nodes]
+        websocket.send_json({"command": "start", "cities": cities, "resume_from": started["run_id"]})
+        assert receive_until(websocket, "error")["message"].endswith("belongs to other cities.")
+
+@pytest.mark.timeout(20)
+def test_websocket_start_with_heterogeneous_fleet():
+    """
+    Test that a fleet definition replaces the number, capacity and autonomy of the vehicles.
+    """
+    fleet = [{"capacity": 10, "autonomy": 400, "cost": 0.5, "count": 2}, {"capacity": 40, "autonomy": 900}]
+    with client.websocket_connect("/ws/genetic") as websocket:
+        websocket.send_json({"command": "start", "seed": 2, "max_generations": 3, "split_mode": "optimal",
+                             "fleet": fleet})
+        receive_until(websocket, "started")
+        receive_until(websocket, "run_finished")
+        websocket.send_json({"command": "get_best_solution"})
+        vehicles = receive_until(websocket, "best_solution")["solution"]["vehicles"]
+        assert [(vehicle["capacity"], vehicle["cost"]) for vehicle in vehicles] == [(10, 0.5), (10, 0.5), (40, 0.0)]
+
+        websocket.send_json({"command": "start", "fleet": [{"capacity": 10}]})
+        assert receive_until(websocket, "error")["message"].startswith("tipo de veículo inválido")
+
+
+def test_websocket_start_with_seeded_population():
+    """
+    Test that a run can seed its initial population with the construction heuristics, and that unknown heuristics
+    are reported.
+    """
+    with client.websocket_connect("/ws/genetic") as websocket:
+        websocket.send_json({"command": "start", "seed": 2, "max_generations": 2, "seeding": 0.5,
+                             "seeding_heuristics": ["savings", "sweep"]})
+        receive_until(websocket, "started")
+        receive_until(websocket, "run_finished")
+
+        websocket.send_json({"command": "start", "seeding": 0.5, "seeding_heuristics": ["greedy"]})
+        assert receive_until(websocket, "error")["message"].startswith("Seeding heuristics must be among")
+
+
+def test_websocket_start_with_distance_metric():
+    """
+    Test that a run can use great-circle distances, and that unknown metrics are reported.
+    """
+    cities = [{"identifier": i, "x": -46.6 + 0.05 * i, "y": -23.5 + 0.03 * (i % 3)} for i in range(8)]
+    with client.websocket_connect("/ws/genetic") as websocket:
+        websocket.send_json({"command": "start", "seed": 2, "max_generations": 2, "cities": cities,
+                             "distance_metric": "haversine"})
+        receive_until(websocket, "started")
+        receive_until(websocket, "run_finished")
+        websocket.send_json({"command": "get_best_solution"})
+        # About 5 km between consecutive cities, instead of 0.05 degrees
+        assert receive_until(websocket, "best_solution")["solution"]["total_distance"] > 20
+
+        websocket.send_json({"command": "start", "distance_metric": "manhattan"})
+        assert receive_until(websocket, "error")["message"].startswith("Distance metric must be one of")
+
+
+def test_websocket_reuses_graph_of_same_cities():
+    """
+    Test that a second run on the same cities reuses the prepared graph, and that the cache is in the metrics.
+    """
+    import asyncio
+    from api.websocket import metrics
+    cities = [{"identifier": i, "x": 10 * i, "y": 7 * (i % 4), "demand": 1 + i % 2} for i in range(12)]
+    with client.websocket_connect("/ws/genetic") as websocket:
+        websocket.send_json({"command": "start", "max_generations": 1, "cities": cities})
+        assert receive_until(websocket, "started")["graph_cached"] is False
+        receive_until(websocket, "run_finished")
+        websocket.send_json({"command": "start", "max_generations": 1, "cities": cities, "population_size": 20,
+                             "mutation_probability": 0.2})
+        assert receive_until(websocket, "started")["graph_cached"] is True
+        receive_until(websocket, "run_finished")
+
+    assert "# TYPE vrp_graph_cache_hits_total counter" in asyncio.run(metrics()).body.decode()
+
+
+@pytest.mark.timeout(60)
+def test_websocket_decomposition_mode():
+    """
+    Test that a decomposition run streams every solved cluster and ends with the stitched solution.
+    """
+    cities = [{"identifier": 0, "x": 50, "y": 50}] + [
+        {"identifier": i, "x": (i * 37) % 100, "y": (i * 61) % 100, "demand": 1 + i % 3} for i in range(1, 41)]
+    with client.websocket_connect("/ws/genetic") as websocket:
+        websocket.send_json({"command": "start", "seed": 3, "cities": cities, "number_vehicles": 4,
+                             "vehicle_capacity": 30, "max_generations": 3, "population_size": 20,
+                             "decomposition": "sweep", "clusters": 2, "decomposition_workers": 2})
+        receive_until(websocket, "started")
+        events = [receive_until(websocket, "cluster_finished", timeout=40) for _ in range(2)]
+        assert sorted(event["cluster"] for event in events) == [0, 1]
+        assert sum(event["customers"] for event in events) == 40
+        routed = [customer for event in events for vehicle in event["vehicles"] for customer in vehicle["route"]]
+        assert sorted(set(routed) - {0}) == list(range(1, 41))
+        assert receive_until(websocket, "new_best_solution", timeout=20)["generation"] == 3
+        receive_until(websocket, "run_finished")
+        websocket.send_json({"command": "status"})
+        status = receive_until(websocket, "status")
+        assert status["clusters"] == 2 and status["state"] == "finished"
+        customers = [customer for vehicle in status["best_solution"]["vehicles"]
+                     for customer in vehicle["route"]["customers"] if customer != 0]
+        assert sorted(customers) == list(range(1, 41))
+
+        websocket.send_json({"command": "start", "decomposition": "grid"})
+        assert receive_until(websocket, "error")["message"].startswith("Decomposition method must be one of")
+
+
+@pytest.mark.timeout(60)
+def test_websocket_multi_depot_mode():
+    """
+    Test that a multi-depot run solves the depots and the trunk legs from the distribution center.
+    """
+    cities = [{"identifier": 0, "x": 50, "y": 50, "demand": 0}, {"identifier": 1, "x": 10, "y": 50, "demand": 0},
+              {"identifier": 2, "x": 90, "y": 50, "demand": 0}]
+    cities += [{"identifier": i, "x": (5 if i % 2 else 85) + i % 7, "y": 40 + i % 11} for i in range(3, 23)]
+    with client.websocket_connect("/ws/genetic") as websocket:
+        websocket.send_json({"command": "start", "seed": 5, "cities": cities, "number_vehicles": 2,
+                             "vehicle_capacity": 20, "max_generations": 2, "population_size": 20,
+                             "depots": [1, 2], "trunk_fleet": [{"capacity": 40, "autonomy": 1000}]})
+        receive_until(websocket, "started")
+        events = [receive_until(websocket, "cluster_finished", timeout=40) for _ in range(3)]
+        assert sorted(event["depot"] for event in events) == [0, 1, 2]
+        receive_until(websocket, "run_finished")
+        websocket.send_json({"command": "get_best_solution"})
+        vehicles = receive_until(websocket, "best_solution")["solution"]["vehicles"]
+        assert [vehicle["route"]["customers"][0] for vehicle in vehicles] in ([1, 2, 0], [2, 1, 0])
+
+        websocket.send_json({"command": "start", "cities": cities, "number_vehicles": 1, "depots": [1, 2]})
+        assert receive_until(websocket, "error")["message"] == "Fleet must have at least one vehicle per depot."
+
+
+@pytest.mark.timeout(60)
+def test_websocket_updates_customers_of_a_running_solve():
+    """
+    Test that customers added, removed and changed mid-solve reach the running population without a restart.
+    """
+    cities = [{"identifier": i, "x": (i * 37) % 100, "y": (i * 61) % 100, "demand": 1} for i in range(12)]
+    with client.websocket_connect("/ws/genetic") as websocket:
+        websocket.send_json({"command": "start", "seed": 2, "cities": cities, "protocol": "delta", "max_time": 30,
+                             "population_size": 20})
+        run_id = receive_until(websocket, "started")["run_id"]
+        receive_until(websocket, "new_best_solution")
+        websocket.send_json({"command": "update", "add": [{"identifier": 20, "x": 12, "y": 7, "demand": 2}],
+                             "remove": [5], "change": [{"identifier": 6, "priority": 1}]})
+        updated = receive_until(websocket, "instance_updated")
+        assert updated["run_id"] == run_id and updated["customers"] == 11
+        assert [node["identifier"] for node in updated["nodes"]] == [0, 1, 2, 3, 4, 6, 7, 8, 9, 10, 11, 20]
+        assert updated["nodes"][5]["priority"] == 1
+        customers = [customer for vehicle in updated["solution"]["vehicles"]
+                     for customer in vehicle["route"]["customers"] if customer != 0]
+        assert sorted(customers) == [1, 2, 3, 4, 6, 7, 8, 9, 10, 11, 20]
+
+        websocket.send_json({"command": "update", "remove": [5]})
+        assert receive_until(websocket, "error")["message"].endswith("Node 5 is not a customer of the run.")
+        websocket.send_json({"command": "update", "add": [{"identifier": 21}]})
+        assert receive_until(websocket, "error")["event"] == "error"
+        websocket.send_json({"command": "stop"})
+        receive_until(websocket, "stopped")
@@ -1,15 +1,100 @@
+import asyncio
+import os
 import random
+import re
+from contextlib import asynccontextmanager
+from typing import Optional
 
 from fastapi import FastAPI, WebSocket
+from fastapi.responses import PlainTextResponse
 
-from domain.graph import Graph, Node
-from genetic_algorithm import GeneticAlgorithmRunner, default_problems
+from api.event_stream import SolutionEventStream
+from domain.fleet import Fleet
+from domain.graph import GraphCache, MatrixCache, Node, metric_provider
+from genetic_algorithm import default_problems
+from genetic_algorithm.checkpoint import graph_key, load_checkpoint
+from genetic_algorithm.construction import CONSTRUCTION_HEURISTICS
+from genetic_algorithm.profiler import prometheus_text
+from genetic_algorithm.scheduler import SolverRun, SolverScheduler
 from vrp.vrp_builder import VrpFactory
 
 cities_locations = default_problems[15]
-nodes: list[Node] = [Node(identifier=i, x=city[0], y=city[1], priority=random.randint(0, 1), demand=random.randint(1,11)) for i, city in enumerate(cities_locations)]
+# Fixed seed so the default problem (and its benchmarks) is the same on every start
+_default_random = random.Random(15)
+nodes: list[Node] = [Node(identifier=i, x=city[0], y=city[1], priority=_default_random.randint(0, 1), demand=_default_random.randint(1,11)) for i, city in enumerate(cities_locations)]
+
+# Solver time (seconds spent in slices) after which a run ends unless the start command sets max_time
+DEFAULT_MAX_TIME = 300.0
+
+# Runs started with checkpoint_interval write <run_id>.npz here; resume_from reads it back
+CHECKPOINT_DIRECTORY = os.environ.get("CHECKPOINT_DIRECTORY", "checkpoints")
+# Directory of the cached distance matrices (no cache when unset)
+DISTANCE_CACHE_DIRECTORY = os.environ.get("DISTANCE_CACHE_DIRECTORY")
+
+# Worker processes of the solver, shared by the time slices and the processes of island and decomposition runs
+# (the number of CPUs when unset)
+SOLVER_WORKERS = os.environ.get("SOLVER_WORKERS")
+
+scheduler = SolverScheduler(int(SOLVER_WORKERS) if SOLVER_WORKERS else None)
+# Graphs of the city sets submitted to this process, shared by the runs on the same cities
+graph_cache = GraphCache(int(os.environ.get("GRAPH_CACHE_BYTES", 512 * 2 ** 20)))
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    yield
+    scheduler.shutdown()
+
+app = FastAPI(lifespan=lifespan)
+
+
+async def metrics() -> PlainTextResponse:
+    """
+    Metrics of the generation loop of every run kept by the scheduler and of the graph cache, in the Prometheus text
+    format.
+    """
+    text = prometheus_text([({"run_id": run.run_id}, run.profiler) for run in scheduler.runs()])
+    return PlainTextResponse(text + graph_cache.prometheus_text(), media_type="text/plain; version=0.0.4")
+
+
+if os.environ.get("METRICS_ENDPOINT", "").lower() in ("1", "true"):
+    app.add_api_route("/metrics", metrics, methods=["GET"])
+
+
+def load_run_checkpoint(run_id: str, vrp_factory: VrpFactory):
+    """
+    Reads the checkpoint written by a run, checking that it belongs to the same graph (checkpoints written before
+    the graph keys are only checked for the number of customers and vehicles).
+    Args:
+        run_id: Identifier of the run that wrote the checkpoint.
+        vrp_factory: Factory of the problem of the new run.
+
+    Returns:
+        The checkpoint.
+    Raises:
+        ValueError: If there is no checkpoint of the run or it does not match the problem.
+    """
+    if not re.fullmatch(r"[0-9a-f]{32}", str(run_id)):
+        raise ValueError(f"Invalid run id {run_id}.")
+    path = os.path.join(CHECKPOINT_DIRECTORY, f"{run_id}.npz")
+    if not os.path.exists(path):
+        raise ValueError(f"Run {run_id} has no checkpoint.")
+    checkpoint = load_checkpoint(path)
+    customers = vrp_factory.number_nodes - 1
+    if checkpoint.graph_key is not None and checkpoint.graph_key != graph_key(vrp_factory.graph):
+        raise ValueError(f"Checkpoint of run {run_id} belongs to other cities.")
+    if any(int((genome.sequence != vrp_factory.depot_identifier).sum()) != customers
+           or genome.number_vehicles != vrp_factory.number_vehicles for genome in checkpoint.population[:1]):
+        raise ValueError(f"Checkpoint of run {run_id} does not match the problem.")
+    return checkpoint
+
+
+def create_event_stream(data, run: SolverRun) -> SolutionEventStream:
+    return SolutionEventStream(run.metadata["nodes"],
+                               protocol=data.get("protocol", "full"),
+                               min_interval=data.get("min_event_interval", 0.0),
+                               binary=data.get("binary", False))
 
-app = FastAPI()
 
 async def handle_start_command(data, send_event, websocket, node_list=None):
     population_size = data.get("population_size", 100)
@@ -17,29 +102,65 @@ async def handle_start_command(data, send_event, websocket, node_list=None):
     mutation_probability = data.get("mutation_probability", 0.5)
     vehicle_autonomy = data.get("vehicle_autonomy", 600)
     vehicle_capacity = data.get("vehicle_capacity", 20)
+    fleet_definitions = data.get("fleet")
+    sparse_graph = data.get("sparse_graph", False)
+    distance_metric = data.get("distance_metric", "euclidean")
+    seeding = data.get("seeding", 0.0)
+    seeding_heuristics = data.get("seeding_heuristics", CONSTRUCTION_HEURISTICS)
     crossover_probability = data.get("crossover_probability", 1.0)
+    split_mode = data.get("split_mode", "equal")
+    fitness_cache_size = data.get("fitness_cache_size", 10000)
+    profiling = data.get("profiling", False)
+    seed = data.get("seed")
+    selection_method = data.get("selection_method", "tournament")
+    checkpoint_interval = data.get("checkpoint_interval")
+    resume_from = data.get("resume_from")
+    execution_mode = data.get("execution_mode", "sequential")
+    workers = data.get("workers")
+    max_generations = data.get("max_generations")
+    max_time = data.get("max_time", DEFAULT_MAX_TIME)
+    islands = data.get("islands", 1)
+    migration_interval = data.get("migration_interval", 10)
+    migration_size = data.get("migration_size", 2)
+    migration_topology = data.get("migration_topology", "ring")
+    decomposition = data.get("decomposition")
+    clusters = data.get("clusters")
+    cluster_size = data.get("cluster_size", 300)
+    decomposition_workers = data.get("decomposition_workers")
+    depots = data.get("depots")
+    depot_capacities = data.get("depot_capacities")
+    trunk_fleet_definitions = data.get("trunk_fleet")
+    local_search = data.get("local_search", False)
+    local_search_neighbors = data.get("local_search_neighbors", 10)
+    local_search_time_budget = data.get("local_search_time_budget", 0.05)
+    local_search_elite_size = data.get("local_search_elite_size", 1)
 
+    try:
+        distance_provider = metric_provider(distance_metric)
+    except ValueError as e:
+        await websocket.send_json({"event": "error", "message": str(e)})
+        return None, None
+    cache = MatrixCache(DISTANCE_CACHE_DIRECTORY) if DISTANCE_CACHE_DIRECTORY else None
     cities = data.get("cities")
-    if cities:
-        try:
-            nodes_from_client = [
-                Node(
-                    identifier=city["identifier"],
-                    x=city["x"],
-                    y=city["y"],
-                    priority=city.get("priority", 0),
-                    demand=city.get("demand", 1)
-                )
-                for city in cities
-            ]
-            g = Graph(nodes_from_client)
-        except Exception as e:
-            await websocket.send_json({"event": "error", "message": f"Erro ao processar cidades: {str(e)}"})
-            return None
-    else:
-        nodes_from_client = None
-        g = Graph(nodes)
     try:
+        nodes_from_client = [
+            Node(
+                identifier=city["identifier"],
+                x=city["x"],
+                y=city["y"],
+                priority=city.get("priority", 0),
+                demand=city.get("demand", 1)
+            )
+            for city in cities
+        ] if cities else None
+        # Building the matrices of new cities takes a while, so it happens off the event loop
+        g, cached = await asyncio.to_thread(graph_cache.get, nodes_from_client or nodes, sparse_graph,
+                                            distance_provider, cache)
+    except Exception as e:
+        await websocket.send_json({"event": "error", "message": f"Erro ao processar cidades: {str(e)}"})
+        return None, None
+    try:
+        fleet = Fleet.from_definitions(fleet_definitions) if fleet_definitions else None
         vrp_factory = VrpFactory(
             g,
             population_size,
@@ -47,17 +168,44 @@ async def handle_start_command(data, send_event, websocket, node_list=None):
             mutation_probability,
             vehicle_autonomy,
             vehicle_capacity,
-            crossover_probability
-        )
-        runner = GeneticAlgorithmRunner(
-            vrp_factory,
-            population_size,
-            on_new_best_solution=send_event
+            crossover_probability,
+            split_mode,
+            fitness_cache_size,
+            profiling,
+            seed,
+            selection_method,
+            fleet,
+            seeding,
+            tuple(seeding_heuristics)
         )
-        await runner.start()
-        await websocket.send_json({"event": "started"})
-        return runner, nodes_from_client if nodes_from_client else nodes
-    except ValueError as e:
+        local_search_options = {"neighbors": local_search_neighbors, "time_budget": local_search_time_budget,
+                                "elite_size": local_search_elite_size} if local_search else None
+        island_options = {"islands": islands, "migration_interval": migration_interval,
+                          "migration_size": migration_size, "topology": migration_topology} if islands > 1 else None
+        decomposition_options = {"method": decomposition, "clusters": clusters, "cluster_size": cluster_size,
+                                 "workers": decomposition_workers} if decomposition else None
+        if depots:
+            trunk_fleet = Fleet.from_definitions(trunk_fleet_definitions) if trunk_fleet_definitions else None
+            decomposition_options = {"depots": depots, "depot_capacities": depot_capacities,
+                                     "trunk_fleet": trunk_fleet, "workers": decomposition_workers}
+        checkpoint = await asyncio.to_thread(load_run_checkpoint, resume_from, vrp_factory) if resume_from else None
+        # Submitting generates the initial population, so it also runs off the event loop
+        run = await asyncio.to_thread(scheduler.submit, vrp_factory, population_size, max_generations, max_time,
+                                      local_search_options,
+                                      metadata={"nodes": nodes_from_client if nodes_from_client else nodes},
+                                      subscriber=send_event, island_options=island_options, checkpoint=checkpoint,
+                                      checkpoint_directory=CHECKPOINT_DIRECTORY if checkpoint_interval else None,
+                                      checkpoint_interval=checkpoint_interval or 0.0,
+                                      decomposition_options=decomposition_options, execution_mode=execution_mode,
+                                      workers=workers, loop=asyncio.get_running_loop())
+        stream = create_event_stream(data, run)
+        started = {**stream.started_event(), "run_id": run.run_id, "graph_cached": cached}
+        if checkpoint is not None:
+            started.update({"resumed_from": resume_from, "generation": run.generation,
+                            "best_solution": stream.solution_dict(run.best_solution)})
+        await websocket.send_json(started)
+        return run, stream
+    except (KeyError, TypeError, ValueError) as e:
         await websocket.send_json({"event": "error", "message": str(e)})
         return None, None
 
@@ -65,6 +213,8 @@ async def handle_start_command(data, send_event, websocket, node_list=None):
 async def websocket_endpoint(websocket: WebSocket):
     """
     WebSocket endpoint for managing the genetic algorithm for solving the Vehicle Routing Problem (VRP).
+    Runs are executed by the shared scheduler and outlive the connection: a client can attach to a run again
+    with its run_id.
     Args:
         websocket: The WebSocket connection.
 
@@ -76,15 +226,49 @@ async def websocket_endpoint(websocket: WebSocket):
     """
     await websocket.accept()
 
-    runner = None
-    node_list = None
+    run = None
+    stream = None
+    # Solution events wait until the started/attached event is sent: in the delta protocol it carries the nodes
+    # the solution events refer to
+    ready = asyncio.Event()
+    # Sends the solution event held back by the minimum event interval once it expires
+    trailing: Optional[asyncio.Task] = None
+
+    async def send_message(message):
+        if isinstance(message, bytes):
+            await websocket.send_bytes(message)
+        else:
+            await websocket.send_json(message)
+
+    async def send_trailing(current: SolutionEventStream):
+        while delay := current.pending_delay():
+            await asyncio.sleep(delay)
+        message = current.flush()
+        if message is not None and current is stream:
+            await send_message(message)
 
     async def send_event_with_nodes(event: dict):
+        nonlocal trailing
+        await ready.wait()
+        if run is None or event.get("run_id") != run.run_id:
+            return
         # Only adjust for new_best_solution
-        if event.get("event") == "new_best_solution" and runner and node_list:
-            customer_id_to_node = {n.identifier: n for n in node_list}
-            solution_obj = runner.best_solution
-            event["solution"] = solution_obj.to_dict(customer_id_to_node=customer_id_to_node) if solution_obj else None
+        if event.get("event") == "new_best_solution" and stream:
+            message = stream.encode(event, run.best_solution)
+            if message is None:
+                if trailing is None or trailing.done():
+                    trailing = asyncio.create_task(send_trailing(stream))
+                return
+            await send_message(message)
+            return
+        if event.get("event") in ("run_finished", "run_failed") and stream:
+            # The last improvement reaches the client before the end of the run
+            message = stream.flush()
+            if message is not None:
+                await send_message(message)
+        if event.get("event") == "instance_updated" and stream:
+            await websocket.send_json(stream.updated_event(event, run.metadata["nodes"], run.best_solution))
+            return
         await websocket.send_json(event)
 
     try:
@@ -93,36 +277,65 @@ async def websocket_endpoint(websocket: WebSocket):
             command = data.get("command")
 
             if command == "start":
-                runner, node_list = await handle_start_command(data, send_event_with_nodes, websocket)
-            elif command == "pause" and runner:
-                await runner.pause()
+                ready.clear()
+                if run:
+                    # A connection follows a single run: starting again replaces the previous one
+                    scheduler.unsubscribe(run.run_id, send_event_with_nodes)
+                    scheduler.stop(run.run_id)
+                run, stream = await handle_start_command(data, send_event_with_nodes, websocket)
+                ready.set()
+            elif command == "attach":
+                attached = scheduler.get(data.get("run_id"))
+                if attached is None:
+                    await websocket.send_json({"event": "error", "message": f"Run {data.get('run_id')} does not exist."})
+                    continue
+                ready.clear()
+                if run:
+                    scheduler.unsubscribe(run.run_id, send_event_with_nodes)
+                run, stream = attached, create_event_stream(data, attached)
+                scheduler.subscribe(run.run_id, send_event_with_nodes)
+                await websocket.send_json({**stream.started_event(), **run.status(), "event": "attached",
+                                           "best_solution": stream.solution_dict(run.best_solution)})
+                ready.set()
+            elif command == "runs":
+                await websocket.send_json({"event": "runs", "runs": [r.status() for r in scheduler.runs()]})
+            elif command == "pause" and run:
+                scheduler.pause(run.run_id)
                 await websocket.send_json({"event": "paused"})
-            elif command == "resume" and runner:
-                await runner.resume()
+            elif command == "resume" and run:
+                scheduler.resume(run.run_id)
                 await websocket.send_json({"event": "resumed"})
-            elif command == "stop" and runner:
-                customer_id_to_node = {n.identifier: n for n in node_list} if node_list else {}
-                solution_obj = runner.best_solution
-                solution = solution_obj.to_dict(customer_id_to_node=customer_id_to_node) if solution_obj else None
-                await runner.stop()
+            elif command == "stop" and run:
+                scheduler.stop(run.run_id)
                 await websocket.send_json({
                     "event": "stopped",
-                    "solution": solution
+                    "solution": stream.solution_dict(run.best_solution)
                 })
-            elif command == "status" and runner:
-                customer_id_to_node = {n.identifier: n for n in node_list} if node_list else {}
-                status = runner.status()
-                solution_obj = runner.best_solution
-                status["best_solution"] = solution_obj.to_dict(customer_id_to_node=customer_id_to_node) if solution_obj else None
+            elif command == "update" and run:
+                # Customers added, removed or changed mid-solve: the run continues from its repaired population
+                try:
+                    added = [Node(identifier=city["identifier"], x=city["x"], y=city["y"],
+                                  priority=city.get("priority", 0), demand=city.get("demand", 1))
+                             for city in data.get("add", [])]
+                    await asyncio.to_thread(scheduler.update, run.run_id, added, data.get("remove", []),
+                                            data.get("change", []))
+                except (KeyError, TypeError, ValueError) as e:
+                    await websocket.send_json({"event": "error", "message": f"Erro ao atualizar cidades: {str(e)}"})
+            elif command == "status" and run:
+                status = run.status()
+                status["best_solution"] = stream.solution_dict(run.best_solution)
                 await websocket.send_json({"event": "status", **status})
-            elif command == "get_best_solution" and runner:
-                customer_id_to_node = {n.identifier: n for n in node_list} if node_list else {}
-                solution_obj = runner.best_solution
-                solution = solution_obj.to_dict(customer_id_to_node=customer_id_to_node) if solution_obj else None
+            elif command == "metrics" and run:
+                await websocket.send_json({"event": "metrics", **run.metrics()})
+            elif command == "get_best_solution" and run:
+                solution = stream.solution_dict(run.best_solution)
                 await websocket.send_json({
                     "event": "best_solution",
                     "solution": solution
                 })
     except Exception:
-        if runner:
-            await runner.stop()
+        if trailing is not None:
+            trailing.cancel()
+        # The run keeps going within its budget, so the client can attach again
+        if run:
+            scheduler.unsubscribe(run.run_id, send_event_with_nodes)
@@ -0,0 +1,67 @@
+import argparse
+import json
+import sys
+
+import genetic_algorithm  # noqa: F401 (loads the operators before the VRP package)
+from benchmark.cvrplib import bundled_instances, load_instance
+from benchmark.harness import compare_results, run_benchmark, run_isolated, write_results
+from domain.graph import FileDistance, MatrixCache
+
+
+def main(arguments=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmark",
+                                     description="Runs the genetic algorithm headless on CVRP instances.")
+    parser.add_argument("instances", nargs="*", help=".vrp files (the bundled instances by default)")
+    parser.add_argument("--seed", type=int, action="append", help="seed of a run (repeatable, default 0)")
+    parser.add_argument("--generations", type=int, default=200)
+    parser.add_argument("--time-limit", type=float, help="seconds per run; with --generations, the first reached")
+    parser.add_argument("--population-size", type=int, default=100)
+    parser.add_argument("--vehicles", type=int, help="number of vehicles (the instance one by default)")
+    parser.add_argument("--split-mode", default="equal")
+    parser.add_argument("--sparse", action="store_true", help="sparse graph (no distance matrix), for large instances")
+    parser.add_argument("--seeding", type=float, default=0.0,
+                        help="share of the initial population built with construction heuristics")
+    parser.add_argument("--distance-file", help="precomputed distance matrix (.npy or CSV), rows in the node order of "
+                                                    "the instance (depot first)")
+    parser.add_argument("--distance-cache", help="directory of the cached distance matrices")
+    parser.add_argument("--in-process", action="store_true",
+                        help="run every instance in this process (faster, but the peak memory is process-wide)")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="previous results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    options = parser.parse_args(arguments)
+
+    paths = options.instances or bundled_instances()
+    seeds = options.seed or [0]
+    distance_provider = FileDistance(options.distance_file) if options.distance_file else None
+    cache = MatrixCache(options.distance_cache) if options.distance_cache else None
+    run = run_benchmark if options.in_process else run_isolated
+    memory = "process-wide peak RSS" if options.in_process else "peak RSS"
+    results = []
+    for path in paths:
+        instance = load_instance(path)
+        for seed in seeds:
+            result = run(instance, seed, generations=options.generations, time_limit=options.time_limit,
+                         population_size=options.population_size, number_vehicles=options.vehicles,
+                         split_mode=options.split_mode, sparse=options.sparse, seeding=options.seeding,
+                         distance_provider=distance_provider, cache=cache)
+            results.append(result)
+            print(f"{result['instance']} seed={seed}: {result['generations']} generations, "
+                  f"{result['generations_per_second']} gen/s, {result['evaluations_per_second']} eval/s, "
+                  f"best distance {result['best_distance']}, {memory} {result['peak_rss_kb']} KB "
+                  f"(before the run {result['peak_rss_baseline_kb']} KB)")
+
+    document = write_results(results, options.output, {key: value for key, value in vars(options).items()
+                                                        if key not in ("instances", "compare")})
+    if options.compare:
+        with open(options.compare) as file:
+            regressions = compare_results(document, json.load(file), options.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
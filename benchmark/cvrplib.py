@@ -0,0 +1,92 @@
+import re
+from pathlib import Path
+from typing import Optional
+
+from domain.graph import Node
+
+BUNDLED_INSTANCES_DIRECTORY = Path(__file__).parent / "instances"
+
+
+class BenchmarkInstance:
+    """
+    CVRP instance read from a TSPLIB/CVRPLIB file, with the depot renumbered to node 0 (as expected by VrpFactory)
+    and the other nodes renumbered 1..n-1 in file order.
+    """
+
+    def __init__(self, name: str, nodes: list[Node], capacity: int, number_vehicles: Optional[int] = None,
+                 best_known: Optional[float] = None) -> None:
+        self.name = name
+        self.nodes = nodes
+        self.capacity = capacity
+        self.number_vehicles = number_vehicles
+        self.best_known = best_known
+
+    def __str__(self) -> str:
+        return f"BenchmarkInstance(name={self.name}, nodes={len(self.nodes)}, capacity={self.capacity})"
+
+    __repr__ = __str__
+
+
+def bundled_instances() -> list[Path]:
+    return sorted(BUNDLED_INSTANCES_DIRECTORY.glob("*.vrp"))
+
+
+def load_instance(path) -> BenchmarkInstance:
+    """
+    Reads a .vrp file with EUC_2D coordinates (NODE_COORD_SECTION, DEMAND_SECTION and DEPOT_SECTION).
+    The best known value is read from a BEST_KNOWN entry or from "Optimal value: X" / "Best value: X" in the
+    COMMENT, and the number of vehicles from "No of trucks: K" in the COMMENT or the "-kK" suffix of the name.
+    Args:
+        path: Path of the .vrp file.
+
+    Returns:
+        The instance.
+    Raises:
+        ValueError: If the file is not a supported CVRP instance.
+    """
+    specification: dict[str, str] = {}
+    coordinates: dict[int, tuple[float, float]] = {}
+    demands: dict[int, int] = {}
+    depots: list[int] = []
+    section = None
+    for line in Path(path).read_text().splitlines():
+        line = line.strip()
+        if not line or line == "EOF":
+            continue
+        if line.endswith("_SECTION"):
+            section = line
+            continue
+        if re.match(r"^[A-Za-z_]+\s*:", line):
+            key, value = line.split(":", 1)
+            specification[key.strip()] = value.strip()
+            section = None
+            continue
+        fields = line.split()
+        if section == "NODE_COORD_SECTION":
+            coordinates[int(fields[0])] = (float(fields[1]), float(fields[2]))
+        elif section == "DEMAND_SECTION":
+            demands[int(fields[0])] = int(fields[1])
+        elif section == "DEPOT_SECTION":
+            if int(fields[0]) >= 0:
+                depots.append(int(fields[0]))
+
+    if specification.get("EDGE_WEIGHT_TYPE", "EUC_2D") != "EUC_2D":
+        raise ValueError(f"Edge weight type {specification['EDGE_WEIGHT_TYPE']} is not supported.")
+    if not coordinates or "CAPACITY" not in specification:
+        raise ValueError("Instance must have NODE_COORD_SECTION and CAPACITY.")
+
+    depot = depots[0] if depots else min(coordinates)
+    order = [depot] + [identifier for identifier in sorted(coordinates) if identifier != depot]
+    nodes = [Node(identifier=position, x=coordinates[identifier][0], y=coordinates[identifier][1],
+                  demand=demands.get(identifier, 0)) for position, identifier in enumerate(order)]
+
+    name = specification.get("NAME", Path(path).stem)
+    comment = specification.get("COMMENT", "")
+    best_known = specification.get("BEST_KNOWN")
+    if best_known is None:
+        match = re.search(r"(?:Optimal|Best) value:\s*([\d.]+)", comment, re.IGNORECASE)
+        best_known = match.group(1) if match else None
+    vehicles = re.search(r"No of trucks:\s*(\d+)", comment, re.IGNORECASE) or re.search(r"-k(\d+)", name)
+    return BenchmarkInstance(name, nodes, int(specification["CAPACITY"]),
+                             int(vehicles.group(1)) if vehicles else None,
+                             float(best_known) if best_known is not None else None)
@@ -0,0 +1,219 @@
+import asyncio
+import json
+import multiprocessing
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from benchmark.cvrplib import BenchmarkInstance
+from domain.graph import DistanceProvider, Graph, MatrixCache
+from genetic_algorithm import GeneticAlgorithmRunner
+from vrp.vrp_builder import VrpFactory
+
+TARGET_GAPS = (10.0, 5.0, 2.0, 1.0)
+TIMED_OPERATIONS = ("evaluate_population", "sort_population", "crossover", "mutate")
+
+
+class TimedVRP:
+    """
+    Proxy of a VRP accumulating the calls and time of each genetic operation; the evaluations count only the
+    genomes actually scored (those without fitness).
+    """
+
+    def __init__(self, vrp) -> None:
+        self.__vrp = vrp
+        self.generations = 0
+        self.evaluations = 0
+        self.calls = {operation: 0 for operation in TIMED_OPERATIONS}
+        self.seconds = {operation: 0.0 for operation in TIMED_OPERATIONS}
+
+    def __getattr__(self, name):
+        return getattr(self.__vrp, name)
+
+    def __timed(self, operation: str, *args):
+        start = time.perf_counter()
+        result = getattr(self.__vrp, operation)(*args)
+        self.seconds[operation] += time.perf_counter() - start
+        self.calls[operation] += 1
+        return result
+
+    def evaluate_population(self, population):
+        self.evaluations += sum(1 for individual in population if individual.fitness is None)
+        return self.__timed("evaluate_population", population)
+
+    def sort_population(self, population):
+        self.generations += 1
+        return self.__timed("sort_population", population)
+
+    def crossover(self, p1, p2):
+        return self.__timed("crossover", p1, p2)
+
+    def mutate(self, solution):
+        return self.__timed("mutate", solution)
+
+
+def peak_rss_kb() -> int:
+    """Peak resident memory of the whole process since it started (not of a single run)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def time_to_targets(trajectory: list[tuple[float, float]], reference: float) -> dict:
+    """
+    Seconds until the best distance first got within each gap of the reference.
+    Args:
+        trajectory: (seconds, best distance) at every improvement, in order.
+        reference: Best known distance (or best distance of the run).
+
+    Returns:
+        Dictionary from the gap ("5%") to the seconds, or None when the gap was never reached.
+    """
+    targets = {}
+    for gap in TARGET_GAPS:
+        limit = reference * (1 + gap / 100)
+        targets[f"{gap:g}%"] = next((round(seconds, 4) for seconds, distance in trajectory if distance <= limit), None)
+    return targets
+
+
+def run_benchmark(instance: BenchmarkInstance, seed: int = 0, generations: Optional[int] = 200,
+                  time_limit: Optional[float] = None, population_size: int = 100,
+                  number_vehicles: Optional[int] = None, split_mode: str = "equal",
+                  vehicle_autonomy: float = float("inf"), sparse: bool = False, seeding: float = 0.0,
+                  distance_provider: Optional[DistanceProvider] = None, cache: Optional[MatrixCache] = None) -> dict:
+    """
+    Runs the GeneticAlgorithmRunner headless (sequential mode) on an instance with a fixed seed.
+    Distances are the euclidean distances of the graph, not rounded as in the CVRPLIB convention, so the gap to the
+    best known value is approximate. The peak memory is the one of the whole process (peak_rss_kb), reported with
+    the peak before the run: the run alone is measured by run_isolated.
+    Args:
+        instance: Instance to be solved.
+        seed: Seed of the random generator of the run.
+        generations: Number of generations, or None to run until the time limit.
+        time_limit: Seconds of execution, or None to run until the generations.
+        population_size: Size of the population.
+        number_vehicles: Number of vehicles (the instance number of vehicles by default).
+        split_mode: Split mode of the RouteSplitter.
+        vehicle_autonomy: Autonomy of the vehicles.
+        sparse: Whether to use the sparse graph (distances computed on demand, for large instances).
+        seeding: Share of the initial population built with the construction heuristics.
+        distance_provider: Distances of the graph (the euclidean distances by default).
+        cache: Cache of the distance matrices.
+
+    Returns:
+        Dictionary with the measures of the run.
+    """
+    if generations is None and time_limit is None:
+        raise ValueError("Either generations or time_limit must be set.")
+    baseline_rss = peak_rss_kb()
+    number_vehicles = number_vehicles or instance.number_vehicles or 1
+    graph = Graph(instance.nodes, sparse=sparse, distance_provider=distance_provider, cache=cache)
+    factory = VrpFactory(graph, population_size, number_vehicles, vehicle_autonomy=vehicle_autonomy,
+                         vehicle_capacity=instance.capacity, split_mode=split_mode, seed=seed,
+                         seeding=seeding)
+
+    trajectory: list[tuple[float, float]] = []
+    start = time.perf_counter()
+
+    async def record(event: dict) -> None:
+        trajectory.append((time.perf_counter() - start, event["best_distance"]))
+
+    runner = GeneticAlgorithmRunner(factory, population_size, on_new_best_solution=record)
+    timed = TimedVRP(runner.vrp)
+    runner.vrp = timed
+
+    async def drive() -> None:
+        runner.running = True
+        task = asyncio.create_task(runner.loop())
+        while (generations is None or timed.generations < generations) and \
+                (time_limit is None or time.perf_counter() - start < time_limit):
+            await asyncio.sleep(0)
+        runner.running = False
+        await task
+
+    start = time.perf_counter()
+    asyncio.run(drive())
+    elapsed = time.perf_counter() - start
+
+    best = runner.best_solution
+    best_distance = best.total_distance()
+    reference = instance.best_known if instance.best_known is not None else best_distance
+    operations_time = sum(timed.seconds.values())
+    return {
+        "instance": instance.name,
+        "nodes": len(instance.nodes),
+        "seed": seed,
+        "population_size": population_size,
+        "number_vehicles": number_vehicles,
+        "split_mode": split_mode,
+        "sparse": sparse,
+        "seeding": seeding,
+        "generations": timed.generations,
+        "elapsed_seconds": round(elapsed, 4),
+        "generations_per_second": round(timed.generations / elapsed, 4),
+        "evaluations": timed.evaluations,
+        "evaluations_per_second": round(timed.evaluations / elapsed, 4),
+        "best_distance": round(best_distance, 4),
+        "best_fitness": round(best.fitness, 4),
+        "best_known": instance.best_known,
+        "gap_percent": round((best_distance / instance.best_known - 1) * 100, 4) if instance.best_known else None,
+        "target_reference": "best_known" if instance.best_known is not None else "run_best",
+        "time_to_target": time_to_targets(trajectory, reference),
+        "peak_rss_kb": peak_rss_kb(),
+        "peak_rss_baseline_kb": baseline_rss,
+        "operators": {
+            **{operation: {"calls": timed.calls[operation], "seconds": round(timed.seconds[operation], 4)}
+               for operation in TIMED_OPERATIONS},
+            # Selection, elitism and the runner bookkeeping
+            "other": {"seconds": round(max(elapsed - operations_time, 0.0), 4)}
+        }
+    }
+
+
+def run_isolated(instance: BenchmarkInstance, seed: int = 0, **options) -> dict:
+    """
+    run_benchmark in a new process, so the peak memory of the result is the one of this run (and of the imports)
+    instead of the largest run executed so far in the process.
+    Args:
+        instance: Instance to be solved.
+        seed: Seed of the random generator of the run.
+        options: Other arguments of run_benchmark.
+
+    Returns:
+        Dictionary with the measures of the run.
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(run_benchmark, instance, seed, **options).result()
+
+
+def compare_results(current: dict, previous: dict, tolerance: float = 0.1) -> list[str]:
+    """
+    Compares two results files, reporting the instances whose throughput dropped or whose best distance got worse
+    by more than the tolerance.
+    Args:
+        current: Results of this run.
+        previous: Results of the baseline run.
+        tolerance: Relative change accepted (0.1 = 10%).
+
+    Returns:
+        List of regression descriptions (empty when there is no regression).
+    """
+    baseline = {(result["instance"], result["seed"]): result for result in previous["results"]}
+    regressions = []
+    for result in current["results"]:
+        before = baseline.get((result["instance"], result["seed"]))
+        if before is None:
+            continue
+        for metric in ("generations_per_second", "evaluations_per_second"):
+            if before[metric] and result[metric] < before[metric] * (1 - tolerance):
+                regressions.append(f"{result['instance']}: {metric} dropped from {before[metric]} to {result[metric]}")
+        if result["best_distance"] > before["best_distance"] * (1 + tolerance):
+            regressions.append(f"{result['instance']}: best_distance rose from {before['best_distance']} "
+                               f"to {result['best_distance']}")
+    return regressions
+
+
+def write_results(results: list[dict], path, settings: dict) -> dict:
+    document = {"settings": settings, "results": results}
+    with open(path, "w") as file:
+        json.dump(document, file, indent=2)
+    return document
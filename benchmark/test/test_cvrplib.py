@@ -0,0 +1,67 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from benchmark.cvrplib import bundled_instances, load_instance
+
+INSTANCE = """NAME : A-n5-k2
+COMMENT : (Augerat et al, No of trucks: 2, Optimal value: 123)
+TYPE : CVRP
+DIMENSION : 5
+EDGE_WEIGHT_TYPE : EUC_2D
+CAPACITY : 10
+NODE_COORD_SECTION
+ 1 0 0
+ 2 3 4
+ 3 6 8
+ 4 0 5
+ 5 1 1
+DEMAND_SECTION
+1 4
+2 5
+3 0
+4 7
+5 2
+DEPOT_SECTION
+ 3
+ -1
+EOF
+"""
+
+
+class TestLoadInstance(TestCase):
+
+    def write(self, content):
+        handle, path = tempfile.mkstemp(suffix=".vrp")
+        with os.fdopen(handle, "w") as file:
+            file.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_depot_is_renumbered_to_zero(self):
+        instance = load_instance(self.write(INSTANCE))
+
+        self.assertEqual(instance.name, "A-n5-k2")
+        self.assertEqual(instance.capacity, 10)
+        self.assertEqual([node.identifier for node in instance.nodes], [0, 1, 2, 3, 4])
+        self.assertEqual((instance.nodes[0].x, instance.nodes[0].y, instance.nodes[0].demand), (6, 8, 0))
+        self.assertEqual([node.demand for node in instance.nodes[1:]], [4, 5, 7, 2])
+
+    def test_best_known_and_vehicles_are_read_from_the_comment(self):
+        instance = load_instance(self.write(INSTANCE))
+
+        self.assertEqual(instance.best_known, 123.0)
+        self.assertEqual(instance.number_vehicles, 2)
+
+    def test_unsupported_edge_weight_type(self):
+        with self.assertRaises(ValueError):
+            load_instance(self.write(INSTANCE.replace("EUC_2D", "EXPLICIT")))
+
+    def test_bundled_instances(self):
+        instances = [load_instance(path) for path in bundled_instances()]
+
+        self.assertEqual(len(instances), 3)
+        for instance in instances:
+            self.assertIsNone(instance.best_known)
+            self.assertEqual(instance.nodes[0].demand, 0)
+            self.assertEqual(len(instance.nodes), int(instance.name.split("-n")[1].split("-")[0]))
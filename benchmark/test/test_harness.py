@@ -0,0 +1,76 @@
+from unittest import TestCase
+
+import genetic_algorithm  # noqa: F401
+from benchmark.cvrplib import BenchmarkInstance
+from benchmark.harness import compare_results, run_benchmark, run_isolated, time_to_targets
+from domain.graph import Node
+
+
+def instance():
+    nodes = [Node(identifier=0, x=50, y=50)] + [
+        Node(identifier=i, x=(i * 37) % 100, y=(i * 61) % 100, demand=1 + i % 4) for i in range(1, 15)]
+    return BenchmarkInstance("test-n15-k2", nodes, capacity=20, number_vehicles=2)
+
+
+class TestRunBenchmark(TestCase):
+
+    def test_report(self):
+        result = run_benchmark(instance(), seed=3, generations=5, population_size=10)
+
+        self.assertEqual(result["generations"], 5)
+        self.assertEqual(result["number_vehicles"], 2)
+        self.assertEqual(result["operators"]["sort_population"]["calls"], 5)
+        self.assertGreater(result["evaluations"], 0)
+        self.assertGreater(result["peak_rss_kb"], 0)
+        self.assertEqual(result["target_reference"], "run_best")
+        # Without a best known value the run best is the reference, always reached
+        self.assertIsNotNone(result["time_to_target"]["1%"])
+
+    def test_isolated_run_measures_its_own_memory(self):
+        in_process = run_benchmark(instance(), seed=7, generations=5, population_size=10)
+        isolated = run_isolated(instance(), seed=7, generations=5, population_size=10)
+
+        self.assertEqual(isolated["best_distance"], in_process["best_distance"])
+        self.assertGreater(isolated["peak_rss_kb"], 0)
+        self.assertLessEqual(isolated["peak_rss_baseline_kb"], isolated["peak_rss_kb"])
+        self.assertLessEqual(in_process["peak_rss_baseline_kb"], in_process["peak_rss_kb"])
+
+    def test_same_seed_same_result(self):
+        first = run_benchmark(instance(), seed=7, generations=5, population_size=10)
+        second = run_benchmark(instance(), seed=7, generations=5, population_size=10)
+
+        self.assertEqual(first["best_distance"], second["best_distance"])
+        self.assertEqual(first["evaluations"], second["evaluations"])
+
+    def test_budget_is_required(self):
+        with self.assertRaises(ValueError):
+            run_benchmark(instance(), generations=None, time_limit=None)
+
+
+class TestTimeToTargets(TestCase):
+
+    def test_first_time_within_each_gap(self):
+        targets = time_to_targets([(0.1, 120.0), (0.5, 104.0), (0.9, 100.5)], 100.0)
+
+        self.assertEqual(targets, {"10%": 0.5, "5%": 0.5, "2%": 0.9, "1%": 0.9})
+
+    def test_unreached_gap(self):
+        self.assertIsNone(time_to_targets([(0.1, 120.0)], 100.0)["10%"])
+
+
+class TestCompareResults(TestCase):
+
+    @staticmethod
+    def document(generations_per_second, best_distance):
+        return {"results": [{"instance": "a", "seed": 0, "generations_per_second": generations_per_second,
+                             "evaluations_per_second": 100.0, "best_distance": best_distance}]}
+
+    def test_within_tolerance(self):
+        self.assertEqual(compare_results(self.document(95.0, 105.0), self.document(100.0, 100.0), 0.1), [])
+
+    def test_regressions(self):
+        regressions = compare_results(self.document(50.0, 150.0), self.document(100.0, 100.0), 0.1)
+
+        self.assertEqual(len(regressions), 2)
+        self.assertIn("generations_per_second", regressions[0])
+        self.assertIn("best_distance", regressions[1])
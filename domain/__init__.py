@@ -1,3 +1,5 @@
 from .route import Route
 from .solution import Solution
-from .vehicle import Vehicle
\ No newline at end of file
+from .vehicle import Vehicle
+from .genome import Genome
+from .fleet import Fleet
@@ -0,0 +1,78 @@
+import numpy as np
+
+
+class Fleet:
+    """
+    Vehicles available to a run as per-vehicle arrays: capacity, autonomy (maximum distance of a trip) and
+    operating cost per unit of distance. The vehicle i of every genome of the run is the vehicle i of the fleet,
+    so heterogeneous fleets are handled by the operators and the fitness without per-vehicle objects.
+    """
+    __slots__ = ("capacities", "autonomies", "costs")
+
+    def __init__(self, capacities, autonomies, costs=0.0) -> None:
+        capacities = np.atleast_1d(np.asarray(capacities))
+        number_vehicles = len(capacities)
+        if number_vehicles == 0:
+            raise ValueError("a frota deve ter ao menos um veículo")
+        self.capacities: np.ndarray = capacities
+        self.autonomies: np.ndarray = np.broadcast_to(np.asarray(autonomies), (number_vehicles,))
+        self.costs: np.ndarray = np.broadcast_to(np.asarray(costs, dtype=np.float64), (number_vehicles,))
+        if not all(np.issubdtype(values.dtype, np.number) for values in (self.capacities, self.autonomies)):
+            raise ValueError("capacidade e autonomia dos veículos devem ser numéricas")
+        if np.any(self.costs < 0):
+            raise ValueError("custo dos veículos não pode ser negativo")
+
+    @classmethod
+    def homogeneous(cls, number_vehicles: int, capacity: float, autonomy: float, cost: float = 0.0) -> "Fleet":
+        if number_vehicles <= 0:
+            raise ValueError("a frota deve ter ao menos um veículo")
+        return cls(np.full(number_vehicles, capacity), autonomy, cost)
+
+    @classmethod
+    def from_definitions(cls, definitions: list[dict]) -> "Fleet":
+        """
+        Builds the fleet from vehicle types, e.g. [{"capacity": 5, "autonomy": 80, "cost": 0.2, "count": 3}].
+        Args:
+            definitions: List of vehicle types with capacity, autonomy, cost (default 0) and count (default 1).
+
+        Returns:
+            The fleet, vehicles in the order of the definitions.
+        Raises:
+            ValueError: If a definition is not valid.
+        """
+        capacities, autonomies, costs = [], [], []
+        for definition in definitions:
+            try:
+                count = int(definition.get("count", 1))
+                capacity, autonomy = definition["capacity"], definition["autonomy"]
+                cost = float(definition.get("cost", 0.0))
+                if not all(isinstance(value, (int, float)) and not isinstance(value, bool)
+                           for value in (capacity, autonomy)):
+                    raise TypeError
+            except (AttributeError, KeyError, TypeError, ValueError):
+                raise ValueError(f"tipo de veículo inválido: {definition!r}") from None
+            if count <= 0:
+                raise ValueError(f"quantidade de veículos deve ser maior que zero: {definition!r}")
+            capacities += [capacity] * count
+            autonomies += [autonomy] * count
+            costs += [cost] * count
+        return cls(capacities, autonomies, costs)
+
+    @property
+    def number_vehicles(self) -> int:
+        return len(self.capacities)
+
+    @property
+    def is_homogeneous(self) -> bool:
+        return bool(np.all(self.capacities == self.capacities[0]) and np.all(self.autonomies == self.autonomies[0])
+                    and np.all(self.costs == self.costs[0]))
+
+    def to_dict(self) -> list[dict]:
+        return [{"capacity": capacity, "autonomy": autonomy, "cost": cost}
+                for capacity, autonomy, cost in zip(self.capacities.tolist(), self.autonomies.tolist(),
+                                                    self.costs.tolist())]
+
+    def __str__(self) -> str:
+        return f"Fleet(vehicles={self.number_vehicles}, homogeneous={self.is_homogeneous})"
+
+    __repr__ = __str__
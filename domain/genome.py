@@ -0,0 +1,87 @@
+from typing import Optional
+
+import numpy as np
+
+from .route import Route
+from .solution import Solution
+from .vehicle import Vehicle
+
+
+class Genome:
+    """
+    Compact chromosome used by the genetic operators.
+    The itineraries of all vehicles (depot visits included) are stored in a single int32 array, cut by the
+    vehicle offsets, with per-vehicle capacities, autonomies, operating costs and cached distances as arrays. Genomes are never
+    changed in place by the operators, so they can be shared between generations without copies.
+    Solution objects are only materialized for the API (to_solution/to_dict).
+    The fitness is None until the genome is evaluated; penalty keeps the fixed part of the fitness (tolls, priority,
+    capacity and autonomy penalties) so that moves can be evaluated incrementally.
+    """
+    __slots__ = ("sequence", "offsets", "capacities", "autonomies", "distances", "fitness", "penalty", "costs")
+
+    def __init__(self, sequence, offsets, capacities, autonomies, distances=None, fitness: Optional[float] = None,
+                 penalty: Optional[float] = None, costs=0.0) -> None:
+        self.sequence: np.ndarray = np.asarray(sequence, dtype=np.int32)
+        self.offsets: np.ndarray = np.asarray(offsets, dtype=np.int64)
+        number_vehicles = len(self.offsets) - 1
+        if number_vehicles < 0 or (number_vehicles and self.offsets[-1] != len(self.sequence)):
+            raise ValueError("offsets devem delimitar toda a sequência")
+        self.capacities: np.ndarray = np.broadcast_to(np.asarray(capacities), (number_vehicles,))
+        self.autonomies: np.ndarray = np.broadcast_to(np.asarray(autonomies), (number_vehicles,))
+        self.costs: np.ndarray = np.broadcast_to(np.asarray(costs, dtype=np.float64), (number_vehicles,))
+        self.distances: np.ndarray = np.zeros(number_vehicles) if distances is None else np.asarray(distances, dtype=np.float64)
+        self.fitness: Optional[float] = fitness
+        self.penalty: Optional[float] = penalty
+
+    @classmethod
+    def from_solution(cls, solution: Solution) -> "Genome":
+        vehicles = solution.vehicles
+        lengths = [len(vehicle.customers()) for vehicle in vehicles]
+        sequence = [customer for vehicle in vehicles for customer in vehicle.customers()]
+        return cls(sequence, np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)]),
+                   [vehicle.capacity for vehicle in vehicles], [vehicle.autonomy for vehicle in vehicles],
+                   [vehicle.distance() for vehicle in vehicles], solution.fitness,
+                   costs=[vehicle.cost for vehicle in vehicles])
+
+    @property
+    def number_vehicles(self) -> int:
+        return len(self.offsets) - 1
+
+    def route(self, vehicle_index: int) -> np.ndarray:
+        return self.sequence[self.offsets[vehicle_index]:self.offsets[vehicle_index + 1]]
+
+    def customers(self, depot_identifier: int) -> np.ndarray:
+        """
+        Returns the giant tour: the visiting order of the customers without the depot visits.
+        """
+        return self.sequence[self.sequence != depot_identifier]
+
+    def flatten_routes(self) -> list[int]:
+        return self.sequence.tolist()
+
+    def total_distance(self) -> float:
+        return sum(self.distances.tolist())
+
+    @property
+    def vehicles(self) -> list[Vehicle]:
+        vehicles = []
+        for index in range(self.number_vehicles):
+            route = Route(self.route(index).tolist())
+            route.distance = float(self.distances[index])
+            vehicles.append(Vehicle(route, capacity=self.capacities[index].item(), autonomy=self.autonomies[index].item(),
+                                    cost=self.costs[index].item()))
+        return vehicles
+
+    def to_solution(self) -> Solution:
+        solution = Solution(vehicles=self.vehicles)
+        if self.fitness is not None:
+            solution.fitness = self.fitness
+        return solution
+
+    def to_dict(self, customer_id_to_node=None):
+        return self.to_solution().to_dict(customer_id_to_node=customer_id_to_node)
+
+    def __str__(self) -> str:
+        return str(self.to_solution())
+
+    __repr__ = __str__
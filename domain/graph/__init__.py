@@ -1,3 +1,6 @@
 from .node import Node
 from .edge import Edge
 from .graph import Graph
+from .distance import (DistanceProvider, EuclideanDistance, HaversineDistance, FileDistance, MatrixCache,
+                       MatrixDistance, metric_provider)
+from .graph_cache import GraphCache
@@ -0,0 +1,234 @@
+import hashlib
+import os
+from typing import Callable, Optional
+
+import numpy as np
+
+from domain.graph.node import Node
+
+# Mean radius of the Earth in kilometers (IUGG)
+EARTH_RADIUS_KM = 6371.0088
+
+DistanceFunction = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+
+class DistanceProvider:
+    """
+    Source of the distances of a graph. prepare binds the provider to the nodes of the graph and returns a function
+    of node positions (integer arrays broadcast against each other) to distances, used for the dense matrix, the
+    lazy matrix of sparse graphs and the rows of added nodes.
+    """
+    symmetric = True
+
+    def prepare(self, nodes: list[Node]) -> DistanceFunction:
+        raise NotImplementedError
+
+    def matrix(self, nodes: list[Node]) -> np.ndarray:
+        positions = np.arange(len(nodes))
+        return np.asarray(self.prepare(nodes)(positions[:, None], positions[None, :]), dtype=np.float64)
+
+    def fingerprint(self) -> str:
+        """Description of the provider configuration, part of the key of its matrices in a MatrixCache."""
+        return type(self).__name__
+
+
+def _coordinates(nodes: list[Node]) -> tuple[np.ndarray, np.ndarray]:
+    x = np.array([node.x for node in nodes], dtype=np.float64)
+    y = np.array([node.y for node in nodes], dtype=np.float64)
+    return x, y
+
+
+class EuclideanDistance(DistanceProvider):
+    """Straight-line distance between the node coordinates (the default of the graph)."""
+
+    def prepare(self, nodes: list[Node]) -> DistanceFunction:
+        x, y = _coordinates(nodes)
+        return lambda rows, columns: np.hypot(x[rows] - x[columns], y[rows] - y[columns])
+
+    def matrix(self, nodes: list[Node]) -> np.ndarray:
+        x, y = _coordinates(nodes)
+        return np.hypot(x[:, None] - x[None, :], y[:, None] - y[None, :])
+
+
+class HaversineDistance(DistanceProvider):
+    """
+    Great-circle distance for nodes with geographic coordinates: x is the longitude and y the latitude, in degrees.
+    """
+
+    def __init__(self, radius: float = EARTH_RADIUS_KM) -> None:
+        if radius <= 0:
+            raise ValueError("Radius must be greater than zero.")
+        self.radius = radius
+
+    def prepare(self, nodes: list[Node]) -> DistanceFunction:
+        longitudes, latitudes = (np.radians(values) for values in _coordinates(nodes))
+        cosines = np.cos(latitudes)
+
+        def distances(rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+            half_latitudes = np.sin((latitudes[columns] - latitudes[rows]) / 2)
+            half_longitudes = np.sin((longitudes[columns] - longitudes[rows]) / 2)
+            haversine = half_latitudes ** 2 + cosines[rows] * cosines[columns] * half_longitudes ** 2
+            return 2 * self.radius * np.arcsin(np.sqrt(np.clip(haversine, 0.0, 1.0)))
+
+        return distances
+
+    def fingerprint(self) -> str:
+        return f"{type(self).__name__}({self.radius!r})"
+
+
+class FileDistance(DistanceProvider):
+    """
+    Precomputed matrix (e.g. road distances exported from a routing engine) read from a .npy file, memory-mapped,
+    or from a CSV file without header. Row and column i are the node identifiers[i] (the nodes of the graph in
+    order by default).
+    """
+
+    def __init__(self, path, identifiers: Optional[list[int]] = None) -> None:
+        self.path = os.path.abspath(path)
+        self.identifiers = None if identifiers is None else [int(identifier) for identifier in identifiers]
+        self.__matrix: Optional[np.ndarray] = None
+        self.__symmetric: Optional[bool] = None
+
+    @property
+    def values(self) -> np.ndarray:
+        """
+        The matrix of the file, read on first use.
+        Raises:
+            ValueError: If the file is not a square matrix.
+        """
+        if self.__matrix is None:
+            if self.path.endswith(".npy"):
+                matrix = np.load(self.path, mmap_mode="r")
+            else:
+                matrix = np.loadtxt(self.path, delimiter=",", dtype=np.float64, ndmin=2)
+            if matrix.ndim != 2 or matrix.shape[0] != matrix.shape[1]:
+                raise ValueError(f"Distance file {self.path} is not a square matrix.")
+            if self.identifiers is not None and len(self.identifiers) != len(matrix):
+                raise ValueError(f"Distance file {self.path} has {len(matrix)} rows for "
+                                 f"{len(self.identifiers)} identifiers.")
+            self.__matrix = matrix
+        return self.__matrix
+
+    @property
+    def symmetric(self) -> bool:
+        if self.__symmetric is None:
+            self.__symmetric = bool(np.array_equal(self.values, self.values.T))
+        return self.__symmetric
+
+    def __getstate__(self) -> dict:
+        # The matrix is read again from the file instead of being copied to other processes
+        return {**self.__dict__, "_FileDistance__matrix": None}
+
+    def rows_of(self, nodes: list[Node]) -> np.ndarray:
+        """
+        Rows of the file of each node.
+        Raises:
+            ValueError: If a node is not in the file.
+        """
+        if self.identifiers is None:
+            if len(nodes) > len(self.values):
+                raise ValueError(f"Distance file {self.path} has {len(self.values)} rows for {len(nodes)} nodes.")
+            return np.arange(len(nodes))
+        rows = {identifier: row for row, identifier in enumerate(self.identifiers)}
+        try:
+            return np.array([rows[node.identifier] for node in nodes], dtype=np.int64)
+        except KeyError as error:
+            raise ValueError(f"Node {error.args[0]} is not in the distance file {self.path}.") from None
+
+    def prepare(self, nodes: list[Node]) -> DistanceFunction:
+        matrix, rows_of = self.values, self.rows_of(nodes)
+        return lambda rows, columns: np.asarray(matrix[rows_of[rows], rows_of[columns]], dtype=np.float64)
+
+    def matrix(self, nodes: list[Node]) -> np.ndarray:
+        rows = self.rows_of(nodes)
+        if self.identifiers is None and len(rows) == len(self.values):
+            return np.array(self.values, dtype=np.float64)
+        return np.asarray(self.values[np.ix_(rows, rows)], dtype=np.float64)
+
+    def fingerprint(self) -> str:
+        status = os.stat(self.path)
+        return f"{type(self).__name__}({self.path!r}, {status.st_size}, {status.st_mtime_ns}, {self.identifiers!r})"
+
+
+class MatrixDistance(DistanceProvider):
+    """
+    Distances given as a matrix in the order of the nodes of the graph, e.g. the rows and columns of a subgraph
+    sliced from the matrix of its parent graph (see Graph.subgraph).
+    """
+
+    def __init__(self, matrix: np.ndarray) -> None:
+        matrix = np.asarray(matrix, dtype=np.float64)
+        if matrix.ndim != 2 or matrix.shape[0] != matrix.shape[1]:
+            raise ValueError("Distance matrix must be a square matrix.")
+        self.values = matrix
+        self.symmetric = bool(np.array_equal(matrix, matrix.T))
+
+    def prepare(self, nodes: list[Node]) -> DistanceFunction:
+        if len(nodes) > len(self.values):
+            raise ValueError(f"Distance matrix has {len(self.values)} rows for {len(nodes)} nodes.")
+        return lambda rows, columns: self.values[rows, columns]
+
+    def matrix(self, nodes: list[Node]) -> np.ndarray:
+        self.prepare(nodes)
+        # The same array, so a pickled graph does not carry its matrix twice
+        return self.values if len(nodes) == len(self.values) else self.values[:len(nodes), :len(nodes)].copy()
+
+    def fingerprint(self) -> str:
+        return f"{type(self).__name__}({hashlib.sha256(self.values.tobytes()).hexdigest()})"
+
+
+DISTANCE_METRICS = {"euclidean": EuclideanDistance, "haversine": HaversineDistance}
+
+
+def metric_provider(metric: str) -> DistanceProvider:
+    """
+    Provider of a distance computed from the coordinates, by name.
+    Raises:
+        ValueError: If the metric is not one of DISTANCE_METRICS.
+    """
+    if metric not in DISTANCE_METRICS:
+        raise ValueError(f"Distance metric must be one of {tuple(DISTANCE_METRICS)}.")
+    return DISTANCE_METRICS[metric]()
+
+
+class MatrixCache:
+    """
+    Content-addressed directory of graph matrices saved as .npy files and loaded memory-mapped (copy-on-write), so
+    runs on the same nodes skip the computation and processes loading the same matrix share its pages. The key is
+    a hash of the provider configuration and of the identifiers and coordinates of the nodes.
+    """
+
+    def __init__(self, directory) -> None:
+        self.directory = os.fspath(directory)
+
+    @staticmethod
+    def key(provider: DistanceProvider, nodes: list[Node]) -> str:
+        digest = hashlib.sha256(provider.fingerprint().encode())
+        digest.update(np.array([node.identifier for node in nodes], dtype=np.int64).tobytes())
+        for values in _coordinates(nodes):
+            digest.update(values.tobytes())
+        return digest.hexdigest()
+
+    def path(self, key: str, name: str) -> str:
+        return os.path.join(self.directory, f"{key}-{name}.npy")
+
+    def load(self, key: str, name: str, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        """
+        Returns the cached matrix, computing and saving it first when it is not in the cache.
+        Args:
+            key: Key of the nodes and provider (see MatrixCache.key).
+            name: Name of the matrix (e.g. "distances").
+            compute: Function computing the matrix.
+
+        Returns:
+            The matrix, memory-mapped copy-on-write (changes are private to the process).
+        """
+        path = self.path(key, name)
+        if not os.path.exists(path):
+            os.makedirs(self.directory, exist_ok=True)
+            # Written to a temporary file and renamed, so concurrent processes never read a partial matrix
+            temporary = f"{path}.{os.getpid()}.tmp"
+            with open(temporary, "wb") as file:
+                np.save(file, np.ascontiguousarray(compute()))
+            os.replace(temporary, path)
+        return np.load(path, mmap_mode="c")
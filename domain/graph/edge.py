@@ -1,5 +1,27 @@
+import numpy as np
+
 from domain.graph import Node
 
+TOLL_INTERVAL_KM = 150
+
+
+def count_tolls(distances: np.ndarray) -> np.ndarray:
+    """
+    Counts the tolls crossed along each distance, one toll every TOLL_INTERVAL_KM after the first interval.
+    Args:
+        distances: Array of distances.
+
+    Returns:
+        Integer array with the number of tolls for each distance.
+    """
+    distances = np.asarray(distances, dtype=np.float64)
+    tolls = np.floor(distances / TOLL_INTERVAL_KM)
+    # Corrects floating point rounding so that the count matches "TOLL_INTERVAL_KM * k < distance" exactly
+    tolls -= TOLL_INTERVAL_KM * tolls >= distances
+    tolls += TOLL_INTERVAL_KM * (tolls + 1) < distances
+    return np.maximum(tolls, 0).astype(np.int64)
+
+
 class Edge:
 
     def __init__(self, from_node: Node, to_node: Node, distance: float = 0) -> None:
@@ -8,15 +30,9 @@ class Edge:
         self.from_node: Node = from_node
         self.to_node: Node = to_node
         self.distance: float = distance
-
-        tolls = []
-        km = 150
-        while km < distance:
-            km += 150
-            tolls.append(km)
-        self.toll_quantity: int = len(tolls)
+        self.toll_quantity: int = int(count_tolls(distance))
 
     def __str__(self) -> str:
         return f"Edge(from={self.from_node.identifier}, to={self.to_node.identifier}, distance={self.distance})"
-    
-    __repr__ = __str__
\ No newline at end of file
+
+    __repr__ = __str__
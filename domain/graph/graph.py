@@ -1,72 +1,366 @@
-import math
+import copy
+from typing import Optional
+
+import numpy as np
 
 from domain.graph import Node
 from domain.graph import Edge
+from domain.graph.distance import DistanceProvider, EuclideanDistance, MatrixCache, MatrixDistance
+from domain.graph.edge import count_tolls
+from domain.graph.spatial import GridIndex, LazyMatrix
 
 
 class Graph:
-    def __init__(self, nodes: list[Node]) -> None:
+    """
+    Complete graph over the nodes, with distances and tolls as matrices indexed by node position (see index_of).
+    In sparse mode (for instances too large for N x N matrices) distances and tolls are computed on demand and the
+    nearest neighbors come from a grid index over the coordinates; edges cannot be overridden.
+    Distances come from a DistanceProvider (straight-line by default). With a MatrixCache the dense matrices are
+    loaded memory-mapped from the cache, computed only for new node sets, and a pickled graph (e.g. sent to the
+    worker processes) carries the paths of the cached matrices instead of their contents.
+    """
+
+    def __init__(self, nodes: list[Node], sparse: bool = False, distance_provider: Optional[DistanceProvider] = None,
+                 cache: Optional[MatrixCache] = None) -> None:
         if not isinstance(nodes, list) or not all(isinstance(n, Node) for n in nodes):
             raise TypeError('nodes deve ser uma lista de Node')
+        self.sparse = sparse
+        self.distance_provider = distance_provider or EuclideanDistance()
+        # Paths of the cached matrices while the graph matrices are unchanged
+        self._matrix_files: dict[str, str] | None = None
         self._nodes: list[Node] = []
-        self._edges: list[Edge] = []
+        self._index: dict[int, int] = {}
+        self._edges: dict[tuple[int, int], Edge] = {}
+        self._lookup: tuple[np.ndarray, np.ndarray] | None = None
+        self._symmetric: bool | None = None
+        self._neighbors: dict[int, np.ndarray] = {}
         for node in nodes:
-            self.add_node(node)
-        for from_node in nodes:
-            for to_node in nodes:
-                if from_node != to_node:
-                    distance: float = math.hypot(from_node.x - to_node.x, from_node.y - to_node.y)
-                    edge = Edge(from_node=from_node, to_node=to_node, distance=distance)
-                    self.add_edge(edge)
+            if node.identifier in self._index:
+                raise ValueError(f"Vertex {node} already exists.")
+            self._index[node.identifier] = len(self._nodes)
+            self._nodes.append(node)
+
+        if sparse:
+            self._build_lazy_matrices()
+        elif cache is not None:
+            key = cache.key(self.distance_provider, self._nodes)
+            self._distances = cache.load(key, "distances", lambda: self.distance_provider.matrix(self._nodes))
+            self._tolls = cache.load(key, "tolls", lambda: count_tolls(self._distances))
+            self._matrix_files = {"_distances": cache.path(key, "distances"), "_tolls": cache.path(key, "tolls")}
+        else:
+            self._distances: np.ndarray = self.distance_provider.matrix(self._nodes)
+            self._tolls: np.ndarray = count_tolls(self._distances)
+        self._demands: np.ndarray = np.array([node.demand for node in self._nodes], dtype=np.int64)
+        self._priorities: np.ndarray = np.array([node.priority for node in self._nodes], dtype=np.int64)
+
+    def _build_lazy_matrices(self) -> None:
+        x = np.array([node.x for node in self._nodes], dtype=np.float64)
+        y = np.array([node.y for node in self._nodes], dtype=np.float64)
+        distances = self.distance_provider.prepare(self._nodes)
+        self._coordinates = (x, y)
+        self._distances = LazyMatrix(distances, len(x))
+        self._tolls = LazyMatrix(lambda rows, columns: count_tolls(distances(rows, columns)), len(x))
 
     @property
     def nodes(self):
         return self._nodes
 
+    @property
+    def distance_matrix(self) -> np.ndarray:
+        """
+        Float64 matrix of distances, indexed by node position (see index_of): a dense array, or a LazyMatrix
+        supporting integer (array) indexing in sparse mode.
+        """
+        return self._distances
+
+    @property
+    def toll_matrix(self) -> np.ndarray:
+        """Int matrix with the number of tolls between nodes, indexed like distance_matrix."""
+        return self._tolls
+
+    @property
+    def demands(self) -> np.ndarray:
+        return self._demands
+
+    @property
+    def priorities(self) -> np.ndarray:
+        return self._priorities
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory of the arrays of the graph: matrices (lazy and memory-mapped matrices are not counted), demands,
+        priorities, coordinates, lookup table and neighbor lists.
+        """
+        arrays = [self._distances, self._tolls, self._demands, self._priorities, *self._neighbors.values(),
+                  *(self._lookup or ()), *getattr(self, "_coordinates", ())]
+        return sum(array.nbytes for array in arrays
+                   if isinstance(array, np.ndarray) and not isinstance(array, np.memmap))
+
+    @property
+    def is_symmetric(self) -> bool:
+        """Whether distances and tolls are the same in both directions (always true unless edges were overridden)."""
+        if self.sparse:
+            return self.distance_provider.symmetric
+        if self._symmetric is None:
+            self._symmetric = bool(np.array_equal(self._distances, self._distances.T)
+                                   and np.array_equal(self._tolls, self._tolls.T))
+        return self._symmetric
+
+    def nearest_neighbors(self, k: int) -> np.ndarray:
+        """
+        Returns the k nearest nodes of every node, computed once per k from the node coordinates (with the grid
+        index in sparse mode, so neighbor lists do not need the distance matrix).
+        Args:
+            k: Number of neighbors per node (limited to the number of other nodes).
+
+        Returns:
+            Integer array (number of nodes, k) with node positions (see index_of), nearest first.
+        """
+        k = max(0, min(k, len(self._nodes) - 1))
+        if k not in self._neighbors and self.sparse:
+            self._neighbors[k] = GridIndex(*self._coordinates).nearest(k)[0]
+        if k not in self._neighbors:
+            distances = self._distances.copy()
+            np.fill_diagonal(distances, np.inf)
+            candidates = np.argpartition(distances, k - 1, axis=1)[:, :k] if k else np.empty((len(self._nodes), 0), dtype=np.int64)
+            order = np.argsort(np.take_along_axis(distances, candidates, axis=1), axis=1, kind="stable")
+            self._neighbors[k] = np.take_along_axis(candidates, order, axis=1)
+        return self._neighbors[k]
+
+    def index_of(self, node_id: int) -> int:
+        """
+        Returns the position of the node in the graph matrices.
+        Args:
+            node_id: Identifier of the node.
+
+        Returns:
+            Row/column index of the node in the matrices.
+        Raises:
+            ValueError: If the node does not exist.
+        """
+        try:
+            return self._index[node_id]
+        except KeyError:
+            raise ValueError(f"Node {node_id} does not exist.") from None
+
+    def indices_of(self, node_ids) -> np.ndarray:
+        """
+        Vectorized version of index_of.
+        Args:
+            node_ids: Sequence of node identifiers.
+
+        Returns:
+            Integer array with the position of each node in the graph matrices.
+        Raises:
+            ValueError: If any node does not exist.
+        """
+        node_ids = np.asarray(node_ids, dtype=np.int64)
+        if self._lookup is None:
+            identifiers = np.array([node.identifier for node in self._nodes], dtype=np.int64)
+            order = np.argsort(identifiers, kind="stable")
+            self._lookup = (identifiers[order], order)
+        sorted_identifiers, order = self._lookup
+        if node_ids.size == 0:
+            return np.empty(0, dtype=np.int64)
+        if len(sorted_identifiers) == 0:
+            raise ValueError(f"Node {node_ids.flat[0]} does not exist.")
+        found = np.minimum(np.searchsorted(sorted_identifiers, node_ids), len(sorted_identifiers) - 1)
+        missing = sorted_identifiers[found] != node_ids
+        if np.any(missing):
+            raise ValueError(f"Node {node_ids[missing].flat[0]} does not exist.")
+        return order[found]
+
+    def subgraph(self, node_ids, demands=None) -> "Graph":
+        """
+        Returns the dense graph over some of the nodes, with the distances and tolls of this graph (overridden edges
+        included), e.g. a cluster of a large instance solved on its own.
+        Args:
+            node_ids: Identifiers of the nodes of the subgraph, in order (the depot first).
+            demands: Demand of each node in the subgraph (e.g. the load of the depots supplied by a distribution
+                center), or None for the demands of the nodes.
+
+        Returns:
+            The subgraph, its matrices sliced from the matrices of this graph.
+        Raises:
+            ValueError: If any node does not exist.
+        """
+        positions = self.indices_of(node_ids)
+        rows, columns = positions[:, None], positions[None, :]
+        nodes = [self._nodes[position] for position in positions.tolist()]
+        if demands is not None:
+            nodes = [Node(identifier=node.identifier, x=node.x, y=node.y, priority=node.priority, demand=int(demand))
+                     for node, demand in zip(nodes, demands)]
+        graph = Graph(nodes, distance_provider=MatrixDistance(self._distances[rows, columns]))
+        graph._tolls = np.asarray(self._tolls[rows, columns], dtype=np.int64)
+        return graph
+
     def add_node(self, node: Node) -> None:
-        if node in self._nodes:
-            raise ValueError(f"Vertex {node} already exists.")
-        
-        self._nodes.append(node)
+        self.add_nodes([node])
+
+    def add_nodes(self, nodes: list[Node]) -> None:
+        """
+        Appends nodes to the graph. Only the rows and columns of the new nodes are computed, the distances between
+        the nodes already in the graph are copied (e.g. customers added to a running solve).
+        Args:
+            nodes: Nodes to be appended.
+        Raises:
+            ValueError: If a node already exists or the provider has no distances for it (nothing is appended).
+        """
+        identifiers = set()
+        for node in nodes:
+            if node in self or node.identifier in identifiers:
+                raise ValueError(f"Vertex {node} already exists.")
+            identifiers.add(node.identifier)
+        if not nodes:
+            return
+
+        size = len(self._nodes)
+        for node in nodes:
+            self._index[node.identifier] = len(self._nodes)
+            self._nodes.append(node)
+        try:
+            if self.sparse:
+                self._build_lazy_matrices()
+            else:
+                self._extend_matrices(len(nodes))
+        except Exception:
+            for node in self._nodes[size:]:
+                del self._index[node.identifier]
+            del self._nodes[size:]
+            if self.sparse:
+                self._build_lazy_matrices()
+            raise
+        self._lookup = None
+        self._neighbors = {}
+        self._matrix_files = None
+        self._demands = np.append(self._demands, np.array([node.demand for node in nodes], dtype=np.int64))
+        self._priorities = np.append(self._priorities, np.array([node.priority for node in nodes], dtype=np.int64))
+
+    def _extend_matrices(self, count: int) -> None:
+        """
+        Grows the matrices by the rows and columns of the nodes appended last to the graph.
+        Args:
+            count: Number of nodes appended.
+        """
+        size = len(self._nodes)
+        old = size - count
+        positions, added = np.arange(size), np.arange(old, size)
+        function = self.distance_provider.prepare(self._nodes)
+        rows, columns = function(added[:, None], positions[None, :]), function(positions[:, None], added[None, :])
+
+        distances = np.zeros((size, size), dtype=np.float64)
+        distances[:old, :old] = self._distances
+        distances[old:, :] = rows
+        distances[:, old:] = columns
+        self._distances = distances
+
+        tolls = np.zeros((size, size), dtype=np.int64)
+        tolls[:old, :old] = self._tolls
+        tolls[old:, :] = count_tolls(rows)
+        tolls[:, old:] = count_tolls(columns)
+        self._tolls = tolls
+
+    def update_node(self, node_id: int, demand: Optional[int] = None, priority: Optional[int] = None) -> None:
+        """
+        Changes the demand or the priority of a node. The node is replaced, so graphs sharing it (see copy) keep
+        the previous values.
+        Args:
+            node_id: Identifier of the node.
+            demand: New demand, or None to keep it.
+            priority: New priority, or None to keep it.
+        Raises:
+            ValueError: If the node does not exist.
+        """
+        position = self.index_of(node_id)
+        node = self._nodes[position]
+        self._nodes[position] = Node(identifier=node.identifier, x=node.x, y=node.y,
+                                     priority=node.priority if priority is None else priority,
+                                     demand=node.demand if demand is None else demand)
+        self._demands = self._demands.copy()
+        self._demands[position] = self._nodes[position].demand
+        self._priorities = self._priorities.copy()
+        self._priorities[position] = self._nodes[position].priority
+
+    def copy(self) -> "Graph":
+        """
+        Returns a graph over the same nodes that can be changed with add_nodes and update_node without changing
+        this one (e.g. a cached graph patched for a single run). The matrices are shared and only copied when
+        nodes are added, so add_edge must not be used on the copy.
+        """
+        graph = copy.copy(self)
+        graph._nodes = list(self._nodes)
+        graph._index = dict(self._index)
+        graph._edges = dict(self._edges)
+        graph._neighbors = dict(self._neighbors)
+        return graph
 
     def add_edge(self, edge: Edge) -> None:
+        if self.sparse:
+            raise ValueError("Edges cannot be overridden in a sparse graph.")
         if edge.from_node not in self:
             self.add_node(edge.from_node)
 
         if edge.to_node not in self:
             self.add_node(edge.to_node)
 
-        self._edges.append(edge)
+        i = self._index[edge.from_node.identifier]
+        j = self._index[edge.to_node.identifier]
+        self._distances[i, j] = edge.distance
+        self._tolls[i, j] = edge.toll_quantity
+        self._symmetric = None
+        self._matrix_files = None
+        self._neighbors = {}
+        self._edges[(edge.from_node.identifier, edge.to_node.identifier)] = edge
+
+    def __getstate__(self) -> dict:
+        # Lazy matrices are rebuilt from the provider and cached matrices loaded again from their files
+        state = dict(self.__dict__)
+        for name in ("_distances", "_tolls") if self.sparse else self._matrix_files or ():
+            state[name] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        if self.sparse:
+            self._build_lazy_matrices()
+        for name, path in (self._matrix_files or {}).items():
+            setattr(self, name, np.load(path, mmap_mode="c"))
 
     def get_node(self, node_id: int) -> Node:
-        for node in self._nodes:
-            if node.identifier == node_id:
-                return node
-        raise ValueError(f"Node {node_id} does not exist.")
+        return self._nodes[self.index_of(node_id)]
 
     def get_edge(self, from_node: Node, to_node: Node) -> Edge:
-        for edge in self._edges:
-            if edge.from_node == from_node and edge.to_node == to_node:
-                return edge
-        raise ValueError(f"Edge from {from_node} to {to_node} does not exist.")
+        if from_node not in self or to_node not in self or from_node == to_node:
+            raise ValueError(f"Edge from {from_node} to {to_node} does not exist.")
+        key = (from_node.identifier, to_node.identifier)
+        edge = self._edges.get(key)
+        if edge is None:
+            distance = float(self._distances[self._index[key[0]], self._index[key[1]]])
+            edge = Edge(from_node=self.get_node(key[0]), to_node=self.get_node(key[1]), distance=distance)
+            self._edges[key] = edge
+        return edge
 
     def get_edge_by_node_ids(self, from_node_id: int, to_node_id: int) -> Edge:
         from_node = self.get_node(from_node_id)
         to_node = self.get_node(to_node_id)
         return self.get_edge(from_node, to_node)
-    
+
+    def get_distance(self, from_node_id: int, to_node_id: int) -> float:
+        return float(self._distances[self.index_of(from_node_id), self.index_of(to_node_id)])
+
     def get_nodes(self) -> list[Node]:
         return self._nodes
 
     def get_node_demand(self, node_id: int) -> int:
-        node = self.get_node(node_id)
-        return node.demand
+        return int(self._demands[self.index_of(node_id)])
 
     def __contains__(self, node: Node) -> bool:
-        return node in self._nodes
-    
+        return isinstance(node, Node) and node.identifier in self._index
+
     def __str__(self):
-        return f"Graph with {len(self._nodes)} nodes and {len(self._edges)} edges."
+        size = len(self._nodes)
+        return f"Graph with {size} nodes and {size * (size - 1)} edges."
 
     def get_edge_toll_by_node_id(self, from_node_id: int, to_node_id: int) -> int:
-        return self.get_edge_by_node_ids(from_node_id, to_node_id).toll_quantity
\ No newline at end of file
+        return int(self._tolls[self.index_of(from_node_id), self.index_of(to_node_id)])
@@ -0,0 +1,111 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from domain.graph.distance import DistanceProvider, EuclideanDistance, MatrixCache
+from domain.graph.graph import Graph
+from domain.graph.node import Node
+
+
+class GraphCache:
+    """
+    Process-wide memoization of prepared graphs (matrices, demand and priority arrays, symmetry, neighbor lists)
+    with least recently used eviction bounded by memory size, so runs submitted again on the same nodes skip the
+    O(N^2) preparation. The key is a hash of the nodes in submission order (identifier, coordinates, priority and
+    demand), the sparse mode and the distance provider.
+    Cached graphs are shared by the runs and must not be changed (add_node and add_edge), a run that changes its
+    graph works on a copy (see Graph.copy).
+    """
+
+    def __init__(self, max_bytes: int = 512 * 2 ** 20) -> None:
+        if max_bytes <= 0:
+            raise ValueError("Graph cache size must be greater than zero.")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.__entries: OrderedDict[str, Graph] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def key(nodes: list[Node], sparse: bool = False, distance_provider: Optional[DistanceProvider] = None) -> str:
+        digest = hashlib.sha256(f"{sparse}:{(distance_provider or EuclideanDistance()).fingerprint()}".encode())
+        digest.update(np.array([[node.identifier, node.priority, node.demand] for node in nodes],
+                               dtype=np.int64).tobytes())
+        digest.update(np.array([[node.x, node.y] for node in nodes], dtype=np.float64).tobytes())
+        return digest.hexdigest()
+
+    def get(self, nodes: list[Node], sparse: bool = False, distance_provider: Optional[DistanceProvider] = None,
+            cache: Optional[MatrixCache] = None) -> tuple[Graph, bool]:
+        """
+        Returns the cached graph of the nodes, building it on a miss.
+        Args:
+            nodes: Nodes of the graph, the depot first.
+            sparse: Whether the graph is sparse (see Graph).
+            distance_provider: Distances of the graph (the euclidean distances by default).
+            cache: Cache of the distance matrices used on a miss.
+
+        Returns:
+            Tuple with the graph and whether it came from the cache.
+        Raises:
+            TypeError, ValueError: If the graph cannot be built from the nodes.
+        """
+        key = self.key(nodes, sparse, distance_provider)
+        with self.__lock:
+            graph = self.__entries.get(key)
+            if graph is not None:
+                self.__entries.move_to_end(key)
+                self.hits += 1
+                return graph, True
+            self.misses += 1
+        graph = Graph(nodes, sparse, distance_provider, cache)
+        with self.__lock:
+            self.__entries[key] = graph
+            self.__evict()
+        return graph, False
+
+    def __evict(self) -> None:
+        # Sizes are measured again on every insertion, since neighbor lists are added to the graphs while cached
+        while self.__entries and self.nbytes > self.max_bytes:
+            self.__entries.popitem(last=False)
+            self.evictions += 1
+
+    @property
+    def nbytes(self) -> int:
+        return sum(graph.nbytes for graph in self.__entries.values())
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def statistics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.__entries),
+            "bytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+    def prometheus_text(self) -> str:
+        """
+        Statistics of the cache in the Prometheus text exposition format.
+        """
+        metrics = (("vrp_graph_cache_hits_total", "counter", "Graph lookups served from the cache.", self.hits),
+                   ("vrp_graph_cache_misses_total", "counter", "Graphs built on a cache miss.", self.misses),
+                   ("vrp_graph_cache_evictions_total", "counter", "Graphs evicted from the cache.", self.evictions),
+                   ("vrp_graph_cache_entries", "gauge", "Graphs in the cache.", len(self.__entries)),
+                   ("vrp_graph_cache_bytes", "gauge", "Memory of the graphs in the cache.", self.nbytes))
+        lines = []
+        for name, metric_type, description, value in metrics:
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} {metric_type}", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
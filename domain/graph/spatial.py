@@ -0,0 +1,106 @@
+import math
+
+import numpy as np
+
+
+class LazyMatrix:
+    """
+    Read-only matrix whose entries are computed on demand from the node positions, for graphs too large for a dense
+    N x N array. Supports the integer (fancy) indexing used by the operators: matrix[rows, columns] with integers
+    or integer arrays broadcast against each other, and matrix[rows] for whole rows.
+    """
+    __slots__ = ("__function", "__size")
+
+    def __init__(self, function, size: int) -> None:
+        self.__function = function
+        self.__size = size
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.__size, self.__size
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (np.asarray(key)[..., None], np.arange(self.__size))
+        rows, columns = key
+        return self.__function(np.asarray(rows), np.asarray(columns))
+
+    def __len__(self) -> int:
+        return self.__size
+
+
+class GridIndex:
+    """
+    Uniform grid over the node coordinates (about nodes_per_cell nodes per cell) answering k-nearest-neighbor
+    queries without the N x N distance matrix. Nodes are sorted by cell, so the cells of a grid column form a
+    contiguous range and a square of cells around a query is gathered with one slice per column.
+    """
+
+    def __init__(self, x: np.ndarray, y: np.ndarray, nodes_per_cell: int = 4) -> None:
+        self.__x = np.asarray(x, dtype=np.float64)
+        self.__y = np.asarray(y, dtype=np.float64)
+        size = len(self.__x)
+        self.__origin = (float(self.__x.min()), float(self.__y.min())) if size else (0.0, 0.0)
+        width = float(self.__x.max()) - self.__origin[0] if size else 0.0
+        height = float(self.__y.max()) - self.__origin[1] if size else 0.0
+        area = max(width, 1e-9) * max(height, 1e-9)
+        self.cell_size = max(math.sqrt(area * nodes_per_cell / max(size, 1)), 1e-9)
+        self.columns = int(width / self.cell_size) + 1
+        self.rows = int(height / self.cell_size) + 1
+        cell_x, cell_y = self.__cell_of(self.__x, self.__y)
+        cells = cell_x * self.rows + cell_y
+        self.__order = np.argsort(cells, kind="stable")
+        self.__starts = np.searchsorted(cells[self.__order], np.arange(self.columns * self.rows + 1))
+        self.__cells = cells
+
+    def __cell_of(self, x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        cell_x = np.clip(((x - self.__origin[0]) / self.cell_size).astype(np.int64), 0, self.columns - 1)
+        cell_y = np.clip(((y - self.__origin[1]) / self.cell_size).astype(np.int64), 0, self.rows - 1)
+        return cell_x, cell_y
+
+    def __gather(self, cell_x: int, cell_y: int, radius: int) -> np.ndarray:
+        low_y, high_y = max(cell_y - radius, 0), min(cell_y + radius, self.rows - 1)
+        slices = []
+        for column in range(max(cell_x - radius, 0), min(cell_x + radius, self.columns - 1) + 1):
+            first, last = column * self.rows + low_y, column * self.rows + high_y
+            slices.append(self.__order[self.__starts[first]:self.__starts[last + 1]])
+        return np.concatenate(slices) if slices else np.empty(0, dtype=np.int64)
+
+    def nearest(self, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        k nearest other nodes of every node, nearest first (same order as sorting the distances, ties by position).
+        The nodes of a cell are answered together: the square of cells around the cell grows until it holds k
+        other nodes, and once more until its border is farther than the k-th candidate of every node of the cell.
+        Args:
+            k: Number of neighbors (at most the number of nodes minus one).
+
+        Returns:
+            Tuple with the neighbor positions and their distances, arrays (number of nodes, k).
+        """
+        size = len(self.__x)
+        neighbors = np.empty((size, k), dtype=np.int64)
+        distances = np.empty((size, k), dtype=np.float64)
+        if k == 0:
+            return neighbors, distances
+        whole_grid = max(self.columns, self.rows)
+        for cell in np.unique(self.__cells).tolist():
+            members = self.__order[self.__starts[cell]:self.__starts[cell + 1]]
+            cell_x, cell_y = divmod(cell, self.rows)
+            radius = 1
+            while True:
+                candidates = np.sort(self.__gather(cell_x, cell_y, radius))
+                if len(candidates) < k + 1 and radius < whole_grid:
+                    radius *= 2
+                    continue
+                block = np.hypot(self.__x[members, None] - self.__x[None, candidates],
+                                 self.__y[members, None] - self.__y[None, candidates])
+                block[members[:, None] == candidates[None, :]] = np.inf
+                kth = float(np.partition(block, k - 1, axis=1)[:, k - 1].max())
+                if kth <= radius * self.cell_size or radius >= whole_grid:
+                    break
+                # Every node outside the square is farther than radius cells from the cell
+                radius = min(int(math.ceil(kth / self.cell_size)), whole_grid)
+            order = np.argsort(block, axis=1, kind="stable")[:, :k]
+            neighbors[members] = candidates[order]
+            distances[members] = np.take_along_axis(block, order, axis=1)
+        return neighbors, distances
@@ -0,0 +1,141 @@
+import os
+import pickle
+from unittest import TestCase
+
+import numpy as np
+import pytest
+
+from domain.graph import (Edge, FileDistance, Graph, HaversineDistance, MatrixCache, Node, EuclideanDistance,
+                          metric_provider)
+
+
+def nodes():
+    return [Node(identifier=0, x=0, y=0), Node(identifier=1, x=3, y=4), Node(identifier=2, x=6, y=8),
+            Node(identifier=3, x=-3, y=4)]
+
+
+class TestProviders(TestCase):
+
+    def test_euclidean_matches_the_default_graph(self):
+        np.testing.assert_array_equal(Graph(nodes(), distance_provider=EuclideanDistance()).distance_matrix,
+                                      Graph(nodes()).distance_matrix)
+
+    def test_haversine(self):
+        # Sao Paulo (lon, lat) and Rio de Janeiro, about 361 km apart
+        cities = [Node(identifier=0, x=-46.6333, y=-23.5505), Node(identifier=1, x=-43.1729, y=-22.9068)]
+        graph = Graph(cities, distance_provider=HaversineDistance())
+
+        self.assertAlmostEqual(graph.get_distance(0, 1), 361.0, delta=2.0)
+        self.assertEqual(graph.get_distance(0, 1), graph.get_distance(1, 0))
+        self.assertEqual(graph.get_edge_toll_by_node_id(0, 1), 2)
+
+    def test_sparse_graph_uses_the_provider(self):
+        cities = [Node(identifier=i, x=-46.0 + i * 0.1, y=-23.0 - i * 0.05) for i in range(6)]
+        dense = Graph(cities, distance_provider=HaversineDistance())
+        sparse = Graph(cities, sparse=True, distance_provider=HaversineDistance())
+        positions = np.arange(6)
+
+        np.testing.assert_allclose(sparse.distance_matrix[positions[:, None], positions[None, :]],
+                                   dense.distance_matrix)
+
+    def test_metric_provider(self):
+        self.assertIsInstance(metric_provider("haversine"), HaversineDistance)
+        with self.assertRaises(ValueError):
+            metric_provider("manhattan")
+
+
+class TestFileDistance:
+
+    def test_npy_and_csv(self, tmp_path):
+        matrix = np.array([[0, 10, 20, 30], [11, 0, 5, 6], [21, 5, 0, 7], [31, 6, 7, 0]], dtype=np.float64)
+        np.save(tmp_path / "roads.npy", matrix)
+        np.savetxt(tmp_path / "roads.csv", matrix, delimiter=",")
+
+        for name in ("roads.npy", "roads.csv"):
+            graph = Graph(nodes(), distance_provider=FileDistance(tmp_path / name))
+            np.testing.assert_array_equal(graph.distance_matrix, matrix)
+            assert not graph.is_symmetric
+
+    def test_rows_by_identifier(self, tmp_path):
+        matrix = np.arange(25, dtype=np.float64).reshape(5, 5)
+        np.save(tmp_path / "roads.npy", matrix)
+        provider = FileDistance(tmp_path / "roads.npy", identifiers=[3, 9, 2, 1, 0])
+
+        graph = Graph(nodes(), distance_provider=provider)
+        assert graph.get_distance(0, 1) == matrix[4, 3]
+        assert graph.get_distance(3, 2) == matrix[0, 2]
+
+        graph.add_node(Node(identifier=9, x=0, y=0))
+        assert graph.get_distance(9, 0) == matrix[1, 4]
+        assert graph.get_distance(0, 9) == matrix[4, 1]
+        with pytest.raises(ValueError, match="Node 7 is not in the distance file"):
+            graph.add_node(Node(identifier=7, x=0, y=0))
+
+    def test_invalid_files(self, tmp_path):
+        np.save(tmp_path / "short.npy", np.zeros((2, 2)))
+        np.save(tmp_path / "wide.npy", np.zeros((2, 3)))
+
+        with pytest.raises(ValueError, match="has 2 rows for 4 nodes"):
+            Graph(nodes(), distance_provider=FileDistance(tmp_path / "short.npy"))
+        with pytest.raises(ValueError, match="not a square matrix"):
+            Graph(nodes(), distance_provider=FileDistance(tmp_path / "wide.npy"))
+
+
+class TestMatrixCache:
+
+    def test_matrices_are_computed_once(self, tmp_path):
+        calls = []
+
+        class CountingDistance(EuclideanDistance):
+            def matrix(self, graph_nodes):
+                calls.append(len(graph_nodes))
+                return super().matrix(graph_nodes)
+
+        cache = MatrixCache(tmp_path)
+        first = Graph(nodes(), distance_provider=CountingDistance(), cache=cache)
+        second = Graph(nodes(), distance_provider=CountingDistance(), cache=cache)
+
+        assert calls == [4]
+        assert isinstance(second.distance_matrix, np.memmap)
+        np.testing.assert_array_equal(second.distance_matrix, Graph(nodes()).distance_matrix)
+        np.testing.assert_array_equal(second.toll_matrix, first.toll_matrix)
+        assert len(os.listdir(tmp_path)) == 2
+
+    def test_key_depends_on_nodes_and_provider(self):
+        moved = nodes()
+        moved[2].x += 1
+
+        keys = {MatrixCache.key(EuclideanDistance(), nodes()), MatrixCache.key(EuclideanDistance(), moved),
+                MatrixCache.key(HaversineDistance(), nodes()), MatrixCache.key(EuclideanDistance(), nodes()[:3])}
+        assert len(keys) == 4
+
+    def test_changes_stay_private(self, tmp_path):
+        cache = MatrixCache(tmp_path)
+        graph = Graph(nodes(), cache=cache)
+        graph.add_edge(Edge(graph.get_node(0), graph.get_node(1), distance=100))
+
+        assert graph.get_distance(0, 1) == 100
+        assert Graph(nodes(), cache=cache).get_distance(0, 1) == 5
+
+    def test_pickle_carries_the_paths(self, tmp_path):
+        grid = [Node(identifier=i, x=i % 10, y=i // 10) for i in range(100)]
+        graph = Graph(grid, cache=MatrixCache(tmp_path))
+        plain = pickle.dumps(Graph(grid))
+
+        data = pickle.dumps(graph)
+        restored = pickle.loads(data)
+
+        assert len(data) < len(plain)
+        assert isinstance(restored.distance_matrix, np.memmap)
+        np.testing.assert_array_equal(restored.distance_matrix, graph.distance_matrix)
+        # A changed graph is pickled with its matrices
+        graph.add_node(Node(identifier=100, x=1, y=1))
+        assert pickle.loads(pickle.dumps(graph)).get_distance(100, 0) == graph.get_distance(100, 0)
+
+
+def test_sparse_graph_pickle():
+    graph = Graph(nodes(), sparse=True, distance_provider=HaversineDistance())
+
+    restored = pickle.loads(pickle.dumps(graph))
+
+    assert restored.get_distance(1, 2) == graph.get_distance(1, 2)
@@ -62,3 +62,88 @@ class TestGraph(TestCase):
         node = Node(identifier=999999, x=1e6, y=-1e6, priority=100, demand=0)
         graph = Graph(nodes=[node])
         self.assertEqual(graph.get_node(999999), node)
+
+    def test_distance_and_toll_matrices_match_edges(self):
+        """Matrizes densas devem coincidir com as arestas criadas sob demanda."""
+        nodes = [Node(identifier=i, x=i * 100.0, y=(i % 3) * 75.0, demand=i) for i in range(6)]
+        graph = Graph(nodes=nodes)
+        for from_node in nodes:
+            for to_node in nodes:
+                if from_node == to_node:
+                    continue
+                edge = graph.get_edge_by_node_ids(from_node.identifier, to_node.identifier)
+                self.assertEqual(graph.get_distance(from_node.identifier, to_node.identifier), edge.distance)
+                self.assertEqual(graph.get_edge_toll_by_node_id(from_node.identifier, to_node.identifier), edge.toll_quantity)
+        self.assertEqual(graph.get_node_demand(4), 4)
+
+    def test_edges_are_created_lazily(self):
+        node1 = Node(identifier=1, x=0, y=0)
+        node2 = Node(identifier=2, x=3, y=4)
+        graph = Graph(nodes=[node1, node2])
+        self.assertEqual(len(graph._edges), 0)
+        self.assertIs(graph.get_edge(node1, node2), graph.get_edge(node1, node2))
+        self.assertEqual(len(graph._edges), 1)
+
+    def test_add_node_extends_matrices(self):
+        node1 = Node(identifier=1, x=0, y=0, demand=3)
+        graph = Graph(nodes=[node1])
+        graph.add_node(Node(identifier=7, x=0, y=400, demand=5))
+        self.assertEqual(graph.distance_matrix.shape, (2, 2))
+        self.assertEqual(graph.get_distance(7, 1), 400)
+        self.assertEqual(graph.get_edge_toll_by_node_id(1, 7), 2)
+        self.assertEqual(graph.get_node_demand(7), 5)
+        self.assertEqual(graph.index_of(7), 1)
+
+    def test_add_nodes_matches_the_graph_built_at_once(self):
+        nodes = [Node(identifier=i, x=x, y=x % 7, demand=i) for i, x in enumerate([0, 10, 3, 7, 25, 40])]
+        graph = Graph(nodes=nodes[:3])
+        graph.add_nodes(nodes[3:])
+        expected = Graph(nodes=nodes)
+        self.assertEqual(graph.distance_matrix.tolist(), expected.distance_matrix.tolist())
+        self.assertEqual(graph.toll_matrix.tolist(), expected.toll_matrix.tolist())
+        self.assertEqual(graph.demands.tolist(), [0, 1, 2, 3, 4, 5])
+        with self.assertRaises(ValueError):
+            graph.add_nodes([Node(identifier=9, x=0, y=0), Node(identifier=9, x=1, y=1)])
+        self.assertNotIn(Node(identifier=9), graph)
+
+    def test_copy_can_change_without_changing_the_graph(self):
+        graph = Graph(nodes=[Node(identifier=i, x=x, y=0, demand=1) for i, x in enumerate([0, 10, 3])])
+        copied = graph.copy()
+        copied.add_node(Node(identifier=5, x=4, y=0))
+        copied.update_node(1, demand=8, priority=1)
+        self.assertEqual(copied.distance_matrix.shape, (4, 4))
+        self.assertEqual(copied.get_distance(5, 2), 1)
+        self.assertEqual((copied.get_node(1).demand, copied.get_node(1).priority), (8, 1))
+        self.assertEqual(copied.demands.tolist(), [1, 8, 1, 0])
+        self.assertEqual(graph.distance_matrix.shape, (3, 3))
+        self.assertEqual(graph.demands.tolist(), [1, 1, 1])
+        self.assertEqual(graph.get_node(1).demand, 1)
+        self.assertNotIn(Node(identifier=5), graph)
+        with self.assertRaises(ValueError):
+            copied.update_node(7, demand=1)
+
+    def test_nearest_neighbors_are_sorted_and_exclude_the_node(self):
+        graph = Graph(nodes=[Node(identifier=i, x=x, y=0) for i, x in enumerate([0, 10, 3, 7])])
+        neighbors = graph.nearest_neighbors(2)
+        self.assertEqual(neighbors.tolist(), [[2, 3], [3, 2], [0, 3], [1, 2]])
+        self.assertEqual(graph.nearest_neighbors(10).shape, (4, 3))
+        graph.add_node(Node(identifier=9, x=1, y=0))
+        self.assertEqual(graph.nearest_neighbors(2)[0].tolist(), [4, 2])
+
+    def test_subgraph_slices_the_matrices(self):
+        graph = Graph(nodes=[Node(identifier=i, x=x, y=0, demand=i) for i, x in enumerate([0, 10, 300, 7])])
+        graph.add_edge(Edge(graph.get_node(3), graph.get_node(0), distance=50))
+        subgraph = graph.subgraph([0, 3, 2])
+        self.assertEqual([node.identifier for node in subgraph.get_nodes()], [0, 3, 2])
+        self.assertEqual(subgraph.get_distance(3, 0), 50)
+        self.assertEqual(subgraph.get_distance(0, 3), 7)
+        self.assertEqual(subgraph.get_edge_toll_by_node_id(2, 0), graph.get_edge_toll_by_node_id(2, 0))
+        self.assertEqual(subgraph.get_node_demand(2), 2)
+        self.assertFalse(subgraph.is_symmetric)
+        sparse = Graph(nodes=graph.get_nodes(), sparse=True).subgraph([2, 1])
+        self.assertFalse(sparse.sparse)
+        self.assertEqual(sparse.get_distance(2, 1), 290)
+        with self.assertRaises(ValueError):
+            graph.subgraph([0, 5])
+        self.assertEqual(graph.subgraph([3, 2], demands=[0, 40]).demands.tolist(), [0, 40])
+        self.assertEqual(graph.get_node_demand(2), 2)
@@ -0,0 +1,82 @@
+from unittest import TestCase
+
+import numpy as np
+
+from domain.graph import Graph, GraphCache, HaversineDistance, Node
+
+
+def cities(size=30, shift=0.0):
+    return [Node(identifier=i, x=float(i % 7) + shift, y=float(i // 7), demand=1 + i % 3, priority=i % 2)
+            for i in range(size)]
+
+
+class TestGraphCache(TestCase):
+
+    def test_same_cities_hit(self):
+        cache = GraphCache()
+
+        first, first_cached = cache.get(cities())
+        second, second_cached = cache.get(cities())
+
+        self.assertFalse(first_cached)
+        self.assertTrue(second_cached)
+        self.assertIs(first, second)
+        np.testing.assert_array_equal(second.distance_matrix, Graph(cities()).distance_matrix)
+        self.assertEqual(cache.statistics()["hit_rate"], 0.5)
+
+    def test_key_covers_nodes_and_options(self):
+        changed_demand = cities()
+        changed_demand[3].demand += 1
+        variants = [cities(), cities(shift=0.5), cities(29), changed_demand]
+
+        keys = {GraphCache.key(nodes) for nodes in variants}
+        keys |= {GraphCache.key(cities(), sparse=True), GraphCache.key(cities(), distance_provider=HaversineDistance())}
+
+        self.assertEqual(len(keys), 6)
+        # Values are compared as numbers, not as the types submitted
+        integers = [Node(identifier=node.identifier, x=int(node.x), y=int(node.y), demand=node.demand,
+                         priority=node.priority) for node in cities()]
+        self.assertEqual(GraphCache.key(integers), GraphCache.key(cities()))
+
+    def test_least_recently_used_graph_is_evicted(self):
+        size = Graph(cities()).nbytes
+        cache = GraphCache(max_bytes=2 * size)
+
+        cache.get(cities())
+        cache.get(cities(shift=1.0))
+        cache.get(cities())
+        cache.get(cities(shift=2.0))
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evictions, 1)
+        self.assertTrue(cache.get(cities())[1])
+        self.assertFalse(cache.get(cities(shift=1.0))[1])
+        self.assertLessEqual(cache.nbytes, cache.max_bytes)
+
+    def test_neighbor_lists_count_in_the_size(self):
+        cache = GraphCache()
+        graph, _ = cache.get(cities())
+        before = cache.nbytes
+
+        graph.nearest_neighbors(5)
+
+        self.assertEqual(cache.nbytes, before + 30 * 5 * 8)
+
+    def test_invalid_cities_are_not_cached(self):
+        cache = GraphCache()
+        duplicated = cities(3) + cities(1)
+
+        with self.assertRaises(ValueError):
+            cache.get(duplicated)
+        self.assertEqual(len(cache), 0)
+
+    def test_prometheus_text(self):
+        cache = GraphCache()
+        cache.get(cities())
+        cache.get(cities())
+
+        text = cache.prometheus_text()
+
+        self.assertIn("# TYPE vrp_graph_cache_hits_total counter\nvrp_graph_cache_hits_total 1\n", text)
+        self.assertIn("vrp_graph_cache_misses_total 1\n", text)
+        self.assertIn("vrp_graph_cache_entries 1\n", text)
@@ -0,0 +1,92 @@
+import random
+from unittest import TestCase
+
+import numpy as np
+import pytest
+
+from domain.graph import Edge, Graph, Node
+from domain.graph.spatial import GridIndex
+
+
+def random_nodes(size, seed=3, clustered=False):
+    rng = random.Random(seed)
+    nodes = []
+    for i in range(size):
+        if clustered:
+            x, y = rng.gauss(500 * (i % 3), 5), rng.gauss(0, 5)
+        else:
+            x, y = rng.uniform(0, 1000), rng.uniform(0, 300)
+        nodes.append(Node(identifier=i + 1, x=x, y=y, demand=rng.randint(1, 5), priority=i % 2))
+    return nodes
+
+
+class TestGridIndex(TestCase):
+
+    def test_nearest_matches_brute_force(self):
+        for clustered in (False, True):
+            nodes = random_nodes(200, clustered=clustered)
+            x = np.array([node.x for node in nodes])
+            y = np.array([node.y for node in nodes])
+            distances = np.hypot(x[:, None] - x[None, :], y[:, None] - y[None, :])
+            np.fill_diagonal(distances, np.inf)
+
+            neighbors, neighbor_distances = GridIndex(x, y).nearest(7)
+
+            np.testing.assert_allclose(neighbor_distances, np.sort(distances, axis=1)[:, :7])
+            np.testing.assert_allclose(np.take_along_axis(distances, neighbors, axis=1), neighbor_distances)
+
+    def test_single_location(self):
+        neighbors, distances = GridIndex(np.zeros(4), np.zeros(4)).nearest(3)
+
+        self.assertEqual(sorted(neighbors[0].tolist()), [1, 2, 3])
+        self.assertEqual(distances.max(), 0.0)
+
+
+class TestSparseGraph(TestCase):
+
+    def setUp(self):
+        self.nodes = [Node(identifier=0, x=500, y=150)] + random_nodes(60)
+        self.dense = Graph(self.nodes)
+        self.sparse = Graph(self.nodes, sparse=True)
+
+    def test_distances_and_tolls_on_demand(self):
+        rows = np.array([[0, 1, 2], [5, 9, 60]])
+        columns = np.array([[3, 0, 2], [59, 1, 0]])
+
+        np.testing.assert_allclose(self.sparse.distance_matrix[rows, columns], self.dense.distance_matrix[rows, columns])
+        np.testing.assert_array_equal(self.sparse.toll_matrix[rows, columns], self.dense.toll_matrix[rows, columns])
+        np.testing.assert_allclose(self.sparse.distance_matrix[0, rows[1]], self.dense.distance_matrix[0, rows[1]])
+        self.assertEqual(self.sparse.get_distance(3, 7), self.dense.get_distance(3, 7))
+        self.assertEqual(self.sparse.get_edge_toll_by_node_id(3, 40), self.dense.get_edge_toll_by_node_id(3, 40))
+        self.assertTrue(self.sparse.is_symmetric)
+
+    def test_nearest_neighbors(self):
+        dense = np.take_along_axis(self.dense.distance_matrix, self.dense.nearest_neighbors(5), axis=1)
+        sparse = np.take_along_axis(self.dense.distance_matrix, self.sparse.nearest_neighbors(5), axis=1)
+
+        np.testing.assert_allclose(sparse, dense)
+
+    def test_add_node(self):
+        self.sparse.add_node(Node(identifier=100, x=0, y=0, demand=3))
+
+        self.assertEqual(self.sparse.get_distance(0, 100), float(np.hypot(500, 150)))
+        self.assertEqual(self.sparse.get_node_demand(100), 3)
+
+    def test_edges_cannot_be_overridden(self):
+        with pytest.raises(ValueError, match="sparse"):
+            self.sparse.add_edge(Edge(self.nodes[0], self.nodes[1], distance=1.0))
+
+    def test_fitness_matches_dense_graph(self):
+        import genetic_algorithm  # noqa: F401
+        from genetic_algorithm.fitness import Fitness
+        from vrp.vrp_builder import VrpFactory
+
+        population = VrpFactory(self.dense, 10, 3, vehicle_capacity=30, split_mode="optimal",
+                                seed=1).create_vrp().generate_initial_population()
+        sparse_population = VrpFactory(self.sparse, 10, 3, vehicle_capacity=30, split_mode="optimal",
+                                       seed=1).create_vrp().generate_initial_population()
+
+        self.assertEqual([genome.flatten_routes() for genome in population],
+                         [genome.flatten_routes() for genome in sparse_population])
+        np.testing.assert_allclose(Fitness(self.sparse).evaluate_population(sparse_population),
+                                   Fitness(self.dense).evaluate_population(population))
@@ -0,0 +1,35 @@
+from unittest import TestCase
+
+from domain.fleet import Fleet
+
+
+class TestFleet(TestCase):
+
+    def test_homogeneous(self):
+        fleet = Fleet.homogeneous(3, capacity=20, autonomy=600)
+
+        self.assertEqual(fleet.number_vehicles, 3)
+        self.assertEqual(fleet.capacities.tolist(), [20, 20, 20])
+        self.assertEqual(fleet.costs.tolist(), [0.0, 0.0, 0.0])
+        self.assertTrue(fleet.is_homogeneous)
+
+    def test_from_definitions(self):
+        fleet = Fleet.from_definitions([{"capacity": 5, "autonomy": 80, "cost": 0.2, "count": 2},
+                                        {"capacity": 40, "autonomy": 600}])
+
+        self.assertEqual(fleet.number_vehicles, 3)
+        self.assertEqual(fleet.capacities.tolist(), [5, 5, 40])
+        self.assertEqual(fleet.autonomies.tolist(), [80, 80, 600])
+        self.assertEqual(fleet.costs.tolist(), [0.2, 0.2, 0.0])
+        self.assertFalse(fleet.is_homogeneous)
+        self.assertEqual(fleet.to_dict()[2], {"capacity": 40, "autonomy": 600, "cost": 0.0})
+
+    def test_invalid_definitions(self):
+        for definitions in ([{"capacity": 5}], [{"capacity": "5", "autonomy": 80}],
+                            [{"capacity": 5, "autonomy": 80, "count": 0}], ["truck"], []):
+            with self.assertRaises(ValueError):
+                Fleet.from_definitions(definitions)
+
+    def test_negative_cost(self):
+        with self.assertRaises(ValueError):
+            Fleet([10, 20], 100, [-1.0, 0.0])
@@ -0,0 +1,45 @@
+import pickle
+from unittest import TestCase
+
+from domain.genome import Genome
+from domain.graph import Node
+from domain.route import Route
+from domain.solution import Solution
+from domain.vehicle import Vehicle
+
+
+class TestGenome(TestCase):
+    def setUp(self):
+        route1 = Route([0, 1, 2, 0])
+        route1.distance = 200.0
+        route2 = Route([0, 3, 0])
+        route2.distance = 50.0
+        self.solution = Solution([Vehicle(route1, capacity=50, autonomy=300), Vehicle(route2, capacity=40, autonomy=100)])
+        self.solution.fitness = 275.0
+        self.genome = Genome.from_solution(self.solution)
+
+    def test_from_solution(self):
+        self.assertEqual(self.genome.number_vehicles, 2)
+        self.assertEqual(self.genome.route(0).tolist(), [0, 1, 2, 0])
+        self.assertEqual(self.genome.route(1).tolist(), [0, 3, 0])
+        self.assertEqual(self.genome.customers(0).tolist(), [1, 2, 3])
+        self.assertEqual(self.genome.flatten_routes(), self.solution.flatten_routes())
+        self.assertEqual(self.genome.total_distance(), 250.0)
+        self.assertEqual(self.genome.fitness, 275.0)
+
+    def test_to_dict_matches_solution(self):
+        nodes = {i: Node(identifier=i, x=i, y=2 * i) for i in range(4)}
+        self.assertEqual(self.genome.to_dict(customer_id_to_node=nodes), self.solution.to_dict(customer_id_to_node=nodes))
+
+    def test_uses_slots(self):
+        with self.assertRaises(AttributeError):
+            self.genome.extra = 1
+
+    def test_pickle(self):
+        restored = pickle.loads(pickle.dumps(self.genome))
+        self.assertEqual(restored.flatten_routes(), self.genome.flatten_routes())
+        self.assertEqual(restored.capacities.tolist(), [50, 40])
+
+    def test_invalid_offsets(self):
+        with self.assertRaises(ValueError):
+            Genome([0, 1, 0], [0, 2], 10, 10)
@@ -2,12 +2,13 @@ from .route import Route
 
 class Vehicle:
 
-    def __init__(self, route: Route, capacity: int = 100, autonomy: float = 500.0) -> None:
+    def __init__(self, route: Route, capacity: int = 100, autonomy: float = 500.0, cost: float = 0.0) -> None:
         if not isinstance(route, Route):
             raise TypeError('route deve ser uma instância de Route')
         self.route = route
         self.capacity = capacity
         self.autonomy = autonomy
+        self.cost = cost
 
     def customers(self) -> list[int]:
         return self.route.customers
@@ -19,11 +20,12 @@ class Vehicle:
         return {
             "capacity": self.capacity,
             "autonomy": self.autonomy,
+            "cost": self.cost,
             "route": self.route.to_dict(customer_id_to_node=customer_id_to_node)
         }
 
     def __str__(self):
         lines = [
-            f"Vehicle(capacity={self.capacity}, total distance={self.distance()}, autonomy={self.autonomy}",
+            f"Vehicle(capacity={self.capacity}, total distance={self.distance()}, autonomy={self.autonomy}, cost={self.cost}",
             f"     {str(self.route)}"]
         return "\n".join(lines)
@@ -0,0 +1,123 @@
+import math
+import os
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from domain.genome import Genome
+from domain.graph import Graph, GraphCache
+
+CHECKPOINT_FORMAT_VERSION = 1
+
+
+class Checkpoint:
+    """
+    State needed to continue a run: population, generation counter, best solution, state of the random
+    generator of the run (random.Random.getstate()) and solver time already spent, with the key of the graph of
+    the run (see graph_key) when known.
+    """
+
+    def __init__(self, population: list[Genome], generation: int, best_solution: Optional[Genome],
+                 random_state: tuple, elapsed: float = 0.0, graph_key: Optional[str] = None) -> None:
+        self.population = population
+        self.generation = generation
+        self.best_solution = best_solution
+        self.random_state = random_state
+        self.elapsed = elapsed
+        self.graph_key = graph_key
+
+    def __str__(self) -> str:
+        return f"Checkpoint(generation={self.generation}, population={len(self.population)}, elapsed={self.elapsed})"
+
+    __repr__ = __str__
+
+
+def graph_key(graph: Graph) -> str:
+    """Key of the problem a checkpoint belongs to: the key of its graph in GraphCache."""
+    return GraphCache.key(graph.nodes, graph.sparse, graph.distance_provider)
+
+
+def _pack_genomes(prefix: str, genomes: list[Genome]) -> dict[str, np.ndarray]:
+    # Every field of the genomes is concatenated in a flat array, cut again by the lengths and number of vehicles
+    return {
+        f"{prefix}_lengths": np.array([len(genome.sequence) for genome in genomes], dtype=np.int64),
+        f"{prefix}_vehicles": np.array([genome.number_vehicles for genome in genomes], dtype=np.int64),
+        f"{prefix}_sequence": np.concatenate([genome.sequence for genome in genomes] or [np.empty(0, np.int32)]),
+        f"{prefix}_offsets": np.concatenate([genome.offsets for genome in genomes] or [np.empty(0, np.int64)]),
+        f"{prefix}_capacities": np.concatenate([genome.capacities for genome in genomes] or [np.empty(0)]),
+        f"{prefix}_autonomies": np.concatenate([genome.autonomies for genome in genomes] or [np.empty(0)]),
+        f"{prefix}_distances": np.concatenate([genome.distances for genome in genomes] or [np.empty(0)]),
+        f"{prefix}_costs": np.concatenate([genome.costs for genome in genomes] or [np.empty(0)]),
+        f"{prefix}_fitness": np.array([np.nan if genome.fitness is None else genome.fitness for genome in genomes],
+                                      dtype=np.float64),
+        f"{prefix}_penalty": np.array([np.nan if genome.penalty is None else genome.penalty for genome in genomes],
+                                      dtype=np.float64),
+    }
+
+
+def _unpack_genomes(prefix: str, arrays) -> list[Genome]:
+    lengths, vehicles = arrays[f"{prefix}_lengths"], arrays[f"{prefix}_vehicles"]
+    sequence_starts = np.concatenate([[0], np.cumsum(lengths)])
+    vehicle_starts = np.concatenate([[0], np.cumsum(vehicles)])
+    sequence, offsets = arrays[f"{prefix}_sequence"], arrays[f"{prefix}_offsets"]
+    capacities, autonomies = arrays[f"{prefix}_capacities"], arrays[f"{prefix}_autonomies"]
+    distances, fitness, penalty = arrays[f"{prefix}_distances"], arrays[f"{prefix}_fitness"], arrays[f"{prefix}_penalty"]
+    # Checkpoints written before the operating costs of the fleet have no costs (zero)
+    costs = arrays[f"{prefix}_costs"] if f"{prefix}_costs" in arrays else np.zeros(len(distances))
+    genomes = []
+    for index in range(len(lengths)):
+        first, last = vehicle_starts[index], vehicle_starts[index + 1]
+        genomes.append(Genome(sequence[sequence_starts[index]:sequence_starts[index + 1]],
+                              offsets[first + index:last + index + 1], capacities[first:last], autonomies[first:last],
+                              distances[first:last],
+                              fitness=None if math.isnan(fitness[index]) else float(fitness[index]),
+                              penalty=None if math.isnan(penalty[index]) else float(penalty[index]),
+                              costs=costs[first:last]))
+    return genomes
+
+
+def save_checkpoint(path, checkpoint: Checkpoint) -> None:
+    """
+    Writes the checkpoint as a NumPy archive of flat arrays (no pickled objects), replacing the previous file
+    atomically so a crash while writing keeps the last complete checkpoint.
+    Args:
+        path: Path of the checkpoint file.
+        checkpoint: Checkpoint to be written.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    version, internal_state, gauss_next = checkpoint.random_state
+    best = [checkpoint.best_solution] if checkpoint.best_solution is not None else []
+    temporary = path.with_name(path.name + ".tmp")
+    with open(temporary, "wb") as file:
+        np.savez(file, format_version=CHECKPOINT_FORMAT_VERSION, generation=checkpoint.generation,
+                 elapsed=checkpoint.elapsed, random_version=version,
+                 random_state=np.array(internal_state, dtype=np.uint32),
+                 random_gauss=np.nan if gauss_next is None else gauss_next, graph_key=checkpoint.graph_key or "",
+                 **_pack_genomes("population", checkpoint.population), **_pack_genomes("best", best))
+    os.replace(temporary, path)
+
+
+def load_checkpoint(path) -> Checkpoint:
+    """
+    Reads a checkpoint written by save_checkpoint.
+    Args:
+        path: Path of the checkpoint file.
+
+    Returns:
+        The checkpoint.
+    Raises:
+        ValueError: If the file is not a checkpoint of a supported version.
+    """
+    with np.load(path, allow_pickle=False) as arrays:
+        if "format_version" not in arrays or int(arrays["format_version"]) != CHECKPOINT_FORMAT_VERSION:
+            raise ValueError(f"{path} is not a checkpoint of version {CHECKPOINT_FORMAT_VERSION}.")
+        gauss_next = float(arrays["random_gauss"])
+        random_state = (int(arrays["random_version"]), tuple(int(value) for value in arrays["random_state"]),
+                        None if math.isnan(gauss_next) else gauss_next)
+        best = _unpack_genomes("best", arrays)
+        # Checkpoints written before the graph keys have none
+        key = str(arrays["graph_key"]) if "graph_key" in arrays else ""
+        return Checkpoint(_unpack_genomes("population", arrays), int(arrays["generation"]), best[0] if best else None,
+                          random_state, float(arrays["elapsed"]), key or None)
@@ -0,0 +1,205 @@
+import math
+from typing import Optional
+
+import numpy as np
+
+CONSTRUCTION_HEURISTICS = ("nearest_neighbor", "savings", "sweep")
+# Number of nearest unvisited candidates among which the randomized nearest-neighbor tour draws the next customer
+NEIGHBOR_CHOICES = 2
+# Length of the candidate lists searched by the nearest-neighbor tours whose own list is fully visited
+WIDE_NEIGHBORS = 64
+# Relative noise applied to the savings of the randomized Clarke-Wright variants
+SAVINGS_NOISE = 0.2
+# Randomized Clarke-Wright merges per population, shared by the savings individuals (each joins the trips in its
+# own order and orientation)
+SAVINGS_VARIANTS = 8
+# Standard deviation of the angle noise of the randomized sweep, in mean angular gaps between customers
+SWEEP_JITTER = 3.0
+
+
+def nearest_neighbor_tours(distance_matrix, neighbors: np.ndarray, customers: np.ndarray, starts: np.ndarray,
+                           choices, generator: np.random.Generator,
+                           wide_neighbors: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Nearest-neighbor giant tours built together, one step of every tour per iteration: the next customer of a tour
+    is drawn among the `choices` nearest unvisited ones of the candidate list of the current customer. Tours whose
+    list is fully visited take the nearest unvisited customer of the wide list, and only when this one is visited
+    too they search it in a row of the distance matrix.
+    Args:
+        distance_matrix: Distances by node position (dense or lazy, see Graph.distance_matrix).
+        neighbors: Candidate lists by node position, nearest first (see Graph.nearest_neighbors).
+        customers: Positions of the customers.
+        starts: Position of the first customer of each tour.
+        choices: Number of candidates drawn from, per tour or for all of them (1 is the deterministic heuristic).
+        generator: NumPy random generator.
+        wide_neighbors: Longer candidate lists by node position, nearest first (optional).
+
+    Returns:
+        Array (number of tours, number of customers) with customer positions in visiting order.
+    """
+    number_tours, size = len(starts), len(customers)
+    tours = np.empty((number_tours, size), dtype=np.int64)
+    if size == 0:
+        return tours
+    # Flat mask of the unvisited nodes of every tour (row t starts at t * number of nodes)
+    number_nodes = len(neighbors)
+    unvisited = np.zeros((number_tours, number_nodes), dtype=bool)
+    unvisited[:, customers] = True
+    flat = unvisited.ravel()
+    bases = np.arange(number_tours) * number_nodes
+    choices = np.broadcast_to(np.asarray(choices, dtype=np.int64), (number_tours,))
+    current = np.asarray(starts, dtype=np.int64)
+    for step in range(size):
+        tours[:, step] = current
+        flat[bases + current] = False
+        if step == size - 1:
+            break
+        candidates = neighbors[current]
+        open_candidates = flat[bases[:, None] + candidates]
+        ranks = np.cumsum(open_candidates, axis=1, dtype=np.int32)
+        counts = np.minimum(ranks[:, -1], choices) if candidates.shape[1] else np.zeros(number_tours, dtype=np.int64)
+        following = np.empty(number_tours, dtype=np.int64)
+        found = np.flatnonzero(counts)
+        if len(found):
+            drawn = (generator.random(len(found)) * counts[found]).astype(np.int32) + 1
+            columns = np.argmax(open_candidates[found] & (ranks[found] == drawn[:, None]), axis=1)
+            following[found] = candidates[found, columns]
+        lost = np.flatnonzero(counts == 0)
+        if len(lost) and wide_neighbors is not None:
+            candidates = wide_neighbors[current[lost]]
+            open_candidates = flat[bases[lost, None] + candidates]
+            columns = np.argmax(open_candidates, axis=1)
+            found = open_candidates[np.arange(len(lost)), columns]
+            following[lost[found]] = candidates[found, columns[found]]
+            lost = lost[~found]
+        if len(lost):
+            block = np.where(unvisited[lost], distance_matrix[current[lost]], np.inf)
+            following[lost] = np.argmin(block, axis=1)
+        current = following
+    return tours
+
+
+def savings_routes(distance_matrix, neighbors: np.ndarray, depot: int, customers: np.ndarray, demands: np.ndarray,
+                   capacity: float, autonomy: float = math.inf, generator: Optional[np.random.Generator] = None,
+                   noise: float = 0.0) -> list[np.ndarray]:
+    """
+    Clarke-Wright savings over the candidate lists: every customer starts in a trip of its own and the pairs of
+    neighbors are merged by decreasing saving d(0, i) + d(0, j) - d(i, j) while both are trip ends and the merged
+    trip respects the capacity and the autonomy. Only neighbor pairs are considered, so large graphs need no
+    N x N savings list; the distances are taken as symmetric.
+    Args:
+        distance_matrix: Distances by node position (dense or lazy).
+        neighbors: Candidate lists by node position.
+        depot: Position of the depot.
+        customers: Positions of the customers.
+        demands: Demands by node position.
+        capacity: Capacity limiting the merged trips (the largest vehicle).
+        autonomy: Autonomy limiting the merged trips (the largest vehicle).
+        generator: NumPy random generator, required with noise.
+        noise: Savings are multiplied by a uniform factor in [1 - noise, 1 + noise] (0 is the deterministic heuristic).
+
+    Returns:
+        Trips as arrays of customer positions.
+    """
+    size = len(neighbors)
+    first = np.repeat(customers, neighbors.shape[1])
+    second = neighbors[customers].ravel()
+    is_customer = np.zeros(size, dtype=bool)
+    is_customer[customers] = True
+    keep = is_customer[second] & (first != second)
+    pairs = np.unique(np.minimum(first, second)[keep] * size + np.maximum(first, second)[keep])
+    first, second = pairs // size, pairs % size
+    to_depot = np.asarray(distance_matrix[np.full(size, depot), np.arange(size)], dtype=np.float64)
+    lengths = np.asarray(distance_matrix[first, second], dtype=np.float64)
+    savings = to_depot[first] + to_depot[second] - lengths
+    if noise:
+        savings = savings * generator.uniform(1.0 - noise, 1.0 + noise, len(savings))
+    order = np.argsort(-savings, kind="stable")
+
+    # Trips are undirected paths: the other end, load and length (without the depot legs) are kept at both ends
+    other_end = np.arange(size).tolist()
+    load = np.asarray(demands, dtype=np.float64).tolist()
+    path_length = [0.0] * size
+    links: list[list[int]] = [[] for _ in range(size)]
+    to_depot = to_depot.tolist()
+    for i, j, length in zip(first[order].tolist(), second[order].tolist(), lengths[order].tolist()):
+        if len(links[i]) > 1 or len(links[j]) > 1 or other_end[i] == j:
+            continue
+        start, end = other_end[i], other_end[j]
+        merged_load = load[i] + load[j]
+        merged_length = path_length[i] + path_length[j] + length
+        if merged_load > capacity or merged_length + to_depot[start] + to_depot[end] > autonomy:
+            continue
+        links[i].append(j)
+        links[j].append(i)
+        other_end[start], other_end[end] = end, start
+        load[start] = load[end] = merged_load
+        path_length[start] = path_length[end] = merged_length
+
+    routes, visited = [], np.zeros(size, dtype=bool)
+    for customer in customers.tolist():
+        if visited[customer] or len(links[customer]) > 1:
+            continue
+        route, previous, current = [], -1, customer
+        while current != -1:
+            route.append(current)
+            visited[current] = True
+            following = [node for node in links[current] if node != previous]
+            previous, current = current, following[0] if following else -1
+        routes.append(np.array(route, dtype=np.int64))
+    return routes
+
+
+def join_routes(routes: list[np.ndarray], angles: np.ndarray, generator: Optional[np.random.Generator] = None
+                ) -> np.ndarray:
+    """
+    Concatenates trips into a giant tour in the order of the polar angle of their middle customer. With a
+    generator the sweep starts at a random trip and every trip is reversed with probability 1/2.
+    Args:
+        routes: Trips as arrays of customer positions.
+        angles: Polar angle around the depot by node position.
+        generator: NumPy random generator (None for the deterministic order).
+
+    Returns:
+        Customer positions in visiting order.
+    """
+    if not routes:
+        return np.empty(0, dtype=np.int64)
+    order = np.argsort([angles[route[len(route) // 2]] for route in routes], kind="stable")
+    if generator is not None:
+        order = np.roll(order, -int(generator.integers(len(order))))
+        routes = [route[::-1] if flip else route for route, flip in zip(routes, generator.random(len(routes)) < 0.5)]
+    return np.concatenate([routes[index] for index in order])
+
+
+def sweep_tours(angles: np.ndarray, radii: np.ndarray, customers: np.ndarray, sector_size: int, number_tours: int,
+                generator: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    Sweep giant tours: customers ordered by polar angle around the depot, in sectors of sector_size customers
+    visited by increasing and decreasing distance to the depot in turn, so a trip of two sectors goes out along one
+    and comes back along the next. Without a generator the single tour starts at angle -pi; with a generator each
+    tour starts at a random angle, turns in a random direction and perturbs the angles with a normal noise of
+    SWEEP_JITTER mean gaps, so neighboring customers change places and sectors.
+    Args:
+        angles: Polar angle around the depot by node position.
+        radii: Distance to the depot by node position.
+        customers: Positions of the customers.
+        sector_size: Number of customers per sector (about half of a trip).
+        number_tours: Number of tours.
+        generator: NumPy random generator (None for the deterministic tour).
+
+    Returns:
+        Array (number of tours, number of customers) with customer positions in visiting order.
+    """
+    keys = np.broadcast_to(angles[customers], (number_tours, len(customers)))
+    if generator is not None and len(customers):
+        gap = 2 * math.pi / len(customers)
+        offsets = generator.uniform(0, 2 * math.pi, (number_tours, 1))
+        keys = np.mod(keys - offsets, 2 * math.pi) + generator.normal(0, SWEEP_JITTER * gap, keys.shape)
+        keys = np.where(generator.random((number_tours, 1)) < 0.5, keys, -keys)
+    tours = customers[np.argsort(keys, axis=1, kind="stable")]
+    sectors = np.arange(len(customers)) // max(sector_size, 1)
+    # Odd sectors are visited from the farthest customer back to the depot
+    distances = np.where(sectors % 2 == 0, radii[tours], -radii[tours])
+    order = np.lexsort((distances, np.broadcast_to(sectors, tours.shape)), axis=1)
+    return np.take_along_axis(tours, order, axis=1)
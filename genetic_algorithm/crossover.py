@@ -1,75 +1,183 @@
 import random
+from typing import Optional
 
+import numpy as np
+
+from domain.genome import Genome
 from domain.route import Route
-from domain.solution import Solution
 from vrp.route_spliter import RouteSplitter
-from domain.vehicle import Vehicle
 
 
-def choose_two_different_indices(length: int) -> tuple[int, int]:
-    idx1 = random.randint(0, length - 1)
-    idx2 = random.randint(idx1 + 1, length)
+def choose_two_different_indices(length: int, rng: Optional[random.Random] = None) -> tuple[int, int]:
+    generator = rng or random
+    idx1 = generator.randint(0, length - 1)
+    idx2 = generator.randint(idx1 + 1, length)
     return idx1, idx2
 
 
+def order_crossover(main_parent: np.ndarray, secondary_parent: np.ndarray, start_index: int, end_index: int) -> np.ndarray:
+    """
+    Order crossover (OX): the child keeps the slice [start_index, end_index) of the main parent and the other
+    positions are filled, from left to right, with the remaining genes in the order of the secondary parent.
+    Membership is tested with a boolean lookup table, so the child is built in O(n).
+    Args:
+        main_parent: Customers of the parent that provides the preserved slice.
+        secondary_parent: Customers of the parent that provides the fill order.
+        start_index: First position of the preserved slice.
+        end_index: Position after the last one of the preserved slice.
+
+    Returns:
+        The child customers.
+    """
+    preserved = main_parent[start_index:end_index]
+    remaining = secondary_parent[~np.isin(secondary_parent, preserved, kind="table")] if len(preserved) else secondary_parent
+    return np.concatenate([remaining[:start_index], preserved, remaining[start_index:]])
+
+
+def order_crossover_batch(main_parents: np.ndarray, secondary_parents: np.ndarray, start_indices: np.ndarray,
+                          end_indices: np.ndarray) -> np.ndarray:
+    """
+    Vectorized order crossover producing K children from K parent pairs at once.
+    Every row must be a permutation of the same set of customers.
+    Args:
+        main_parents: Array (K, n) with the parents that provide the preserved slices.
+        secondary_parents: Array (K, n) with the parents that provide the fill order.
+        start_indices: Array (K,) with the first position of each preserved slice.
+        end_indices: Array (K,) with the position after the last one of each preserved slice.
+
+    Returns:
+        Array (K, n) with the children, same result as order_crossover row by row.
+    """
+    main_parents = np.asarray(main_parents)
+    secondary_parents = np.asarray(secondary_parents)
+    number_pairs, length = main_parents.shape
+    if number_pairs == 0 or length == 0:
+        return main_parents.copy()
+    positions = np.arange(length)
+    preserved = (positions >= np.asarray(start_indices)[:, None]) & (positions < np.asarray(end_indices)[:, None])
+
+    # Genes are mapped to 0..n-1 so membership is a (K, n) boolean mask
+    genes = np.sort(main_parents[0])
+    main_codes = np.searchsorted(genes, main_parents)
+    secondary_codes = np.searchsorted(genes, secondary_parents)
+    rows = np.arange(number_pairs)[:, None]
+    is_preserved_gene = np.zeros((number_pairs, length), dtype=bool)
+    is_preserved_gene[rows, main_codes] = preserved
+
+    children = np.where(preserved, main_parents, 0)
+    children[~preserved] = secondary_parents[~is_preserved_gene[rows, secondary_codes]]
+    return children
+
+
 def build_child_route(main_parent_flat_routes: list[int], secondary_parent_flat_routes: list[int], end_index: int, start_index: int) -> Route:
-    child: list[int] = main_parent_flat_routes[start_index:end_index]
-    remaining_positions = [i for i in range(len(main_parent_flat_routes)) if i < start_index or i >= end_index]
-    remaining_genes = [gene for gene in secondary_parent_flat_routes if gene not in child]
-    for position, gene in zip(remaining_positions, remaining_genes):
-        child.insert(position, gene)
-    return Route(child)
+    child = order_crossover(np.asarray(main_parent_flat_routes), np.asarray(secondary_parent_flat_routes), start_index, end_index)
+    return Route(child.tolist())
+
+
+def force_swap(customers: np.ndarray) -> np.ndarray:
+    """
+    Returns a copy of the customers with the first two genes swapped (or an unchanged copy when there are less than two).
+    """
+    child = customers.copy()
+    if len(child) > 1:
+        child[[0, 1]] = child[[1, 0]]
+    return child
+
 
 class Crossover:
-    def __init__(self, depot_identifier: int, number_vehicles: int, vehicle_autonomy: float, vehicle_capacity: int, crossover_probability: float = 1.0) -> None:
+    """
+    Order crossover of the giant tours of two parents, the children being split again into the vehicles.
+    Capacity, autonomy and cost are single values for a homogeneous fleet or per-vehicle arrays (see Fleet).
+    """
+
+    def __init__(self, depot_identifier: int, number_vehicles: int, vehicle_autonomy, vehicle_capacity, crossover_probability: float = 1.0,
+                 route_splitter: Optional[RouteSplitter] = None, rng: Optional[random.Random] = None,
+                 vehicle_cost=0.0) -> None:
         if number_vehicles <= 0:
             raise ValueError("Number of vehicles must be greater than zero.")
         self.__number_vehicles = number_vehicles
         self.__depot_identifier = depot_identifier
         self.__vehicle_autonomy = vehicle_autonomy
         self.__vehicle_capacity = vehicle_capacity
-        self.__route_splitter = RouteSplitter(depot_identifier, number_vehicles)
+        self.__vehicle_cost = vehicle_cost
+        self.__route_splitter = route_splitter or RouteSplitter(depot_identifier, number_vehicles)
         self.__crossover_probability = crossover_probability
+        self.__random = rng or random.Random()
 
-    def apply(self, p1: Solution, p2: Solution) -> tuple[Solution, Solution]:
-        if random.random() > self.__crossover_probability:
+    def apply(self, p1: Genome, p2: Genome) -> tuple[Genome, Genome]:
+        if self.__random.random() > self.__crossover_probability:
             return p1, p2
-        p1_flat_routes: list[int] = [x for x in p1.flatten_routes() if x != self.__depot_identifier]
-        p2_flat_routes: list[int] = [x for x in p2.flatten_routes() if x != self.__depot_identifier]
+        p1_flat_routes = p1.customers(self.__depot_identifier)
+        p2_flat_routes = p2.customers(self.__depot_identifier)
         length = len(p1_flat_routes)
         if length != len(p2_flat_routes):
             raise ValueError("Parents must have the same number of customers for crossover.")
 
-        max_attempts = 10
+        # Identical parents always produce copies of themselves, so the attempts are skipped
+        max_attempts = 10 if not np.array_equal(p1_flat_routes, p2_flat_routes) else 0
         for attempt in range(max_attempts):
-            start_index, end_index = choose_two_different_indices(length)
-            child1 = build_child_route(p1_flat_routes, p2_flat_routes, end_index, start_index)
-            child2 = build_child_route(p2_flat_routes, p1_flat_routes, end_index, start_index)
+            start_index, end_index = choose_two_different_indices(length, self.__random)
+            child1 = order_crossover(p1_flat_routes, p2_flat_routes, start_index, end_index)
+            child2 = order_crossover(p2_flat_routes, p1_flat_routes, start_index, end_index)
 
             # Check if children are different from parents
-            if child1.customers != p1_flat_routes or child2.customers != p2_flat_routes:
+            if not np.array_equal(child1, p1_flat_routes) or not np.array_equal(child2, p2_flat_routes):
                 break
         else:
             # If all attempts fail, force a swap of at least one gene
-            if length > 1:
-                child1_genes = p1_flat_routes.copy()
-                child1_genes[0], child1_genes[1] = child1_genes[1], child1_genes[0]
-                child1 = Route(child1_genes)
-                child2_genes = p2_flat_routes.copy()
-                child2_genes[0], child2_genes[1] = child2_genes[1], child2_genes[0]
-                child2 = Route(child2_genes)
-            else:
-                child1 = Route(p1_flat_routes)
-                child2 = Route(p2_flat_routes)
-
-        if len(child1.customers) != length:
+            child1, child2 = force_swap(p1_flat_routes), force_swap(p2_flat_routes)
+
+        if len(child1) != length:
             raise ValueError("Children route must have parent length.")
-        if len(child2.customers) != length:
+        if len(child2) != length:
             raise ValueError("Children route must have parent length.")
-        if len(child1.customers) != len(child2.customers):
-            raise ValueError("Children routes must have the same length.")
 
-        vehicles_solution_1 = [Vehicle(route, autonomy=self.__vehicle_autonomy, capacity=self.__vehicle_capacity) for route in self.__route_splitter.split(child1)]
-        vehicles_solution_2 = [Vehicle(route, autonomy=self.__vehicle_autonomy, capacity=self.__vehicle_capacity) for route in self.__route_splitter.split(child2)]
+        return self.__build_genome(child1), self.__build_genome(child2)
+
+    def apply_batch(self, parents1: list[Genome], parents2: list[Genome]) -> list[tuple[Genome, Genome]]:
+        """
+        Applies the crossover to K parent pairs at once with order_crossover_batch.
+        Keeps the semantics of apply: pairs are kept with probability 1 - crossover_probability, and pairs whose
+        children are equal to the parents are drawn again up to 10 times before the forced swap.
+        Args:
+            parents1: First parent of each pair.
+            parents2: Second parent of each pair.
+
+        Returns:
+            List with the two children of each pair.
+        """
+        results: list[tuple[Genome, Genome]] = [(p1, p2) for p1, p2 in zip(parents1, parents2)]
+        crossed = [i for i in range(len(results)) if self.__random.random() <= self.__crossover_probability]
+        if not crossed:
+            return results
+        main = np.stack([parents1[i].customers(self.__depot_identifier) for i in crossed])
+        secondary = np.stack([parents2[i].customers(self.__depot_identifier) for i in crossed])
+        length = main.shape[1]
+        children1, children2 = main.copy(), secondary.copy()
+
+        pending = np.flatnonzero(np.any(main != secondary, axis=1))
+        for attempt in range(10):
+            if len(pending) == 0:
+                break
+            starts = np.array([self.__random.randint(0, length - 1) for _ in pending])
+            ends = np.array([self.__random.randint(start + 1, length) for start in starts])
+            children1[pending] = order_crossover_batch(main[pending], secondary[pending], starts, ends)
+            children2[pending] = order_crossover_batch(secondary[pending], main[pending], starts, ends)
+            unchanged = (np.all(children1[pending] == main[pending], axis=1) &
+                         np.all(children2[pending] == secondary[pending], axis=1))
+            pending = pending[unchanged]
+
+        # Pairs still equal to the parents (including identical parents) get the forced swap
+        forced = np.flatnonzero(np.all(children1 == main, axis=1) & np.all(children2 == secondary, axis=1))
+        if length > 1 and len(forced):
+            swapped = [1, 0] + list(range(2, length))
+            children1[forced] = main[forced][:, swapped]
+            children2[forced] = secondary[forced][:, swapped]
+
+        for row, index in enumerate(crossed):
+            results[index] = (self.__build_genome(children1[row]), self.__build_genome(children2[row]))
+        return results
 
-        return Solution(vehicles=vehicles_solution_1), Solution(vehicles=vehicles_solution_2)
+    def __build_genome(self, customers: np.ndarray) -> Genome:
+        sequence, offsets = self.__route_splitter.split_customers(customers)
+        return Genome(sequence, offsets, self.__vehicle_capacity, self.__vehicle_autonomy, costs=self.__vehicle_cost)
@@ -0,0 +1,581 @@
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+
+from domain.fleet import Fleet
+from domain.genome import Genome
+from genetic_algorithm.fitness import Fitness
+from genetic_algorithm.offspring import step
+from genetic_algorithm.selection import numpy_generator
+
+DECOMPOSITION_METHODS = ("kmeans", "sweep")
+KMEANS_ITERATIONS = 50
+# Rows of the point to centroid distances computed at once by k-means
+KMEANS_BLOCK = 8192
+# A customer is on the boundary when one of its nearest neighbors belongs to another cluster
+BOUNDARY_NEIGHBORS = 10
+# Share of the time budget of the run kept at most for the repair of the stitched solution
+REPAIR_SHARE = 0.1
+# Seconds of repair per boundary customer
+REPAIR_TIME_PER_CUSTOMER = 0.01
+
+# Events of the engine that owns the worker process (see DecompositionEngine)
+_stop_event = None
+_pause_event = None
+
+
+def number_clusters(number_customers: int, number_vehicles: int, cluster_size: int = 300,
+                    clusters: Optional[int] = None) -> int:
+    """
+    Number of clusters of an instance: the requested one, or one per cluster_size customers, limited so that every
+    cluster has at least one customer and one vehicle. The count follows the number of customers, which drives the
+    cost of the generations, rather than the demand: vehicles return to the depot as often as needed, so any demand
+    fits the vehicles of a cluster, and the partitions balance the demand of the clusters instead.
+    """
+    wanted = clusters if clusters is not None else math.ceil(number_customers / cluster_size)
+    return max(1, min(wanted, number_vehicles, number_customers))
+
+
+def sweep_partition(x: np.ndarray, y: np.ndarray, demands: np.ndarray, depot: tuple[float, float],
+                    clusters: int) -> np.ndarray:
+    """
+    Cuts the customers into angular sectors around the depot holding about the same demand. The sweep starts at
+    the largest angular gap between customers, so no sector is split across an empty direction.
+    Returns:
+        Integer array with the cluster of each customer.
+    """
+    angles = np.arctan2(y - depot[1], x - depot[0])
+    order = np.argsort(angles, kind="stable")
+    if len(order) > 1:
+        gaps = np.diff(np.concatenate([angles[order], [angles[order[0]] + 2 * np.pi]]))
+        order = np.roll(order, -(int(np.argmax(gaps)) + 1))
+    weights = np.maximum(demands[order].astype(np.float64), 1e-9)
+    before = np.cumsum(weights) - weights
+    labels = np.empty(len(order), dtype=np.int64)
+    labels[order] = np.minimum((before * clusters / weights.sum()).astype(np.int64), clusters - 1)
+    return labels
+
+
+def kmeans_partition(x: np.ndarray, y: np.ndarray, clusters: int, generator: np.random.Generator,
+                     iterations: int = KMEANS_ITERATIONS, demands: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Lloyd's k-means on the customer coordinates with k-means++ seeding. A cluster left empty takes the customer
+    farthest from its centroid, so every cluster keeps at least one customer.
+    With demands, the customers are then assigned to the centroids with a capacity of the same share of the total
+    demand each (see _balance), so the clusters hold about the same demand.
+    Returns:
+        Integer array with the cluster of each customer.
+    """
+    points = np.column_stack([x, y]).astype(np.float64)
+    centroids = np.empty((clusters, 2))
+    centroids[0] = points[generator.integers(len(points))]
+    nearest = ((points - centroids[0]) ** 2).sum(axis=1)
+    for index in range(1, clusters):
+        total = nearest.sum()
+        chosen = generator.choice(len(points), p=nearest / total) if total > 0 else generator.integers(len(points))
+        centroids[index] = points[chosen]
+        nearest = np.minimum(nearest, ((points - centroids[index]) ** 2).sum(axis=1))
+
+    labels = np.full(len(points), -1, dtype=np.int64)
+    for _ in range(iterations):
+        assigned, distances = _assign(points, centroids)
+        counts = np.bincount(assigned, minlength=clusters)
+        for empty in np.flatnonzero(counts == 0):
+            farthest = int(np.argmax(distances))
+            counts[assigned[farthest]] -= 1
+            assigned[farthest], distances[farthest] = empty, 0.0
+            counts[empty] = 1
+        if np.array_equal(assigned, labels):
+            break
+        labels = assigned
+        for axis in range(2):
+            centroids[:, axis] = np.bincount(labels, weights=points[:, axis], minlength=clusters) / counts
+    if demands is not None and clusters > 1:
+        labels = _balance(points, centroids, np.asarray(demands, dtype=np.float64))
+    return labels
+
+
+def _balance(points: np.ndarray, centroids: np.ndarray, demands: np.ndarray) -> np.ndarray:
+    """
+    Capacitated assignment of the customers to the centroids: every centroid takes the same share of the total
+    demand (plus the largest demand, so the last customers are not left without room), and customers go to their
+    nearest centroid with room left, those with the largest regret (how much farther their second nearest centroid
+    is) first. A cluster left empty takes the customer nearest to its centroid.
+    """
+    clusters = len(centroids)
+    nearest = np.empty((len(points), 2))
+    labels = np.empty(len(points), dtype=np.int64)
+    for start in range(0, len(points), KMEANS_BLOCK):
+        squared = ((points[start:start + KMEANS_BLOCK, None, :] - centroids[None, :, :]) ** 2).sum(axis=2)
+        labels[start:start + KMEANS_BLOCK] = np.argmin(squared, axis=1)
+        nearest[start:start + KMEANS_BLOCK] = np.sqrt(np.partition(squared, 1, axis=1)[:, :2])
+    remaining = np.full(clusters, demands.sum() / clusters + demands.max())
+    for customer in np.argsort(nearest[:, 0] - nearest[:, 1], kind="stable").tolist():
+        cluster = labels[customer]
+        if remaining[cluster] < demands[customer]:
+            room = np.flatnonzero(remaining >= demands[customer])
+            if len(room):
+                squared = ((centroids[room] - points[customer]) ** 2).sum(axis=1)
+                cluster = room[int(np.argmin(squared))]
+        labels[customer] = cluster
+        remaining[cluster] -= demands[customer]
+    counts = np.bincount(labels, minlength=clusters)
+    for empty in np.flatnonzero(counts == 0).tolist():
+        squared = ((points - centroids[empty]) ** 2).sum(axis=1)
+        squared[counts[labels] <= 1] = np.inf
+        customer = int(np.argmin(squared))
+        counts[labels[customer]] -= 1
+        labels[customer], counts[empty] = empty, 1
+    return labels
+
+
+def _assign(points: np.ndarray, centroids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    labels = np.empty(len(points), dtype=np.int64)
+    distances = np.empty(len(points))
+    for start in range(0, len(points), KMEANS_BLOCK):
+        block = points[start:start + KMEANS_BLOCK]
+        squared = ((block[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2)
+        labels[start:start + KMEANS_BLOCK] = np.argmin(squared, axis=1)
+        distances[start:start + KMEANS_BLOCK] = squared[np.arange(len(block)), labels[start:start + KMEANS_BLOCK]]
+    return labels, distances
+
+
+def allocate_vehicles(cluster_demands: np.ndarray, capacities: np.ndarray,
+                      heaviest: Optional[np.ndarray] = None) -> list[list[int]]:
+    """
+    Assigns the vehicles of the fleet to the clusters by capacity: the largest vehicles go first to the clusters
+    of largest demand (or, with heaviest, of heaviest customer, so that every cluster gets a vehicle able to carry
+    it whenever possible), one each, then every remaining vehicle goes to the cluster with the largest demand not
+    covered yet.
+    Args:
+        cluster_demands: Total demand of each cluster.
+        capacities: Capacity of each vehicle of the fleet (at least one per cluster).
+        heaviest: Largest demand of a customer of each cluster, or None.
+
+    Returns:
+        Indices of the vehicles of each cluster, in fleet order.
+    """
+    clusters = len(cluster_demands)
+    vehicles = np.argsort(-np.asarray(capacities, dtype=np.float64), kind="stable").tolist()
+    allocated: list[list[int]] = [[] for _ in range(clusters)]
+    covered = np.zeros(clusters)
+    order = (np.argsort(-cluster_demands, kind="stable") if heaviest is None
+             else np.lexsort((-cluster_demands, -np.asarray(heaviest))))
+    for cluster, vehicle in zip(order.tolist(), vehicles):
+        allocated[cluster].append(vehicle)
+        covered[cluster] += capacities[vehicle]
+    for vehicle in vehicles[clusters:]:
+        cluster = int(np.argmax(cluster_demands - covered))
+        allocated[cluster].append(vehicle)
+        covered[cluster] += capacities[vehicle]
+    return [sorted(cluster_vehicles) for cluster_vehicles in allocated]
+
+
+def assign_to_depots(distances: np.ndarray, demands: np.ndarray,
+                     capacities: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Assigns every customer to a depot: the nearest one or, with depot capacities, the nearest one with capacity
+    left, customers with the largest regret (how much farther their second nearest depot is) first. Customers that
+    fit in no depot go to the nearest one.
+    Args:
+        distances: Array (depots, customers) with the distance from each depot to each customer.
+        demands: Demand of each customer.
+        capacities: Capacity of each depot, or None for unlimited depots.
+
+    Returns:
+        Integer array with the depot (row of distances) of each customer.
+    """
+    nearest = np.argmin(distances, axis=0)
+    if capacities is None or len(distances) == 1:
+        return nearest
+    preferences = np.argsort(distances, axis=0, kind="stable")
+    ranked = np.take_along_axis(distances, preferences, axis=0)
+    remaining = np.asarray(capacities, dtype=np.float64).copy()
+    labels = nearest.copy()
+    for customer in np.argsort(ranked[0] - ranked[1], kind="stable").tolist():
+        depot = next((int(depot) for depot in preferences[:, customer] if remaining[depot] >= demands[customer]),
+                     int(nearest[customer]))
+        labels[customer] = depot
+        remaining[depot] -= demands[customer]
+    return labels
+
+
+def boundary_customers(neighbors: np.ndarray, labels: np.ndarray) -> np.ndarray:
+    """
+    Positions of the nodes with a neighbor in another cluster.
+    Args:
+        neighbors: Nearest neighbors of every node (see Graph.nearest_neighbors).
+        labels: Cluster of every node, -1 for the depot.
+
+    Returns:
+        Integer array with the node positions of the boundary customers.
+    """
+    neighbor_labels = labels[neighbors]
+    crossing = np.any((neighbor_labels != labels[:, None]) & (neighbor_labels >= 0), axis=1)
+    return np.flatnonzero(crossing & (labels >= 0))
+
+
+def stitch(fleet, depot_identifier: int, vehicles: list[list[int]], genomes: list[Genome]) -> Genome:
+    """
+    Joins the solutions of the clusters into a solution of the whole problem: the vehicle i of a cluster is the
+    vehicle vehicles[cluster][i] of the fleet, and vehicles without a cluster stay at the depot.
+    Returns:
+        The stitched genome with the distances of the vehicles, not evaluated.
+    """
+    depot = np.array([depot_identifier, depot_identifier], dtype=np.int32)
+    routes = [depot] * fleet.number_vehicles
+    distances = np.zeros(fleet.number_vehicles)
+    for cluster_vehicles, genome in zip(vehicles, genomes):
+        for local, vehicle in enumerate(cluster_vehicles):
+            routes[vehicle] = genome.route(local)
+            distances[vehicle] = genome.distances[local]
+    offsets = np.concatenate([[0], np.cumsum([len(route) for route in routes], dtype=np.int64)])
+    return Genome(np.concatenate(routes), offsets, fleet.capacities, fleet.autonomies, distances, costs=fleet.costs)
+
+
+def _init_worker(stop_event, pause_event) -> None:
+    global _stop_event, _pause_event
+    _stop_event, _pause_event = stop_event, pause_event
+
+
+def _solve_cluster(cluster: int, vrp_factory, population_size: int, max_generations: Optional[int],
+                   time_budget: Optional[float], local_search_options: Optional[dict]) -> tuple:
+    """
+    Evolves the population of a cluster inside a worker process until its generation or time budget is spent
+    (time while not paused) or the engine stops.
+    Returns:
+        Tuple with the cluster, the number of generations, the best genome and the time spent.
+    """
+    vrp = vrp_factory.create_vrp()
+    local_search = vrp_factory.create_local_search(**local_search_options) if local_search_options is not None else None
+    population = vrp.generate_initial_population()
+    generation, elapsed, last = 0, 0.0, time.perf_counter()
+    while not _stop_event.is_set():
+        now = time.perf_counter()
+        if _pause_event.is_set():
+            last = now
+            time.sleep(0.05)
+            continue
+        elapsed, last = elapsed + now - last, now
+        if ((max_generations is not None and generation >= max_generations)
+                or (time_budget is not None and elapsed >= time_budget)):
+            break
+        generation += 1
+        population = step(vrp, population, population_size, local_search)[1]
+    vrp.evaluate_population(population)
+    return cluster, generation, vrp.sort_population(population)[0], elapsed
+
+
+def heaviest_customers(labels: np.ndarray, demands: np.ndarray, clusters: int) -> np.ndarray:
+    """Largest demand of a customer of each cluster."""
+    heaviest = np.zeros(clusters, dtype=np.asarray(demands).dtype)
+    np.maximum.at(heaviest, labels, demands)
+    return heaviest
+
+
+def _repair(vrp_factory, genome: Genome, boundary: list[int], neighbors: int, time_budget: float) -> Genome:
+    """
+    Evaluates the stitched genome on the whole problem and searches the neighborhoods of the boundary customers,
+    where the independent clusters left moves between them unexplored.
+    """
+    vrp_factory.create_vrp().evaluate_population([genome])
+    if not boundary or time_budget <= 0:
+        return genome
+    local_search = vrp_factory.create_local_search(neighbors=neighbors, time_budget=time_budget)
+    return local_search.improve(genome, time.perf_counter() + time_budget, boundary)
+
+
+class DecompositionEngine:
+    """
+    Cluster-first, route-second decomposition for very large instances: the customers are partitioned by
+    geography (k-means or sweep sectors) into clusters of about cluster_size customers holding about the same
+    demand, the vehicles are assigned to the clusters by demand and by their heaviest customer, and every cluster is
+    solved as an independent VRP in a pool of worker processes. When every cluster is solved, their routes are
+    stitched into a solution of the whole problem and repaired, in this process where the graph already is, by a
+    local search around the customers on the cluster boundaries.
+    The time budget is shared by the waves of clusters (clusters / workers) and the repair, which takes at most
+    REPAIR_SHARE of it.
+    """
+
+    def __init__(self, vrp_factory, population_size: int, method: str = "kmeans", clusters: Optional[int] = None,
+                 cluster_size: int = 300, workers: Optional[int] = None, max_generations: Optional[int] = None,
+                 max_time: Optional[float] = None, local_search_options: Optional[dict] = None,
+                 repair_neighbors: int = BOUNDARY_NEIGHBORS) -> None:
+        if method not in DECOMPOSITION_METHODS:
+            raise ValueError(f"Decomposition method must be one of {DECOMPOSITION_METHODS}.")
+        if clusters is not None and clusters <= 0:
+            raise ValueError("Number of clusters must be greater than zero.")
+        if cluster_size <= 0:
+            raise ValueError("Cluster size must be greater than zero.")
+        if max_generations is None and max_time is None:
+            raise ValueError("Decomposition runs need a generation or time budget.")
+        self.vrp_factory = vrp_factory
+        self.population_size = population_size
+        self.method = method
+        self.clusters = number_clusters(vrp_factory.number_nodes - 1, vrp_factory.number_vehicles, cluster_size,
+                                        clusters)
+        self.workers = min(workers or os.cpu_count() or 1, self.clusters)
+        self.max_generations = max_generations
+        waves = math.ceil(self.clusters / self.workers)
+        self.cluster_time = None if max_time is None else max_time * (1 - REPAIR_SHARE) / waves
+        self.max_repair_time = None if max_time is None else max_time * REPAIR_SHARE
+        self.local_search_options = local_search_options
+        self.repair_neighbors = repair_neighbors
+        # Customers (identifiers), fleet vehicles and depot of each cluster, set by start
+        self.customers: list[list[int]] = []
+        self.vehicles: list[list[int]] = []
+        self.depots: list[int] = []
+        # Cluster of every node position, -1 for the depots
+        self._labels: Optional[np.ndarray] = None
+        self.__context = multiprocessing.get_context("spawn")
+        self.__stop_event = self.__context.Event()
+        self.__pause_event = self.__context.Event()
+        self.__executor: Optional[ProcessPoolExecutor] = None
+        self.__futures: dict[int, Future] = {}
+        self.__reported: set[int] = set()
+        self.__solutions: dict[int, tuple[int, Genome]] = {}
+        self.__finish: Optional[Future] = None
+
+    def partition(self) -> None:
+        """
+        Partitions the customers and assigns the vehicles to the clusters (customers, vehicles and depots).
+        Raises:
+            ValueError: If the vehicles of a cluster cannot carry its heaviest customer.
+        """
+        graph = self.vrp_factory.graph
+        depot = graph.get_node(self.vrp_factory.depot_identifier)
+        nodes = [node for node in graph.get_nodes() if node.identifier != depot.identifier]
+        x = np.array([node.x for node in nodes], dtype=np.float64)
+        y = np.array([node.y for node in nodes], dtype=np.float64)
+        demands = np.array([node.demand for node in nodes], dtype=np.int64)
+        if self.method == "sweep":
+            labels = sweep_partition(x, y, demands, (depot.x, depot.y), self.clusters)
+        else:
+            labels = kmeans_partition(x, y, self.clusters, numpy_generator(self.vrp_factory.random), demands=demands)
+        identifiers = np.array([node.identifier for node in nodes], dtype=np.int64)
+        self.customers = [identifiers[labels == cluster].tolist() for cluster in range(self.clusters)]
+        heaviest = heaviest_customers(labels, demands, self.clusters)
+        self.vehicles = allocate_vehicles(np.bincount(labels, weights=demands, minlength=self.clusters),
+                                          self.vrp_factory.fleet.capacities, heaviest)
+        self._check_vehicles(heaviest, self.vrp_factory.fleet)
+        self.depots = [depot.identifier] * self.clusters
+        self._labels = np.full(len(graph.get_nodes()), -1, dtype=np.int64)
+        self._labels[graph.indices_of(identifiers)] = labels
+
+    def _check_vehicles(self, heaviest: np.ndarray, fleet: Fleet) -> None:
+        for cluster, vehicles in enumerate(self.vehicles):
+            capacity = fleet.capacities[vehicles].max()
+            if heaviest[cluster] > capacity:
+                raise ValueError(f"Cluster {cluster} has a customer of demand {heaviest[cluster]} but its vehicles "
+                                 f"carry at most {capacity}; use fewer clusters or larger vehicles.")
+
+    def _factory(self, cluster: int):
+        """Factory of the VRP of a cluster."""
+        depot = self.depots[cluster]
+        return self.vrp_factory.subproblem(self.vrp_factory.graph.subgraph([depot] + self.customers[cluster]),
+                                           self.vehicles[cluster], depot)
+
+    def _finish(self, genomes: list[Genome]) -> Future:
+        """
+        Starts the last step once every cluster is solved: the repair of the stitched solution, in a thread of this
+        process, so the graph of the whole problem is not sent to a worker.
+        Args:
+            genomes: Best genome of each cluster.
+
+        Returns:
+            Future of the solution of the whole problem.
+        """
+        stitched = stitch(self.vrp_factory.fleet, self.vrp_factory.depot_identifier, self.vehicles, genomes)
+        boundary = self.boundary()
+        repair_time = min(len(boundary) * REPAIR_TIME_PER_CUSTOMER, self.max_repair_time or math.inf)
+        future = Future()
+
+        def repair() -> None:
+            try:
+                future.set_result(_repair(self.vrp_factory, stitched, boundary, self.repair_neighbors, repair_time))
+            except Exception as error:
+                future.set_exception(error)
+
+        threading.Thread(target=repair, daemon=True, name="decomposition-repair").start()
+        return future
+
+    def start(self) -> None:
+        if not self.customers:
+            self.partition()
+        # Largest clusters first, so the last wave is not held up by a large cluster; every factory is built (and
+        # its problem validated) before anything is submitted
+        order = sorted(range(self.clusters), key=lambda cluster: -len(self.customers[cluster]))
+        factories = {cluster: self._factory(cluster) for cluster in order}
+        self.__executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=self.__context,
+                                              initializer=_init_worker,
+                                              initargs=(self.__stop_event, self.__pause_event))
+        for cluster in order:
+            self.__futures[cluster] = self.__executor.submit(_solve_cluster, cluster, factories[cluster],
+                                                             self.population_size, self.max_generations,
+                                                             self.cluster_time, self.local_search_options)
+
+    def pause(self) -> None:
+        self.__pause_event.set()
+
+    def resume(self) -> None:
+        self.__pause_event.clear()
+
+    def generations(self) -> list[int]:
+        return [self.__solutions[cluster][0] if cluster in self.__solutions else 0 for cluster in range(self.clusters)]
+
+    def poll(self) -> list[tuple[int, int, Genome]]:
+        """
+        Returns the clusters solved since the last poll, and starts the last step once every cluster is solved.
+        Returns:
+            List of tuples with the cluster, its number of generations and its best genome.
+        Raises:
+            Exception: The error of a worker that failed.
+        """
+        updates = []
+        for cluster, future in self.__futures.items():
+            if cluster in self.__reported or not future.done():
+                continue
+            _, generation, best, _ = future.result()
+            self.__reported.add(cluster)
+            self.__solutions[cluster] = (generation, best)
+            updates.append((cluster, generation, best))
+        if self.__finish is None and self.__futures and len(self.__solutions) == self.clusters:
+            self.__finish = self._finish([self.__solutions[cluster][1] for cluster in range(self.clusters)])
+        return updates
+
+    def boundary(self) -> list[int]:
+        """Identifiers of the customers with a nearest neighbor in another cluster."""
+        graph = self.vrp_factory.graph
+        positions = boundary_customers(graph.nearest_neighbors(self.repair_neighbors), self._labels)
+        return [graph.get_nodes()[position].identifier for position in positions.tolist()]
+
+    def done(self) -> bool:
+        return self.__finish is not None and self.__finish.done()
+
+    def result(self) -> Genome:
+        """
+        The solution of the whole problem (see done).
+        Raises:
+            Exception: The error of the last step.
+        """
+        return self.__finish.result()
+
+    def shutdown(self) -> None:
+        self.__stop_event.set()
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=False, cancel_futures=True)
+            self.__executor = None
+
+
+class MultiDepotEngine(DecompositionEngine):
+    """
+    Two-echelon multi-depot solving: every customer is assigned to a depot (the nearest one, or the nearest one with
+    capacity left), the customers of each depot are a VRP of their own served by vehicles of the fleet assigned by
+    demand, and the trunk legs supplying the depots from the distribution center (the depot of the problem) are a
+    VRP of the trunk fleet over the depots, each with the demand of its customers. The depot problems and the trunk
+    problem are independent, so they are all solved concurrently in the worker pool (the trunk is the last cluster).
+    The solution has the vehicles of the fleet, starting at their depots, followed by the trunk vehicles; it is
+    evaluated on the whole graph and fleet, each route ending its trips at its own depot and the depots supplied by
+    the trunk weighing their loads. The distribution center can also be one of the depots, serving its
+    customers directly.
+    """
+
+    def __init__(self, vrp_factory, population_size: int, depots: list[int], depot_capacities: Optional[list] = None,
+                 trunk_fleet: Optional[Fleet] = None, workers: Optional[int] = None,
+                 max_generations: Optional[int] = None, max_time: Optional[float] = None,
+                 local_search_options: Optional[dict] = None) -> None:
+        depots = list(dict.fromkeys(int(depot) for depot in depots))
+        if not depots:
+            raise ValueError("At least one depot is required.")
+        if depot_capacities is not None and len(depot_capacities) != len(depots):
+            raise ValueError("Depot capacities must have one value per depot.")
+        if vrp_factory.number_vehicles < len(depots):
+            raise ValueError("Fleet must have at least one vehicle per depot.")
+        vrp_factory.graph.indices_of(depots)
+        super().__init__(vrp_factory, population_size, clusters=len(depots), workers=workers,
+                         max_generations=max_generations, max_time=max_time,
+                         local_search_options=local_search_options)
+        self.depot_identifiers = depots
+        self.depot_capacities = None if depot_capacities is None else np.asarray(depot_capacities, dtype=np.float64)
+        self.trunk_fleet = trunk_fleet
+        # Fleet of the solution: the vehicles of the run followed by the trunk vehicles, set by partition
+        self.fleet: Fleet = vrp_factory.fleet
+        # One cluster per depot, plus the trunk when some depot is not the distribution center
+        satellites = sum(depot != vrp_factory.depot_identifier for depot in depots)
+        self.clusters = len(depots) + (1 if satellites else 0)
+        self.workers = min(workers or os.cpu_count() or 1, self.clusters)
+        # There is no repair: the waves of clusters take the whole time budget
+        self.cluster_time = None if max_time is None else max_time / math.ceil(self.clusters / self.workers)
+        self.__trunk: Optional[int] = None
+        self.__loads: list[int] = []
+        # Demands of the nodes of the whole graph, the depots supplied by the trunk carrying their loads
+        self.__demands: np.ndarray = vrp_factory.graph.demands
+
+    def partition(self) -> None:
+        """
+        Assigns the customers to the depots and the vehicles of the fleet to the depots with customers, and builds
+        the trunk problem over these depots.
+        Raises:
+            ValueError: If the load of a depot exceeds the capacity of every trunk vehicle (the trunk legs do not
+                split deliveries).
+        """
+        graph = self.vrp_factory.graph
+        center = self.vrp_factory.depot_identifier
+        excluded = set(self.depot_identifiers) | {center}
+        nodes = [node for node in graph.get_nodes() if node.identifier not in excluded]
+        identifiers = np.array([node.identifier for node in nodes], dtype=np.int64)
+        demands = np.array([node.demand for node in nodes], dtype=np.int64)
+        rows, columns = graph.indices_of(self.depot_identifiers), graph.indices_of(identifiers)
+        distances = np.asarray(graph.distance_matrix[rows[:, None], columns[None, :]], dtype=np.float64)
+        labels = assign_to_depots(distances, demands, self.depot_capacities)
+        loads = np.bincount(labels, weights=demands, minlength=len(rows)).astype(np.int64)
+        used = np.flatnonzero(np.bincount(labels, minlength=len(rows))).tolist()
+
+        fleet = self.vrp_factory.fleet
+        self.customers = [identifiers[labels == depot].tolist() for depot in used]
+        self.depots = [self.depot_identifiers[depot] for depot in used]
+        heaviest = heaviest_customers(labels, demands, len(rows))[used]
+        self.vehicles = allocate_vehicles(loads[used], fleet.capacities, heaviest)
+        self._check_vehicles(heaviest, fleet)
+        self._labels = np.full(len(graph.get_nodes()), -1, dtype=np.int64)
+        self._labels[columns] = np.searchsorted(used, labels)
+        satellites = [depot for depot in used if self.depot_identifiers[depot] != center]
+        if satellites:
+            trunk_fleet = self.trunk_fleet or Fleet.homogeneous(1, int(loads[satellites].sum()), np.inf)
+            heaviest = satellites[int(np.argmax(loads[satellites]))]
+            if loads[heaviest] > trunk_fleet.capacities.max():
+                raise ValueError(f"Depot {self.depot_identifiers[heaviest]} load ({loads[heaviest]}) exceeds the "
+                                 f"capacity of every trunk vehicle ({trunk_fleet.capacities.max()}); trunk legs do "
+                                 f"not split deliveries.")
+            self.fleet = Fleet(np.concatenate([fleet.capacities, trunk_fleet.capacities]),
+                               np.concatenate([fleet.autonomies, trunk_fleet.autonomies]),
+                               np.concatenate([fleet.costs, trunk_fleet.costs]))
+            self.__trunk = len(self.customers)
+            self.__loads = [0] + loads[satellites].tolist()
+            self.__demands = graph.demands.copy()
+            self.__demands[rows[satellites]] = loads[satellites]
+            self.customers.append([self.depot_identifiers[depot] for depot in satellites])
+            self.depots.append(center)
+            self.vehicles.append(list(range(fleet.number_vehicles, self.fleet.number_vehicles)))
+        self.clusters = len(self.customers)
+
+    def _factory(self, cluster: int):
+        depot = self.depots[cluster]
+        demands = self.__loads if cluster == self.__trunk else None
+        graph = self.vrp_factory.graph.subgraph([depot] + self.customers[cluster], demands)
+        return self.vrp_factory.subproblem(graph, self.vehicles[cluster], depot, self.fleet)
+
+    def _finish(self, genomes: list[Genome]) -> Future:
+        genome = stitch(self.fleet, self.vrp_factory.depot_identifier, self.vehicles, genomes)
+        fitness = Fitness(self.vrp_factory.graph, self.vrp_factory.depot_identifier, self.__demands,
+                          route_depots=True)
+        fitness.evaluate_genomes([genome])
+        future = Future()
+        future.set_result(genome)
+        return future
@@ -1,10 +1,31 @@
+import math
+from typing import Optional
+
+import numpy as np
+
 from domain.graph import Node, Graph
+from domain.genome import Genome
+from domain.solution import Solution
 from domain.vehicle import Vehicle
+from genetic_algorithm.mutation import ReversalMove
 
 
 class Fitness:
-    def __init__(self, graph: Graph=None):
+    TOLL_PENALTY = 5
+    PRIORITY_PENALTY = 50
+    # Penalty per unit of distance travelled beyond the autonomy in a trip
+    AUTONOMY_PENALTY = 10
+
+    def __init__(self, graph: Graph=None, depot_identifier: int = 0, demands: Optional[np.ndarray] = None,
+                 route_depots: bool = False):
         self.__graph = graph
+        self.__depot_identifier = depot_identifier
+        # Demand of each node of the graph used by the vectorized evaluation instead of the demands of the nodes
+        # (e.g. the load a distribution center delivers to a depot), or None
+        self.__demands = demands
+        # Whether the trips of each route end at its first node instead of the depot, as in multi-depot solutions
+        # where every vehicle starts at its own depot
+        self.__route_depots = route_depots
 
     @staticmethod
     def _total_distance(vehicles: list[Vehicle]) -> float:
@@ -35,7 +56,7 @@ class Fitness:
             route = vehicle.customers()
             for i in range(len(route) - 1):
                 total_tolls += self.__graph.get_edge_toll_by_node_id(route[i], route[i + 1])
-        return total_tolls * 5
+        return total_tolls * self.TOLL_PENALTY
 
     def calculate_priority_violation_penality(self, vehicles: list[Vehicle]) -> int:
         """
@@ -52,7 +73,7 @@ class Fitness:
             customer_ids = vehicle.customers()
             for customer_id in customer_ids:
                 node: Node = self.__graph.get_node(customer_id)
-                has_non_priority_customer_before_priority_customer_in_itinerary, priority_customer_violation_penalty = self._calculate_priority_violation_penality(self.__graph.get_node(0), node, has_non_priority_customer_before_priority_customer_in_itinerary)
+                has_non_priority_customer_before_priority_customer_in_itinerary, priority_customer_violation_penalty = self._calculate_priority_violation_penality(self.__graph.get_node(self.__depot_identifier), node, has_non_priority_customer_before_priority_customer_in_itinerary)
                 penalty += priority_customer_violation_penalty
         return penalty
 
@@ -72,7 +93,7 @@ class Fitness:
         """
         penalty = 0
         if node.priority == 1 and has_non_priority_customer_before_priority_customer_in_itinerary:
-            penalty = 50
+            penalty = self.PRIORITY_PENALTY
 
         if node.priority == 0 and depot != node:
             has_non_priority_customer_before_priority_customer_in_itinerary = True
@@ -114,11 +135,337 @@ class Fitness:
             current_load = 0
             for customer_id in vehicle.customers():
                 demand = self.__graph.get_node(customer_id).demand
-                if customer_id != 0:
+                if customer_id != self.__depot_identifier:
                     current_load += demand
-                if customer_id == 0:
+                if customer_id == self.__depot_identifier:
                     if current_load > vehicle.capacity:
                         penalty += float('inf')
                     current_load = 0
 
-        return penalty
\ No newline at end of file
+        return penalty
+
+    def calculate_autonomy_violation_penality(self, vehicles: list[Vehicle]) -> float:
+        """
+        Calculate the penality for autonomy violations: the distance of each trip (between two depot visits) beyond
+        the autonomy of the vehicle. Trip distances are differences of the distance travelled since the start of
+        the route, as in the vectorized evaluation.
+        Args:
+            vehicles: List of vehicles in the solution.
+
+        Returns:
+            Penality value.
+
+        """
+        excess = 0.0
+        for vehicle in vehicles:
+            customers = vehicle.customers()
+            travelled = 0.0
+            trip_start = 0.0
+            for position, customer_id in enumerate(customers):
+                if position:
+                    travelled += self.__graph.get_distance(customers[position - 1], customer_id)
+                if customer_id == self.__depot_identifier:
+                    excess += max(travelled - trip_start - vehicle.autonomy, 0.0)
+                    trip_start = travelled
+        return excess * self.AUTONOMY_PENALTY
+
+    @staticmethod
+    def calculate_operating_cost(vehicles: list[Vehicle]) -> float:
+        """
+        Calculate the operating cost of the vehicles: the distance of each vehicle times its cost per unit of
+        distance (zero for vehicles without cost).
+        Args:
+            vehicles: List of vehicles in the solution.
+
+        Returns:
+            Operating cost.
+
+        """
+        return sum(vehicle.cost * vehicle.distance() for vehicle in vehicles)
+
+    def evaluate_population(self, population: list[Genome | Solution]) -> np.ndarray:
+        """
+        Calculate the fitness of every solution of the population at once.
+        The routes are encoded as a padded array of node indices and every penalty is computed with array
+        operations over the graph matrices. Sums are accumulated sequentially (cumsum) in the same order as
+        the per-solution methods, so the scores are identical to distance + tolls + priority + capacity +
+        autonomy + balance + operating cost computed one solution at a time.
+        Args:
+            population: List of solutions.
+
+        Returns:
+            Array with the fitness of each solution, in population order.
+        """
+        return self._evaluate(population)[0]
+
+    def evaluate_genomes(self, genomes: list[Genome]) -> None:
+        """
+        Evaluate the genomes at once, storing the fitness and the fixed penalty (tolls, priority, capacity and
+        autonomy) used by evaluate_move.
+        Args:
+            genomes: List of genomes to be evaluated.
+        """
+        scores, penalties = self._evaluate(genomes)
+        for genome, score, penalty in zip(genomes, scores.tolist(), penalties.tolist()):
+            genome.fitness = score
+            genome.penalty = penalty
+
+    def _evaluate(self, population: list[Genome | Solution]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized evaluation shared by evaluate_population and evaluate_genomes.
+        Returns:
+            Tuple with the fitness and the fixed penalty (tolls + priority + capacity + autonomy) of each solution.
+        """
+        if self.__graph is None:
+            raise ValueError("Graph is not set for Fitness calculation.")
+        if not population:
+            return np.empty(0, dtype=np.float64), np.empty(0, dtype=np.float64)
+
+        routes, lengths, capacities, autonomies, costs, owners, slots, vehicles_per_solution = \
+            self._encode_population(population)
+        depot_index = self.__graph.index_of(self.__depot_identifier)
+        positions = np.arange(routes.shape[1])
+        valid = positions < lengths[:, None]
+
+        # Legs between consecutive nodes of each route
+        legs_valid = valid[:, 1:]
+        legs_from, legs_to = routes[:, :-1], routes[:, 1:]
+        legs_distance = np.where(legs_valid, self.__graph.distance_matrix[legs_from, legs_to], 0.0)
+        travelled = np.concatenate([np.zeros((len(routes), 1)), np.cumsum(legs_distance, axis=1)], axis=1)
+        route_distance = travelled[:, -1]
+        route_tolls = np.where(legs_valid, self.__graph.toll_matrix[legs_from, legs_to], 0).sum(axis=1)
+
+        is_depot = (routes == (routes[:, :1] if self.__route_depots else depot_index)) & valid
+
+        # Priority: a priority customer visited after any regular customer of the same route is penalized
+        priorities = self.__graph.priorities[routes]
+        regular = (priorities == 0) & ~is_depot & valid
+        regular_before = (np.cumsum(regular, axis=1) - regular) > 0
+        route_priority = ((priorities == 1) & valid & regular_before).sum(axis=1) * self.PRIORITY_PENALTY
+
+        # Capacity: load accumulated between two depot visits must fit in the vehicle
+        node_demands = self.__graph.demands if self.__demands is None else self.__demands
+        demands = np.where(is_depot | ~valid, 0, node_demands[routes])
+        accumulated = np.cumsum(demands, axis=1)
+        last_depot = np.maximum.accumulate(np.where(is_depot, positions, -1), axis=1)
+        previous_depot = np.concatenate([np.full((len(routes), 1), -1), last_depot[:, :-1]], axis=1)
+        accumulated_before = np.where(previous_depot >= 0,
+                                      np.take_along_axis(accumulated, np.maximum(previous_depot, 0), axis=1), 0)
+        overloaded = is_depot & (accumulated - accumulated_before > capacities[:, None])
+        route_overloaded = overloaded.any(axis=1)
+
+        # Autonomy: distance of each trip from the prefix sums of the legs, on the same depot segmentation
+        travelled_before = np.take_along_axis(travelled, np.maximum(previous_depot, 0), axis=1)
+        excess = np.where(is_depot, np.maximum(travelled - travelled_before - autonomies[:, None], 0.0), 0.0)
+        route_excess = np.cumsum(excess, axis=1)[:, -1]
+
+        # Per solution aggregation, vehicles laid out as [solution, slot]
+        number_solutions = len(population)
+        max_vehicles = max(int(vehicles_per_solution.max()), 1)
+        vehicle_distance = np.zeros((number_solutions, max_vehicles), dtype=np.float64)
+        vehicle_distance[owners, slots] = route_distance
+        vehicle_valid = np.zeros((number_solutions, max_vehicles), dtype=bool)
+        vehicle_valid[owners, slots] = True
+
+        total_distance = np.cumsum(vehicle_distance, axis=1)[:, -1]
+        average_distance = np.divide(total_distance, vehicles_per_solution,
+                                     out=np.zeros(number_solutions), where=vehicles_per_solution > 0)
+        deviation = np.where(vehicle_valid, np.abs(vehicle_distance - average_distance[:, None]), 0.0)
+        balance_penalty = np.cumsum(deviation, axis=1)[:, -1]
+        vehicle_cost = np.zeros((number_solutions, max_vehicles), dtype=np.float64)
+        vehicle_cost[owners, slots] = costs * route_distance
+        operating_cost = np.cumsum(vehicle_cost, axis=1)[:, -1]
+
+        tolls_penalty = np.bincount(owners, weights=route_tolls, minlength=number_solutions).astype(np.int64)
+        priority_penalty = np.bincount(owners, weights=route_priority, minlength=number_solutions).astype(np.int64)
+        capacity_penalty = np.where(np.bincount(owners, weights=route_overloaded, minlength=number_solutions) > 0,
+                                    np.inf, 0.0)
+
+        fixed_penalty = (tolls_penalty * self.TOLL_PENALTY + priority_penalty).astype(np.float64)
+        autonomy_penalty = np.bincount(owners, weights=route_excess, minlength=number_solutions) * self.AUTONOMY_PENALTY
+        fixed_penalty = fixed_penalty + capacity_penalty + autonomy_penalty
+        penalty = fixed_penalty + balance_penalty + operating_cost
+        return total_distance + penalty, fixed_penalty
+
+    def evaluate_move(self, genome: Genome, move: ReversalMove) -> Optional[Genome]:
+        """
+        Incremental (delta) evaluation of a segment reversal on an evaluated genome.
+        A reversal inside a single trip (no depot visit between the customers) keeps the vehicles and trips of the
+        genome when the capacity and autonomy split of the vehicle (see Helper.split_itinerary) would cut the
+        reversed tour at the same depot visits: the first customer of the trip still does not fit in the previous
+        trip, the first customer of the next trip still does not fit in this one and every customer of the trip is
+        still within range. These checks take the prefix sums of the distance and load of the trip (and of the
+        previous trip when the segment starts the trip). Distance and tolls change only on the four edges at the ends
+        of the segment (requires symmetric matrices), priority violations are recounted on the segment only and
+        capacity is unchanged. Distances are updated by difference, so they can differ from a full evaluation by
+        floating point rounding.
+        The moved genome is then the one the mutation and adjustment build by splitting the reversed tour again,
+        provided the genome is itself the equal mode split of its tour, as the split and adjustment build it. Genomes
+        built otherwise (optimal split, moved customers of a heterogeneous fleet, local search) keep their vehicles
+        and trips, as the moves of the local search do.
+        Args:
+            genome: Evaluated genome (fitness and penalty set).
+            move: Reversal of the customers move.first..move.last (indices in the giant tour).
+
+        Returns:
+            The moved and evaluated genome, or None when the move crosses a vehicle or depot boundary, could change
+            the split of the vehicle (or the genome is not evaluated) and a full evaluation is needed.
+        """
+        if (genome.fitness is None or genome.penalty is None or not self.__graph.is_symmetric
+                or self.__route_depots or self.__demands is not None):
+            return None
+        sequence = genome.sequence
+        depot = self.__depot_identifier
+        if move.positions is not None:
+            first, last = move.positions
+        else:
+            customers = np.flatnonzero(sequence != depot)
+            first, last = int(customers[move.first]), int(customers[move.last])
+        if last - first != move.last - move.first or first == 0 or last + 1 >= len(sequence):
+            return None
+        # Depot visits delimiting the trip of the segment
+        trip_start, trip_end = first - 1, last + 1
+        while sequence[trip_start] != depot:
+            trip_start -= 1
+        while sequence[trip_end] != depot:
+            trip_end += 1
+        vehicle = int(np.searchsorted(genome.offsets, first, side="right")) - 1
+        route_start, route_end = int(genome.offsets[vehicle]), int(genome.offsets[vehicle + 1])
+
+        indices = self.__graph.indices_of(sequence[[first - 1, first, last, last + 1]])
+        before, segment_first, segment_last, after = indices.tolist()
+        distances, tolls = self.__graph.distance_matrix, self.__graph.toll_matrix
+        distance_delta = (distances[before, segment_last] + distances[segment_first, after]
+                          - distances[before, segment_first] - distances[segment_last, after])
+        tolls_delta = int(tolls[before, segment_last] + tolls[segment_first, after]
+                          - tolls[before, segment_first] - tolls[segment_last, after])
+
+        capacity, autonomy = genome.capacities[vehicle].item(), genome.autonomies[vehicle].item()
+        bounded = not math.isinf(autonomy)
+        depot_index = self.__graph.index_of(depot)
+        demands = self.__graph.demands
+        if first - 1 == trip_start and trip_start != route_start:
+            # The new first customer of the trip must still not fit in the previous trip
+            previous_start = trip_start - 1
+            while sequence[previous_start] != depot:
+                previous_start -= 1
+            previous = self.__graph.indices_of(sequence[previous_start:trip_start])
+            if len(previous) > 1 and self._fits_after(int(demands[previous[1:]].sum()),
+                                                      float(np.cumsum(distances[previous[:-1], previous[1:]])[-1]),
+                                                      int(previous[-1]), segment_last, capacity, autonomy):
+                return None
+
+        autonomy_delta = 0.0
+        if bounded:
+            trip = self.__graph.indices_of(sequence[trip_start:trip_end + 1])
+            # travelled[k]: distance from the depot to the position k of the trip
+            travelled = np.concatenate([[0.0], np.cumsum(distances[trip[:-1], trip[1:]])])
+            back = distances[trip, depot_index]
+            start, stop = first - trip_start, last - trip_start + 1
+            # Every customer but the first of the trip must stay within range: the segment is travelled backwards
+            # and the customers after it are reached distance_delta later
+            segment_range = (travelled[start - 1] + distances[before, segment_last] + travelled[stop - 1]
+                             - travelled[start:stop] + back[start:stop])
+            if start == 1:
+                segment_range = segment_range[:-1]
+            after_range = travelled[stop:-1] + back[stop:-1] + distance_delta
+            if np.any(segment_range > autonomy) or np.any(after_range > autonomy):
+                return None
+            trip_distance = float(travelled[-1])
+            if trip_end != route_end - 1 and sequence[trip_end + 1] != depot:
+                # The first customer of the next trip must still be out of range (the load of the trip is unchanged)
+                last_customer = segment_first if stop == len(trip) - 1 else int(trip[-2])
+                if self._fits_after(int(demands[trip[1:-1]].sum()),
+                                    trip_distance + distance_delta - distances[last_customer, depot_index],
+                                    last_customer, self.__graph.index_of(sequence[trip_end + 1].item()), capacity,
+                                    autonomy):
+                    return None
+            autonomy_delta = (max(trip_distance + distance_delta - autonomy, 0.0)
+                              - max(trip_distance - autonomy, 0.0)) * self.AUTONOMY_PENALTY
+
+        priorities = self.__graph.priorities
+        regular_before = False
+        for position in range(first - 1, route_start, -1):
+            node = sequence[position].item()
+            if node != depot and priorities[self.__graph.index_of(node)] == 0:
+                regular_before = True
+                break
+        segment_priorities = priorities[self.__graph.indices_of(sequence[first:last + 1])]
+        priority_delta = (self._segment_priority_violations(segment_priorities[::-1], regular_before)
+                          - self._segment_priority_violations(segment_priorities, regular_before)) * self.PRIORITY_PENALTY
+
+        moved_sequence = sequence.copy()
+        moved_sequence[first:last + 1] = sequence[first:last + 1][::-1]
+        moved_distances = genome.distances.copy()
+        moved_distances[vehicle] += distance_delta
+        penalty = genome.penalty + (tolls_delta * self.TOLL_PENALTY + priority_delta) + autonomy_delta
+        moved = Genome(moved_sequence, genome.offsets, genome.capacities, genome.autonomies, moved_distances,
+                       penalty=penalty, costs=genome.costs)
+
+        vehicle_distances = moved_distances.tolist()
+        total_distance = sum(vehicle_distances)
+        average_distance = total_distance / len(vehicle_distances)
+        balance_penalty = sum(abs(distance - average_distance) for distance in vehicle_distances)
+        operating_cost = sum(cost * distance for cost, distance in zip(genome.costs.tolist(), vehicle_distances))
+        moved.fitness = total_distance + (penalty + balance_penalty + operating_cost)
+        return moved
+
+    def _fits_after(self, load: float, travelled: float, last: int, customer: int, capacity: float,
+                    autonomy: float) -> bool:
+        """
+        Whether the split of the itineraries (see Helper.split_itinerary) appends a customer to a trip instead of
+        returning to the depot first.
+        Args:
+            load: Load of the trip.
+            travelled: Distance from the depot to the last customer of the trip.
+            last: Graph index of the last customer of the trip.
+            customer: Graph index of the customer.
+            capacity: Capacity of the vehicle.
+            autonomy: Autonomy of the vehicle.
+        """
+        if load + self.__graph.demands[customer] > capacity:
+            return False
+        if math.isinf(autonomy):
+            return True
+        distances = self.__graph.distance_matrix
+        depot_index = self.__graph.index_of(self.__depot_identifier)
+        return travelled + distances[last, customer] + distances[customer, depot_index] <= autonomy
+
+    @staticmethod
+    def _segment_priority_violations(segment_priorities: np.ndarray, regular_before: bool) -> int:
+        """
+        Count the priority customers of a segment visited after a regular customer of the same route.
+        Args:
+            segment_priorities: Priorities of the segment customers, in visiting order.
+            regular_before: Whether a regular customer is visited before the segment.
+        """
+        regular = segment_priorities == 0
+        regular_seen = (np.cumsum(regular) - regular > 0) | regular_before
+        return int(np.count_nonzero((segment_priorities == 1) & regular_seen))
+
+    def _encode_population(self, population: list[Genome | Solution]) -> tuple[np.ndarray, ...]:
+        """
+        Encode the routes of the population as a padded array of node indices.
+        Args:
+            population: List of genomes (solutions are converted).
+
+        Returns:
+            Tuple with the padded routes (one row per vehicle), route lengths, vehicle capacities, autonomies and
+            costs, the solution owning each route, the vehicle slot of each route and the number of vehicles of each solution.
+        """
+        genomes = [individual if isinstance(individual, Genome) else Genome.from_solution(individual)
+                   for individual in population]
+        vehicles_per_solution = np.array([genome.number_vehicles for genome in genomes], dtype=np.int64)
+        lengths = np.concatenate([np.diff(genome.offsets) for genome in genomes])
+        capacities = np.concatenate([genome.capacities for genome in genomes]).astype(np.float64)
+        autonomies = np.concatenate([genome.autonomies for genome in genomes]).astype(np.float64)
+        costs = np.concatenate([genome.costs for genome in genomes])
+        owners = np.repeat(np.arange(len(genomes)), vehicles_per_solution)
+        first_route = np.concatenate([[0], np.cumsum(vehicles_per_solution)[:-1]])
+        slots = np.arange(len(owners)) - first_route[owners]
+
+        max_length = int(lengths.max()) if len(lengths) else 0
+        routes = np.zeros((len(lengths), max(max_length, 1)), dtype=np.int64)
+        customers = np.concatenate([genome.sequence for genome in genomes])
+        routes[np.arange(routes.shape[1]) < lengths[:, None]] = self.__graph.indices_of(customers)
+        return routes, lengths, capacities, autonomies, costs, owners, slots, vehicles_per_solution
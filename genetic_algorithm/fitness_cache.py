@@ -0,0 +1,63 @@
+from collections import OrderedDict
+from typing import Optional
+
+from domain.genome import Genome
+
+
+class FitnessCache:
+    """
+    Bounded memoization of evaluated genomes with least recently used eviction.
+    The key is the flat sequence (depot visits included, so it also encodes the capacity split) plus the vehicle
+    offsets; bytes keys are hashed once by the dictionary and never collide.
+    """
+
+    def __init__(self, max_size: int = 10000) -> None:
+        if max_size <= 0:
+            raise ValueError("Fitness cache size must be greater than zero.")
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.__entries: OrderedDict[tuple[bytes, bytes], tuple[float, float]] = OrderedDict()
+
+    @staticmethod
+    def key(genome: Genome) -> tuple[bytes, bytes]:
+        return genome.sequence.tobytes(), genome.offsets.tobytes()
+
+    def lookup(self, genome: Genome) -> bool:
+        """
+        Sets the fitness and penalty of the genome when an identical chromosome was already evaluated.
+        Args:
+            genome: Genome not evaluated.
+
+        Returns:
+            True on a cache hit.
+        """
+        key = self.key(genome)
+        entry: Optional[tuple[float, float]] = self.__entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return False
+        self.__entries.move_to_end(key)
+        genome.fitness, genome.penalty = entry
+        self.hits += 1
+        return True
+
+    def store(self, genome: Genome) -> None:
+        key = self.key(genome)
+        self.__entries[key] = (genome.fitness, genome.penalty)
+        self.__entries.move_to_end(key)
+        while len(self.__entries) > self.max_size:
+            self.__entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def statistics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.__entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -1,74 +1,145 @@
 import asyncio
-import copy
 import itertools
 import time
-from typing import Callable, Awaitable
 from typing import Callable, Awaitable, Optional
-from domain.solution import Solution
-from genetic_algorithm.selection import parents_selection
+from domain.genome import Genome
+from genetic_algorithm.checkpoint import Checkpoint, save_checkpoint
+from genetic_algorithm.island_engine import IslandEngine
+from genetic_algorithm.offspring import step
+from genetic_algorithm.parallel_engine import ParallelGenerationEngine
 from vrp.vrp_builder import VrpFactory
+from genetic_algorithm.local_search import LocalSearch
+
+EXECUTION_MODES = ("sequential", "process", "islands")
 
 
 class GeneticAlgorithmRunner:
-    def __init__(self, vrp_factory: VrpFactory, population_size: int, on_new_best_solution: Callable[[dict], Awaitable[None]] = None) -> None:
+    def __init__(self, vrp_factory: VrpFactory, population_size: int, on_new_best_solution: Callable[[dict], Awaitable[None]] = None,
+                 execution_mode: str = "sequential", workers: Optional[int] = None,
+                 local_search: Optional[LocalSearch] = None, islands: int = 4, migration_interval: int = 10,
+                 migration_size: int = 2, migration_topology: str = "ring", checkpoint_path: Optional[str] = None,
+                 checkpoint_interval: float = 5.0) -> None:
+        if execution_mode not in EXECUTION_MODES:
+            raise ValueError(f"Execution mode must be one of {EXECUTION_MODES}.")
+        self.vrp_factory = vrp_factory
         self.vrp = vrp_factory.create_vrp()
         self.population_size = population_size
-        self.population: list[Solution] = self.vrp.generate_initial_population()
+        self.population: list[Genome] = self.vrp.generate_initial_population()
+        self.profiler = self.vrp.profiler
+        self.random = self.vrp.random
 
-        self.best_solution: Optional[Solution] = None
+        self.best_solution: Optional[Genome] = None
         self.generation_counter = itertools.count(start=1)
+        self.generation = 0
 
         self.running = False
         self.paused = False
         self.on_new_best_solution = on_new_best_solution
 
+        self.execution_mode = execution_mode
+        self.workers = workers
+        self.engine: Optional[ParallelGenerationEngine | IslandEngine] = None
+        self.task: Optional[asyncio.Task] = None
+        self.local_search = local_search
+        self.islands = islands
+        self.migration_interval = migration_interval
+        self.migration_size = migration_size
+        self.migration_topology = migration_topology
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
 
     async def loop(self):
+        if self.execution_mode == "islands":
+            await self.__island_loop()
+            return
+        start_time = time.time()
+        last_checkpoint = start_time
+        evaluated = False
+        try:
+            while self.running:
+                if self.paused:
+                    await asyncio.sleep(0.1)
+                    continue
+
+                generation_start = time.time()
+                generation = self.generation = next(self.generation_counter)
+
+                if self.engine is None:
+                    ranked, self.population = step(self.vrp, self.population, self.population_size, self.local_search)
+                else:
+                    if not evaluated:
+                        await self.engine.evaluate(self.population)
+                        evaluated = True
+                    # Children come back from the workers already evaluated; the step waits for them off the loop
+                    ranked, self.population = await asyncio.to_thread(step, self.vrp, self.population,
+                                                                      self.population_size, self.local_search,
+                                                                      self.engine.offspring)
+
+                generation_time = time.time() - generation_start
+                total_time = time.time() - start_time
+
+                if self.best_solution is None or self.best_solution.fitness > ranked[0].fitness:
+                    self.best_solution = ranked[0]
+                    if self.on_new_best_solution:
+                        with self.profiler.section("events"):
+                            await self.on_new_best_solution({
+                                "event": "new_best_solution",
+                                "generation": generation,
+                                "best_distance": round(self.best_solution.total_distance(), 2),
+                                "best_fitness": round(self.best_solution.fitness, 2),
+                                "generation_time": round(generation_time, 2),
+                                "total_time": round(total_time, 2)
+                            })
+
+                if self.checkpoint_path and time.time() - last_checkpoint >= self.checkpoint_interval:
+                    save_checkpoint(self.checkpoint_path, self.checkpoint())
+                    last_checkpoint = time.time()
+                await asyncio.sleep(0)
+        finally:
+            self.__shutdown_engine()
+
+    async def __island_loop(self):
+        """
+        Follows the islands evolving in their processes, reporting the global best through on_new_best_solution.
+        """
         start_time = time.time()
-        while self.running:
-            if self.paused:
-                await asyncio.sleep(0.1)
-                continue
-
-            generation_start = time.time()
-            generation = next(self.generation_counter)
-
-            for individual in self.population:
-                self.vrp.fitness(individual)
-
-            self.population = self.vrp.sort_population(population=self.population)
-
-            generation_time = time.time() - generation_start
-            total_time = time.time() - start_time
-
-            if self.best_solution is None or self.best_solution.fitness > self.population[0].fitness:
-                self.best_solution = self.population[0]
-                if self.on_new_best_solution:
-                    await self.on_new_best_solution({
-                        "event": "new_best_solution",
-                        "generation": generation,
-                        "best_distance": round(self.best_solution.total_distance(), 2),
-                        "best_fitness": round(self.best_solution.fitness, 2),
-                        "generation_time": round(generation_time, 2),
-                        "total_time": round(total_time, 2)
-                    })
-
-            new_population = [copy.deepcopy(self.population[0])]
-            while len(new_population) < self.population_size:
-                parent1, parent2 = parents_selection(self.population)
-                child1, child2 = self.vrp.crossover(parent1, parent2)
-                mutated_child1 = self.vrp.mutate(child1)
-                mutated_child2 = self.vrp.mutate(child2)
-                new_population.extend([mutated_child1, mutated_child2])
-
-            self.population = new_population
-            await asyncio.sleep(0)
+        try:
+            while self.running:
+                if self.paused:
+                    self.engine.pause()
+                    await asyncio.sleep(0.1)
+                    continue
+                self.engine.resume()
+                for island, generation, best in self.engine.poll():
+                    if self.best_solution is None or self.best_solution.fitness > best.fitness:
+                        self.best_solution = best
+                        if self.on_new_best_solution:
+                            await self.on_new_best_solution({
+                                "event": "new_best_solution",
+                                "generation": generation,
+                                "island": island,
+                                "best_distance": round(best.total_distance(), 2),
+                                "best_fitness": round(best.fitness, 2),
+                                "total_time": round(time.time() - start_time, 2)
+                            })
+                await asyncio.sleep(0.05)
+        finally:
+            self.__shutdown_engine()
 
     async def start(self):
         if not self.running:
+            if self.task is not None and not self.task.done():
+                # A stopped loop ends at its next iteration; waiting avoids two loops on the same population
+                await self.task
             self.running = True
             self.paused = False
-            asyncio.create_task(self.loop())
+            if self.execution_mode == "process":
+                self.engine = ParallelGenerationEngine(self.vrp_factory, self.workers, self.vrp)
+            elif self.execution_mode == "islands":
+                self.engine = IslandEngine(self.vrp_factory, self.population_size, self.islands,
+                                           self.migration_interval, self.migration_size, self.migration_topology)
+                self.engine.start()
+            self.task = asyncio.create_task(self.loop())
 
     async def pause(self):
         self.paused = True
@@ -79,9 +150,46 @@ class GeneticAlgorithmRunner:
     async def stop(self):
         self.running = False
 
+    def __shutdown_engine(self) -> None:
+        if self.engine is not None:
+            self.engine.shutdown()
+            self.engine = None
+
+    def checkpoint(self) -> Checkpoint:
+        """
+        State of the run between two generations (the island model keeps its populations in the island processes
+        and is not checkpointed).
+        """
+        return Checkpoint(self.population, self.generation, self.best_solution, self.random.getstate())
+
+    def restore(self, checkpoint: Checkpoint) -> None:
+        """
+        Continues the run from a checkpoint: the next generation, and the random draws, follow the ones of the run
+        that wrote it.
+        Args:
+            checkpoint: Checkpoint of a run of the same problem.
+        """
+        if self.running:
+            raise ValueError("A running runner cannot be restored.")
+        self.population = list(checkpoint.population)
+        self.generation = checkpoint.generation
+        self.generation_counter = itertools.count(start=checkpoint.generation + 1)
+        self.best_solution = checkpoint.best_solution
+        self.random.setstate(checkpoint.random_state)
+
+    def metrics(self) -> dict:
+        """
+        Measures of the generation loop (see GenerationProfiler); with the process engine, the work done by the
+        workers is not measured.
+        """
+        return self.profiler.snapshot()
+
     def status(self):
         return {
             "running": self.running,
             "paused": self.paused,
+            "execution_mode": self.execution_mode,
+            "local_search": self.local_search is not None,
+            "fitness_cache": self.vrp.cache_statistics(),
             "best_solution": self.best_solution.to_dict() if self.best_solution else None
-        }
\ No newline at end of file
+        }
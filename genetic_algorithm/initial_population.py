@@ -1,55 +1,142 @@
+import math
 import random
+from typing import Optional
 
 import numpy as np
 
+from domain.genome import Genome
 from domain.graph import Graph, Node
-from domain.route import Route
-from domain.solution import Solution
-from domain.vehicle import Vehicle
+from genetic_algorithm.construction import (CONSTRUCTION_HEURISTICS, NEIGHBOR_CHOICES, SAVINGS_NOISE, SAVINGS_VARIANTS,
+                                            WIDE_NEIGHBORS, join_routes, nearest_neighbor_tours, savings_routes,
+                                            sweep_tours)
+from genetic_algorithm.selection import numpy_generator
 from vrp.adjustment.adjustment import Adjustment
+from vrp.route_spliter import RouteSplitter
 
 
 class InitialPopulationGenerator:
-    def __init__(self, graph: Graph, population_size: int, adjustment: Adjustment, vehicle_capacity: int,
-                 vehicle_autonomy: float, number_vehicles: int, depot_identifier: int = 0) -> None:
+    """
+    Initial population. Capacity, autonomy and cost are single values for a homogeneous fleet or per-vehicle
+    arrays (see Fleet).
+    A share of the population (seeding) is built with construction heuristics instead of random shuffles, split
+    evenly among the chosen heuristics (see CONSTRUCTION_HEURISTICS): nearest-neighbor tours over the candidate
+    lists of the graph, Clarke-Wright savings and sweep by polar angle around the depot. The first individual of
+    each heuristic is its deterministic tour and the others are randomized variants; the tours of a heuristic are
+    built together, vectorized over the individuals.
+    """
+
+    def __init__(self, graph: Graph, population_size: int, adjustment: Adjustment, vehicle_capacity,
+                 vehicle_autonomy, number_vehicles: int, depot_identifier: int = 0,
+                 route_splitter: Optional[RouteSplitter] = None, rng: Optional[random.Random] = None,
+                 vehicle_cost=0.0, seeding: float = 0.0, neighbors: int = 10,
+                 heuristics: tuple[str, ...] = CONSTRUCTION_HEURISTICS) -> None:
+        if not 0.0 <= seeding <= 1.0:
+            raise ValueError("Seeding share must be between 0 and 1.")
+        if not heuristics or any(heuristic not in CONSTRUCTION_HEURISTICS for heuristic in heuristics):
+            raise ValueError(f"Seeding heuristics must be among {CONSTRUCTION_HEURISTICS}.")
         self.__adjustment = adjustment
         self.__vehicle_capacity = vehicle_capacity
         self.__vehicle_autonomy = vehicle_autonomy
+        self.__vehicle_cost = vehicle_cost
         self.__number_vehicles = number_vehicles
         self.__graph = graph
         self.__population_size = population_size
         self.__depot_identifier = depot_identifier
+        self.__route_splitter = route_splitter or RouteSplitter(depot_identifier, number_vehicles)
+        self.__random = rng or random.Random()
+        self.__seeding = seeding
+        self.__neighbors = neighbors
+        self.__heuristics = tuple(heuristics)
 
-    def generate(self):
+    def generate(self) -> list[Genome]:
         """
-        Generate the initial population of solutions using a random shuffle of customers.
+        Generate the initial population: the seeded share with the construction heuristics, the rest with random
+        shuffles of the customers.
         Returns:
             Initial population of solutions.
         """
-        customers: list[Node] = self.__graph.get_nodes()[1:]
-        solutions: list[Solution] = list()
-        for _ in range(self.__population_size):
-            shuffled_customers: list[Node] = random.sample(customers, len(customers))
+        customers: list[Node] = [node for node in self.__graph.get_nodes()
+                                 if node.identifier != self.__depot_identifier]
+        seeded = round(self.__seeding * self.__population_size) if len(customers) > 1 else 0
+        solutions: list[Genome] = [self.__adjustment.apply(self.__build_genome(customer_ids))
+                                   for customer_ids in self.seed_tours(seeded)]
+        for _ in range(self.__population_size - seeded):
+            shuffled_customers: list[Node] = self.__random.sample(customers, len(customers))
             customer_ids: list[int] = [customer.identifier for customer in shuffled_customers]
-            vehicles = self.__build_vehicles(customer_ids)
-            solution = Solution(vehicles=vehicles)
+            solution = self.__build_genome(customer_ids)
             solution = self.__adjustment.apply(solution)
             solutions.append(solution)
         return solutions
 
-    def __build_vehicles(self, customer_ids: list[int]) -> list[Vehicle]:
+    def seed_tours(self, number_tours: int) -> list[list[int]]:
+        """
+        Giant tours of the construction heuristics, split evenly among them in the order of the heuristics.
+        Args:
+            number_tours: Number of tours.
+
+        Returns:
+            Tours as lists of customer identifiers in visiting order.
+        """
+        base, extra = divmod(number_tours, len(self.__heuristics))
+        counts = [base + (1 if index < extra else 0) for index in range(len(self.__heuristics))]
+        if not number_tours:
+            return []
+        graph = self.__graph
+        generator = numpy_generator(self.__random)
+        identifiers = np.array([node.identifier for node in graph.get_nodes()])
+        depot = graph.index_of(self.__depot_identifier)
+        customers = np.delete(np.arange(len(identifiers)), depot)
+        neighbors = graph.nearest_neighbors(self.__neighbors)
+        x = np.array([node.x for node in graph.get_nodes()], dtype=np.float64)
+        y = np.array([node.y for node in graph.get_nodes()], dtype=np.float64)
+        angles = np.arctan2(y - y[depot], x - x[depot])
+        tours: list[np.ndarray] = []
+        for heuristic, count in zip(self.__heuristics, counts):
+            if not count:
+                continue
+            if heuristic == "nearest_neighbor":
+                # The deterministic tour starts at the customer nearest to the depot
+                starts = generator.choice(customers, count)
+                starts[0] = customers[np.argmin(graph.distance_matrix[np.full(len(customers), depot), customers])]
+                choices = np.full(count, NEIGHBOR_CHOICES)
+                choices[0] = 1
+                tours.extend(nearest_neighbor_tours(graph.distance_matrix, neighbors, customers, starts, choices,
+                                                    generator, graph.nearest_neighbors(WIDE_NEIGHBORS)))
+            elif heuristic == "savings":
+                capacity = float(np.max(self.__vehicle_capacity))
+                autonomy = float(np.max(self.__vehicle_autonomy))
+                routes = savings_routes(graph.distance_matrix, neighbors, depot, customers, graph.demands, capacity,
+                                        autonomy)
+                tours.append(join_routes(routes, angles))
+                # The merges are sequential, so the other individuals share a few noisy variants
+                variants = [savings_routes(graph.distance_matrix, neighbors, depot, customers, graph.demands,
+                                           capacity, autonomy, generator, SAVINGS_NOISE)
+                            for _ in range(min(count - 1, SAVINGS_VARIANTS))]
+                tours.extend(join_routes(variants[index % len(variants)], angles, generator)
+                             for index in range(count - 1))
+            else:
+                radii = np.hypot(x - x[depot], y - y[depot])
+                sector_size = self.__trip_size(graph.demands[customers]) // 2
+                tours.extend(sweep_tours(angles, radii, customers, sector_size, 1))
+                tours.extend(sweep_tours(angles, radii, customers, sector_size, count - 1, generator))
+        return [identifiers[tour].tolist() for tour in tours]
+    def __trip_size(self, demands: np.ndarray) -> int:
+        # Customers of an average trip: as many as the largest vehicle carries, at most an even share per vehicle
+        share = math.ceil(len(demands) / self.__number_vehicles)
+        mean_demand = float(np.mean(demands)) if len(demands) else 0.0
+        if mean_demand <= 0:
+            return share
+        return max(1, min(share, int(float(np.max(self.__vehicle_capacity)) / mean_demand)))
+
+    def __build_genome(self, customer_ids: list[int]) -> Genome:
         """
-        Split route into vehicles and create vehicles with the given capacity and autonomy.
+        Split route into vehicles with the given capacity and autonomy.
         Args:
             customer_ids: List of customer IDs to be served by the vehicles.
 
         Returns:
-            List of vehicles with assigned routes.
+            Genome with one itinerary per vehicle.
 
         """
-        vehicles = []
-        chunks = np.array_split(customer_ids, self.__number_vehicles)
-        for chunk in chunks:
-            route = Route([self.__depot_identifier] + chunk.tolist() + [self.__depot_identifier])
-            vehicles.append(Vehicle(route=route, autonomy=self.__vehicle_autonomy, capacity=self.__vehicle_capacity))
-        return vehicles
+        sequence, offsets = self.__route_splitter.split_customers(customer_ids)
+        return Genome(sequence, offsets, self.__vehicle_capacity, self.__vehicle_autonomy, costs=self.__vehicle_cost)
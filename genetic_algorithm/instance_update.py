@@ -0,0 +1,102 @@
+from typing import Iterable
+
+import numpy as np
+
+from domain.genome import Genome
+from domain.graph import Graph, Node
+
+
+def drop_customers(genome: Genome, customers: Iterable[int]) -> Genome:
+    """
+    Removes customers from the routes of the genome.
+    Args:
+        genome: The genome.
+        customers: Identifiers of the customers to be removed.
+
+    Returns:
+        A new genome without the customers (not adjusted nor evaluated).
+    """
+    kept = ~np.isin(genome.sequence, np.fromiter(customers, dtype=np.int64))
+    # Routes always start and end at the depot, so no route is empty and reduceat counts every vehicle
+    lengths = np.add.reduceat(kept.astype(np.int64), genome.offsets[:-1]) if genome.number_vehicles else []
+    offsets = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)])
+    return Genome(genome.sequence[kept], offsets, genome.capacities, genome.autonomies, costs=genome.costs)
+
+
+def insert_customers(genome: Genome, customers: Iterable[int], graph: Graph) -> Genome:
+    """
+    Inserts customers one by one at their cheapest position: between the two consecutive stops of a vehicle with
+    capacity for the demand of the customer where the detour (d(a, c) + d(c, b) - d(a, b)) is the smallest.
+    Args:
+        genome: The genome, with at least one vehicle.
+        customers: Identifiers of the customers to be inserted, in order.
+        graph: Graph with the customers and the stops of the genome.
+
+    Returns:
+        A new genome with the customers (not adjusted nor evaluated).
+    """
+    sequence, offsets = genome.sequence, genome.offsets
+    matrix = graph.distance_matrix
+    for customer in customers:
+        positions = graph.indices_of(sequence)
+        before, after = positions[:-1], positions[1:]
+        column = np.full(len(before), graph.index_of(customer))
+        detours = matrix[before, column] + matrix[column, after] - matrix[before, after]
+        # The last stop of a vehicle and the first one of the next vehicle are not consecutive stops
+        detours[offsets[1:-1] - 1] = np.inf
+        capacities = np.repeat(genome.capacities, np.diff(offsets))[:-1]
+        detours[capacities < graph.demands[column[0]]] = np.inf
+        position = int(np.argmin(detours)) + 1
+        sequence = np.insert(sequence, position, customer)
+        offsets = offsets + (offsets > position)
+    return Genome(sequence, offsets, genome.capacities, genome.autonomies, costs=genome.costs)
+
+
+def update_instance(vrp_factory, population: list[Genome], added: Iterable[Node] = (),
+                    removed: Iterable[int] = (), changed: Iterable[dict] = ()) -> tuple:
+    """
+    Applies changes of the customers to a problem being solved, warm starting from its population instead of a new
+    one: the graph is copied (the graph of the problem may be shared) and extended by the rows and columns of the
+    new customers, and every individual drops the removed customers, gets the new ones (and the customers whose
+    new demand exceeds the capacity of their vehicle) at their cheapest position and is adjusted to the capacity and
+    autonomy of the vehicles again.
+    Removed customers stay in the graph, out of the routes, so their identifiers cannot be added again.
+    Args:
+        vrp_factory: Factory of the problem.
+        population: Current population of the problem.
+        added: New customers.
+        removed: Identifiers of the customers to be removed.
+        changed: Changes of customers, dictionaries with the identifier and the new demand and/or priority.
+
+    Returns:
+        Tuple with the factory of the changed problem and the repaired population (not evaluated).
+    Raises:
+        ValueError: If a removed or changed node is not a customer of the problem, an added node already exists, or
+            a demand does not fit in the vehicles.
+    """
+    added, removed, changed = list(added), [int(customer) for customer in removed], list(changed)
+    depot = vrp_factory.depot_identifier
+    customers = set(population[0].customers(depot).tolist()) if population else set()
+    for identifier in removed + [change["identifier"] for change in changed]:
+        if identifier not in customers:
+            raise ValueError(f"Node {identifier} is not a customer of the run.")
+
+    graph = vrp_factory.graph.copy()
+    for change in changed:
+        graph.update_node(change["identifier"], change.get("demand"), change.get("priority"))
+    graph.add_nodes(added)
+    factory = vrp_factory.with_graph(graph)
+    adjustment = factory.adjustment
+    new_customers = [node.identifier for node in added]
+    repaired = []
+    for genome in population:
+        if removed:
+            genome = drop_customers(genome, removed)
+        capacities = np.repeat(genome.capacities, np.diff(genome.offsets))
+        misplaced = genome.sequence[graph.demands[graph.indices_of(genome.sequence)] > capacities].tolist()
+        if misplaced:
+            genome = drop_customers(genome, misplaced)
+        if misplaced or new_customers:
+            genome = insert_customers(genome, misplaced + new_customers, graph)
+        repaired.append(adjustment.apply(genome))
+    return factory, repaired
@@ -0,0 +1,202 @@
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+from typing import Optional
+
+import numpy as np
+
+from domain.genome import Genome
+from genetic_algorithm.offspring import step
+
+MIGRATION_TOPOLOGIES = ("ring", "random")
+# Every island is a process of its own
+MAX_ISLANDS = 64
+
+
+def _slot_dtype(migration_size: int, max_length: int, number_vehicles: int) -> np.dtype:
+    """
+    Layout of the shared buffer of an island: a header (version, generation and number of individuals) followed by
+    its top individuals, published at every improvement and migration.
+    """
+    return np.dtype([
+        ("version", np.int64),
+        ("generation", np.int64),
+        ("count", np.int64),
+        ("length", np.int64, (migration_size,)),
+        ("vehicles", np.int64, (migration_size,)),
+        ("fitness", np.float64, (migration_size,)),
+        ("penalty", np.float64, (migration_size,)),
+        ("sequence", np.int32, (migration_size, max_length)),
+        ("offsets", np.int64, (migration_size, number_vehicles + 1)),
+        ("distances", np.float64, (migration_size, number_vehicles)),
+    ])
+
+
+def _write_slot(slot, genomes: list[Genome], generation: int) -> None:
+    for position, genome in enumerate(genomes):
+        number_vehicles = genome.number_vehicles
+        slot["length"][position] = len(genome.sequence)
+        slot["vehicles"][position] = number_vehicles
+        slot["fitness"][position] = genome.fitness
+        slot["penalty"][position] = np.nan if genome.penalty is None else genome.penalty
+        slot["sequence"][position, :len(genome.sequence)] = genome.sequence
+        slot["offsets"][position, :number_vehicles + 1] = genome.offsets
+        slot["distances"][position, :number_vehicles] = genome.distances
+    slot["count"] = len(genomes)
+    slot["generation"] = generation
+    slot["version"] += 1
+
+
+def _read_slot(slot, fleet) -> list[Genome]:
+    # Every genome of the run carries the vehicles of the fleet, so they are not stored in the slot
+    genomes = []
+    for position in range(int(slot["count"])):
+        number_vehicles = int(slot["vehicles"][position])
+        penalty = float(slot["penalty"][position])
+        genomes.append(Genome(slot["sequence"][position, :int(slot["length"][position])].copy(),
+                              slot["offsets"][position, :number_vehicles + 1].copy(), fleet.capacities,
+                              fleet.autonomies, slot["distances"][position, :number_vehicles].copy(),
+                              fitness=float(slot["fitness"][position]),
+                              penalty=None if np.isnan(penalty) else penalty, costs=fleet.costs))
+    return genomes
+
+
+def _island_main(index: int, vrp_factory, population_size: int, buffer_name: str, dtype: np.dtype, locks,
+                 stop_event, pause_event, migration_interval: int, migration_size: int, topology: str,
+                 seed: int) -> None:
+    """
+    Evolves one island until the stop event: the top individuals are published in the island slot whenever the
+    best improves, and every migration_interval generations the published individuals of the source island (the
+    previous one in the ring, or a random one) replace the worst individuals of the population.
+    """
+    vrp_factory.random.seed(seed)
+    buffer = shared_memory.SharedMemory(name=buffer_name)
+    try:
+        slots = np.ndarray((len(locks),), dtype=dtype, buffer=buffer.buf)
+        vrp = vrp_factory.create_vrp()
+        population = vrp.generate_initial_population()
+        islands = len(locks)
+        generation, best_fitness = 0, None
+        while not stop_event.is_set():
+            if pause_event.is_set():
+                time.sleep(0.05)
+                continue
+            generation += 1
+            ranked, population = step(vrp, population, population_size)
+            migration = islands > 1 and generation % migration_interval == 0
+            if migration:
+                source = (index - 1) % islands if topology == "ring" else vrp.random.choice(
+                    [island for island in range(islands) if island != index])
+                with locks[source]:
+                    migrants = _read_slot(slots[source], vrp_factory.fleet)
+                # The migrants replace the last children of the next population, keeping its elite
+                if migrants:
+                    population = population[:len(population) - len(migrants)] + migrants
+            improved = best_fitness is None or ranked[0].fitness < best_fitness
+            if improved or migration:
+                best_fitness = ranked[0].fitness
+            with locks[index]:
+                if improved or migration:
+                    _write_slot(slots[index], ranked[:migration_size], generation)
+                else:
+                    slots[index]["generation"] = generation
+        del slots
+    finally:
+        buffer.close()
+
+
+class IslandEngine:
+    """
+    Island model: independent populations evolved in separate processes, exchanging their best individuals
+    through shared memory buffers (one slot per island, guarded by a lock).
+    """
+
+    def __init__(self, vrp_factory, population_size: int, islands: int = 4, migration_interval: int = 10,
+                 migration_size: int = 2, topology: str = "ring") -> None:
+        if not 0 < islands <= MAX_ISLANDS:
+            raise ValueError(f"Number of islands must be between one and {MAX_ISLANDS}.")
+        if migration_interval <= 0:
+            raise ValueError("Migration interval must be greater than zero.")
+        if not 0 < migration_size < population_size:
+            raise ValueError("Migration size must be between one and the population size.")
+        if topology not in MIGRATION_TOPOLOGIES:
+            raise ValueError(f"Migration topology must be one of {MIGRATION_TOPOLOGIES}.")
+        self.vrp_factory = vrp_factory
+        self.population_size = population_size
+        self.islands = islands
+        self.migration_interval = migration_interval
+        self.migration_size = migration_size
+        self.topology = topology
+        # Each customer may be followed by a return to the depot, plus the depot at both ends of every vehicle
+        max_length = 2 * vrp_factory.number_nodes + 2 * vrp_factory.number_vehicles
+        self.__dtype = _slot_dtype(migration_size, max_length, vrp_factory.number_vehicles)
+        self.__context = multiprocessing.get_context("spawn")
+        self.__buffer: Optional[shared_memory.SharedMemory] = None
+        self.__slots: Optional[np.ndarray] = None
+        self.__locks = []
+        self.__processes = []
+        self.__stop_event = self.__context.Event()
+        self.__pause_event = self.__context.Event()
+        self.__versions = [0] * islands
+
+    def start(self) -> None:
+        self.__buffer = shared_memory.SharedMemory(create=True, size=self.__dtype.itemsize * self.islands)
+        self.__slots = np.ndarray((self.islands,), dtype=self.__dtype, buffer=self.__buffer.buf)
+        self.__slots["version"] = 0
+        self.__slots["generation"] = 0
+        self.__slots["count"] = 0
+        self.__locks = [self.__context.Lock() for _ in range(self.islands)]
+        self.__processes = [
+            self.__context.Process(target=_island_main, daemon=True, name=f"island-{index}",
+                                   args=(index, self.vrp_factory, self.population_size, self.__buffer.name,
+                                         self.__dtype, self.__locks, self.__stop_event, self.__pause_event,
+                                         self.migration_interval, self.migration_size, self.topology,
+                                         self.vrp_factory.random.getrandbits(63)))
+            for index in range(self.islands)]
+        for process in self.__processes:
+            process.start()
+
+    def pause(self) -> None:
+        self.__pause_event.set()
+
+    def resume(self) -> None:
+        self.__pause_event.clear()
+
+    def generations(self) -> list[int]:
+        return self.__slots["generation"].tolist() if self.__slots is not None else [0] * self.islands
+
+    def alive(self) -> bool:
+        return any(process.is_alive() for process in self.__processes)
+
+    def poll(self) -> list[tuple[int, int, Genome]]:
+        """
+        Returns the best individual of every island that published since the last poll.
+        Returns:
+            List of tuples with the island, its generation and its best genome.
+        """
+        updates = []
+        if self.__slots is None:
+            return updates
+        for island in range(self.islands):
+            with self.__locks[island]:
+                slot = self.__slots[island]
+                if slot["version"] == self.__versions[island] or not slot["count"]:
+                    continue
+                self.__versions[island] = int(slot["version"])
+                generation = int(slot["generation"])
+                best = _read_slot(slot, self.vrp_factory.fleet)[0]
+            updates.append((island, generation, best))
+        return updates
+
+    def shutdown(self) -> None:
+        self.__stop_event.set()
+        for process in self.__processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self.__processes = []
+        if self.__buffer is not None:
+            self.__slots = None
+            self.__buffer.close()
+            self.__buffer.unlink()
+            self.__buffer = None
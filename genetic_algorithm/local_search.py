@@ -0,0 +1,232 @@
+import random
+import time
+from typing import Optional
+
+import numpy as np
+
+from domain.genome import Genome
+from domain.graph import Graph
+from genetic_algorithm.fitness import Fitness
+from vrp.adjustment.adjustment import Adjustment
+
+
+class LocalSearch:
+    """
+    Memetic intensification applied to the elite of each generation.
+    The neighborhoods of the customers are scanned in turn (in a random order on every pass): for each neighbor in
+    the k nearest nodes of a customer, 2-opt and Or-opt inside a vehicle, and relocate and swap between vehicles.
+    The distance change of every move is computed from the edges it replaces; only the moves shortening the routes
+    are adjusted and evaluated, at once, with the real fitness, and the best one is kept when it improves the genome.
+    The search stops at a local optimum (a pass over every customer without improvement) or when the time budget
+    of the generation is exhausted. Moves whose only gain is on the penalties (priorities, balance, tolls) are not
+    explored.
+    """
+
+    OR_OPT_SEGMENT_LENGTHS = (1, 2, 3)
+    # Smallest distance change considered an improvement
+    EPSILON = 1e-9
+
+    def __init__(self, graph: Graph, adjustment: Adjustment, fitness: Fitness, depot_identifier: int = 0,
+                 neighbors: int = 10, time_budget: float = 0.05, elite_size: int = 1,
+                 rng: Optional[random.Random] = None) -> None:
+        if neighbors <= 0:
+            raise ValueError("Number of neighbors must be greater than zero.")
+        if time_budget < 0:
+            raise ValueError("Local search time budget must not be negative.")
+        self.__graph = graph
+        self.__adjustment = adjustment
+        self.__fitness = fitness
+        self.__depot_identifier = depot_identifier
+        self.__neighbors = graph.nearest_neighbors(neighbors)
+        self.__node_identifiers = np.array([node.identifier for node in graph.get_nodes()])
+        # Position in the graph matrices and demand of every node, read by every distance and capacity check
+        identifiers = self.__node_identifiers.tolist()
+        self.__positions = {identifier: position for position, identifier in enumerate(identifiers)}
+        self.__demands = dict(zip(identifiers, graph.demands.tolist()))
+        self.__symmetric = graph.is_symmetric
+        self.time_budget = time_budget
+        self.elite_size = elite_size
+        self.__random = rng or random.Random()
+
+    def intensify(self, population: list[Genome]) -> list[Genome]:
+        """
+        Improves the first elite_size individuals of a sorted and evaluated population, sharing the time budget.
+        Args:
+            population: Population sorted by fitness.
+
+        Returns:
+            The population with the elite replaced by the improved genomes (not sorted again).
+        """
+        deadline = time.perf_counter() + self.time_budget
+        population = list(population)
+        for index in range(min(self.elite_size, len(population))):
+            if time.perf_counter() >= deadline:
+                break
+            population[index] = self.improve(population[index], deadline)
+        return population
+
+    def improve(self, genome: Genome, deadline: float, customers: Optional[list[int]] = None) -> Genome:
+        """
+        Applies improving moves to the genome until a local optimum or the deadline.
+        Args:
+            genome: Evaluated genome.
+            deadline: Value of time.perf_counter() at which the search stops.
+            customers: Customers whose neighborhoods are searched (e.g. the customers near the boundary of two
+                clusters), or None for every customer.
+
+        Returns:
+            The best genome found (the same genome when no improvement is found).
+        """
+        best = genome
+        routes = self.__routes(best)
+        improved = True
+        while improved:
+            improved = False
+            visited = {customer for route in routes for customer in route}
+            if len(visited) < 2:
+                break
+            order = [customer for customer in customers if customer in visited] if customers is not None \
+                else sorted(visited)
+            self.__random.shuffle(order)
+            location = self.__locate(routes)
+            for customer in order:
+                if time.perf_counter() >= deadline:
+                    return best
+                candidates = self.__candidates(routes, location, customer, best.capacities)
+                if not candidates:
+                    continue
+                genomes = [self.__adjustment.apply(self.__build(best, candidate)) for candidate in candidates]
+                self.__fitness.evaluate_genomes(genomes)
+                challenger = min(genomes, key=lambda candidate: candidate.fitness)
+                if challenger.fitness < best.fitness:
+                    best, routes, improved = challenger, self.__routes(challenger), True
+                    location = self.__locate(routes)
+        return best
+
+    def __routes(self, genome: Genome) -> list[list[int]]:
+        return [[customer for customer in genome.route(index).tolist() if customer != self.__depot_identifier]
+                for index in range(genome.number_vehicles)]
+
+    @staticmethod
+    def __locate(routes: list[list[int]]) -> dict[int, tuple[int, int]]:
+        """Vehicle and position of every customer of the routes."""
+        return {customer: (vehicle, position) for vehicle, route in enumerate(routes)
+                for position, customer in enumerate(route)}
+
+    def __build(self, template: Genome, routes: list[list[int]]) -> Genome:
+        sequence: list[int] = []
+        offsets = [0]
+        for route in routes:
+            sequence.extend([self.__depot_identifier] + route + [self.__depot_identifier])
+            offsets.append(len(sequence))
+        return Genome(np.array(sequence, dtype=np.int32), offsets, template.capacities, template.autonomies,
+                      costs=template.costs)
+
+    def __candidates(self, routes: list[list[int]], location: dict[int, tuple[int, int]], customer: int,
+                     capacities: np.ndarray) -> list[list[list[int]]]:
+        """
+        Builds the candidate routes of the moves of the customer towards each of its nearest neighbors that shorten
+        the routes (depot returns left aside, the adjustment places them again).
+        Moves between vehicles (swap and relocate) giving a vehicle a customer heavier than its capacity are skipped.
+        """
+        vehicle_u, position_u = location[customer]
+        demand = self.__demands.__getitem__
+        candidates: list[list[list[int]]] = []
+        for neighbor in self.__node_identifiers[self.__neighbors[self.__positions[customer]]].tolist():
+            if neighbor not in location:
+                continue
+            vehicle_v, position_v = location[neighbor]
+            if vehicle_u == vehicle_v:
+                if self.__two_opt_delta(routes[vehicle_u], position_u, position_v) < -self.EPSILON:
+                    candidates.append(self.__two_opt(routes, vehicle_u, position_u, position_v))
+            elif demand(customer) <= capacities[vehicle_v] and demand(neighbor) <= capacities[vehicle_u]:
+                if self.__swap_delta(routes, vehicle_u, position_u, vehicle_v, position_v) < -self.EPSILON:
+                    candidates.append(self.__swap(routes, vehicle_u, position_u, vehicle_v, position_v))
+            for length in self.OR_OPT_SEGMENT_LENGTHS:
+                segment = routes[vehicle_u][position_u:position_u + length]
+                if vehicle_u != vehicle_v and max(demand(c) for c in segment) > capacities[vehicle_v]:
+                    continue
+                delta = self.__or_opt_delta(routes, vehicle_u, position_u, length, vehicle_v, position_v)
+                if delta is not None and delta < -self.EPSILON:
+                    candidates.append(self.__or_opt(routes, vehicle_u, position_u, length, neighbor))
+        return candidates
+
+    def __distance(self, origin: int, destination: int) -> float:
+        return float(self.__graph.distance_matrix[self.__positions[origin], self.__positions[destination]])
+
+    def __at(self, route: list[int], position: int) -> int:
+        """Customer of the route at the position, or the depot before the first and after the last one."""
+        return route[position] if 0 <= position < len(route) else self.__depot_identifier
+
+    def __two_opt_delta(self, route: list[int], position_u: int, position_v: int) -> float:
+        start, end = sorted((position_u, position_v))
+        if end == start + 1:
+            return 0.0
+        d, at = self.__distance, self.__at
+        delta = (d(route[start], route[end]) + d(route[start + 1], at(route, end + 1))
+                 - d(route[start], route[start + 1]) - d(route[end], at(route, end + 1)))
+        if not self.__symmetric:
+            # The reversed path is travelled the other way
+            delta += sum(d(route[position + 1], route[position]) - d(route[position], route[position + 1])
+                         for position in range(start + 1, end))
+        return delta
+
+    def __swap_delta(self, routes: list[list[int]], vehicle_u: int, position_u: int, vehicle_v: int,
+                     position_v: int) -> float:
+        d, at = self.__distance, self.__at
+        delta = 0.0
+        for vehicle, position, removed, added in ((vehicle_u, position_u, routes[vehicle_u][position_u],
+                                                   routes[vehicle_v][position_v]),
+                                                  (vehicle_v, position_v, routes[vehicle_v][position_v],
+                                                   routes[vehicle_u][position_u])):
+            previous, following = at(routes[vehicle], position - 1), at(routes[vehicle], position + 1)
+            delta += d(previous, added) + d(added, following) - d(previous, removed) - d(removed, following)
+        return delta
+
+    def __or_opt_delta(self, routes: list[list[int]], vehicle_u: int, position_u: int, length: int, vehicle_v: int,
+                       position_v: int) -> Optional[float]:
+        """Distance change of __or_opt, or None when the move is not possible or leaves the routes unchanged."""
+        route_u = routes[vehicle_u]
+        end = position_u + length
+        if end > len(route_u) or (vehicle_u == vehicle_v and position_u - 1 <= position_v < end):
+            return None
+        d, at = self.__distance, self.__at
+        first, last = route_u[position_u], route_u[end - 1]
+        previous, following = at(route_u, position_u - 1), at(route_u, end)
+        neighbor, after = routes[vehicle_v][position_v], at(routes[vehicle_v], position_v + 1)
+        return (d(previous, following) - d(previous, first) - d(last, following)
+                + d(neighbor, first) + d(last, after) - d(neighbor, after))
+
+    @staticmethod
+    def __two_opt(routes: list[list[int]], vehicle: int, position_u: int, position_v: int) -> list[list[int]]:
+        """Reverses the path between u and v so that they become adjacent (edges (u, u+1) and (v, v+1) replaced)."""
+        start, end = sorted((position_u, position_v))
+        route = routes[vehicle]
+        moved = [list(r) for r in routes]
+        moved[vehicle] = route[:start + 1] + route[start + 1:end + 1][::-1] + route[end + 1:]
+        return moved
+
+    @staticmethod
+    def __swap(routes: list[list[int]], vehicle_u: int, position_u: int, vehicle_v: int, position_v: int) -> list[list[int]]:
+        """Exchanges two customers of different vehicles."""
+        moved = [list(r) for r in routes]
+        moved[vehicle_u][position_u], moved[vehicle_v][position_v] = routes[vehicle_v][position_v], routes[vehicle_u][position_u]
+        return moved
+
+    @staticmethod
+    def __or_opt(routes: list[list[int]], vehicle_u: int, position_u: int, length: int, neighbor: int):
+        """
+        Moves the segment of `length` customers starting at u to just after the neighbor, in the same vehicle
+        (Or-opt) or in another one (relocate). Returns None when the move is not possible.
+        """
+        segment = routes[vehicle_u][position_u:position_u + length]
+        if len(segment) < length or neighbor in segment:
+            return None
+        moved = [list(r) for r in routes]
+        del moved[vehicle_u][position_u:position_u + length]
+        for route in moved:
+            if neighbor in route:
+                insert_at = route.index(neighbor) + 1
+                route[insert_at:insert_at] = segment
+                return moved
+        return None
@@ -1,53 +1,99 @@
 import random
+from typing import Optional
+
+import numpy as np
+
 from vrp.route_spliter import RouteSplitter
-from domain import Solution
-from domain import Vehicle
-from domain import Route
+from domain import Genome
+
+
+class ReversalMove:
+    """
+    Descriptor of an Inverted Displacement Mutation: reversal of the customers first..last (inclusive) of the
+    giant tour (customers without the depot). positions keeps the indices of these customers in the sequence of the
+    genome the move was drawn for, when known, so the move is located without scanning the genome again.
+    """
+    __slots__ = ("first", "last", "positions")
+
+    def __init__(self, first: int, last: int, positions: Optional[tuple[int, int]] = None) -> None:
+        self.first = first
+        self.last = last
+        self.positions = positions
+
+    def __str__(self) -> str:
+        return f"ReversalMove(first={self.first}, last={self.last})"
+
+    __repr__ = __str__
 
 
 class Mutation:
-    def __init__(self, mutation_probability: float, splitter: RouteSplitter) -> None:
+    def __init__(self, mutation_probability: float, splitter: RouteSplitter,
+                 rng: Optional[random.Random] = None) -> None:
         self.__mutation_probability = mutation_probability
         self.__splitter = splitter
+        self.__random = rng or random.Random()
+
+    def apply(self, genome: Genome) -> Genome:
+        """
+        Applies the Inverted Displacement Mutation to the genome.
+        Args:
+            genome: Genome to be mutated.
+
+        Returns:
+            Mutated genome, or the same genome when no mutation happens.
 
-    def apply(self, solution: Solution) -> Solution:
         """
-        Applies the Inverted Displacement Mutation to the solution.
+        move = self.propose(genome)
+        if move is None:
+            return genome
+        return self.apply_move(genome, move)
+
+    def propose(self, genome: Genome) -> Optional[ReversalMove]:
+        """
+        Draws the Inverted Displacement Mutation to be applied to the genome, without applying it.
         Args:
-            solution: Solution to be mutated.
+            genome: Genome to be mutated.
 
         Returns:
-            Mutated solution.
+            The move, or None when no mutation happens.
 
         """
-        if random.random() > self.__mutation_probability:
-            return solution
-
-        vehicles = solution.vehicles
-        if not vehicles:
-            return solution
-        depot_identifier = vehicles[0].route.customers[0]  # Assumes depot is the first node
-        autonomy = vehicles[0].autonomy
-        capacity = vehicles[0].capacity
-        number_vehicles = len(vehicles)
-
-        # Obtains the linear route without the depot
-        flat_route = [x for x in solution.flatten_routes() if x != depot_identifier]
-        route_length = len(flat_route)
+        if self.__random.random() > self.__mutation_probability:
+            return None
+
+        if not genome.number_vehicles:
+            return None
+        depot_identifier = int(genome.sequence[0])  # Assumes depot is the first node
+
+        # Obtains the positions of the linear route without the depot
+        customers = np.flatnonzero(genome.sequence != depot_identifier)
+        route_length = len(customers)
         if route_length < 2:
-            return solution
+            return None
 
         # Selects two distinct indices
-        idx1 = random.randint(0, route_length - 2)
-        idx2 = random.randint(idx1 + 1, route_length - 1)
+        idx1 = self.__random.randint(0, route_length - 2)
+        idx2 = self.__random.randint(idx1 + 1, route_length - 1)
+        return ReversalMove(idx1, idx2, (int(customers[idx1]), int(customers[idx2])))
+
+    def apply_move(self, genome: Genome, move: ReversalMove) -> Genome:
+        """
+        Applies a reversal to a copy of the genome, splitting the mutated route again into the vehicles.
+        Args:
+            genome: Genome to be mutated.
+            move: Reversal to be applied.
 
-        # Extracts, inverts, and repositions the segment
-        segment = flat_route[idx1:idx2 + 1]
-        segment.reverse()
-        mutated_route = flat_route[:idx1] + segment + flat_route[idx2 + 1:]
+        Returns:
+            Mutated genome, not adjusted.
 
-        # Divides the mutated route into routes for each vehicle
-        split_routes = self.__splitter.split(Route(mutated_route))
-        mutated_vehicles = [Vehicle(route, autonomy=autonomy, capacity=capacity) for route in split_routes]
+        """
+        depot_identifier = int(genome.sequence[0])
+        flat_route = genome.customers(depot_identifier)
+
+        # Inverts the segment in a copy of the route
+        mutated_route = flat_route.copy()
+        mutated_route[move.first:move.last + 1] = flat_route[move.first:move.last + 1][::-1]
 
-        return Solution(mutated_vehicles)
+        # Divides the mutated route into routes for each vehicle
+        sequence, offsets = self.__splitter.split_customers(mutated_route)
+        return Genome(sequence, offsets, genome.capacities, genome.autonomies, costs=genome.costs)
@@ -0,0 +1,68 @@
+from typing import Callable
+
+from domain.genome import Genome
+
+
+def produce_offspring(vrp, population: list[Genome], number_children: int) -> list[Genome]:
+    """
+    Produces children by selection, crossover and mutation of the population.
+    The parents of the whole generation are selected at once, without changing the population.
+    Args:
+        vrp: VRP providing the selection, crossover and mutation operators.
+        population: Population sorted and evaluated, used to select the parents.
+        number_children: Number of children to be produced.
+
+    Returns:
+        List with number_children children, not evaluated.
+    """
+    pairs = vrp.select_parents(population, (number_children + 1) // 2).tolist()
+    return breed(vrp, [(population[first], population[second]) for first, second in pairs], number_children)
+
+
+def breed(vrp, parents: list[tuple[Genome, Genome]], number_children: int) -> list[Genome]:
+    """
+    Produces children by crossover and mutation of pairs of parents already selected.
+    Args:
+        vrp: VRP providing the crossover and mutation operators.
+        parents: Pairs of parents, two children per pair.
+        number_children: Number of children to be produced.
+
+    Returns:
+        List with number_children children, not evaluated.
+    """
+    children: list[Genome] = []
+    for first, second in parents:
+        child1, child2 = vrp.crossover(first, second)
+        children.extend([vrp.mutate(child1), vrp.mutate(child2)])
+    return children[:number_children]
+
+
+def step(vrp, population: list[Genome], population_size: int, local_search=None,
+         offspring: Callable[..., list[Genome]] = produce_offspring) -> tuple[list[Genome], list[Genome]]:
+    """
+    One generation, shared by every execution mode (runner, scheduler slices, islands and clusters): evaluates and
+    sorts the population, intensifies its elite with the local search, and breeds the next population keeping the
+    best individual (elitism). The generation is measured by the profiler of the VRP.
+    Args:
+        vrp: VRP of the run.
+        population: Current population.
+        population_size: Size of the next population.
+        local_search: LocalSearch applied to the elite, or None.
+        offspring: Function producing the children, with the arguments of produce_offspring (e.g. the one of a
+            ParallelGenerationEngine).
+
+    Returns:
+        Tuple with the population evaluated and sorted by fitness (its first genome is the best of the generation)
+        and the next population.
+    """
+    vrp.profiler.start_generation()
+    vrp.evaluate_population(population)
+    ranked = vrp.sort_population(population)
+    if local_search is not None:
+        with vrp.profiler.section("local_search"):
+            intensified = local_search.intensify(ranked)
+        ranked = vrp.sort_population(intensified)
+    # Genomes are never changed in place, so the elite can be kept without a copy
+    following = [ranked[0]] + offspring(vrp, ranked, population_size - 1)
+    vrp.profiler.end_generation(following)
+    return ranked, following
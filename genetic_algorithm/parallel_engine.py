@@ -0,0 +1,136 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional
+
+from domain.genome import Genome
+from genetic_algorithm.offspring import breed
+
+# VRP owned by each worker process, built once by the pool initializer so the graph matrices are
+# transferred a single time per worker instead of on every task.
+_worker_vrp = None
+
+
+def _initialize_worker(vrp_factory) -> None:
+    global _worker_vrp
+    _worker_vrp = vrp_factory.create_vrp()
+
+
+def _seed_worker(seed: int) -> None:
+    _worker_vrp.random.seed(seed)
+
+
+def _breed_chunk(parents: list[tuple[Genome, Genome]], number_children: int, seed: int) -> list[Genome]:
+    """
+    Produces and evaluates a chunk of children inside a worker process.
+    Args:
+        parents: Pairs of parents of the chunk, selected by the parent process.
+        number_children: Number of children to be produced.
+        seed: Seed of the worker random generator for this task, drawn from the generator of the run.
+
+    Returns:
+        Evaluated children.
+    """
+    _seed_worker(seed)
+    children = breed(_worker_vrp, parents, number_children)
+    _worker_vrp.evaluate_population(children)
+    return children
+
+
+def _evaluate_chunk(population: list[Genome]) -> list[tuple[float, float]]:
+    _worker_vrp.evaluate_population(population)
+    return [(solution.fitness, solution.penalty) for solution in population]
+
+
+def split_evenly(total: int, parts: int) -> list[int]:
+    """
+    Splits a total into at most `parts` positive chunk sizes that differ by at most one.
+    Args:
+        total: Amount to be split.
+        parts: Maximum number of chunks.
+
+    Returns:
+        List of chunk sizes.
+    """
+    parts = max(1, min(parts, total))
+    base, remainder = divmod(total, parts)
+    return [base + (1 if i < remainder else 0) for i in range(parts) if base or i < remainder]
+
+
+class ParallelGenerationEngine:
+    """
+    Produces and evaluates the children of a generation in a pool of worker processes. The parents are selected in
+    this process, so each worker only receives the parents of its chunk instead of the whole population.
+    """
+
+    def __init__(self, vrp_factory, workers: Optional[int] = None, vrp=None) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        if self.workers <= 0:
+            raise ValueError("Number of workers must be greater than zero.")
+        self.__executor = ProcessPoolExecutor(max_workers=self.workers,
+                                              mp_context=multiprocessing.get_context("spawn"),
+                                              initializer=_initialize_worker,
+                                              initargs=(vrp_factory,))
+        self.__random = vrp_factory.random
+        # Selects the parents (the VRP of the run, or one sharing the random generator of the factory)
+        self.__vrp = vrp or vrp_factory.create_vrp()
+
+    async def evaluate(self, population: list[Genome]) -> None:
+        """
+        Evaluates the population in the worker processes, setting the fitness and penalty of every solution.
+        Args:
+            population: Population to be evaluated.
+        """
+        loop = asyncio.get_running_loop()
+        chunks, start = [], 0
+        for size in split_evenly(len(population), self.workers):
+            chunks.append(population[start:start + size])
+            start += size
+        results = await asyncio.gather(*[loop.run_in_executor(self.__executor, _evaluate_chunk, chunk) for chunk in chunks])
+        for chunk, scores in zip(chunks, results):
+            for solution, (fitness, penalty) in zip(chunk, scores):
+                solution.fitness, solution.penalty = fitness, penalty
+
+    async def breed(self, population: list[Genome], number_children: int) -> list[Genome]:
+        """
+        Produces evaluated children in the worker processes, one chunk per worker.
+        Args:
+            population: Population sorted and evaluated, used to select the parents.
+            number_children: Number of children to be produced.
+
+        Returns:
+            Evaluated children.
+        """
+        futures = [asyncio.wrap_future(future) for future in self.__submit(self.__vrp, population, number_children)]
+        children: list[Genome] = []
+        for chunk in await asyncio.gather(*futures):
+            children.extend(chunk)
+        return children
+
+    def offspring(self, vrp, population: list[Genome], number_children: int) -> list[Genome]:
+        """
+        Blocking version of breed with the signature of produce_offspring, so it can be given to the generation step.
+        Args:
+            vrp: VRP selecting the parents.
+            population: Population sorted and evaluated, used to select the parents.
+            number_children: Number of children to be produced.
+
+        Returns:
+            Evaluated children.
+        """
+        children: list[Genome] = []
+        for future in self.__submit(vrp, population, number_children):
+            children.extend(future.result())
+        return children
+
+    def __submit(self, vrp, population: list[Genome], number_children: int) -> list[Future]:
+        futures = []
+        for size in split_evenly(number_children, self.workers):
+            pairs = vrp.select_parents(population, (size + 1) // 2).tolist()
+            parents = [(population[first], population[second]) for first, second in pairs]
+            futures.append(self.__executor.submit(_breed_chunk, parents, size, self.__random.getrandbits(63)))
+        return futures
+
+    def shutdown(self) -> None:
+        self.__executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,230 @@
+import gc
+import math
+import sys
+import time
+from typing import Optional
+
+PROFILED_SECTIONS = ("fitness", "sort", "local_search", "selection", "crossover", "mutation", "adjustment", "events")
+# Upper bounds (seconds) of the buckets of the per-generation time histograms
+HISTOGRAM_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, math.inf)
+_MEASURES = ("generation",) + PROFILED_SECTIONS
+
+
+class _Section:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: "GenerationProfiler", name: str) -> None:
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *_) -> bool:
+        self.profiler.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NoSection:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *_) -> bool:
+        return False
+
+
+_NO_SECTION = _NoSection()
+
+
+def _collections() -> int:
+    return sum(generation["collections"] for generation in gc.get_stats())
+
+
+def population_diversity(population) -> Optional[float]:
+    """
+    Share of distinct chromosomes in the population (1.0 when every individual is different).
+    """
+    if not population:
+        return None
+    return len({individual.sequence.tobytes() for individual in population}) / len(population)
+
+
+class GenerationProfiler:
+    """
+    Instrumentation of the generation loop: cumulative and per-generation time of each section (fitness, sort,
+    local search, selection, crossover, mutation, adjustment and event emission) with a histogram of the
+    per-generation times, number of evaluations, memory blocks allocated and garbage collections per generation
+    and diversity of the population.
+    A disabled profiler returns a shared no-op context manager from section and ignores the other hooks, so the
+    instrumentation can stay in the loop.
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self) -> None:
+        self.generations = 0
+        self.evaluations = 0
+        self.seconds = dict.fromkeys(_MEASURES, 0.0)
+        self.last_generation = dict.fromkeys(_MEASURES, 0.0)
+        self.histograms = {name: [0] * len(HISTOGRAM_BUCKETS) for name in _MEASURES}
+        self.allocated_blocks = 0
+        self.gc_collections = 0
+        self.diversity: Optional[float] = None
+        self.__current = dict.fromkeys(_MEASURES, 0.0)
+        self.__generation_start: Optional[float] = None
+        self.__blocks = 0
+        self.__collections = 0
+
+    def section(self, name: str):
+        """
+        Context manager adding the time of its block to the section.
+        Args:
+            name: One of PROFILED_SECTIONS.
+        """
+        return _Section(self, name) if self.enabled else _NO_SECTION
+
+    def add(self, name: str, seconds: float) -> None:
+        self.seconds[name] += seconds
+        self.__current[name] += seconds
+
+    def count_evaluations(self, number: int) -> None:
+        if self.enabled:
+            self.evaluations += number
+
+    def start_generation(self) -> None:
+        if not self.enabled:
+            return
+        self.__generation_start = time.perf_counter()
+        self.__blocks = sys.getallocatedblocks()
+        self.__collections = _collections()
+
+    def end_generation(self, population) -> None:
+        """
+        Closes the generation opened by start_generation, recording its times in the histograms.
+        Args:
+            population: Population at the end of the generation, used to measure the diversity.
+        """
+        if not self.enabled or self.__generation_start is None:
+            return
+        self.add("generation", time.perf_counter() - self.__generation_start)
+        self.__generation_start = None
+        self.generations += 1
+        for name, seconds in self.__current.items():
+            self.histograms[name][self.__bucket(seconds)] += 1
+        self.last_generation, self.__current = self.__current, dict.fromkeys(_MEASURES, 0.0)
+        self.allocated_blocks = sys.getallocatedblocks() - self.__blocks
+        self.gc_collections += _collections() - self.__collections
+        self.diversity = population_diversity(population)
+
+    def merge(self, other: "GenerationProfiler") -> None:
+        """
+        Adds the measures of another profiler (e.g. of a time slice executed in a worker process).
+        """
+        self.generations += other.generations
+        self.evaluations += other.evaluations
+        for name in _MEASURES:
+            self.seconds[name] += other.seconds[name]
+            self.histograms[name] = [a + b for a, b in zip(self.histograms[name], other.histograms[name])]
+        self.gc_collections += other.gc_collections
+        if other.generations:
+            self.last_generation = dict(other.last_generation)
+            self.allocated_blocks = other.allocated_blocks
+            self.diversity = other.diversity
+
+    def snapshot(self) -> dict:
+        generation_seconds = self.seconds["generation"]
+        return {
+            "enabled": self.enabled,
+            "generations": self.generations,
+            "evaluations": self.evaluations,
+            "evaluations_per_second": round(self.evaluations / generation_seconds, 2) if generation_seconds else None,
+            "generation_seconds": {
+                "total": round(generation_seconds, 6),
+                "mean": round(generation_seconds / self.generations, 6) if self.generations else None,
+                "last": round(self.last_generation["generation"], 6)
+            },
+            "sections": {name: {"total": round(self.seconds[name], 6), "last": round(self.last_generation[name], 6)}
+                         for name in PROFILED_SECTIONS},
+            "histograms": {name: dict(zip(map(_bucket_label, HISTOGRAM_BUCKETS), counts))
+                           for name, counts in self.histograms.items()},
+            "allocated_blocks": self.allocated_blocks,
+            "gc_collections": self.gc_collections,
+            "diversity": round(self.diversity, 4) if self.diversity is not None else None
+        }
+
+    def prometheus(self, labels: dict) -> dict[str, list[str]]:
+        """
+        Samples of the profiler in the Prometheus text format, grouped by metric (see prometheus_text).
+        Args:
+            labels: Labels of every sample (e.g. the run id).
+        """
+        samples = {
+            "vrp_generations_total": [_sample("vrp_generations_total", labels, self.generations)],
+            "vrp_evaluations_total": [_sample("vrp_evaluations_total", labels, self.evaluations)],
+            "vrp_section_seconds_total": [_sample("vrp_section_seconds_total", {**labels, "section": name},
+                                                  self.seconds[name]) for name in PROFILED_SECTIONS],
+            "vrp_generation_seconds": [],
+            "vrp_allocated_blocks": [_sample("vrp_allocated_blocks", labels, self.allocated_blocks)],
+            "vrp_gc_collections_total": [_sample("vrp_gc_collections_total", labels, self.gc_collections)],
+        }
+        if self.diversity is not None:
+            samples["vrp_population_diversity"] = [_sample("vrp_population_diversity", labels, self.diversity)]
+        for name, counts in self.histograms.items():
+            section_labels = {**labels, "section": name}
+            cumulative = 0
+            for bound, count in zip(HISTOGRAM_BUCKETS, counts):
+                cumulative += count
+                samples["vrp_generation_seconds"].append(
+                    _sample("vrp_generation_seconds_bucket", {**section_labels, "le": _bucket_label(bound)}, cumulative))
+            samples["vrp_generation_seconds"].append(
+                _sample("vrp_generation_seconds_sum", section_labels, self.seconds[name]))
+            samples["vrp_generation_seconds"].append(_sample("vrp_generation_seconds_count", section_labels, cumulative))
+        return samples
+
+    @staticmethod
+    def __bucket(seconds: float) -> int:
+        return next(index for index, bound in enumerate(HISTOGRAM_BUCKETS) if seconds <= bound)
+
+
+_METRIC_DESCRIPTIONS = {
+    "vrp_generations_total": ("counter", "Generations executed."),
+    "vrp_evaluations_total": ("counter", "Genomes evaluated (full or incremental)."),
+    "vrp_section_seconds_total": ("counter", "Time spent in each section of the generation loop."),
+    "vrp_generation_seconds": ("histogram", "Time per generation spent in each section (generation = whole loop)."),
+    "vrp_allocated_blocks": ("gauge", "Memory blocks allocated (net) during the last generation."),
+    "vrp_gc_collections_total": ("counter", "Garbage collections during the generations."),
+    "vrp_population_diversity": ("gauge", "Share of distinct chromosomes in the population."),
+}
+
+
+def _bucket_label(bound: float) -> str:
+    return "+Inf" if math.isinf(bound) else f"{bound:g}"
+
+
+def _sample(name: str, labels: dict, value) -> str:
+    rendered = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    return f"{name}{{{rendered}}} {value}" if rendered else f"{name} {value}"
+
+
+def prometheus_text(profilers: list[tuple[dict, GenerationProfiler]]) -> str:
+    """
+    Renders the metrics of many profilers in the Prometheus text exposition format.
+    Args:
+        profilers: List of tuples with the labels and the profiler.
+
+    Returns:
+        The exposition, with a HELP and TYPE header per metric.
+    """
+    grouped: dict[str, list[str]] = {name: [] for name in _METRIC_DESCRIPTIONS}
+    for labels, profiler in profilers:
+        for name, samples in profiler.prometheus(labels).items():
+            grouped[name].extend(samples)
+    lines = []
+    for name, samples in grouped.items():
+        metric_type, description = _METRIC_DESCRIPTIONS[name]
+        lines += [f"# HELP {name} {description}", f"# TYPE {name} {metric_type}"] + samples
+    return "\n".join(lines) + "\n"
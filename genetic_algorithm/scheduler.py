@@ -0,0 +1,816 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Awaitable, Callable, Iterable, Optional
+
+from domain.genome import Genome
+from domain.graph import Node
+from genetic_algorithm.checkpoint import Checkpoint, graph_key, save_checkpoint
+from genetic_algorithm.decomposition import DecompositionEngine, MultiDepotEngine
+from genetic_algorithm.instance_update import update_instance
+from genetic_algorithm.island_engine import IslandEngine
+from genetic_algorithm.offspring import step
+from genetic_algorithm.parallel_engine import ParallelGenerationEngine
+from genetic_algorithm.profiler import GenerationProfiler
+
+RUN_STATES = ("queued", "running", "paused", "stopped", "finished", "failed")
+# Time slices on the shared workers, or every generation of the run spread over workers of its own
+RUN_EXECUTION_MODES = ("sequential", "process")
+
+# VRP (and local search) of the runs recently sliced by each worker process, so the factory (with the graph
+# matrices) is transferred and the operators are built once per run (and revision of its problem) and worker
+# instead of once per slice.
+_worker_runs: OrderedDict = OrderedDict()
+_WORKER_RUNS_LIMIT = 16
+
+
+def _run_context(run_id: str, vrp_factory, local_search_options: Optional[dict], revision: int = 0):
+    key = (run_id, revision)
+    if key in _worker_runs:
+        _worker_runs.move_to_end(key)
+        return _worker_runs[key]
+    if vrp_factory is None:
+        return None
+    vrp = vrp_factory.create_vrp()
+    local_search = vrp_factory.create_local_search(**local_search_options) if local_search_options is not None else None
+    _worker_runs[key] = (vrp, local_search)
+    while len(_worker_runs) > _WORKER_RUNS_LIMIT:
+        _worker_runs.popitem(last=False)
+    return vrp, local_search
+
+
+def _run_slice(run_id: str, vrp_factory, local_search_options: Optional[dict], population: list[Genome],
+               population_size: int, generation: int, best_fitness: Optional[float], time_slice: float,
+               generations_left: Optional[int], random_state: tuple, revision: int = 0) -> tuple:
+    """
+    Runs generations of a run inside a worker process until the time slice or the generation budget is spent.
+    Args:
+        run_id: Identifier of the run.
+        vrp_factory: Factory of the VRP of the run, or None to use the one the worker already holds.
+        local_search_options: Arguments of VrpFactory.create_local_search, or None without local search.
+        population: Current population of the run.
+        population_size: Size of the population.
+        generation: Number of generations already executed.
+        best_fitness: Fitness of the best solution found so far.
+        time_slice: Seconds after which the slice returns.
+        generations_left: Maximum number of generations to be executed, or None.
+        random_state: State of the random generator of the run at the end of the previous slice.
+        revision: Number of changes of the problem of the run (see SolverScheduler.update).
+
+    Returns:
+        Tuple with the population, the generation counter, the best solution found in the slice (or None when
+        there is no improvement) with its generation, the time spent, the profiler of the slice, the hits and
+        misses of the fitness cache in the slice (None without a cache) and the state of the random generator; None
+        when no factory is given and the worker does not hold the run.
+    """
+    context = _run_context(run_id, vrp_factory, local_search_options, revision)
+    if context is None:
+        return None
+    vrp, local_search = context
+    # The run continues the same random sequence whichever worker executes the slice
+    vrp.random.setstate(random_state)
+    profiler = vrp.profiler
+    profiler.reset()
+    # The cache of the worker outlives the slice, so only its lookups during the slice are reported
+    cache = vrp.cache_statistics()
+    start = time.perf_counter()
+    best, best_generation, executed = None, generation, 0
+    while generations_left is None or executed < generations_left:
+        generation += 1
+        executed += 1
+        ranked, population = step(vrp, population, population_size, local_search)
+        if best_fitness is None or ranked[0].fitness < best_fitness:
+            best, best_fitness, best_generation = ranked[0], ranked[0].fitness, generation
+        if time.perf_counter() - start >= time_slice:
+            break
+    elapsed = time.perf_counter() - start
+    if cache is not None:
+        statistics = vrp.cache_statistics()
+        cache = (statistics["hits"] - cache["hits"], statistics["misses"] - cache["misses"])
+    return population, generation, best, best_generation, elapsed, profiler, cache, vrp.random.getstate()
+
+
+class SolverRun:
+    """
+    State of a run owned by the scheduler. The population and the state of the random generator only live between
+    slices; subscribers are async callbacks bound to the event loop of the connection that subscribed them.
+    """
+
+    def __init__(self, vrp_factory, population: list[Genome], population_size: int,
+                 max_generations: Optional[int] = None, max_time: Optional[float] = None,
+                 local_search_options: Optional[dict] = None, metadata: Optional[dict] = None) -> None:
+        self.run_id = uuid.uuid4().hex
+        self.vrp_factory = vrp_factory
+        self.population = population
+        self.population_size = population_size
+        self.max_generations = max_generations
+        self.max_time = max_time
+        self.local_search_options = local_search_options
+        self.metadata = metadata or {}
+        self.state = "queued"
+        self.in_flight = False
+        self.enqueued = False
+        self.generation = 0
+        self.elapsed = 0.0
+        # Number of changes of the customers while the run is solved, and whether a change waits for the slice in
+        # flight (see SolverScheduler.update)
+        self.revision = 0
+        self.updating = False
+        self.update_lock = threading.Lock()
+        self.best_solution: Optional[Genome] = None
+        self.error: Optional[str] = None
+        self.engine: Optional[IslandEngine | DecompositionEngine | ParallelGenerationEngine] = None
+        # Measures of the slices, merged as they come back from the workers
+        self.profiler = GenerationProfiler(vrp_factory.profiling)
+        # Hits and misses of the fitness caches of the workers in the slices of the run (None without a cache)
+        self.cache_lookups: Optional[tuple[int, int]] = None
+        self.subscribers: list[tuple[Callable[[dict], Awaitable[None]], asyncio.AbstractEventLoop]] = []
+        self.random_state = vrp_factory.random.getstate()
+        self.checkpoint_path: Optional[Path] = None
+        self.checkpoint_interval = 5.0
+        self.last_checkpoint = time.monotonic()
+        # Graph key of the checkpoints, with the factory it was computed from (an update replaces the factory)
+        self.__graph_key: Optional[tuple] = None
+
+    def checkpoint(self) -> Checkpoint:
+        if self.__graph_key is None or self.__graph_key[0] is not self.vrp_factory:
+            self.__graph_key = (self.vrp_factory, graph_key(self.vrp_factory.graph))
+        return Checkpoint(self.population, self.generation, self.best_solution, self.random_state, self.elapsed,
+                          self.__graph_key[1])
+
+    def restore(self, checkpoint: Checkpoint) -> None:
+        self.population = list(checkpoint.population)
+        self.generation = checkpoint.generation
+        self.best_solution = checkpoint.best_solution
+        self.random_state = checkpoint.random_state
+        self.elapsed = checkpoint.elapsed
+
+    @property
+    def done(self) -> bool:
+        return self.state in ("stopped", "finished", "failed")
+
+    def budget_exhausted(self) -> bool:
+        return ((self.max_generations is not None and self.generation >= self.max_generations)
+                or (self.max_time is not None and self.elapsed >= self.max_time))
+
+    def merge_cache_lookups(self, lookups: Optional[tuple[int, int]]) -> None:
+        if lookups is not None:
+            hits, misses = self.cache_lookups or (0, 0)
+            self.cache_lookups = (hits + lookups[0], misses + lookups[1])
+
+    def cache_statistics(self) -> Optional[dict]:
+        if self.cache_lookups is None:
+            return None
+        hits, misses = self.cache_lookups
+        return {"hits": hits, "misses": misses,
+                "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0}
+
+    def status(self) -> dict:
+        return {
+            "run_id": self.run_id,
+            "state": self.state,
+            "running": self.state in ("queued", "running"),
+            "paused": self.state == "paused",
+            "generation": self.generation,
+            "elapsed_time": round(self.elapsed, 2),
+            "max_generations": self.max_generations,
+            "max_time": self.max_time,
+            "best_fitness": round(self.best_solution.fitness, 2) if self.best_solution else None,
+            "islands": getattr(self.engine, "islands", None),
+            "clusters": getattr(self.engine, "clusters", None),
+            "workers": getattr(self.engine, "workers", None),
+            "fitness_cache": self.cache_statistics(),
+            "error": self.error
+        }
+
+    def metrics(self) -> dict:
+        return {"run_id": self.run_id, "state": self.state, "elapsed_time": round(self.elapsed, 2),
+                **self.profiler.snapshot()}
+
+
+class SolverScheduler:
+    """
+    Runs many solver runs on a bounded pool of worker processes.
+    Runs wait in a ready queue and execute in time slices of a few generations: a dispatcher thread per worker
+    takes the next run, executes one slice in the pool and puts the run back at the end of the queue, so active
+    runs share the workers round robin and the event loops stay free. Runs stop at their generation or time
+    budget (time spent in slices) and outlive the connections, which can subscribe again by run id.
+    Island runs evolve in processes of their own (IslandEngine), followed by a monitor thread that reports the
+    global best and enforces the budget (wall time while not paused). These processes count against the workers:
+    a slice takes one worker and an island run one per island, runs needing more than the workers are rejected and
+    the others wait until enough workers are free (slices are not dispatched while a run waits, so it is not
+    starved). Process runs produce the children of each generation on workers of their own
+    (ParallelGenerationEngine), driven by a monitor thread and counted against the workers in the same way.
+    Decomposition runs (DecompositionEngine, or MultiDepotEngine for several depots) solve their clusters in a pool
+    of their own; their monitor reports every solved cluster and ends the run with the solution of the whole problem.
+    The customers of a time-sliced run can change while it is solved (see update): the population is repaired
+    between two slices and evolution continues from it.
+    """
+
+    MONITOR_INTERVAL = 0.1
+    # Seconds between two checks of an update waiting for the slice in flight
+    UPDATE_INTERVAL = 0.01
+
+    def __init__(self, workers: Optional[int] = None, time_slice: float = 0.5, retained_runs: int = 64) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        if self.workers <= 0:
+            raise ValueError("Number of workers must be greater than zero.")
+        if time_slice <= 0:
+            raise ValueError("Time slice must be greater than zero.")
+        self.time_slice = time_slice
+        self.retained_runs = retained_runs
+        self.__runs: dict[str, SolverRun] = {}
+        self.__ready: queue.Queue = queue.Queue()
+        self.__lock = threading.Lock()
+        self.__executor: Optional[ProcessPoolExecutor] = None
+        self.__dispatchers: list[threading.Thread] = []
+        # Workers in use (slices in flight and processes of the island runs) and runs waiting for workers
+        self.__busy = 0
+        self.__waiting: list[SolverRun] = []
+        self.__released = threading.Condition(self.__lock)
+
+    def submit(self, vrp_factory, population_size: int, max_generations: Optional[int] = None,
+               max_time: Optional[float] = None, local_search_options: Optional[dict] = None,
+               metadata: Optional[dict] = None,
+               subscriber: Optional[Callable[[dict], Awaitable[None]]] = None,
+               island_options: Optional[dict] = None, checkpoint: Optional[Checkpoint] = None,
+               checkpoint_directory: Optional[str] = None, checkpoint_interval: float = 5.0,
+               decomposition_options: Optional[dict] = None, execution_mode: str = "sequential",
+               workers: Optional[int] = None, loop: Optional[asyncio.AbstractEventLoop] = None) -> SolverRun:
+        """
+        Creates a run and queues it. The initial population is generated here, so invalid problems are reported
+        to the caller.
+        Args:
+            vrp_factory: Factory of the VRP of the run.
+            population_size: Size of the population.
+            max_generations: Generation budget, or None.
+            max_time: Budget in seconds of solver time, or None.
+            local_search_options: Arguments of VrpFactory.create_local_search, or None without local search.
+            metadata: Data kept with the run for the clients (e.g. the nodes).
+            subscriber: Async callback subscribed before the run is queued (see subscribe).
+            island_options: Arguments of IslandEngine (islands, migration_interval, migration_size, topology) to
+                run the island model instead of time slices, or None.
+            checkpoint: Checkpoint the run continues from (population, generation, best solution, random state
+                and solver time), or None to start from an initial population.
+            checkpoint_directory: Directory where the run writes its checkpoint (<run_id>.npz) after a slice when
+                checkpoint_interval seconds have passed since the previous one, and when it ends; None disables it.
+            checkpoint_interval: Minimum seconds between two checkpoints.
+            decomposition_options: Arguments of DecompositionEngine (method, clusters, cluster_size, workers) to
+                solve the problem by clusters instead of as a whole, or of MultiDepotEngine (depots,
+                depot_capacities, trunk_fleet, workers) when depots is given, or None. The workers of the scheduler
+                are used unless workers is given.
+            execution_mode: "sequential" to run time slices of the run on the shared workers, or "process" to spread
+                the children of every generation over worker processes reserved for the run.
+            workers: Number of worker processes of a process run (the workers of the scheduler when None).
+            loop: Event loop the subscriber is called on; the running one when None, so callers submitting from a
+                thread pass the loop of the subscriber.
+
+        Returns:
+            The queued run.
+        Raises:
+            ValueError: If the problem is invalid, the execution mode is unknown or combined with islands or
+                decomposition, checkpoints are requested for an island or decomposition run, or a run needs more
+                processes than the workers of the scheduler.
+        """
+        if execution_mode not in RUN_EXECUTION_MODES:
+            raise ValueError(f"Execution mode must be one of {RUN_EXECUTION_MODES}.")
+        if execution_mode == "process" and (island_options is not None or decomposition_options is not None):
+            raise ValueError("The process mode does not support islands or decomposition.")
+        if island_options is not None and (checkpoint is not None or checkpoint_directory is not None):
+            raise ValueError("Checkpoints are not supported by the island model.")
+        if decomposition_options is not None and (island_options is not None or checkpoint is not None
+                                                  or checkpoint_directory is not None):
+            raise ValueError("Decomposition runs do not support islands or checkpoints.")
+        engine = None
+        if decomposition_options is not None:
+            # The clusters build their own populations
+            engine_class = MultiDepotEngine if "depots" in decomposition_options else DecompositionEngine
+            options = {**decomposition_options, "workers": decomposition_options.get("workers") or self.workers}
+            engine = engine_class(vrp_factory, population_size, max_generations=max_generations, max_time=max_time,
+                                  local_search_options=local_search_options, **options)
+        starts_population = checkpoint is None and engine is None
+        population = vrp_factory.create_vrp().generate_initial_population() if starts_population else []
+        run = SolverRun(vrp_factory, population, population_size, max_generations, max_time, local_search_options,
+                        metadata)
+        if checkpoint is not None:
+            run.restore(checkpoint)
+        if checkpoint_directory is not None:
+            run.checkpoint_path = Path(checkpoint_directory) / f"{run.run_id}.npz"
+            run.checkpoint_interval = checkpoint_interval
+        if subscriber is not None:
+            run.subscribers.append((subscriber, loop or asyncio.get_running_loop()))
+        if island_options is not None:
+            engine = IslandEngine(vrp_factory, population_size, **island_options)
+        elif execution_mode == "process":
+            # The pool starts its processes on the first generation, once the run has its workers
+            engine = ParallelGenerationEngine(vrp_factory, workers or self.workers)
+        if engine is not None and self.__processes(engine) > self.workers:
+            raise ValueError(f"The run needs {self.__processes(engine)} processes, more than the {self.workers} "
+                             f"workers of the scheduler.")
+        run.engine = engine
+        with self.__lock:
+            self.__forget_done_runs()
+            self.__runs[run.run_id] = run
+            if run.engine is None:
+                self.__start()
+                self.__enqueue(run)
+                return run
+            self.__waiting.append(run)
+            self.__launch_waiting()
+        return run
+
+    def get(self, run_id: str) -> Optional[SolverRun]:
+        return self.__runs.get(run_id)
+
+    def runs(self) -> list[SolverRun]:
+        return list(self.__runs.values())
+
+    def pause(self, run_id: str) -> None:
+        with self.__lock:
+            run = self.__runs[run_id]
+            if not run.done:
+                run.state = "paused"
+
+    def resume(self, run_id: str) -> None:
+        with self.__lock:
+            run = self.__runs[run_id]
+            if run.state != "paused":
+                return
+            if run.engine is not None:
+                run.state = "running"
+                return
+            run.state = "queued"
+            if not run.in_flight:
+                # Otherwise the dispatcher puts the run back in the queue when the slice ends
+                self.__enqueue(run)
+
+    def stop(self, run_id: str) -> None:
+        with self.__lock:
+            run = self.__runs[run_id]
+            if not run.done:
+                run.state = "stopped"
+            # A stopped run no longer waits for workers
+            self.__launch_waiting()
+
+    def update(self, run_id: str, added: Iterable[Node] = (), removed: Iterable[int] = (),
+               changed: Iterable[dict] = ()) -> Genome:
+        """
+        Adds, removes or changes customers of a run without starting it again: waits for the slice in flight, then
+        repairs the population of the run (see update_instance) and evolves it on the changed problem from the
+        next slice on. Subscribers receive an instance_updated event. The generation and time budgets are kept.
+        Blocking, so callers on an event loop run it in a thread.
+        Args:
+            run_id: Identifier of the run.
+            added: New customers.
+            removed: Identifiers of the customers to be removed.
+            changed: Changes of customers, dictionaries with the identifier and the new demand and/or priority.
+
+        Returns:
+            The best solution of the repaired population, which replaces the best solution of the run.
+        Raises:
+            KeyError: If the run does not exist.
+            ValueError: If the run is over, is an island, process, decomposition or checkpointed run, or the changes
+                are invalid (the run is left unchanged).
+        """
+        with self.__lock:
+            run = self.__runs[run_id]
+            if run.engine is not None:
+                raise ValueError("Island, process and decomposition runs cannot be updated.")
+            if run.checkpoint_path is not None:
+                raise ValueError("Runs with checkpoints cannot be updated.")
+        with run.update_lock:
+            return self.__update(run, list(added), list(removed), list(changed))
+
+    def __update(self, run: SolverRun, added: list[Node], removed: list[int], changed: list[dict]) -> Genome:
+        # Called with the update lock of the run held
+        with self.__lock:
+            # The dispatchers leave the run in the queue until the change is applied
+            run.updating = True
+        try:
+            while True:
+                with self.__lock:
+                    if run.done:
+                        raise ValueError(f"Run {run.run_id} is over.")
+                    if not run.in_flight:
+                        run.in_flight = True
+                        break
+                time.sleep(self.UPDATE_INTERVAL)
+        except ValueError:
+            with self.__lock:
+                run.updating = False
+            raise
+        try:
+            vrp_factory, population = update_instance(run.vrp_factory, run.population, added, removed, changed)
+            vrp_factory.create_vrp().evaluate_population(population)
+            population = sorted(population, key=lambda genome: genome.fitness)
+            graph = vrp_factory.graph
+            excluded = set(removed)
+            nodes = [graph.get_node(node.identifier) for node in run.metadata.get("nodes", [])
+                     if node.identifier not in excluded] + added
+            with self.__lock:
+                run.vrp_factory, run.population, run.best_solution = vrp_factory, population, population[0]
+                run.revision += 1
+                run.metadata = {**run.metadata, "nodes": nodes}
+        finally:
+            with self.__lock:
+                run.in_flight = run.updating = False
+                if run.state == "queued":
+                    self.__enqueue(run)
+        best = population[0]
+        self.__notify(run, {
+            "event": "instance_updated",
+            "run_id": run.run_id,
+            "revision": run.revision,
+            "added": [node.identifier for node in added],
+            "removed": removed,
+            "changed": [change["identifier"] for change in changed],
+            "customers": len(best.customers(vrp_factory.depot_identifier)),
+            "generation": run.generation,
+            "best_distance": round(best.total_distance(), 2),
+            "best_fitness": round(best.fitness, 2),
+            "total_time": round(run.elapsed, 2)
+        })
+        return best
+
+    def subscribe(self, run_id: str, callback: Callable[[dict], Awaitable[None]]) -> None:
+        """
+        Registers an async callback for the events of the run, called on the running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        with self.__lock:
+            self.__runs[run_id].subscribers.append((callback, loop))
+
+    def unsubscribe(self, run_id: str, callback: Callable[[dict], Awaitable[None]]) -> None:
+        with self.__lock:
+            run = self.__runs.get(run_id)
+            if run is not None:
+                run.subscribers = [(c, loop) for c, loop in run.subscribers if c is not callback]
+
+    def shutdown(self) -> None:
+        """
+        Stops the dispatchers and the worker processes. The scheduler starts again on the next submit.
+        """
+        with self.__lock:
+            for run in self.__runs.values():
+                if not run.done:
+                    run.state = "stopped"
+            dispatchers, self.__dispatchers = self.__dispatchers, []
+            executor, self.__executor = self.__executor, None
+            self.__waiting = []
+            self.__released.notify_all()
+        for _ in dispatchers:
+            self.__ready.put(None)
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def __start(self) -> None:
+        if self.__executor is not None:
+            return
+        self.__executor = ProcessPoolExecutor(max_workers=self.workers,
+                                              mp_context=multiprocessing.get_context("spawn"))
+        self.__dispatchers = [threading.Thread(target=self.__dispatch, args=(self.__executor,), daemon=True,
+                                               name=f"solver-dispatcher-{index}") for index in range(self.workers)]
+        for dispatcher in self.__dispatchers:
+            dispatcher.start()
+
+    @staticmethod
+    def __processes(engine) -> int:
+        # Workers kept busy by the processes of an island run, or by the worker pool of a process or
+        # decomposition run
+        if isinstance(engine, IslandEngine):
+            return engine.islands
+        return engine.workers if isinstance(engine, (DecompositionEngine, ParallelGenerationEngine)) else 0
+
+    def __launch_waiting(self) -> None:
+        # Called with the lock held: starts the waiting runs, in order, while there are enough free workers
+        self.__waiting = [run for run in self.__waiting if not run.done]
+        while self.__waiting and self.__busy + self.__processes(self.__waiting[0].engine) <= self.workers:
+            run = self.__waiting.pop(0)
+            self.__busy += self.__processes(run.engine)
+            run.in_flight = True
+            if run.state == "queued":
+                run.state = "running"
+            if isinstance(run.engine, DecompositionEngine):
+                # Partitioning a large instance takes a while, so it happens in the monitor thread
+                target, name = self.__monitor_decomposition, f"decomposition-monitor-{run.run_id}"
+            elif isinstance(run.engine, ParallelGenerationEngine):
+                target, name = self.__monitor_process, f"process-monitor-{run.run_id}"
+            else:
+                target, name = self.__monitor, f"island-monitor-{run.run_id}"
+            threading.Thread(target=target, args=(run,), daemon=True, name=name).start()
+        self.__released.notify_all()
+
+    def __release(self, processes: int) -> None:
+        # Called with the lock held
+        self.__busy -= processes
+        self.__launch_waiting()
+
+    def __forget_done_runs(self) -> None:
+        # Keeps only the most recent runs that are over, so their results can still be fetched after a reconnect
+        done = [run_id for run_id, run in self.__runs.items() if run.done and not run.in_flight]
+        for run_id in done[:max(0, len(done) - self.retained_runs)]:
+            del self.__runs[run_id]
+
+    def __enqueue(self, run: SolverRun) -> None:
+        # Called with the lock held; a run is never twice in the queue, so every run gets the same share
+        if not run.enqueued:
+            run.enqueued = True
+            self.__ready.put(run.run_id)
+
+    def __dispatch(self, executor: ProcessPoolExecutor) -> None:
+        while True:
+            run_id = self.__ready.get()
+            if run_id is None:
+                return
+            with self.__lock:
+                run = self.__runs[run_id]
+                run.enqueued = False
+                # Waits for a free worker; runs waiting for workers go first
+                while self.__executor is executor and (self.__busy >= self.workers or self.__waiting):
+                    self.__released.wait()
+                if self.__executor is not executor:
+                    return
+                if run.state != "queued" or run.in_flight or run.updating:
+                    continue
+                self.__busy += 1
+                run.state, run.in_flight = "running", True
+                generations_left = None if run.max_generations is None else run.max_generations - run.generation
+                best_fitness = run.best_solution.fitness if run.best_solution else None
+            arguments = (run.local_search_options, run.population, run.population_size, run.generation,
+                         best_fitness, self.time_slice, generations_left, run.random_state, run.revision)
+            try:
+                # The factory is only sent to a worker that does not hold the run yet, so the graph matrices are
+                # not transferred on every slice
+                result = executor.submit(_run_slice, run.run_id, None, *arguments).result()
+                if result is None:
+                    result = executor.submit(_run_slice, run.run_id, run.vrp_factory, *arguments).result()
+            except Exception as error:
+                with self.__lock:
+                    self.__release(1)
+                    run.in_flight = False
+                    if not run.done:
+                        run.state, run.error = "failed", str(error)
+                self.__notify(run, {"event": "run_failed", "run_id": run.run_id, "message": str(error)})
+                continue
+
+            population, generation, best, best_generation, elapsed, profiler, cache, random_state = result
+            with self.__lock:
+                self.__release(1)
+                run.population, run.generation = population, generation
+                run.random_state = random_state
+                run.elapsed += elapsed
+                run.profiler.merge(profiler)
+                run.merge_cache_lookups(cache)
+                if best is not None:
+                    run.best_solution = best
+                finished = run.budget_exhausted() and not run.done
+                if finished:
+                    run.state = "finished"
+                checkpoint = run.checkpoint() if self.__checkpoint_due(run) else None
+                if checkpoint is None:
+                    run.in_flight = False
+                if run.state in ("running", "queued"):
+                    run.state = "queued"
+                    if checkpoint is None:
+                        self.__enqueue(run)
+            if checkpoint is not None:
+                # Written outside the lock; the run is queued again only afterwards, so its checkpoints are in order
+                self.__save_checkpoint(run, checkpoint)
+                with self.__lock:
+                    run.in_flight = False
+                    if run.state == "queued":
+                        self.__enqueue(run)
+            if best is not None:
+                with run.profiler.section("events"):
+                    self.__notify(run, {
+                        "event": "new_best_solution",
+                        "run_id": run.run_id,
+                        "generation": best_generation,
+                        "best_distance": round(best.total_distance(), 2),
+                        "best_fitness": round(best.fitness, 2),
+                        "total_time": round(run.elapsed, 2)
+                    })
+            if finished:
+                self.__notify(run, {"event": "run_finished", "run_id": run.run_id, "generation": run.generation})
+
+    @staticmethod
+    def __checkpoint_due(run: SolverRun) -> bool:
+        # Called with the lock held
+        if run.checkpoint_path is None:
+            return False
+        return run.done or time.monotonic() - run.last_checkpoint >= run.checkpoint_interval
+
+    def __save_checkpoint(self, run: SolverRun, checkpoint: Checkpoint) -> None:
+        try:
+            save_checkpoint(run.checkpoint_path, checkpoint)
+            run.last_checkpoint = time.monotonic()
+        except OSError as error:
+            self.__notify(run, {"event": "checkpoint_failed", "run_id": run.run_id, "message": str(error)})
+
+    def __monitor(self, run: SolverRun) -> None:
+        engine = run.engine
+        try:
+            try:
+                engine.start()
+            except OSError as error:
+                with self.__lock:
+                    run.state, run.error = "failed", str(error)
+                self.__notify(run, {"event": "run_failed", "run_id": run.run_id, "message": str(error)})
+                return
+            # The budget counts once an island has published its first generation, so the start of the processes
+            # is not charged to it
+            last = time.perf_counter()
+            while True:
+                time.sleep(self.MONITOR_INTERVAL)
+                now = time.perf_counter()
+                generations = engine.generations()
+                with self.__lock:
+                    state = run.state
+                    if state == "running" and max(generations) > 0:
+                        run.elapsed += now - last
+                    run.generation = max(generations)
+                last = now
+                if state == "paused":
+                    engine.pause()
+                    continue
+                if state != "running":
+                    return
+                engine.resume()
+                for island, generation, best in engine.poll():
+                    with self.__lock:
+                        improved = run.best_solution is None or best.fitness < run.best_solution.fitness
+                        if improved:
+                            run.best_solution = best
+                    if improved:
+                        self.__notify(run, {
+                            "event": "new_best_solution",
+                            "run_id": run.run_id,
+                            "generation": generation,
+                            "island": island,
+                            "best_distance": round(best.total_distance(), 2),
+                            "best_fitness": round(best.fitness, 2),
+                            "total_time": round(run.elapsed, 2)
+                        })
+                with self.__lock:
+                    finished = run.budget_exhausted() and not run.done
+                    failed = not finished and not engine.alive()
+                    if finished:
+                        run.state = "finished"
+                    elif failed:
+                        run.state, run.error = "failed", "Island processes exited."
+                if finished:
+                    self.__notify(run, {"event": "run_finished", "run_id": run.run_id, "generation": run.generation})
+                    return
+                if failed:
+                    self.__notify(run, {"event": "run_failed", "run_id": run.run_id, "message": run.error})
+                    return
+        finally:
+            engine.shutdown()
+            with self.__lock:
+                run.in_flight = False
+                self.__release(self.__processes(engine))
+
+    def __monitor_process(self, run: SolverRun) -> None:
+        engine = run.engine
+        vrp = run.vrp_factory.create_vrp()
+        local_search = (run.vrp_factory.create_local_search(**run.local_search_options)
+                        if run.local_search_options is not None else None)
+        # The run continues the random sequence of its checkpoint, if any
+        vrp.random.setstate(run.random_state)
+        try:
+            while True:
+                with self.__lock:
+                    state = run.state
+                if state == "paused":
+                    time.sleep(self.MONITOR_INTERVAL)
+                    continue
+                if state != "running":
+                    return
+                start = time.perf_counter()
+                vrp.profiler.reset()
+                # Children come back from the workers of the run already evaluated
+                ranked, population = step(vrp, run.population, run.population_size, local_search, engine.offspring)
+                elapsed = time.perf_counter() - start
+                best = None
+                with self.__lock:
+                    run.population, run.random_state = population, vrp.random.getstate()
+                    run.generation += 1
+                    run.elapsed += elapsed
+                    run.profiler.merge(vrp.profiler)
+                    if run.best_solution is None or ranked[0].fitness < run.best_solution.fitness:
+                        best = run.best_solution = ranked[0]
+                    finished = run.budget_exhausted() and not run.done
+                    if finished:
+                        run.state = "finished"
+                    checkpoint = run.checkpoint() if self.__checkpoint_due(run) else None
+                if checkpoint is not None:
+                    self.__save_checkpoint(run, checkpoint)
+                if best is not None:
+                    with run.profiler.section("events"):
+                        self.__notify(run, {
+                            "event": "new_best_solution",
+                            "run_id": run.run_id,
+                            "generation": run.generation,
+                            "best_distance": round(best.total_distance(), 2),
+                            "best_fitness": round(best.fitness, 2),
+                            "total_time": round(run.elapsed, 2)
+                        })
+                if finished:
+                    self.__notify(run, {"event": "run_finished", "run_id": run.run_id, "generation": run.generation})
+                    return
+        except Exception as error:
+            with self.__lock:
+                if not run.done:
+                    run.state, run.error = "failed", str(error)
+            self.__notify(run, {"event": "run_failed", "run_id": run.run_id, "message": str(error)})
+        finally:
+            engine.shutdown()
+            with self.__lock:
+                run.in_flight = False
+                self.__release(self.__processes(engine))
+
+    def __monitor_decomposition(self, run: SolverRun) -> None:
+        engine = run.engine
+        last = time.perf_counter()
+        try:
+            engine.start()
+            while True:
+                time.sleep(self.MONITOR_INTERVAL)
+                now = time.perf_counter()
+                with self.__lock:
+                    state = run.state
+                    if state == "running":
+                        run.elapsed += now - last
+                last = now
+                if state == "paused":
+                    engine.pause()
+                    continue
+                if state != "running":
+                    return
+                engine.resume()
+                for cluster, generation, best in engine.poll():
+                    with self.__lock:
+                        run.generation = max(engine.generations())
+                    routes = [best.route(local).tolist() for local in range(best.number_vehicles)]
+                    self.__notify(run, {
+                        "event": "cluster_finished",
+                        "run_id": run.run_id,
+                        "cluster": cluster,
+                        "clusters": engine.clusters,
+                        "depot": engine.depots[cluster],
+                        "customers": len(engine.customers[cluster]),
+                        "generation": generation,
+                        "best_distance": round(best.total_distance(), 2),
+                        "best_fitness": round(best.fitness, 2),
+                        "vehicles": [{"vehicle": vehicle, "route": route, "distance": float(best.distances[local])}
+                                     for local, (vehicle, route) in enumerate(zip(engine.vehicles[cluster], routes))],
+                        "total_time": round(run.elapsed, 2)
+                    })
+                if not engine.done():
+                    continue
+                best = engine.result()
+                with self.__lock:
+                    run.best_solution = best
+                    finished = not run.done
+                    if finished:
+                        run.state = "finished"
+                self.__notify(run, {
+                    "event": "new_best_solution",
+                    "run_id": run.run_id,
+                    "generation": run.generation,
+                    "best_distance": round(best.total_distance(), 2),
+                    "best_fitness": round(best.fitness, 2),
+                    "total_time": round(run.elapsed, 2)
+                })
+                if finished:
+                    self.__notify(run, {"event": "run_finished", "run_id": run.run_id, "generation": run.generation})
+                return
+        except Exception as error:
+            with self.__lock:
+                if not run.done:
+                    run.state, run.error = "failed", str(error)
+            self.__notify(run, {"event": "run_failed", "run_id": run.run_id, "message": str(error)})
+        finally:
+            engine.shutdown()
+            with self.__lock:
+                run.in_flight = False
+                self.__release(self.__processes(engine))
+
+    def __notify(self, run: SolverRun, event: dict) -> None:
+        with self.__lock:
+            subscribers = list(run.subscribers)
+        for callback, loop in subscribers:
+            coroutine = callback(dict(event))
+            try:
+                asyncio.run_coroutine_threadsafe(coroutine, loop)
+            except RuntimeError:
+                # The event loop of the connection is closed
+                coroutine.close()
+                self.unsubscribe(run.run_id, callback)
@@ -1,15 +1,174 @@
 import random
+from typing import Optional
+
+import numpy as np
 
 from domain import Solution
 
+SELECTION_METHODS = ("tournament", "rank", "sus")
+# Redraws of a second parent equal to the first before falling back to the next individual
+_DISTINCT_ATTEMPTS = 10
+
+
+def numpy_generator(rng: Optional[random.Random] = None) -> np.random.Generator:
+    """
+    NumPy generator seeded from the random generator of the run, so vectorized draws follow the run seed and its
+    checkpointed state.
+    """
+    return np.random.default_rng((rng or random).getrandbits(64))
+
 
-def parents_selection(population: list[Solution]) -> tuple[Solution, Solution]:
+def _distinct_pairs(first: np.ndarray, second: np.ndarray, redraw, size: int) -> np.ndarray:
+    # Second parents equal to the first are drawn again (rejection keeps the conditional distribution)
+    for _ in range(_DISTINCT_ATTEMPTS):
+        conflicts = np.flatnonzero(first == second)
+        if not len(conflicts):
+            break
+        second[conflicts] = redraw(len(conflicts))
+    conflicts = first == second
+    second[conflicts] = (first[conflicts] + 1) % size
+    return np.column_stack([first, second])
+
+
+def _swap_partners(first: np.ndarray, second: np.ndarray, generator: np.random.Generator) -> None:
+    # Pairs of equal parents exchange their second parent with another pair, keeping the selection counts
+    for index in np.flatnonzero(first == second):
+        for other in generator.permutation(len(first)):
+            if second[other] != first[index] and first[other] != second[index]:
+                second[index], second[other] = second[other], second[index]
+                break
+
+
+def tournament_selection(fitness: np.ndarray, number_pairs: int, generator: np.random.Generator,
+                         tournament_size: int = 5) -> np.ndarray:
+    """
+    Tournament selection of a whole generation: each parent is the fittest of tournament_size individuals drawn
+    with replacement, and the tournament of the second parent never includes the first one.
+    Args:
+        fitness: Fitness of each individual (lower is better).
+        number_pairs: Number of parent pairs.
+        generator: NumPy random generator.
+        tournament_size: Number of individuals per tournament (at most the population size).
+
+    Returns:
+        Array (number_pairs, 2) with the indices of the parents.
+    """
+    size = len(fitness)
+    tournament_size = min(tournament_size, size)
+    rows = np.arange(number_pairs)
+    candidates = generator.integers(0, size, (number_pairs, tournament_size))
+    first = candidates[rows, np.argmin(fitness[candidates], axis=1)]
+    # Draws among the other size - 1 individuals, skipping the index of the first parent
+    candidates = generator.integers(0, size - 1, (number_pairs, tournament_size))
+    candidates += candidates >= first[:, None]
+    second = candidates[rows, np.argmin(fitness[candidates], axis=1)]
+    return np.column_stack([first, second])
+
+
+def rank_selection(fitness: np.ndarray, number_pairs: int, generator: np.random.Generator,
+                   pressure: float = 1.5) -> np.ndarray:
+    """
+    Linear ranking selection: the probability of an individual depends only on its rank, from pressure / n for the
+    best to (2 - pressure) / n for the worst.
+    Args:
+        fitness: Fitness of each individual (lower is better).
+        number_pairs: Number of parent pairs.
+        generator: NumPy random generator.
+        pressure: Selection pressure, between 1 (uniform) and 2.
+
+    Returns:
+        Array (number_pairs, 2) with the indices of the parents (always two different individuals).
     """
-    Selects two parents from the population using tournament selection.
+    size = len(fitness)
+    ranks = np.empty(size)
+    ranks[np.argsort(fitness, kind="stable")] = np.arange(size)
+    probabilities = (pressure - (2 * pressure - 2) * ranks / (size - 1)) / size
+    probabilities /= probabilities.sum()
+    draws = generator.choice(size, size=2 * number_pairs, p=probabilities)
+    return _distinct_pairs(draws[:number_pairs], draws[number_pairs:],
+                           lambda count: generator.choice(size, size=count, p=probabilities), size)
+
+
+def stochastic_universal_sampling(fitness: np.ndarray, number_pairs: int,
+                                  generator: np.random.Generator) -> np.ndarray:
+    """
+    Stochastic universal sampling: 2 * number_pairs equally spaced pointers over the cumulative weights, so every
+    individual is selected a number of times within one of its expected count. Weights are proportional to the
+    distance to the worst fitness plus a base that keeps the worst individual selectable; the selected parents are
+    shuffled before being paired, and pairs of equal parents exchange partners with other pairs.
+    Args:
+        fitness: Fitness of each individual (lower is better).
+        number_pairs: Number of parent pairs.
+        generator: NumPy random generator.
+
+    Returns:
+        Array (number_pairs, 2) with the indices of the parents (always two different individuals).
+    """
+    size = len(fitness)
+    spread = float(fitness.max() - fitness.min())
+    weights = fitness.max() - fitness + (spread / size if spread > 0 else 1.0)
+    cumulative = np.cumsum(weights)
+    number_parents = 2 * number_pairs
+    step = cumulative[-1] / number_parents
+    pointers = generator.uniform(0, step) + step * np.arange(number_parents)
+    selected = np.minimum(np.searchsorted(cumulative, pointers, side="right"), size - 1)
+    selected = generator.permutation(selected)
+    first, second = selected[:number_pairs], selected[number_pairs:]
+    _swap_partners(first, second, generator)
+    # Only when an individual holds more than half of the selections some pairs cannot be fixed by exchanges
+    probabilities = weights / cumulative[-1]
+    return _distinct_pairs(first, second, lambda count: generator.choice(size, size=count, p=probabilities), size)
+
+
+class Selection:
+    """
+    Parent selection of a whole generation in one vectorized call, on the fitness array of the population.
+    The population is never changed, so the selection pressure is the same for every pair.
+    """
+
+    def __init__(self, method: str = "tournament", tournament_size: int = 5, pressure: float = 1.5) -> None:
+        if method not in SELECTION_METHODS:
+            raise ValueError(f"Selection method must be one of {SELECTION_METHODS}.")
+        if tournament_size <= 0:
+            raise ValueError("Tournament size must be greater than zero.")
+        if not 1.0 <= pressure <= 2.0:
+            raise ValueError("Selection pressure must be between 1 and 2.")
+        self.method = method
+        self.tournament_size = tournament_size
+        self.pressure = pressure
+
+    def select(self, fitness: np.ndarray, number_pairs: int, rng: Optional[random.Random] = None) -> np.ndarray:
+        """
+        Selects the parents of number_pairs crossovers.
+        Args:
+            fitness: Fitness of each individual (lower is better).
+            number_pairs: Number of parent pairs.
+            rng: Random generator of the run (the global one by default).
+
+        Returns:
+            Array (number_pairs, 2) with the indices of the two (different) parents of each pair.
+        Raises:
+            ValueError: If the population has less than two individuals.
+        """
+        fitness = np.asarray(fitness, dtype=np.float64)
+        if len(fitness) < 2:
+            raise ValueError("Population must have at least two individuals to select parents.")
+        generator = numpy_generator(rng)
+        if self.method == "tournament":
+            return tournament_selection(fitness, number_pairs, generator, self.tournament_size)
+        if self.method == "rank":
+            return rank_selection(fitness, number_pairs, generator, self.pressure)
+        return stochastic_universal_sampling(fitness, number_pairs, generator)
+
+
+def parents_selection(population: list[Solution], rng: Optional[random.Random] = None) -> tuple[Solution, Solution]:
+    """
+    Selects two parents from the population using tournament selection, without changing the population.
     If a population with only two individuals is provided, those two individuals are returned as parents.
 
     Args:
         population: List of solutions representing the population.
+        rng: Random generator of the run (the global one by default).
 
     Returns:
         A tuple containing two selected parent solutions.
@@ -17,22 +176,5 @@ def parents_selection(population: list[Solution]) -> tuple[Solution, Solution]:
         ValueError: If the population has less than two individuals.
 
     """
-    if len(population) < 2:
-        raise ValueError("Population must have at least two individuals to select parents.")
-
-    if len(population) == 2:
-        return population[0], population[1]
-
-    tournament_size = 5
-    if len(population) < 5:
-        tournament_size = len(population)
-
-    selected = []
-    for _ in range(2):
-        tournament = random.sample(range(len(population)), tournament_size)
-        winner = min(tournament, key=lambda i: population[i].fitness)
-        selected.append(population[winner])
-        population.remove(population[winner])
-        if len(population) < tournament_size:
-            tournament_size = len(population)
-    return selected[0], selected[1]
\ No newline at end of file
+    first, second = Selection().select([solution.fitness for solution in population], 1, rng)[0]
+    return population[first], population[second]
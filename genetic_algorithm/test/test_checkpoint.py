@@ -0,0 +1,58 @@
+import random
+
+import numpy as np
+import pytest
+
+from domain.genome import Genome
+from genetic_algorithm.checkpoint import Checkpoint, load_checkpoint, save_checkpoint
+
+
+def test_round_trip(tmp_path):
+    rng = random.Random(11)
+    rng.gauss(0, 1)
+    population = [
+        Genome([0, 1, 2, 0, 0, 3, 0], [0, 4, 7], [10, 20], [100.0, float("inf")], [5.0, 7.5], fitness=12.5,
+               penalty=0.0, costs=[0.5, 1.0]),
+        Genome([0, 3, 0, 0, 2, 1, 0], [0, 3, 7], 10, 100.0),
+    ]
+    path = tmp_path / "run.npz"
+    save_checkpoint(path, Checkpoint(population, 42, population[0], rng.getstate(), elapsed=3.5, graph_key="ab12"))
+
+    checkpoint = load_checkpoint(path)
+
+    assert (checkpoint.generation, checkpoint.elapsed, checkpoint.graph_key) == (42, 3.5, "ab12")
+    assert len(checkpoint.population) == 2
+    first, second = checkpoint.population
+    assert first.sequence.tolist() == [0, 1, 2, 0, 0, 3, 0]
+    assert first.offsets.tolist() == [0, 4, 7]
+    assert first.capacities.tolist() == [10, 20]
+    assert first.autonomies.tolist() == [100.0, float("inf")]
+    assert first.distances.tolist() == [5.0, 7.5]
+    assert first.costs.tolist() == [0.5, 1.0]
+    assert (first.fitness, first.penalty) == (12.5, 0.0)
+    assert second.sequence.tolist() == [0, 3, 0, 0, 2, 1, 0]
+    assert (second.fitness, second.penalty) == (None, None)
+    assert checkpoint.best_solution.fitness == 12.5
+
+    restored = random.Random()
+    restored.setstate(checkpoint.random_state)
+    assert [restored.random() for _ in range(5)] == [rng.random() for _ in range(5)]
+
+
+def test_without_best_solution(tmp_path):
+    path = tmp_path / "run.npz"
+    save_checkpoint(path, Checkpoint([Genome([0, 1, 0], [0, 3], 10, 100)], 0, None, random.Random(1).getstate()))
+
+    checkpoint = load_checkpoint(path)
+
+    assert checkpoint.best_solution is None
+    assert checkpoint.graph_key is None
+    assert not (tmp_path / "run.npz.tmp").exists()
+
+
+def test_other_archive_is_rejected(tmp_path):
+    path = tmp_path / "other.npz"
+    np.savez(path, values=np.arange(3))
+
+    with pytest.raises(ValueError):
+        load_checkpoint(path)
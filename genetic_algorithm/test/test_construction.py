@@ -0,0 +1,92 @@
+import random
+
+import numpy as np
+
+from domain.graph import Graph, Node
+from genetic_algorithm.construction import join_routes, nearest_neighbor_tours, savings_routes, sweep_tours
+
+
+def random_graph(size=60, seed=4):
+    rng = random.Random(seed)
+    nodes = [Node(identifier=0, x=50, y=50)] + [
+        Node(identifier=i, x=rng.uniform(0, 100), y=rng.uniform(0, 100), demand=rng.randint(1, 3))
+        for i in range(1, size)]
+    return Graph(nodes)
+
+
+def test_nearest_neighbor_follows_a_line():
+    graph = Graph([Node(identifier=0, x=0, y=0)] + [Node(identifier=i, x=i * 10, y=0) for i in range(1, 8)])
+    customers = np.arange(1, 8)
+
+    tours = nearest_neighbor_tours(graph.distance_matrix, graph.nearest_neighbors(2), customers, np.array([4]), 1,
+                                   np.random.default_rng(0))
+
+    assert tours.tolist() == [[4, 3, 2, 1, 5, 6, 7]]
+
+
+def test_randomized_nearest_neighbor_tours_are_permutations():
+    graph = random_graph()
+    customers = np.arange(1, 60)
+    generator = np.random.default_rng(1)
+
+    # Short candidate lists force the search of the nearest unvisited customer in the distance rows
+    tours = nearest_neighbor_tours(graph.distance_matrix, graph.nearest_neighbors(3), customers,
+                                   generator.choice(customers, 20), 2, generator)
+
+    assert tours.shape == (20, 59)
+    assert all(sorted(tour) == customers.tolist() for tour in tours.tolist())
+    assert len({tuple(tour) for tour in tours.tolist()}) > 1
+
+
+def test_savings_respects_capacity_and_autonomy():
+    graph = random_graph()
+    customers = np.arange(1, 60)
+
+    routes = savings_routes(graph.distance_matrix, graph.nearest_neighbors(10), 0, customers, graph.demands, 12, 200)
+
+    assert sorted(np.concatenate(routes).tolist()) == customers.tolist()
+    for route in routes:
+        assert graph.demands[route].sum() <= 12 or len(route) == 1
+        trip = [0] + route.tolist() + [0]
+        assert sum(graph.distance_matrix[a, b] for a, b in zip(trip, trip[1:])) <= 200 or len(route) == 1
+
+
+def test_savings_merges_clusters():
+    nodes = [Node(identifier=0, x=0, y=0)]
+    nodes += [Node(identifier=i, x=100 + i, y=0, demand=1) for i in range(1, 5)]
+    nodes += [Node(identifier=i, x=0, y=100 + i, demand=1) for i in range(5, 9)]
+    graph = Graph(nodes)
+
+    routes = savings_routes(graph.distance_matrix, graph.nearest_neighbors(7), 0, np.arange(1, 9), graph.demands, 4)
+
+    assert sorted(sorted(route.tolist()) for route in routes) == [[1, 2, 3, 4], [5, 6, 7, 8]]
+
+
+def test_sweep_orders_by_angle():
+    angles = np.array([0.0, 1.0, -2.0, 0.5, 3.0])
+    radii = np.zeros(5)
+    customers = np.arange(1, 5)
+
+    assert sweep_tours(angles, radii, customers, 4, 1).tolist() == [[2, 3, 1, 4]]
+    tours = sweep_tours(angles, radii, customers, 4, 10, np.random.default_rng(2))
+    assert all(sorted(tour) == [1, 2, 3, 4] for tour in tours.tolist())
+
+
+def test_sweep_sectors_go_out_and_back():
+    angles = np.array([0.0, -3.0, -2.9, -2.8, -2.0, -1.9, -1.8])
+    radii = np.array([0.0, 30.0, 10.0, 20.0, 10.0, 30.0, 20.0])
+
+    tour = sweep_tours(angles, radii, np.arange(1, 7), 3, 1)
+
+    assert tour.tolist() == [[2, 3, 1, 5, 6, 4]]
+
+
+def test_join_routes():
+    angles = np.array([0.0, 2.0, 2.0, -1.0, -1.0])
+    routes = [np.array([1, 2]), np.array([3, 4])]
+
+    assert join_routes(routes, angles).tolist() == [3, 4, 1, 2]
+    joined = join_routes(routes, angles, np.random.default_rng(3))
+    assert sorted(joined.tolist()) == [1, 2, 3, 4]
+    assert joined.tolist() in ([1, 2, 3, 4], [2, 1, 3, 4], [1, 2, 4, 3], [2, 1, 4, 3], [3, 4, 1, 2], [4, 3, 1, 2],
+                               [3, 4, 2, 1], [4, 3, 2, 1])
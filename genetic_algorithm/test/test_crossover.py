@@ -1,9 +1,14 @@
 from unittest import TestCase
 from genetic_algorithm import Crossover
+from domain.genome import Genome
 from domain.solution import Solution
 from domain.vehicle import Vehicle
 from domain.route import Route
-from genetic_algorithm.crossover import choose_two_different_indices
+import random
+
+import numpy as np
+
+from genetic_algorithm.crossover import choose_two_different_indices, order_crossover, order_crossover_batch, build_child_route
 
 
 def test_choose_two_different_indices():
@@ -12,6 +17,40 @@ def test_choose_two_different_indices():
     assert 0 <= idx1 < idx2 <= length
 
 
+def reference_child(main, secondary, end_index, start_index):
+    """Previous list based implementation, used as the reference of the OX semantics."""
+    child = main[start_index:end_index]
+    remaining_positions = [i for i in range(len(main)) if i < start_index or i >= end_index]
+    remaining_genes = [gene for gene in secondary if gene not in child]
+    for position, gene in zip(remaining_positions, remaining_genes):
+        child.insert(position, gene)
+    return child
+
+
+def test_order_crossover_matches_reference():
+    rng = random.Random(7)
+    for _ in range(200):
+        length = rng.randint(1, 30)
+        main = rng.sample(range(1, 100), length)
+        secondary = rng.sample(main, length)
+        start, end = sorted(rng.sample(range(length + 1), 2))
+        expected = reference_child(main, secondary, end, start)
+        assert order_crossover(np.array(main), np.array(secondary), start, end).tolist() == expected
+        assert build_child_route(main, secondary, end, start).customers == expected
+
+
+def test_order_crossover_batch_matches_single():
+    rng = np.random.default_rng(3)
+    customers = rng.permutation(np.arange(1, 41))
+    main = np.stack([rng.permutation(customers) for _ in range(25)])
+    secondary = np.stack([rng.permutation(customers) for _ in range(25)])
+    starts = rng.integers(0, 40, size=25)
+    ends = np.array([rng.integers(start + 1, 41) for start in starts])
+    children = order_crossover_batch(main, secondary, starts, ends)
+    for row in range(25):
+        assert children[row].tolist() == order_crossover(main[row], secondary[row], starts[row], ends[row]).tolist()
+
+
 class TestCrossover(TestCase):
     depot_identifier = 0
     number_vehicles = 3
@@ -25,20 +64,20 @@ class TestCrossover(TestCase):
         Vehicle(Route([0, 3, 4, 8, 0]), autonomy=vehicle_autonomy, capacity=vehicle_capacity),
         Vehicle(Route([0, 5, 6, 9, 0]), autonomy=vehicle_autonomy, capacity=vehicle_capacity)
     ]
-    parent1 = Solution(vehicles=vehicles_p1)
+    parent1 = Genome.from_solution(Solution(vehicles=vehicles_p1))
 
     vehicles_p2 = [
         Vehicle(Route([0, 4, 5, 7, 0]), autonomy=vehicle_autonomy, capacity=vehicle_capacity),
         Vehicle(Route([0, 6, 1, 8, 0]), autonomy=vehicle_autonomy, capacity=vehicle_capacity),
         Vehicle(Route([0, 2, 3, 9, 0]), autonomy=vehicle_autonomy, capacity=vehicle_capacity)
     ]
-    parent2 = Solution(vehicles=vehicles_p2)
+    parent2 = Genome.from_solution(Solution(vehicles=vehicles_p2))
 
     def test_crossover(self):
         child1, child2 = self.crossover.apply(self.parent1, self.parent2)
 
-        self.assertIsInstance(child1, Solution)
-        self.assertIsInstance(child2, Solution)
+        self.assertIsInstance(child1, Genome)
+        self.assertIsInstance(child2, Genome)
 
         self.assertEqual(len(child1.vehicles), self.number_vehicles)
         self.assertEqual(len(child2.vehicles), self.number_vehicles)
@@ -54,12 +93,29 @@ class TestCrossover(TestCase):
         self.assertTrue(set(child2.flatten_routes()).issubset(all_customers_parent))
 
     def test_invalid_parents_type(self):
-        """Deve lançar erro se os pais não forem Solution."""
+        """Deve lançar erro se os pais não forem Genome."""
         with self.assertRaises(Exception):
             self.crossover.apply('not_a_solution', self.parent2)
 
     def test_empty_parents(self):
         """Deve lançar erro se os pais não tiverem veículos."""
-        empty_parent = Solution(vehicles=[])
+        empty_parent = Genome.from_solution(Solution(vehicles=[]))
         with self.assertRaises(Exception):
             self.crossover.apply(empty_parent, self.parent2)
+
+    def test_identical_parents_force_swap(self):
+        child1, child2 = self.crossover.apply(self.parent1, self.parent1)
+        self.assertEqual(child1.customers(0).tolist(), [2, 1, 7, 3, 4, 8, 5, 6, 9])
+        self.assertEqual(child2.customers(0).tolist(), [2, 1, 7, 3, 4, 8, 5, 6, 9])
+
+    def test_apply_batch(self):
+        results = self.crossover.apply_batch([self.parent1, self.parent1, self.parent2], [self.parent2, self.parent1, self.parent1])
+        self.assertEqual(len(results), 3)
+        pairs = [(self.parent1, self.parent2), (self.parent1, self.parent1), (self.parent2, self.parent1)]
+        for (child1, child2), (parent1, parent2) in zip(results, pairs):
+            self.assertEqual(child1.number_vehicles, self.number_vehicles)
+            self.assertCountEqual(child1.customers(0).tolist(), parent1.customers(0).tolist())
+            self.assertCountEqual(child2.customers(0).tolist(), parent2.customers(0).tolist())
+            self.assertNotEqual((child1.flatten_routes(), child2.flatten_routes()),
+                                (parent1.flatten_routes(), parent2.flatten_routes()))
+        self.assertEqual(results[1][0].customers(0).tolist(), [2, 1, 7, 3, 4, 8, 5, 6, 9])
@@ -0,0 +1,248 @@
+import time
+
+import numpy as np
+import pytest
+
+import genetic_algorithm  # noqa: F401 (loads the operators before the VRP package)
+from domain.fleet import Fleet
+from domain.genome import Genome
+from domain.graph import Graph, Node
+from genetic_algorithm.decomposition import (DecompositionEngine, MultiDepotEngine, allocate_vehicles,
+                                             assign_to_depots, boundary_customers, kmeans_partition, number_clusters,
+                                             stitch, sweep_partition)
+from genetic_algorithm.fitness import Fitness
+from vrp.vrp_builder import VrpFactory
+
+
+def two_blobs(size=40):
+    generator = np.random.default_rng(5)
+    centers = np.repeat([[-100.0, 0.0], [100.0, 0.0]], size // 2, axis=0)
+    points = centers + generator.normal(0, 5, (size, 2))
+    return points[:, 0], points[:, 1]
+
+
+def test_number_clusters():
+    assert number_clusters(1000, 20, cluster_size=300) == 4
+    assert number_clusters(1000, 3, cluster_size=300) == 3
+    assert number_clusters(5, 10, clusters=8) == 5
+    assert number_clusters(10, 10, cluster_size=300) == 1
+
+
+def test_sweep_sectors_hold_the_same_demand():
+    angles = np.linspace(0, 2 * np.pi, 60, endpoint=False)
+    demands = np.where(np.arange(60) < 30, 1, 3)
+
+    labels = sweep_partition(np.cos(angles), np.sin(angles), demands, (0.0, 0.0), 4)
+
+    totals = np.bincount(labels, weights=demands)
+    assert totals.max() - totals.min() <= 3
+    # Sectors are contiguous: consecutive angles change cluster at most 4 times around the circle
+    assert np.count_nonzero(labels != np.roll(labels, 1)) <= 4
+
+
+def test_kmeans_separates_the_blobs():
+    x, y = two_blobs()
+
+    labels = kmeans_partition(x, y, 2, np.random.default_rng(0))
+
+    assert len(set(labels[:20].tolist())) == 1 and len(set(labels[20:].tolist())) == 1
+    assert labels[0] != labels[20]
+    # More clusters than groups never leaves a cluster empty
+    assert np.all(np.bincount(kmeans_partition(x, y, 7, np.random.default_rng(1)), minlength=7) > 0)
+
+
+def test_kmeans_with_demands_balances_the_clusters():
+    x, y = two_blobs()
+    # The left blob holds three times the demand of the right one
+    demands = np.where(np.arange(40) < 20, 3, 1)
+
+    labels = kmeans_partition(x, y, 2, np.random.default_rng(0), demands=demands)
+
+    totals = np.bincount(labels, weights=demands, minlength=2)
+    assert totals.max() <= demands.sum() / 2 + demands.max()
+    assert np.all(np.bincount(labels, minlength=2) > 0)
+
+
+def test_allocate_vehicles_by_demand():
+    allocated = allocate_vehicles(np.array([10.0, 95.0, 40.0]), np.array([20, 50, 20, 20, 20, 20]))
+
+    assert sorted(vehicle for vehicles in allocated for vehicle in vehicles) == list(range(6))
+    assert all(allocated)
+    assert 1 in allocated[1]
+    assert len(allocated[1]) == 3 and len(allocated[2]) == 2
+
+
+def test_allocate_vehicles_carry_the_heaviest_customers():
+    # The small cluster holds the heaviest customer: it gets the largest vehicle first
+    allocated = allocate_vehicles(np.array([60.0, 30.0]), np.array([10, 50, 10]), np.array([5, 45]))
+
+    assert allocated[1] == [1]
+    assert sorted(allocated[0]) == [0, 2]
+
+
+def test_boundary_customers():
+    neighbors = np.array([[1, 2], [0, 2], [1, 3], [2, 4], [3, 2]])
+    labels = np.array([-1, 0, 0, 1, 1])
+
+    assert boundary_customers(neighbors, labels).tolist() == [2, 3, 4]
+
+
+def test_stitch_places_the_routes_on_the_fleet_vehicles():
+    fleet = Fleet([5, 10, 20, 30], 100)
+    first = Genome([0, 1, 2, 0, 0, 3, 0], [0, 4, 7], [5, 20], 100)
+    second = Genome([0, 4, 0], [0, 3], [30], 100)
+
+    genome = stitch(fleet, 0, [[0, 2], [3]], [first, second])
+
+    assert [genome.route(vehicle).tolist() for vehicle in range(4)] == [[0, 1, 2, 0], [0, 0], [0, 3, 0],
+                                                                          [0, 4, 0]]
+    assert genome.capacities.tolist() == [5, 10, 20, 30]
+
+
+def create_factory(number_customers=60):
+    x, y = two_blobs(number_customers)
+    nodes = [Node(identifier=0, x=0, y=0)] + [Node(identifier=i + 1, x=float(x[i]), y=float(y[i]), demand=2)
+                                             for i in range(number_customers)]
+    return VrpFactory(Graph(nodes), 20, 4, vehicle_capacity=40, vehicle_autonomy=10000, seed=3)
+
+
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        DecompositionEngine(create_factory(), 20, method="grid", max_generations=5)
+    with pytest.raises(ValueError):
+        DecompositionEngine(create_factory(), 20, clusters=0, max_generations=5)
+    with pytest.raises(ValueError):
+        DecompositionEngine(create_factory(), 20)
+
+
+def test_partition_covers_customers_and_fleet():
+    engine = DecompositionEngine(create_factory(), 20, clusters=2, max_generations=5)
+
+    engine.partition()
+
+    assert sorted(customer for customers in engine.customers for customer in customers) == list(range(1, 61))
+    assert sorted(vehicle for vehicles in engine.vehicles for vehicle in vehicles) == [0, 1, 2, 3]
+    assert sorted(len(customers) for customers in engine.customers) == [30, 30]
+    assert set(engine.boundary()) <= set(range(1, 61))
+
+
+def test_partition_rejects_clusters_whose_vehicles_cannot_carry_a_customer():
+    x, y = two_blobs(20)
+    # One customer of each blob needs the large vehicle, but there is only one
+    nodes = [Node(identifier=0, x=0, y=0)] + [Node(identifier=i + 1, x=float(x[i]), y=float(y[i]),
+                                                   demand=45 if i in (0, 10) else 1) for i in range(20)]
+    factory = VrpFactory(Graph(nodes), 20, 2, fleet=Fleet([50, 10], 10000), seed=3)
+    engine = DecompositionEngine(factory, 20, clusters=2, max_generations=5)
+
+    with pytest.raises(ValueError, match="carry at most 10"):
+        engine.partition()
+
+
+@pytest.mark.timeout(60)
+def test_clusters_are_solved_stitched_and_repaired():
+    factory = create_factory()
+    engine = DecompositionEngine(factory, 20, method="kmeans", clusters=2, workers=2, max_generations=5)
+    engine.start()
+    try:
+        solved = []
+        while not engine.done():
+            solved += engine.poll()
+            time.sleep(0.05)
+        best = engine.result()
+    finally:
+        engine.shutdown()
+
+    assert sorted(cluster for cluster, _, _ in solved) == [0, 1]
+    assert engine.generations() == [5, 5]
+    assert sorted(best.customers(0).tolist()) == list(range(1, 61))
+    assert best.number_vehicles == 4 and best.fitness is not None
+    # The repair never worsens the stitched routes
+    genomes = [genome for _, _, genome in sorted(solved, key=lambda update: update[0])]
+    stitched = stitch(factory.fleet, 0, engine.vehicles, genomes)
+    factory.create_vrp().evaluate_population([stitched])
+    assert best.fitness <= stitched.fitness
+
+
+def test_assign_to_depots():
+    distances = np.array([[1.0, 2.0, 5.0, 9.0], [4.0, 2.5, 6.0, 1.0]])
+    demands = np.array([3, 3, 3, 3])
+
+    assert assign_to_depots(distances, demands).tolist() == [0, 0, 0, 1]
+    # The customer with the smallest regret (customer 1) is moved when the nearest depot is full
+    assert assign_to_depots(distances, demands, np.array([6, 6])).tolist() == [0, 1, 0, 1]
+    # Customers that fit nowhere (2 and 1, the last by regret) stay at the nearest depot
+    assert assign_to_depots(distances, demands, np.array([3, 3])).tolist() == [0, 0, 0, 1]
+
+
+def create_multi_depot_factory():
+    # Distribution center 0 in the middle, depots 1 and 2 on each side, 10 customers around each depot
+    nodes = [Node(identifier=0, x=0, y=0), Node(identifier=1, x=-100, y=0), Node(identifier=2, x=100, y=0)]
+    nodes += [Node(identifier=3 + i, x=(-100 if i < 10 else 100) + (i % 5) * 4, y=(i % 10 // 5) * 6 - 3, demand=2)
+              for i in range(20)]
+    return VrpFactory(Graph(nodes), 20, 3, vehicle_capacity=30, vehicle_autonomy=10000, seed=4)
+
+
+def test_multi_depot_invalid_settings():
+    with pytest.raises(ValueError):
+        MultiDepotEngine(create_multi_depot_factory(), 20, [], max_generations=2)
+    with pytest.raises(ValueError):
+        MultiDepotEngine(create_multi_depot_factory(), 20, [1, 2], depot_capacities=[10], max_generations=2)
+    with pytest.raises(ValueError):
+        MultiDepotEngine(create_multi_depot_factory(), 20, [0, 1, 2, 9], max_generations=2)
+    with pytest.raises(ValueError):
+        MultiDepotEngine(create_multi_depot_factory(), 20, [99], max_generations=2)
+
+
+def test_multi_depot_partition_builds_the_trunk_problem():
+    engine = MultiDepotEngine(create_multi_depot_factory(), 20, [1, 2], trunk_fleet=Fleet([50, 50], 1000),
+                              max_generations=2)
+
+    engine.partition()
+
+    assert engine.clusters == 3
+    assert engine.depots == [1, 2, 0]
+    assert engine.customers[:2] == [list(range(3, 13)), list(range(13, 23))]
+    assert engine.customers[2] == [1, 2]
+    assert sorted(vehicle for vehicles in engine.vehicles[:2] for vehicle in vehicles) == [0, 1, 2]
+    assert engine.vehicles[2] == [3, 4]
+    assert engine.fleet.capacities.tolist() == [30, 30, 30, 50, 50]
+    trunk = engine._factory(2)
+    assert trunk.depot_identifier == 0
+    assert trunk.graph.demands.tolist() == [0, 20, 20]
+
+
+def test_multi_depot_rejects_trunk_vehicles_smaller_than_a_depot_load():
+    engine = MultiDepotEngine(create_multi_depot_factory(), 20, [1, 2], trunk_fleet=Fleet([15, 15], 1000),
+                              max_generations=2)
+
+    with pytest.raises(ValueError, match="Depot 1 load \\(20\\) exceeds the capacity of every trunk vehicle"):
+        engine.start()
+    engine.shutdown()
+
+
+@pytest.mark.timeout(60)
+def test_multi_depot_solution_serves_every_customer():
+    engine = MultiDepotEngine(create_multi_depot_factory(), 20, [0, 1, 2], workers=2, max_generations=3)
+    engine.start()
+    try:
+        solved = []
+        while not engine.done():
+            solved += engine.poll()
+            time.sleep(0.05)
+        best = engine.result()
+    finally:
+        engine.shutdown()
+
+    # The distribution center serves no customer here, so it only supplies the depots
+    assert engine.depots == [1, 2, 0] and engine.customers[2] == [1, 2]
+    assert len(solved) == 3
+    routes = [best.route(vehicle).tolist() for vehicle in range(best.number_vehicles)]
+    assert best.number_vehicles == 4
+    assert all(route[0] in (1, 2) for route in routes[:3]) and routes[3][0] == 0
+    assert sorted(customer for route in routes for customer in route if customer > 2) == list(range(3, 23))
+    # Evaluated as a whole: the balance penalty spans the vehicles of every part
+    expected = Genome(best.sequence, best.offsets, best.capacities, best.autonomies, best.distances, costs=best.costs)
+    demands = engine.vrp_factory.graph.demands.copy()
+    demands[engine.vrp_factory.graph.indices_of([1, 2])] = 20
+    Fitness(engine.vrp_factory.graph, 0, demands, route_depots=True).evaluate_genomes([expected])
+    assert best.fitness == expected.fitness != sum(genome.fitness for _, _, genome in solved)
@@ -1,8 +1,20 @@
+import random
 from unittest import TestCase
 from unittest.mock import Mock
 
-from domain.graph import Node
+import numpy as np
+
+from domain import Route, Solution, Vehicle
+from domain.fleet import Fleet
+from domain.genome import Genome
+from domain.graph import Graph, Node
+from genetic_algorithm import default_problems
 from genetic_algorithm.fitness import Fitness
+from genetic_algorithm.mutation import Mutation, ReversalMove
+from vrp.adjustment.adjustment import Adjustment
+from vrp.adjustment.helper import Helper
+from vrp.route_spliter import RouteSplitter
+from vrp.vrp_builder import VrpFactory
 
 
 class TestFitness(TestCase):
@@ -114,4 +126,214 @@ class TestFitness(TestCase):
 
         expected_penalty = 0
 
-        assert penalty == expected_penalty
\ No newline at end of file
+        assert penalty == expected_penalty
+
+class TestEvaluatePopulation(TestCase):
+
+    def setUp(self):
+        rng = random.Random(42)
+        nodes = [Node(identifier=i, x=x * 3, y=y * 3, priority=rng.randint(0, 1), demand=rng.randint(1, 11))
+                 for i, (x, y) in enumerate(default_problems[15])]
+        self.graph = Graph(nodes)
+        self.vrp = VrpFactory(self.graph, population_size=50, number_vehicles=3, vehicle_capacity=20,
+                              vehicle_autonomy=5000).create_vrp()
+        self.fitness = Fitness(self.graph)
+
+    def test_matches_per_solution_fitness(self):
+        population = self.vrp.generate_initial_population()
+        scores = self.fitness.evaluate_population(population)
+        for solution, score in zip(population, scores):
+            self.vrp.fitness(solution)
+            self.assertEqual(solution.fitness, score)
+
+    def test_matches_per_solution_fitness_with_capacity_violation(self):
+        helper = Helper(self.graph, 0)
+        route = Route([0] + list(range(1, 15)) + [0])
+        route.distance = helper.calculate_distance(route)
+        solution = Solution([Vehicle(route, capacity=20), Vehicle(Route([0]), capacity=20)])
+        score = self.fitness.evaluate_population([solution])[0]
+        self.vrp.fitness(solution)
+        self.assertEqual(score, float('inf'))
+        self.assertEqual(solution.fitness, score)
+
+    def test_matches_per_solution_fitness_with_autonomy_violation(self):
+        helper = Helper(self.graph, 0)
+        route = Route([0, 1, 2, 3, 0, 4, 0])
+        route.distance = helper.calculate_distance(route)
+        solution = Solution([Vehicle(route, capacity=100, autonomy=300), Vehicle(Route([0]), capacity=100)])
+        penalty = self.fitness.calculate_autonomy_violation_penality(solution.vehicles)
+        trip = helper.calculate_distance(Route([0, 1, 2, 3, 0]))
+        last_trip = helper.calculate_distance(Route([0, 4, 0]))
+        expected = (max(trip - 300, 0) + max(last_trip - 300, 0)) * Fitness.AUTONOMY_PENALTY
+        self.assertAlmostEqual(penalty, expected, places=6)
+        self.assertGreater(penalty, 0)
+        score = self.fitness.evaluate_population([solution])[0]
+        self.vrp.fitness(solution)
+        self.assertEqual(solution.fitness, score)
+
+    def test_matches_per_solution_fitness_with_heterogeneous_fleet(self):
+        fleet = Fleet([10, 20, 40], [2000, 3000, 5000], [0.0, 0.5, 1.5])
+        vrp = VrpFactory(self.graph, population_size=20, number_vehicles=1, split_mode="optimal",
+                         fleet=fleet).create_vrp()
+        population = vrp.generate_initial_population()
+        scores = self.fitness.evaluate_population(population)
+        for solution, score in zip(population, scores):
+            self.assertEqual(solution.capacities.tolist(), [10, 20, 40])
+            self.assertEqual(solution.costs.tolist(), [0.0, 0.5, 1.5])
+            self.assertGreater(self.fitness.calculate_operating_cost(solution.vehicles), 0)
+            vrp.fitness(solution)
+            self.assertEqual(solution.fitness, score)
+
+    def test_empty_population(self):
+        self.assertEqual(len(self.fitness.evaluate_population([])), 0)
+
+    def test_evaluate_move_matches_full_evaluation(self):
+        splitter = RouteSplitter(0, 3)
+        adjustment = Adjustment(Helper(self.graph, 0))
+        population = self.vrp.generate_initial_population()
+        self.fitness.evaluate_genomes(population)
+        incremental = 0
+        for genome in population:
+            customers = genome.customers(0)
+            for first in range(len(customers) - 1):
+                move = ReversalMove(first, first + 1 + (first * 7) % (len(customers) - first - 1))
+                moved = self.fitness.evaluate_move(genome, move)
+                reversed_customers = customers.copy()
+                reversed_customers[move.first:move.last + 1] = customers[move.first:move.last + 1][::-1]
+                expected = adjustment.apply(Genome(*splitter.split_customers(reversed_customers), 20,
+                                                   genome.autonomies[0].item()))
+                if moved is None:
+                    continue
+                incremental += 1
+                self.fitness.evaluate_genomes([expected])
+                self.assertEqual(moved.flatten_routes(), expected.flatten_routes())
+                self.assertAlmostEqual(moved.fitness, expected.fitness, places=6)
+                self.assertEqual(moved.penalty, expected.penalty)
+        self.assertGreater(incremental, 0)
+
+    def test_evaluate_move_matches_the_mutation_and_adjustment(self):
+        adjustment = Adjustment(Helper(self.graph, 0))
+        incremental, inner_trips = 0, 0
+        for autonomy in (2500, float("inf")):
+            vrp = VrpFactory(self.graph, population_size=50, number_vehicles=3, vehicle_capacity=20,
+                             vehicle_autonomy=autonomy).create_vrp()
+            mutation = Mutation(1.0, RouteSplitter(0, 3), random.Random(3))
+            population = vrp.generate_initial_population()
+            self.fitness.evaluate_genomes(population)
+            for genome in population:
+                for _ in range(20):
+                    move = mutation.propose(genome)
+                    moved = self.fitness.evaluate_move(genome, move)
+                    if moved is None:
+                        continue
+                    expected = adjustment.apply(mutation.apply_move(genome, move))
+                    self.fitness.evaluate_genomes([expected])
+                    self.assertEqual(moved.flatten_routes(), expected.flatten_routes())
+                    self.assertAlmostEqual(moved.fitness, expected.fitness, places=6)
+                    self.assertEqual(moved.penalty, expected.penalty)
+                    incremental += 1
+                    # Neither the first nor the last trip of its vehicle
+                    vehicle = int(np.searchsorted(genome.offsets, move.positions[0], side="right")) - 1
+                    route = genome.route(vehicle)
+                    position = move.positions[0] - genome.offsets[vehicle]
+                    inner_trips += (np.count_nonzero(route[:position] == 0) > 1
+                                    and np.count_nonzero(route[position:] == 0) > 1)
+        self.assertGreater(incremental, 100)
+        self.assertGreater(inner_trips, 0)
+
+    def test_evaluate_move_falls_back_across_vehicles(self):
+        genome = self.vrp.generate_initial_population()[0]
+        self.assertIsNone(self.fitness.evaluate_move(genome, ReversalMove(0, 1)))
+        self.fitness.evaluate_genomes([genome])
+        self.assertIsNone(self.fitness.evaluate_move(genome, ReversalMove(0, len(genome.customers(0)) - 1)))
+
+
+class TestRouteDepots(TestCase):
+
+    def setUp(self):
+        # Distribution center 0, depot 1 and customers 2-4 on a line
+        nodes = [Node(identifier=i, x=10 * i, y=0, priority=0, demand=3) for i in range(5)]
+        self.graph = Graph(nodes)
+
+    def test_trips_end_at_the_depot_of_each_route(self):
+        # Depot 1 serves 2 and 3 in two trips; the trunk vehicle brings the load of depot 1 (6) from 0
+        genome = Genome([1, 2, 1, 3, 1, 0, 1, 0], [0, 5, 8], [3, 6], [1000, 1000], [0.0, 0.0])
+        demands = self.graph.demands.copy()
+        demands[1] = 6
+        Fitness(self.graph, 0, demands, route_depots=True).evaluate_genomes([genome])
+
+        self.assertEqual(genome.penalty, 0)
+        # Distances 60 and 20, and a balance penalty of 20 per vehicle
+        self.assertAlmostEqual(genome.fitness, 60 + 20 + 40)
+
+    def test_depot_loads_are_checked_against_the_trunk_vehicle(self):
+        genome = Genome([1, 2, 1, 0, 1, 0], [0, 3, 6], [3, 5], [1000, 1000], [0.0, 0.0])
+        demands = self.graph.demands.copy()
+        demands[1] = 6
+        Fitness(self.graph, 0, demands, route_depots=True).evaluate_genomes([genome])
+
+        self.assertEqual(genome.fitness, float("inf"))
+
+
+class TestAutonomyMove(TestCase):
+
+    def setUp(self):
+        nodes = [Node(identifier=i, x=10 * i, y=0, priority=0, demand=1) for i in range(5)]
+        self.fitness = Fitness(Graph(nodes))
+
+    def evaluated(self, sequence, offsets, autonomy, costs=0.0, capacity=100):
+        distances = [float(sum(abs(a - b) * 10 for a, b in zip(sequence[start:end], sequence[start + 1:end])))
+                     for start, end in zip(offsets, offsets[1:])]
+        genome = Genome(sequence, offsets, capacity, autonomy, distances, costs=costs)
+        self.fitness.evaluate_genomes([genome])
+        return genome
+
+    def test_move_within_autonomy_is_incremental(self):
+        # 0 1 2 3 0 (60) becomes 0 2 1 3 0 (80)
+        moved = self.fitness.evaluate_move(self.evaluated([0, 1, 2, 3, 0], [0, 5], 100), ReversalMove(0, 1))
+
+        self.assertEqual(moved.flatten_routes(), [0, 2, 1, 3, 0])
+        self.assertAlmostEqual(moved.distances[0], 80.0)
+        self.assertEqual(moved.penalty, 0)
+
+    def test_move_beyond_autonomy_falls_back(self):
+        genome = self.evaluated([0, 1, 2, 3, 0], [0, 5], 70)
+
+        self.assertIsNone(self.fitness.evaluate_move(genome, ReversalMove(0, 1)))
+
+    def test_move_before_another_trip_falls_back(self):
+        # A shorter first trip could take in the customer of the next one
+        genome = self.evaluated([0, 2, 1, 0, 4, 0], [0, 6], 100)
+
+        self.assertIsNone(self.fitness.evaluate_move(genome, ReversalMove(0, 1)))
+
+    def test_move_starting_a_trip_is_incremental_when_the_split_is_kept(self):
+        # The new first customer (4) does not fit in the full first trip
+        genome = self.evaluated([0, 1, 2, 0, 3, 4, 0], [0, 7], 100, capacity=2)
+        moved = self.fitness.evaluate_move(genome, ReversalMove(2, 3))
+
+        self.assertEqual(moved.flatten_routes(), [0, 1, 2, 0, 4, 3, 0])
+        self.assertAlmostEqual(moved.fitness, self.evaluated([0, 1, 2, 0, 4, 3, 0], [0, 7], 100, capacity=2).fitness)
+
+    def test_move_starting_a_trip_that_fits_in_the_previous_one_falls_back(self):
+        genome = self.evaluated([0, 1, 0, 2, 3, 0], [0, 6], 60, capacity=2)
+
+        # The first trip could take in 3, within its capacity and range (10 + 20 + 30)
+        self.assertIsNone(self.fitness.evaluate_move(genome, ReversalMove(1, 2)))
+
+    def test_move_keeps_the_trips_of_a_genome_that_is_not_split_by_the_adjustment(self):
+        # The split of the tour would serve every customer in one trip: the incremental evaluation keeps two
+        genome = self.evaluated([0, 1, 0, 2, 3, 4, 0], [0, 7], float("inf"))
+        moved = self.fitness.evaluate_move(genome, ReversalMove(2, 3))
+
+        self.assertEqual(moved.flatten_routes(), [0, 1, 0, 2, 4, 3, 0])
+        self.assertAlmostEqual(moved.fitness, self.evaluated([0, 1, 0, 2, 4, 3, 0], [0, 7], float("inf")).fitness)
+
+    def test_move_updates_operating_cost(self):
+        genome = self.evaluated([0, 1, 2, 3, 0, 0, 4, 0], [0, 5, 8], float("inf"), [2.0, 0.5])
+        moved = self.fitness.evaluate_move(genome, ReversalMove(0, 1))
+        expected = self.evaluated(moved.flatten_routes(), [0, 5, 8], float("inf"), [2.0, 0.5])
+
+        self.assertAlmostEqual(moved.fitness, expected.fitness)
+        # Distance +20, operating cost +20 * 2.0 and balance -20 (both vehicles at 80)
+        self.assertAlmostEqual(moved.fitness - genome.fitness, 20 + 20 * 2.0 - 20)
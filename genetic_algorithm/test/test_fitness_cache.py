@@ -0,0 +1,41 @@
+from unittest import TestCase
+
+from domain.genome import Genome
+from genetic_algorithm.fitness_cache import FitnessCache
+
+
+def evaluated(sequence, offsets, fitness):
+    return Genome(sequence, offsets, 10, 100, fitness=fitness, penalty=0.0)
+
+
+class TestFitnessCache(TestCase):
+
+    def test_key_includes_the_split(self):
+        cache = FitnessCache(10)
+        cache.store(evaluated([0, 1, 2, 0, 0, 3, 0], [0, 4, 7], 5.0))
+        self.assertFalse(cache.lookup(Genome([0, 1, 0, 0, 2, 3, 0], [0, 3, 7], 10, 100)))
+        same = Genome([0, 1, 2, 0, 0, 3, 0], [0, 4, 7], 10, 100)
+        self.assertTrue(cache.lookup(same))
+        self.assertEqual(same.fitness, 5.0)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = FitnessCache(2)
+        cache.store(evaluated([0, 1, 0], [0, 3], 1.0))
+        cache.store(evaluated([0, 2, 0], [0, 3], 2.0))
+        self.assertTrue(cache.lookup(Genome([0, 1, 0], [0, 3], 10, 100)))
+        cache.store(evaluated([0, 3, 0], [0, 3], 3.0))
+
+        self.assertEqual(len(cache), 2)
+        self.assertFalse(cache.lookup(Genome([0, 2, 0], [0, 3], 10, 100)))
+        self.assertTrue(cache.lookup(Genome([0, 1, 0], [0, 3], 10, 100)))
+
+    def test_statistics(self):
+        cache = FitnessCache(4)
+        cache.store(evaluated([0, 1, 0], [0, 3], 1.0))
+        cache.lookup(Genome([0, 1, 0], [0, 3], 10, 100))
+        cache.lookup(Genome([0, 2, 0], [0, 3], 10, 100))
+        self.assertEqual(cache.statistics(), {"size": 1, "max_size": 4, "hits": 1, "misses": 1, "hit_rate": 0.5})
+
+    def test_invalid_size(self):
+        with self.assertRaises(ValueError):
+            FitnessCache(0)
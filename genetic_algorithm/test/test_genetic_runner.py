@@ -1,7 +1,10 @@
 import unittest
 import asyncio
+import random
+import numpy as np
 from unittest.mock import AsyncMock, MagicMock, patch
 from genetic_algorithm.genetic_runner import GeneticAlgorithmRunner
+from genetic_algorithm.profiler import GenerationProfiler
 from domain.solution import Solution
 
 class DummyVRP:
@@ -11,6 +14,8 @@ class DummyVRP:
         self._crossover_called = False
         self._mutate_called = False
         self._population = [Solution([])]
+        self.profiler = GenerationProfiler()
+        self.random = random.Random(0)
     def create_vrp(self):
         return self
     def generate_initial_population(self):
@@ -18,9 +23,16 @@ class DummyVRP:
     def fitness(self, individual):
         self._fitness_called = True
         individual.fitness = 1.0
+    def evaluate_population(self, population):
+        for individual in population:
+            self.fitness(individual)
+    def cache_statistics(self):
+        return None
     def sort_population(self, population):
         self._sort_called = True
         return population
+    def select_parents(self, population, number_pairs):
+        return np.array([[0, 1]] * number_pairs)
     def crossover(self, p1, p2):
         self._crossover_called = True
         return p1, p2
@@ -51,6 +63,16 @@ class TestGeneticAlgorithmRunner(unittest.IsolatedAsyncioTestCase):
         await self.runner.stop()
         self.assertFalse(self.runner.running)
 
+    async def test_restart_waits_for_previous_loop(self):
+        await self.runner.start()
+        first_task = self.runner.task
+        await self.runner.stop()
+        await self.runner.start()
+        self.assertTrue(first_task.done())
+        self.assertIsNot(self.runner.task, first_task)
+        await self.runner.stop()
+        await self.runner.task
+
     async def test_pause_and_resume(self):
         await self.runner.start()
         await self.runner.pause()
@@ -71,6 +93,18 @@ class TestGeneticAlgorithmRunner(unittest.IsolatedAsyncioTestCase):
         self.assertIsNotNone(runner.best_solution)
         callback.assert_called()
 
+    async def test_loop_applies_local_search_to_sorted_population(self):
+        local_search = MagicMock()
+        local_search.intensify.side_effect = lambda population: population
+        runner = GeneticAlgorithmRunner(self.vrp_factory, population_size=2, local_search=local_search)
+        runner.running = True
+        task = asyncio.create_task(runner.loop())
+        await asyncio.sleep(0.05)
+        runner.running = False
+        await task
+        local_search.intensify.assert_called()
+        self.assertTrue(runner.status()["local_search"])
+
     async def test_on_new_best_solution_callback(self):
         callback = AsyncMock()
         runner = GeneticAlgorithmRunner(self.vrp_factory, population_size=2, on_new_best_solution=callback)
@@ -130,8 +164,9 @@ class TestGeneticAlgorithmRunner(unittest.IsolatedAsyncioTestCase):
         vrp.create_vrp.return_value = vrp
         vrp.generate_initial_population.return_value = [Solution([]) for _ in range(2)]
         runner = GeneticAlgorithmRunner(vrp, population_size=2)
-        runner.vrp.fitness = MagicMock()
+        runner.vrp.evaluate_population = MagicMock()
         runner.vrp.sort_population = MagicMock(return_value=runner.population)
+        runner.vrp.select_parents = MagicMock(return_value=np.array([[0, 1]]))
         runner.vrp.crossover = MagicMock(return_value=(Solution([]), Solution([])))
         runner.vrp.mutate = MagicMock(side_effect=lambda x: x)
         runner.running = True
@@ -142,7 +177,7 @@ class TestGeneticAlgorithmRunner(unittest.IsolatedAsyncioTestCase):
             runner.running = False
             await task
         asyncio.run(run())
-        runner.vrp.fitness.assert_called()
+        runner.vrp.evaluate_population.assert_called()
         runner.vrp.sort_population.assert_called()
         runner.vrp.crossover.assert_called()
         runner.vrp.mutate.assert_called()
@@ -157,3 +192,84 @@ class TestGeneticAlgorithmRunner(unittest.IsolatedAsyncioTestCase):
         await task
         self.assertFalse(runner.running)
         self.assertTrue(runner.paused)
+
+    async def test_metrics_with_profiling(self):
+        from genetic_algorithm.test.test_parallel_engine import create_vrp_factory
+        factory = create_vrp_factory()
+        factory.profiling = True
+        runner = GeneticAlgorithmRunner(factory, population_size=20)
+        runner.running = True
+        task = asyncio.create_task(runner.loop())
+        while runner.profiler.generations < 3:
+            await asyncio.sleep(0)
+        runner.running = False
+        await task
+
+        metrics = runner.metrics()
+        self.assertTrue(metrics["enabled"])
+        self.assertGreaterEqual(metrics["generations"], 3)
+        self.assertGreater(metrics["evaluations"], 0)
+        for section in ("fitness", "sort", "selection", "crossover", "mutation"):
+            self.assertGreater(metrics["sections"][section]["total"], 0.0)
+        self.assertEqual(sum(metrics["histograms"]["generation"].values()), metrics["generations"])
+        self.assertTrue(0.0 < metrics["diversity"] <= 1.0)
+
+    async def run_until(self, runner, generation):
+        runner.running = True
+        task = asyncio.create_task(runner.loop())
+        while runner.generation < generation:
+            await asyncio.sleep(0)
+        runner.running = False
+        await task
+
+    async def test_restored_run_follows_the_uninterrupted_one(self):
+        import tempfile, os
+        from genetic_algorithm.checkpoint import load_checkpoint, save_checkpoint
+        from genetic_algorithm.test.test_parallel_engine import create_vrp_factory
+
+        def factory(seed):
+            vrp_factory = create_vrp_factory()
+            vrp_factory.random.seed(seed)
+            return vrp_factory
+
+        uninterrupted = GeneticAlgorithmRunner(factory(5), population_size=20)
+        await self.run_until(uninterrupted, 8)
+
+        first = GeneticAlgorithmRunner(factory(5), population_size=20)
+        await self.run_until(first, 4)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "run.npz")
+            save_checkpoint(path, first.checkpoint())
+            resumed = GeneticAlgorithmRunner(factory(99), population_size=20)
+            resumed.restore(load_checkpoint(path))
+        await self.run_until(resumed, 8)
+
+        self.assertEqual(resumed.generation, 8)
+        self.assertEqual(resumed.best_solution.fitness, uninterrupted.best_solution.fitness)
+        self.assertEqual([genome.sequence.tolist() for genome in resumed.population],
+                         [genome.sequence.tolist() for genome in uninterrupted.population])
+
+    async def test_mixed_fleet_gives_heavy_customers_to_large_vehicles(self):
+        from domain.fleet import Fleet
+        from domain.graph import Graph, Node
+        from vrp.vrp_builder import VrpFactory
+
+        rng = random.Random(3)
+        nodes = [Node(identifier=0, x=150, y=150)] + [
+            Node(identifier=i, x=rng.uniform(0, 300), y=rng.uniform(0, 300), demand=rng.randint(1, 11))
+            for i in range(1, 40)]
+        fleet = Fleet.from_definitions([{"capacity": 5, "autonomy": 5000, "count": 2},
+                                        {"capacity": 40, "autonomy": 5000, "count": 2}])
+        for split_mode in ("equal", "optimal"):
+            with self.subTest(split_mode=split_mode):
+                vrp_factory = VrpFactory(Graph(nodes), 20, 4, fleet=fleet, split_mode=split_mode, seed=1)
+                runner = GeneticAlgorithmRunner(vrp_factory, population_size=20,
+                                                local_search=vrp_factory.create_local_search(time_budget=0.01))
+                await self.run_until(runner, 15)
+
+                best = runner.best_solution
+                self.assertTrue(np.isfinite(best.fitness))
+                self.assertEqual(sorted(best.customers(0).tolist()), list(range(1, 40)))
+                for vehicle in range(best.number_vehicles):
+                    demands = vrp_factory.graph.demands[best.route(vehicle)]
+                    self.assertLessEqual(demands.max(), best.capacities[vehicle])
@@ -1,6 +1,7 @@
 from unittest import TestCase
 from domain.graph import Node, Graph
 from genetic_algorithm import default_problems
+from genetic_algorithm.construction import CONSTRUCTION_HEURISTICS
 from genetic_algorithm.initial_population import InitialPopulationGenerator
 from vrp.adjustment.helper import Helper
 from vrp.adjustment.adjustment import Adjustment
@@ -29,7 +30,75 @@ class TestInitialPopulationGenerator(TestCase):
         self.assertEqual(len(population), self.POPULATION_SIZE)
         for individual in population:
             self.assertIsNotNone(individual)
-            self.assertEqual(len(individual.flatten_routes()), 18)
+            customers = [c for c in individual.flatten_routes() if c != self.depot_identifier]
+            self.assertEqual(sorted(customers), list(range(1, 15)))
             self.assertTrue(len(individual.vehicles) <= self.NUMBER_VEHICLES)
             self.assertEqual(0, individual.flatten_routes()[0])
             self.assertEqual(0, individual.flatten_routes()[-1])
+
+    def test_trips_within_autonomy(self):
+        for individual in self.initialPopulationGenerator.generate():
+            for index in range(individual.number_vehicles):
+                trip = [self.depot_identifier]
+                for customer in individual.route(index).tolist()[1:]:
+                    trip.append(customer)
+                    if customer != self.depot_identifier:
+                        continue
+                    # A customer out of range even alone is served in a trip of its own
+                    if len(trip) > 3:
+                        distance = sum(self.g.get_distance(a, b) for a, b in zip(trip, trip[1:]))
+                        self.assertLessEqual(distance, self.VEHICLE_AUTONOMY)
+                    trip = [self.depot_identifier]
+
+
+class TestSeeding(TestCase):
+
+    def setUp(self):
+        import random
+
+        rng = random.Random(8)
+        nodes = [Node(identifier=0, x=50, y=50)] + [
+            Node(identifier=i, x=rng.uniform(0, 100), y=rng.uniform(0, 100), demand=1) for i in range(1, 120)]
+        self.graph = Graph(nodes, sparse=True)
+
+    def generator(self, seeding=0.5, heuristics=CONSTRUCTION_HEURISTICS, seed=3):
+        import random
+
+        return InitialPopulationGenerator(self.graph, 12, Adjustment(Helper(self.graph, 0)), 200, 10000, 1,
+                                          rng=random.Random(seed), seeding=seeding, neighbors=5, heuristics=heuristics)
+
+    def tour_length(self, tour):
+        return sum(self.graph.get_distance(a, b) for a, b in zip(tour, tour[1:]))
+
+    def test_every_heuristic_visits_every_customer_once(self):
+        for heuristic in CONSTRUCTION_HEURISTICS:
+            with self.subTest(heuristic=heuristic):
+                for tour in self.generator(heuristics=(heuristic,)).seed_tours(4):
+                    self.assertEqual(sorted(tour), list(range(1, 120)))
+
+    def test_seeded_share_of_population(self):
+        population = self.generator().generate()
+        lengths = [self.tour_length(genome.customers(0).tolist()) for genome in population]
+
+        self.assertEqual(len(population), 12)
+        # Two individuals of each heuristic, far shorter than the random ones
+        self.assertLess(max(lengths[:6]), min(lengths[6:]))
+
+    def test_first_tour_of_each_heuristic_is_deterministic(self):
+        first = self.generator(seed=1).seed_tours(6)
+        second = self.generator(seed=2).seed_tours(6)
+
+        self.assertEqual([first[0], first[2], first[4]], [second[0], second[2], second[4]])
+        self.assertNotEqual([first[1], first[3], first[5]], [second[1], second[3], second[5]])
+
+    def test_same_seed_same_population(self):
+        first = [genome.sequence.tolist() for genome in self.generator(seed=5).generate()]
+        second = [genome.sequence.tolist() for genome in self.generator(seed=5).generate()]
+
+        self.assertEqual(first, second)
+
+    def test_invalid_options(self):
+        with self.assertRaises(ValueError):
+            self.generator(seeding=1.5)
+        with self.assertRaises(ValueError):
+            self.generator(heuristics=("greedy",))
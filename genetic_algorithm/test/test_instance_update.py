@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+import genetic_algorithm  # noqa: F401 (loads the operators before the VRP package)
+from domain.fleet import Fleet
+from domain.genome import Genome
+from domain.graph import Graph, Node
+from genetic_algorithm.instance_update import drop_customers, insert_customers, update_instance
+from vrp.vrp_builder import VrpFactory
+
+
+def line_graph():
+    # Depot 0 at the origin, customers 1..4 on the x axis and customer 5 above customer 3
+    return Graph([Node(identifier=0, x=0, y=0)] + [Node(identifier=i, x=10 * i, y=0, demand=2) for i in range(1, 5)]
+                 + [Node(identifier=5, x=30, y=40, demand=2)])
+
+
+def test_drop_customers():
+    genome = Genome([0, 1, 2, 0, 0, 3, 0, 0, 4, 0], [0, 4, 7, 10], 10, 100)
+
+    dropped = drop_customers(genome, [2, 3])
+
+    assert dropped.sequence.tolist() == [0, 1, 0, 0, 0, 0, 4, 0]
+    assert dropped.offsets.tolist() == [0, 3, 5, 8]
+    assert dropped.fitness is None
+
+
+def test_insert_customers_at_the_cheapest_position():
+    graph = line_graph()
+    graph.add_nodes([Node(identifier=6, x=25, y=1, demand=2), Node(identifier=7, x=35, y=41, demand=2)])
+    genome = Genome([0, 1, 0, 0, 2, 3, 4, 5, 0], [0, 3, 9], 10, 1000)
+
+    inserted = insert_customers(genome, [6, 7], graph)
+
+    assert inserted.sequence.tolist() == [0, 1, 0, 0, 2, 6, 3, 4, 7, 5, 0]
+    assert inserted.offsets.tolist() == [0, 3, 11]
+
+
+def test_insert_customers_skips_vehicles_without_capacity():
+    graph = line_graph()
+    graph.add_node(Node(identifier=6, x=10, y=1, demand=8))
+    genome = Genome([0, 1, 0, 0, 4, 0], [0, 3, 6], [5, 10], 1000)
+
+    assert insert_customers(genome, [6], graph).sequence.tolist() == [0, 1, 0, 0, 6, 4, 0]
+
+
+def create_factory():
+    return VrpFactory(line_graph(), 10, 2, vehicle_capacity=6, vehicle_autonomy=1000, seed=2)
+
+
+def test_update_instance_repairs_the_population():
+    factory = create_factory()
+    population = factory.create_vrp().generate_initial_population()
+
+    updated, repaired = update_instance(factory, population, added=[Node(identifier=9, x=20, y=5, demand=3)],
+                                        removed=[2], changed=[{"identifier": 4, "demand": 5, "priority": 1}])
+
+    assert len(repaired) == len(population)
+    for genome in repaired:
+        assert sorted(genome.customers(0).tolist()) == [1, 3, 4, 5, 9]
+        assert genome.number_vehicles == 2 and genome.fitness is None
+    updated.create_vrp().evaluate_population(repaired)
+    assert all(genome.fitness is not None for genome in repaired)
+    assert updated.graph.get_node(4).priority == 1 and updated.graph.distance_matrix.shape == (7, 7)
+    # The graph of the factory may be shared, so it is left unchanged
+    assert factory.graph.get_node(4).demand == 2 and factory.graph.distance_matrix.shape == (6, 6)
+    assert sorted(population[0].customers(0).tolist()) == [1, 2, 3, 4, 5]
+
+
+def test_update_instance_moves_customers_that_no_longer_fit():
+    graph = line_graph()
+    factory = VrpFactory(graph, 4, 2, fleet=Fleet([4, 12], 1000), seed=2)
+    genome = Genome([0, 1, 0, 0, 2, 3, 4, 5, 0], [0, 3, 9], [4, 12], 1000)
+
+    _, (repaired,) = update_instance(factory, [genome], changed=[{"identifier": 1, "demand": 6}])
+
+    assert 1 in repaired.route(1).tolist() and set(repaired.route(0).tolist()) == {0}
+
+
+def test_update_instance_rejects_invalid_changes():
+    factory = create_factory()
+    population = factory.create_vrp().generate_initial_population()
+
+    with pytest.raises(ValueError, match="Node 0 is not a customer"):
+        update_instance(factory, population, removed=[0])
+    with pytest.raises(ValueError, match="Node 7 is not a customer"):
+        update_instance(factory, population, changed=[{"identifier": 7, "demand": 1}])
+    with pytest.raises(ValueError, match="already exists"):
+        update_instance(factory, population, added=[Node(identifier=3, x=1, y=1)])
+    with pytest.raises(ValueError, match="exceeds vehicle capacity"):
+        update_instance(factory, population, changed=[{"identifier": 3, "demand": 50}])
+    np.testing.assert_array_equal(factory.graph.demands, [0, 2, 2, 2, 2, 2])
@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from domain.fleet import Fleet
+from domain.genome import Genome
+from genetic_algorithm import GeneticAlgorithmRunner
+from genetic_algorithm.island_engine import MAX_ISLANDS, IslandEngine, _read_slot, _slot_dtype, _write_slot
+from genetic_algorithm.test.test_parallel_engine import create_vrp_factory
+
+
+def test_slot_round_trip():
+    slots = np.zeros(1, dtype=_slot_dtype(2, 12, 2))
+    genomes = [Genome([0, 1, 2, 0, 0, 3, 0], [0, 4, 7], 20, 600, [10.0, 5.0], fitness=15.0, penalty=0.0),
+               Genome([0, 3, 0, 0, 2, 1, 0], [0, 3, 7], 20, 600, [6.0, 9.0], fitness=16.0)]
+    _write_slot(slots[0], genomes, generation=7)
+
+    decoded = _read_slot(slots[0], Fleet([20, 10], 600, [0.0, 0.5]))
+
+    assert (int(slots[0]["version"]), int(slots[0]["generation"])) == (1, 7)
+    assert [genome.sequence.tolist() for genome in decoded] == [genome.sequence.tolist() for genome in genomes]
+    assert [genome.offsets.tolist() for genome in decoded] == [[0, 4, 7], [0, 3, 7]]
+    assert decoded[0].distances.tolist() == [10.0, 5.0]
+    assert (decoded[0].capacities.tolist(), decoded[1].costs.tolist()) == ([20, 10], [0.0, 0.5])
+    assert (decoded[0].fitness, decoded[0].penalty, decoded[1].penalty) == (15.0, 0.0, None)
+
+
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        IslandEngine(create_vrp_factory(), 20, islands=0)
+    with pytest.raises(ValueError):
+        IslandEngine(create_vrp_factory(), 20, islands=MAX_ISLANDS + 1)
+    with pytest.raises(ValueError):
+        IslandEngine(create_vrp_factory(), 20, migration_size=20)
+    with pytest.raises(ValueError):
+        IslandEngine(create_vrp_factory(), 20, topology="star")
+
+
+@pytest.mark.timeout(60)
+def test_islands_evolve_and_publish_their_best():
+    engine = IslandEngine(create_vrp_factory(), 20, islands=2, migration_interval=3, migration_size=2,
+                          topology="random")
+    engine.start()
+    try:
+        updates = {}
+        deadline = time.time() + 30
+        while len(updates) < 2 and time.time() < deadline:
+            for island, generation, best in engine.poll():
+                updates[island] = (generation, best)
+            time.sleep(0.1)
+        while min(engine.generations()) < 6 and time.time() < deadline:
+            time.sleep(0.1)
+    finally:
+        engine.shutdown()
+
+    assert set(updates) == {0, 1}
+    for generation, best in updates.values():
+        assert generation >= 1
+        assert best.fitness is not None
+        assert best.number_vehicles == 2
+
+
+@pytest.mark.timeout(60)
+def test_runner_reports_global_best_of_islands():
+    events = []
+
+    async def collect(event):
+        events.append(event)
+
+    async def run():
+        runner = GeneticAlgorithmRunner(create_vrp_factory(), 20, on_new_best_solution=collect,
+                                        execution_mode="islands", islands=2, migration_interval=2)
+        await runner.start()
+        deadline = time.time() + 30
+        while not events and time.time() < deadline:
+            await asyncio.sleep(0.1)
+        await runner.stop()
+        await runner.task
+        return runner
+
+    runner = asyncio.run(run())
+
+    assert events and events[0]["event"] == "new_best_solution"
+    assert events[-1]["best_fitness"] == round(runner.best_solution.fitness, 2)
+    assert runner.engine is None
@@ -0,0 +1,109 @@
+import random
+import time
+
+import genetic_algorithm  # noqa: F401 (loads the operators before the VRP package)
+from domain import Genome
+from domain.fleet import Fleet
+from domain.graph import Graph, Node
+from vrp.vrp_builder import VrpFactory
+
+
+def build_factory(number_nodes=30, number_vehicles=3):
+    rng = random.Random(7)
+    nodes = [Node(identifier=i, x=rng.uniform(0, 300), y=rng.uniform(0, 300), priority=rng.randint(0, 1),
+                  demand=rng.randint(1, 5)) for i in range(number_nodes)]
+    return VrpFactory(Graph(nodes), 20, number_vehicles, vehicle_autonomy=5000, vehicle_capacity=40)
+
+
+def test_improve_never_worsens_and_keeps_all_customers():
+    random.seed(1)
+    factory = build_factory()
+    vrp = factory.create_vrp()
+    local_search = factory.create_local_search(neighbors=5, time_budget=0.2)
+    genome = vrp.generate_initial_population()[0]
+    vrp.evaluate_population([genome])
+
+    improved = local_search.improve(genome, time.perf_counter() + 0.2)
+
+    assert improved.fitness <= genome.fitness
+    assert sorted(improved.customers(0).tolist()) == sorted(genome.customers(0).tolist())
+    # The fitness kept by the local search matches a fresh evaluation of the same routes
+    check = Genome(improved.sequence, improved.offsets, improved.capacities, improved.autonomies, improved.distances)
+    vrp.evaluate_population([check])
+    assert check.fitness == improved.fitness
+
+
+def test_improve_stops_at_a_local_optimum():
+    factory = build_factory()
+    vrp = factory.create_vrp()
+    local_search = factory.create_local_search(neighbors=5)
+    genome = vrp.generate_initial_population()[0]
+    vrp.evaluate_population([genome])
+
+    start = time.perf_counter()
+    improved = local_search.improve(genome, start + 60)
+
+    assert time.perf_counter() - start < 30
+    assert improved.fitness < genome.fitness
+    # No move of the neighborhoods improves a local optimum
+    assert local_search.improve(improved, time.perf_counter() + 60) is improved
+
+
+def test_intensify_only_touches_the_elite():
+    random.seed(2)
+    factory = build_factory()
+    vrp = factory.create_vrp()
+    local_search = factory.create_local_search(neighbors=5, time_budget=0.1, elite_size=2)
+    population = vrp.generate_initial_population()
+    vrp.evaluate_population(population)
+    population = vrp.sort_population(population)
+
+    intensified = local_search.intensify(population)
+
+    assert len(intensified) == len(population)
+    assert intensified[2:] == population[2:]
+    assert intensified[0].fitness <= population[0].fitness
+    assert intensified[1].fitness <= population[1].fitness
+
+
+def test_zero_time_budget_returns_population_unchanged():
+    factory = build_factory()
+    vrp = factory.create_vrp()
+    population = vrp.generate_initial_population()
+    vrp.evaluate_population(population)
+    assert factory.create_local_search(time_budget=0).intensify(population) == population
+
+
+def test_improve_can_focus_on_some_customers():
+    random.seed(3)
+    factory = build_factory()
+    vrp = factory.create_vrp()
+    local_search = factory.create_local_search(neighbors=5)
+    genome = vrp.generate_initial_population()[0]
+    vrp.evaluate_population([genome])
+
+    assert local_search.improve(genome, time.perf_counter() + 0.1, customers=[]) is genome
+    improved = local_search.improve(genome, time.perf_counter() + 0.1, customers=[4, 9, 17])
+    assert improved.fitness <= genome.fitness
+    assert sorted(improved.customers(0).tolist()) == sorted(genome.customers(0).tolist())
+
+
+def test_improve_keeps_customers_in_vehicles_able_to_carry_them():
+    rng = random.Random(5)
+    nodes = [Node(identifier=0, x=150, y=150)] + [
+        Node(identifier=i, x=rng.uniform(0, 300), y=rng.uniform(0, 300), demand=rng.randint(1, 11))
+        for i in range(1, 30)]
+    fleet = Fleet.from_definitions([{"capacity": 5, "autonomy": 5000, "count": 2},
+                                    {"capacity": 40, "autonomy": 5000, "count": 2}])
+    factory = VrpFactory(Graph(nodes), 10, 4, fleet=fleet, split_mode="optimal", seed=4)
+    vrp = factory.create_vrp()
+    local_search = factory.create_local_search(neighbors=8)
+    genome = vrp.generate_initial_population()[0]
+    vrp.evaluate_population([genome])
+
+    improved = local_search.improve(genome, time.perf_counter() + 0.2)
+
+    assert improved.fitness <= genome.fitness < float("inf")
+    assert sorted(improved.customers(0).tolist()) == list(range(1, 30))
+    for vehicle in range(improved.number_vehicles):
+        assert factory.graph.demands[improved.route(vehicle)].max() <= improved.capacities[vehicle]
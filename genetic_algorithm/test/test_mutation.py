@@ -1,67 +1,75 @@
 from unittest import TestCase
-from unittest.mock import Mock
 
-from domain.route import Route
-from genetic_algorithm.mutation import Mutation
+from domain.genome import Genome
+from genetic_algorithm.mutation import Mutation, ReversalMove
+from vrp.route_spliter import RouteSplitter
+
+
+def create_genome(sequence, offsets):
+    return Genome(sequence, offsets, capacities=50, autonomies=100, distances=[10.0] * (len(offsets) - 1))
 
 
 class TestMutation(TestCase):
 
-    splitter = Mock()
-    splitter.split.return_value = [Route([0, 3, 2, 1, 0])]
+    splitter = RouteSplitter(depot_identifier=0, number_vehicles=1)
 
     def test_apply_no_mutation_due_to_probability(self):
         mutation = Mutation(0.0, self.splitter)
 
-        solution = Mock()
+        genome = create_genome([0, 1, 2, 3, 0], [0, 5])
 
-        mutated_solution = mutation.apply(solution)
+        mutated_genome = mutation.apply(genome)
 
-        self.assertEqual(solution, mutated_solution)
+        self.assertIs(genome, mutated_genome)
 
     def test_apply_with_mutation_due_to_probability(self):
         mutation = Mutation(1.0, self.splitter)
 
-        vehicle_mock = Mock()
-        vehicle_mock.route.customers = [0, 1, 2, 3, 0]
-        vehicle_mock.autonomy = 100
-        vehicle_mock.capacity = 50
-
-        solution = Mock()
-        solution.vehicles = [vehicle_mock]
-        solution.flatten_routes.return_value = [0, 1, 2, 3, 0]
+        genome = create_genome([0, 1, 2, 3, 0], [0, 5])
 
-        mutated_solution = mutation.apply(solution)
+        mutated_genome = mutation.apply(genome)
 
-        self.assertNotEqual(solution, mutated_solution)
-        self.assertEqual(len(mutated_solution.vehicles), 1)
-        self.assertEqual(mutated_solution.vehicles[0].route.customers[0], 0)
-        self.assertEqual(mutated_solution.vehicles[0].route.customers[-1], 0)
-        self.assertCountEqual(mutated_solution.vehicles[0].route.customers[1:-1], [1, 2, 3])
-        self.assertNotEqual(mutated_solution.vehicles[0].route.customers[1:-1], [1, 2, 3])
+        self.assertIsNot(genome, mutated_genome)
+        self.assertEqual(mutated_genome.number_vehicles, 1)
+        customers = mutated_genome.route(0).tolist()
+        self.assertEqual(customers[0], 0)
+        self.assertEqual(customers[-1], 0)
+        self.assertCountEqual(customers[1:-1], [1, 2, 3])
+        self.assertNotEqual(customers[1:-1], [1, 2, 3])
+        self.assertEqual(mutated_genome.capacities.tolist(), [50])
+        self.assertEqual(genome.flatten_routes(), [0, 1, 2, 3, 0])
 
     def test_apply_with_mutation_with_insufficient_customers(self):
         mutation = Mutation(1.0, self.splitter)
 
-        vehicle_mock = Mock()
-        vehicle_mock.route.customers = [0, 1, 0]
-        vehicle_mock.autonomy = 100
-        vehicle_mock.capacity = 50
+        genome = create_genome([0, 1, 0], [0, 3])
 
-        solution = Mock()
-        solution.vehicles = [vehicle_mock]
-        solution.flatten_routes.return_value = [0, 1, 0]
+        mutated_genome = mutation.apply(genome)
 
-        mutated_solution = mutation.apply(solution)
-
-        self.assertEqual(solution, mutated_solution)
+        self.assertIs(genome, mutated_genome)
 
     def test_apply_no_mutation_with_no_vehicles(self):
         mutation = Mutation(1.0, self.splitter)
 
-        solution = Mock()
-        solution.vehicles = []
+        genome = create_genome([], [0])
+
+        mutated_genome = mutation.apply(genome)
+
+        self.assertIs(genome, mutated_genome)
 
-        mutated_solution = mutation.apply(solution)
+    def test_propose_and_apply_move(self):
+        mutation = Mutation(1.0, RouteSplitter(depot_identifier=0, number_vehicles=2))
+
+        genome = create_genome([0, 1, 2, 0, 0, 3, 4, 0], [0, 4, 8])
+
+        move = mutation.propose(genome)
+        self.assertTrue(0 <= move.first < move.last <= 3)
+
+        moved = mutation.apply_move(genome, ReversalMove(1, 2))
+        self.assertEqual(moved.flatten_routes(), [0, 1, 3, 0, 0, 2, 4, 0])
+        self.assertIsNone(moved.fitness)
+
+    def test_propose_without_mutation(self):
+        mutation = Mutation(0.0, self.splitter)
 
-        self.assertEqual(solution, mutated_solution)
\ No newline at end of file
+        self.assertIsNone(mutation.propose(create_genome([0, 1, 2, 3, 0], [0, 5])))
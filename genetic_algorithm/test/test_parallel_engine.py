@@ -0,0 +1,87 @@
+import asyncio
+import unittest
+
+import pytest
+
+from domain.genome import Genome
+from domain.graph import Graph, Node
+from genetic_algorithm import GeneticAlgorithmRunner, default_problems
+from genetic_algorithm.parallel_engine import ParallelGenerationEngine, split_evenly
+from vrp.vrp_builder import VrpFactory
+
+
+def create_vrp_factory(population_size=20):
+    nodes = [Node(identifier=i, x=city[0], y=city[1], priority=i % 2, demand=1 + i % 5)
+             for i, city in enumerate(default_problems[15])]
+    return VrpFactory(Graph(nodes), population_size, number_vehicles=2, vehicle_capacity=20)
+
+
+def test_split_evenly():
+    assert split_evenly(10, 3) == [4, 3, 3]
+    assert split_evenly(2, 4) == [1, 1]
+    assert split_evenly(0, 4) == []
+
+
+class TestParallelGenerationEngine(unittest.IsolatedAsyncioTestCase):
+
+    @pytest.mark.timeout(60)
+    async def test_breed_returns_evaluated_children(self):
+        vrp_factory = create_vrp_factory()
+        vrp = vrp_factory.create_vrp()
+        population = vrp.generate_initial_population()
+        engine = ParallelGenerationEngine(vrp_factory, workers=2)
+        try:
+            await engine.evaluate(population)
+            population = vrp.sort_population(population)
+            children = await engine.breed(population, 19)
+        finally:
+            engine.shutdown()
+
+        self.assertEqual(len(population), 20)
+        self.assertTrue(all(genome.penalty is not None for genome in population))
+        self.assertEqual(len(children), 19)
+        for child in children:
+            expected = child.fitness
+            vrp.fitness(child)
+            self.assertEqual(child.fitness, expected)
+
+    @pytest.mark.timeout(60)
+    async def test_evaluate_matches_sequential_evaluation(self):
+        vrp_factory = create_vrp_factory()
+        vrp = vrp_factory.create_vrp()
+        population = vrp.generate_initial_population()
+        expected = [Genome(genome.sequence, genome.offsets, genome.capacities, genome.autonomies, genome.distances,
+                           costs=genome.costs) for genome in population]
+        vrp.evaluate_population(expected)
+        engine = ParallelGenerationEngine(vrp_factory, workers=2)
+        try:
+            await engine.evaluate(population)
+        finally:
+            engine.shutdown()
+
+        self.assertEqual([(genome.fitness, genome.penalty) for genome in population],
+                         [(genome.fitness, genome.penalty) for genome in expected])
+
+    def test_invalid_execution_mode(self):
+        with self.assertRaises(ValueError):
+            GeneticAlgorithmRunner(create_vrp_factory(), 20, execution_mode="threads")
+
+    @pytest.mark.timeout(60)
+    async def test_runner_in_process_mode(self):
+        events = []
+
+        async def on_new_best_solution(event):
+            events.append(event)
+
+        runner = GeneticAlgorithmRunner(create_vrp_factory(), 20, on_new_best_solution=on_new_best_solution,
+                                        execution_mode="process", workers=2)
+        await runner.start()
+        for _ in range(600):
+            await asyncio.sleep(0.05)
+            if events and runner.best_solution is not None:
+                break
+        await runner.stop()
+        await asyncio.sleep(0.2)
+        self.assertTrue(events)
+        self.assertIsNone(runner.engine)
+        self.assertEqual(len(runner.population), 20)
@@ -0,0 +1,72 @@
+from unittest import TestCase
+
+from domain.genome import Genome
+from genetic_algorithm.profiler import GenerationProfiler, population_diversity, prometheus_text
+
+
+def genome(sequence):
+    return Genome(sequence, [0, len(sequence)], 10, 100)
+
+
+class TestGenerationProfiler(TestCase):
+
+    def test_disabled_profiler_records_nothing(self):
+        profiler = GenerationProfiler(enabled=False)
+        profiler.start_generation()
+        with profiler.section("crossover"):
+            pass
+        profiler.count_evaluations(5)
+        profiler.end_generation([genome([0, 1, 0])])
+
+        self.assertEqual(profiler.generations, 0)
+        self.assertEqual(profiler.evaluations, 0)
+        self.assertEqual(profiler.seconds["crossover"], 0.0)
+        self.assertIs(profiler.section("fitness"), GenerationProfiler().section("sort"))
+
+    def test_generation_times_go_to_the_histograms(self):
+        profiler = GenerationProfiler(enabled=True)
+        for _ in range(3):
+            profiler.start_generation()
+            profiler.add("fitness", 0.002)
+            profiler.count_evaluations(10)
+            profiler.end_generation([genome([0, 1, 2, 0]), genome([0, 2, 1, 0])])
+
+        snapshot = profiler.snapshot()
+        self.assertEqual(snapshot["generations"], 3)
+        self.assertEqual(snapshot["evaluations"], 30)
+        self.assertAlmostEqual(snapshot["sections"]["fitness"]["total"], 0.006)
+        self.assertEqual(snapshot["sections"]["fitness"]["last"], 0.002)
+        self.assertEqual(snapshot["histograms"]["fitness"]["0.005"], 3)
+        self.assertEqual(snapshot["histograms"]["crossover"]["0.0001"], 3)
+        self.assertEqual(snapshot["diversity"], 1.0)
+
+    def test_merge(self):
+        total, other = GenerationProfiler(True), GenerationProfiler(True)
+        other.start_generation()
+        other.add("mutation", 0.5)
+        other.count_evaluations(4)
+        other.end_generation([genome([0, 1, 0]), genome([0, 1, 0])])
+        total.merge(other)
+        total.merge(other)
+
+        self.assertEqual(total.generations, 2)
+        self.assertEqual(total.evaluations, 8)
+        self.assertEqual(total.seconds["mutation"], 1.0)
+        self.assertEqual(total.diversity, 0.5)
+
+    def test_population_diversity(self):
+        self.assertIsNone(population_diversity([]))
+        self.assertEqual(population_diversity([genome([0, 1, 2, 0]), genome([0, 1, 2, 0]),
+                                               genome([0, 2, 1, 0]), genome([0, 2, 1, 0])]), 0.5)
+
+    def test_prometheus_text(self):
+        profiler = GenerationProfiler(True)
+        profiler.start_generation()
+        profiler.end_generation([genome([0, 1, 0])])
+        text = prometheus_text([({"run_id": "a"}, profiler), ({"run_id": "b"}, GenerationProfiler())])
+
+        self.assertEqual(text.count("# TYPE vrp_generations_total counter"), 1)
+        self.assertIn('vrp_generations_total{run_id="a"} 1', text)
+        self.assertIn('vrp_generations_total{run_id="b"} 0', text)
+        self.assertIn('vrp_generation_seconds_bucket{run_id="a",section="generation",le="+Inf"} 1', text)
+        self.assertIn('vrp_generation_seconds_count{run_id="a",section="fitness"} 1', text)
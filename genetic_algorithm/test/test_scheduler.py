@@ -0,0 +1,265 @@
+import asyncio
+import unittest
+
+import pytest
+
+from domain.graph import Graph, Node
+from genetic_algorithm import scheduler
+from genetic_algorithm.scheduler import SolverScheduler, _run_slice
+from genetic_algorithm.test.test_parallel_engine import create_vrp_factory
+from vrp.vrp_builder import VrpFactory
+
+
+class TestSolverScheduler(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.scheduler = SolverScheduler(workers=2, time_slice=0.05)
+
+    async def asyncTearDown(self):
+        self.scheduler.shutdown()
+
+    async def wait_for(self, condition, timeout=30.0):
+        elapsed = 0.0
+        while not condition():
+            await asyncio.sleep(0.05)
+            elapsed += 0.05
+            if elapsed > timeout:
+                self.fail("Condition not reached")
+
+    @pytest.mark.timeout(60)
+    async def test_runs_share_workers_and_stop_at_generation_budget(self):
+        events = []
+
+        async def collect(event):
+            events.append(event)
+
+        first = self.scheduler.submit(create_vrp_factory(), 20, max_generations=30, subscriber=collect)
+        second = self.scheduler.submit(create_vrp_factory(), 20, max_generations=30)
+        await self.wait_for(lambda: first.done and second.done)
+
+        self.assertEqual((first.state, first.generation), ("finished", 30))
+        self.assertEqual((second.state, second.generation), ("finished", 30))
+        self.assertEqual(len(first.population), 20)
+        self.assertIn("new_best_solution", [event["event"] for event in events])
+        self.assertEqual(events[-1], {"event": "run_finished", "run_id": first.run_id, "generation": 30})
+        self.assertIs(self.scheduler.get(first.run_id), first)
+
+    @pytest.mark.timeout(60)
+    async def test_profilers_of_the_slices_are_merged(self):
+        factory = create_vrp_factory()
+        factory.profiling = True
+        run = self.scheduler.submit(factory, 20, max_generations=10)
+        await self.wait_for(lambda: run.done)
+
+        metrics = run.metrics()
+        self.assertEqual(metrics["generations"], 10)
+        self.assertGreater(metrics["evaluations"], 0)
+        self.assertGreater(metrics["sections"]["crossover"]["total"], 0.0)
+
+    @pytest.mark.timeout(60)
+    async def test_fitness_cache_lookups_of_the_slices_are_merged(self):
+        run = self.scheduler.submit(create_vrp_factory(), 20, max_generations=10)
+        await self.wait_for(lambda: run.done)
+
+        cache = run.status()["fitness_cache"]
+        self.assertGreater(cache["misses"], 0)
+        self.assertEqual(cache["hit_rate"], round(cache["hits"] / (cache["hits"] + cache["misses"]), 4))
+
+    @pytest.mark.timeout(60)
+    async def test_checkpoint_resume_matches_uninterrupted_run(self):
+        import tempfile
+        from genetic_algorithm.checkpoint import load_checkpoint
+
+        def factory(seed):
+            vrp_factory = create_vrp_factory()
+            vrp_factory.random.seed(seed)
+            return vrp_factory
+
+        uninterrupted = self.scheduler.submit(factory(3), 20, max_generations=12)
+        with tempfile.TemporaryDirectory() as directory:
+            first = self.scheduler.submit(factory(3), 20, max_generations=6, checkpoint_directory=directory,
+                                          checkpoint_interval=3600)
+            await self.wait_for(lambda: uninterrupted.done and first.done and not first.in_flight)
+            # Written when the run ends, even within the interval
+            checkpoint = load_checkpoint(f"{directory}/{first.run_id}.npz")
+        self.assertEqual(checkpoint.generation, 6)
+
+        resumed = self.scheduler.submit(factory(99), 20, max_generations=12, checkpoint=checkpoint)
+        self.assertEqual(resumed.generation, 6)
+        await self.wait_for(lambda: resumed.done)
+
+        self.assertEqual(resumed.generation, 12)
+        self.assertEqual(resumed.best_solution.fitness, uninterrupted.best_solution.fitness)
+        self.assertEqual([genome.sequence.tolist() for genome in resumed.population],
+                         [genome.sequence.tolist() for genome in uninterrupted.population])
+
+    async def test_island_runs_are_not_checkpointed(self):
+        with self.assertRaises(ValueError):
+            self.scheduler.submit(create_vrp_factory(), 20, island_options={"islands": 2},
+                                  checkpoint_directory="checkpoints")
+
+    @pytest.mark.timeout(60)
+    async def test_pause_resume_and_stop(self):
+        run = self.scheduler.submit(create_vrp_factory(), 20)
+        await self.wait_for(lambda: run.generation > 0)
+        self.scheduler.pause(run.run_id)
+        await self.wait_for(lambda: not run.in_flight)
+        generation = run.generation
+        await asyncio.sleep(0.2)
+        self.assertEqual(run.generation, generation)
+
+        self.scheduler.resume(run.run_id)
+        await self.wait_for(lambda: run.generation > generation)
+        self.scheduler.stop(run.run_id)
+        await self.wait_for(lambda: not run.in_flight)
+        self.assertEqual(run.status()["state"], "stopped")
+        self.assertIsNotNone(run.best_solution)
+
+    @pytest.mark.timeout(60)
+    async def test_island_run_reports_best_and_stops_at_budget(self):
+        events = []
+
+        async def collect(event):
+            events.append(event)
+
+        run = self.scheduler.submit(create_vrp_factory(), 20, max_time=1.5, subscriber=collect,
+                                    island_options={"islands": 2, "migration_interval": 3})
+        self.assertEqual(run.status()["islands"], 2)
+        await self.wait_for(lambda: run.done and not run.in_flight)
+
+        self.assertEqual(run.state, "finished")
+        self.assertIsNotNone(run.best_solution)
+        self.assertEqual([event["event"] for event in events][-1], "run_finished")
+
+    @pytest.mark.timeout(60)
+    async def test_island_processes_count_against_the_workers(self):
+        with self.assertRaises(ValueError):
+            self.scheduler.submit(create_vrp_factory(), 20, max_time=60, island_options={"islands": 3})
+
+        first = self.scheduler.submit(create_vrp_factory(), 20, max_time=60, island_options={"islands": 2})
+        second = self.scheduler.submit(create_vrp_factory(), 20, max_time=60, island_options={"islands": 2})
+        sliced = self.scheduler.submit(create_vrp_factory(), 20, max_generations=2)
+        await asyncio.sleep(0.5)
+        # Both workers run the islands of the first run: the others wait
+        self.assertEqual((first.state, second.state, sliced.generation), ("running", "queued", 0))
+
+        self.scheduler.stop(first.run_id)
+        await self.wait_for(lambda: second.state == "running")
+        self.assertEqual(sliced.generation, 0)
+        self.scheduler.stop(second.run_id)
+        await self.wait_for(lambda: sliced.done and not second.in_flight)
+        self.assertEqual((sliced.state, sliced.generation), ("finished", 2))
+
+    @pytest.mark.timeout(60)
+    async def test_process_run_spreads_generations_over_its_workers(self):
+        events = []
+
+        async def collect(event):
+            events.append(event)
+
+        with self.assertRaises(ValueError):
+            self.scheduler.submit(create_vrp_factory(), 20, execution_mode="threads")
+        with self.assertRaises(ValueError):
+            self.scheduler.submit(create_vrp_factory(), 20, execution_mode="process", workers=3)
+
+        run = self.scheduler.submit(create_vrp_factory(), 20, max_generations=5, subscriber=collect,
+                                    execution_mode="process", workers=2)
+        sliced = self.scheduler.submit(create_vrp_factory(), 20, max_generations=2)
+        self.assertEqual(run.status()["workers"], 2)
+        await self.wait_for(lambda: run.done and not run.in_flight)
+        self.assertEqual((run.state, run.generation), ("finished", 5))
+        self.assertEqual(len(run.population), 20)
+        self.assertIsNotNone(run.best_solution)
+        self.assertEqual(events[-1], {"event": "run_finished", "run_id": run.run_id, "generation": 5})
+        # The slices wait while the run holds both workers
+        await self.wait_for(lambda: sliced.done)
+        self.assertEqual((sliced.state, sliced.generation), ("finished", 2))
+
+    @pytest.mark.timeout(60)
+    async def test_decomposition_run_reports_clusters_and_stop(self):
+        events = []
+
+        async def collect(event):
+            events.append(event)
+
+        with self.assertRaises(ValueError):
+            self.scheduler.submit(create_vrp_factory(), 20, max_generations=2, checkpoint_directory="checkpoints",
+                                  decomposition_options={"clusters": 2})
+        run = self.scheduler.submit(create_vrp_factory(), 20, max_generations=2, subscriber=collect,
+                                    decomposition_options={"method": "sweep", "clusters": 2})
+        self.assertEqual(run.population, [])
+        await self.wait_for(lambda: run.done and not run.in_flight)
+
+        self.assertEqual(run.state, "finished")
+        self.assertEqual(run.status()["clusters"], 2)
+        self.assertEqual([event["event"] for event in events],
+                         ["cluster_finished", "cluster_finished", "new_best_solution", "run_finished"])
+        self.assertEqual(sorted(run.best_solution.customers(0).tolist()), list(range(1, 15)))
+
+        run = self.scheduler.submit(create_vrp_factory(), 20, max_time=60, decomposition_options={"clusters": 2})
+        self.scheduler.stop(run.run_id)
+        await self.wait_for(lambda: not run.in_flight)
+        self.assertEqual(run.state, "stopped")
+
+    @pytest.mark.timeout(60)
+    async def test_update_continues_from_the_repaired_population(self):
+        events = []
+
+        async def collect(event):
+            events.append(event)
+
+        factory = create_vrp_factory()
+        nodes = factory.graph.get_nodes()
+        run = self.scheduler.submit(factory, 20, max_time=60, metadata={"nodes": nodes}, subscriber=collect)
+        await self.wait_for(lambda: run.generation > 0)
+
+        best = await asyncio.to_thread(self.scheduler.update, run.run_id, [Node(identifier=50, x=5, y=5, demand=2)],
+                                       [3], [{"identifier": 4, "demand": 1}])
+        generation = run.generation
+        await self.wait_for(lambda: run.generation > generation)
+        self.scheduler.stop(run.run_id)
+        await self.wait_for(lambda: not run.in_flight)
+
+        self.assertEqual(run.revision, 1)
+        expected = sorted(set(range(1, 15)) - {3} | {50})
+        self.assertEqual(sorted(best.customers(0).tolist()), expected)
+        self.assertEqual(sorted(run.best_solution.customers(0).tolist()), expected)
+        self.assertTrue(all(sorted(genome.customers(0).tolist()) == expected for genome in run.population))
+        self.assertEqual([node.identifier for node in run.metadata["nodes"]], [0, 1, 2] + list(range(4, 15)) + [50])
+        updated = next(event for event in events if event["event"] == "instance_updated")
+        self.assertEqual((updated["added"], updated["removed"], updated["changed"]), ([50], [3], [4]))
+        # The graph of the submitted factory is left unchanged
+        self.assertEqual(factory.graph.distance_matrix.shape, (15, 15))
+        with self.assertRaises(ValueError):
+            self.scheduler.update(run.run_id, removed=[1])
+
+    async def test_island_runs_cannot_be_updated(self):
+        run = self.scheduler.submit(create_vrp_factory(), 20, max_generations=1, island_options={"islands": 2})
+        with self.assertRaises(ValueError):
+            self.scheduler.update(run.run_id, removed=[1])
+        self.scheduler.stop(run.run_id)
+        await self.wait_for(lambda: not run.in_flight)
+
+    def test_invalid_problem_is_reported_on_submit(self):
+        with self.assertRaises(ValueError):
+            factory = VrpFactory(Graph([Node(identifier=0, x=0, y=0), Node(identifier=1, x=1, y=1, demand=50)]), 4,
+                                 1, vehicle_capacity=10)
+            self.scheduler.submit(factory, 4)
+        self.assertEqual(self.scheduler.runs(), [])
+
+
+def test_run_slice_receives_the_factory_only_on_a_miss():
+    factory = create_vrp_factory()
+    population = factory.create_vrp().generate_initial_population()
+    arguments = (None, population, 20, 0, None, 10.0, 1, factory.random.getstate())
+    try:
+        assert _run_slice("run", None, *arguments) is None
+        first = _run_slice("run", factory, *arguments)
+        second = _run_slice("run", None, *arguments)
+        assert second is not None and second[1] == first[1] == 1
+        # Only the lookups of the slice are reported: the population was evaluated by the first slice
+        assert sum(first[6]) > 0 and second[6] == (0, 0)
+        # A new revision of the problem needs the factory again
+        assert _run_slice("run", None, *arguments, revision=1) is None
+    finally:
+        scheduler._worker_runs.clear()
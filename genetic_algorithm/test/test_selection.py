@@ -1,9 +1,11 @@
 import random
 from unittest.mock import Mock
 
+import numpy as np
 import pytest
 
-from genetic_algorithm.selection import parents_selection
+from genetic_algorithm.selection import (SELECTION_METHODS, Selection, parents_selection,
+                                         stochastic_universal_sampling, tournament_selection)
 
 
 @pytest.mark.parametrize("population_size", [3, 5, 10])
@@ -21,4 +23,68 @@ def test_parents_selection(population_size):
 def test_parents_choice_with_one_individual():
     population = [Mock(fitness=10.0)]
     with pytest.raises(ValueError):
-        parents_selection(population)
\ No newline at end of file
+        parents_selection(population)
+
+def test_parents_selection_does_not_change_the_population():
+    population = [Mock(fitness=float(fitness)) for fitness in range(10)]
+    snapshot = list(population)
+
+    for _ in range(20):
+        parents_selection(population)
+
+    assert population == snapshot
+
+
+@pytest.mark.parametrize("method", SELECTION_METHODS)
+def test_selection_returns_distinct_index_pairs(method):
+    fitness = np.array([float(value) for value in range(50)])
+
+    pairs = Selection(method).select(fitness, 200, random.Random(3))
+
+    assert pairs.shape == (200, 2)
+    assert pairs.min() >= 0 and pairs.max() < 50
+    assert np.all(pairs[:, 0] != pairs[:, 1])
+
+
+@pytest.mark.parametrize("method", SELECTION_METHODS)
+def test_selection_favours_the_fittest(method):
+    fitness = np.arange(100, dtype=np.float64)
+
+    pairs = Selection(method).select(fitness, 2000, random.Random(5))
+
+    # Uniform selection would average 49.5
+    assert pairs.mean() < 45
+
+
+@pytest.mark.parametrize("method", SELECTION_METHODS)
+def test_selection_follows_the_run_generator(method):
+    fitness = np.random.default_rng(0).random(30)
+    selection = Selection(method)
+
+    assert np.array_equal(selection.select(fitness, 10, random.Random(8)), selection.select(fitness, 10, random.Random(8)))
+
+
+def test_stochastic_universal_sampling_counts_are_within_one_of_expected():
+    fitness = np.array([1.0, 2.0, 3.0, 4.0, 10.0])
+    pairs = stochastic_universal_sampling(fitness, 50, np.random.default_rng(1))
+    weights = fitness.max() - fitness + (fitness.max() - fitness.min()) / len(fitness)
+    expected = 100 * weights / weights.sum()
+    counts = np.bincount(pairs.ravel(), minlength=len(fitness))
+
+    assert np.all(np.abs(counts - expected) < 1)
+    assert np.all(pairs[:, 0] != pairs[:, 1])
+
+
+def test_tournament_of_two_individuals_returns_both():
+    pairs = tournament_selection(np.array([5.0, 1.0]), 10, np.random.default_rng(0))
+
+    assert np.all(np.sort(pairs, axis=1) == [0, 1])
+
+
+def test_invalid_selection():
+    with pytest.raises(ValueError):
+        Selection("roulette")
+    with pytest.raises(ValueError):
+        Selection("rank", pressure=3.0)
+    with pytest.raises(ValueError):
+        Selection().select(np.array([1.0]), 1)
@@ -2,7 +2,7 @@
 #
 # 1 - Prioridade diferente para entregas (medicamentos criticos vs entrega regulares) | 1 ou 0 - ok
 # 2 - Capacidade do veiculo - ok
-# 3 - Autonomia (distancia máxima percorrida) - nok
+# 3 - Autonomia (distancia máxima percorrida) - ok
 # 4 - Multiplos veiculos - ok
 
 # Restrições extras implementadas
@@ -14,11 +14,11 @@
 
 # Ideias
 # Visualização do mapa com rotas reais
-# Diferentes tipos de veiculos (motos, carros, caminhões)
-# Diferentes capacidades e custos dos veiculos
+# Diferentes tipos de veiculos (motos, carros, caminhões) - ok
+# Diferentes capacidades e custos dos veiculos - ok
 # Usar cidadades reais
 # Analisar o melhor veiculo para entregar a carga (ex: motos para entregas pequenas e rápidas, caminhões para cargas maiores)
-# Centro de distribuição, a carga vai até o centro e depois é distribuida pelos veiculos menores
+# Centro de distribuição, a carga vai até o centro e depois é distribuida pelos veiculos menores - ok
 # Informar o tempo estimado de entrega
 # Usuário parametrizar o problema (número de veiculos, capacidade, etc)
 # Interface web
@@ -1,5 +1,6 @@
-from domain.solution import Solution
-from domain.vehicle import Vehicle
+import numpy as np
+
+from domain.genome import Genome
 from vrp.adjustment.helper import Helper
 
 
@@ -7,24 +8,32 @@ class Adjustment:
     def __init__(self, helper: Helper):
         self.__helper = helper
 
-    def apply(self, solution: Solution):
+    def apply(self, genome: Genome) -> Genome:
         """
-        Apply adjustments to the solution to ensure that capacity constraints is met.
+        Apply adjustments to the genome to ensure that capacity and autonomy constraints are met: customers heavier
+        than the capacity of their vehicle are moved to a vehicle able to carry them, then every itinerary is split by
+        the capacity and autonomy of its vehicle.
         Args:
-            solution:
-                The solution to have the routes adjusted.
+            genome:
+                The genome to have the routes adjusted.
 
         Returns:
-            The adjusted solution.
+            A new adjusted genome, with the distance of each vehicle calculated.
 
         """
-        new_vehicles: list[Vehicle] = []
-        for vehicle in solution.vehicles:
-            new_route = self.__helper.split_route_by_capacity(vehicle.route, vehicle.capacity)
-            final_route = self.__helper.remove_duplicated_sequencial_depots(new_route)
-            final_route.distance = self.__helper.calculate_distance(final_route)
-            new_vehicle = Vehicle(route=final_route, autonomy=vehicle.autonomy, capacity=vehicle.capacity)
-            new_vehicles.append(new_vehicle)
+        itineraries: list[int] = []
+        offsets: list[int] = [0]
+        distances: list[float] = []
+        sequence, vehicle_offsets = self.__helper.move_oversized_customers(genome.sequence, genome.offsets,
+                                                                           genome.capacities)
+        for index in range(genome.number_vehicles):
+            route = sequence[vehicle_offsets[index]:vehicle_offsets[index + 1]]
+            itinerary = self.__helper.split_itinerary(route.tolist(), genome.capacities[index].item(),
+                                                      genome.autonomies[index].item())
+            final_itinerary = self.__helper.remove_duplicated_sequencial_depots_from_itinerary(itinerary)
+            distances.append(self.__helper.calculate_itinerary_distance(final_itinerary))
+            itineraries.extend(final_itinerary)
+            offsets.append(len(itineraries))
 
-        solution.vehicles = new_vehicles
-        return solution
+        return Genome(np.array(itineraries, dtype=np.int32), offsets, genome.capacities, genome.autonomies, distances,
+                      costs=genome.costs)
@@ -1,3 +1,7 @@
+import math
+
+import numpy as np
+
 from domain.route import Route
 
 
@@ -15,24 +19,107 @@ class Helper:
             vehicle_capacity: The capacity of the vehicle.
         Returns:
             The route split by vehicle capacity.
-        Raises:
-            ValueError: If any customer's demand is greater than the vehicle capacity.
         """
-        new_route: list[int] = []
+        return Route(self.split_itinerary_by_capacity(route.customers, vehicle_capacity))
+
+    def split_itinerary_by_capacity(self, itinerary: list[int], vehicle_capacity: int) -> list[int]:
+        """
+        Same as split_route_by_capacity, working directly on the list of customer identifiers.
+        """
+        return self.split_itinerary(itinerary, vehicle_capacity)
+
+    def split_itinerary(self, itinerary: list[int], vehicle_capacity: int,
+                        vehicle_autonomy: float = math.inf) -> list[int]:
+        """
+        Splits the itinerary by vehicle capacity and autonomy, inserting a depot return before a customer whose
+        demand does not fit in the load of the trip or whose visit (plus the way back to the depot) would take the
+        trip beyond the autonomy. Load and distance are reset at every depot visit.
+        A customer out of range or heavier than the capacity even in a trip of its own is served alone, the fitness
+        penalizes the excess (see move_oversized_customers, which gives such customers to a vehicle able to carry them).
+        Args:
+            itinerary: List of customer identifiers.
+            vehicle_capacity: The capacity of the vehicle.
+            vehicle_autonomy: Maximum distance of a trip between two depot visits (unlimited by default).
+        Returns:
+            The split itinerary.
+        """
+        bounded = not math.isinf(vehicle_autonomy)
+        if bounded:
+            distances = self.__graph.distance_matrix
+            indices = self.__graph.indices_of(itinerary).tolist()
+            depot_index = self.__graph.index_of(self.__depot_identifier)
+            previous_index = depot_index
+        new_itinerary: list[int] = []
         current_load = 0
-        for customer_identifier in route.customers:
+        trip_distance = 0.0
+        for position, customer_identifier in enumerate(itinerary):
             if customer_identifier == self.__depot_identifier:
-                new_route.append(customer_identifier)
+                # The vehicle is unloaded and recharged at every depot visit
+                new_itinerary.append(customer_identifier)
+                current_load = 0
+                trip_distance = 0.0
+                if bounded:
+                    previous_index = depot_index
                 continue
             demand = self.__graph.get_node_demand(customer_identifier)
-            if demand > vehicle_capacity:
-                raise ValueError(f"Customer {customer_identifier} demand ({demand}) exceeds vehicle capacity ({vehicle_capacity})")
-            if current_load + demand > vehicle_capacity:
-                new_route.append(self.__depot_identifier)
+            out_of_range = False
+            if bounded:
+                index = indices[position]
+                leg = distances[previous_index, index]
+                out_of_range = (previous_index != depot_index
+                                and trip_distance + leg + distances[index, depot_index] > vehicle_autonomy)
+            if current_load + demand > vehicle_capacity or out_of_range:
+                new_itinerary.append(self.__depot_identifier)
                 current_load = 0
-            new_route.append(customer_identifier)
+                trip_distance = 0.0
+                if bounded:
+                    leg = distances[depot_index, index]
+            new_itinerary.append(customer_identifier)
             current_load += demand
-        return Route(new_route)
+            if bounded:
+                trip_distance += leg
+                previous_index = index
+        return new_itinerary
+
+    def move_oversized_customers(self, sequence: np.ndarray, offsets: np.ndarray,
+                                 capacities: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Moves the customers whose demand exceeds the capacity of their vehicle (e.g. given to a small vehicle of a
+        heterogeneous fleet by the crossover or the split) to their cheapest position, the one with the smallest
+        detour d(a, c) + d(c, b) - d(a, b), in the itinerary of a vehicle able to carry them. A customer no vehicle
+        can carry is left in place.
+        Args:
+            sequence: Itineraries of all vehicles concatenated.
+            offsets: Offsets delimiting the itinerary of each vehicle.
+            capacities: The capacity of each vehicle.
+        Returns:
+            Tuple with the new sequence and offsets (the same arrays when every customer fits in its vehicle).
+        """
+        if not len(capacities):
+            return sequence, offsets
+        demands = self.__graph.demands[self.__graph.indices_of(sequence)]
+        oversized = (demands > np.repeat(capacities, np.diff(offsets))) & (sequence != self.__depot_identifier)
+        oversized &= demands <= capacities.max()
+        if not oversized.any():
+            return sequence, offsets
+        itineraries = [sequence[offsets[index]:offsets[index + 1]][~oversized[offsets[index]:offsets[index + 1]]].tolist()
+                       for index in range(len(capacities))]
+        distances = self.__graph.distance_matrix
+        depot_index = self.__graph.index_of(self.__depot_identifier)
+        for customer, demand in zip(sequence[oversized].tolist(), demands[oversized].tolist()):
+            index = self.__graph.index_of(customer)
+            best = None
+            for vehicle in np.flatnonzero(capacities >= demand).tolist():
+                stops = np.concatenate([[depot_index], self.__graph.indices_of(itineraries[vehicle]), [depot_index]])
+                detours = distances[stops[:-1], index] + distances[index, stops[1:]] - distances[stops[:-1], stops[1:]]
+                position = int(np.argmin(detours))
+                if best is None or detours[position] < best[0]:
+                    best = (detours[position], vehicle, position)
+            _, vehicle, position = best
+            itineraries[vehicle].insert(position, customer)
+        lengths = [len(itinerary) for itinerary in itineraries]
+        return (np.array([customer for itinerary in itineraries for customer in itinerary], dtype=np.int32),
+                np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)]))
 
     def remove_duplicated_sequencial_depots(self, route: Route) -> Route:
         """
@@ -42,13 +129,19 @@ class Helper:
         Returns:
             The route without duplicated sequential depots.
         """
-        final_route: list[int] = []
+        return Route(self.remove_duplicated_sequencial_depots_from_itinerary(route.customers))
+
+    def remove_duplicated_sequencial_depots_from_itinerary(self, itinerary: list[int]) -> list[int]:
+        """
+        Same as remove_duplicated_sequencial_depots, working directly on the list of customer identifiers.
+        """
+        final_itinerary: list[int] = []
         previous_customer_id = None
-        for customer_identifier in route.customers:
+        for customer_identifier in itinerary:
             if not (previous_customer_id == self.__depot_identifier and customer_identifier == self.__depot_identifier):
-                final_route.append(customer_identifier)
+                final_itinerary.append(customer_identifier)
             previous_customer_id = customer_identifier
-        return Route(final_route)
+        return final_itinerary
 
     def calculate_distance(self, route: Route) -> float:
         """
@@ -61,5 +154,13 @@ class Helper:
         itinerary_distance = 0.0
         customers = route.customers
         for i in range(len(customers) - 1):
-            itinerary_distance += self.__graph.get_edge_by_node_ids(customers[i], customers[i + 1]).distance
+            itinerary_distance += self.__graph.get_distance(customers[i], customers[i + 1])
         return itinerary_distance
+
+    def calculate_itinerary_distance(self, itinerary: list[int]) -> float:
+        """
+        Same as calculate_distance, gathering the legs from the graph distance matrix at once.
+        The legs are summed in order, so the result is identical to calculate_distance.
+        """
+        indices = self.__graph.indices_of(itinerary)
+        return float(sum(self.__graph.distance_matrix[indices[:-1], indices[1:]].tolist()))
@@ -1,65 +1,81 @@
 from unittest import TestCase
 from unittest.mock import Mock
 
-from domain.route import Route
-from domain.solution import Solution
-from domain.vehicle import Vehicle
-from vrp.adjustment.adjustment import Adjustment
-
+import numpy as np
 
-def create_vehicle(autonomy=100, capacity=50, route=None):
-    route = route if route is not None else Route([0, 1, 2, 0])
-    return Vehicle(route=route, autonomy=autonomy, capacity=capacity)
+from domain.genome import Genome
+from vrp.adjustment.adjustment import Adjustment
 
 
-def create_solution(vehicles):
-    return Solution(vehicles=vehicles)
+def create_genome(itineraries, capacities=50, autonomies=100):
+    offsets = [0]
+    for itinerary in itineraries:
+        offsets.append(offsets[-1] + len(itinerary))
+    return Genome([c for itinerary in itineraries for c in itinerary], offsets, capacities, autonomies)
 
 
 class TestAdjustment(TestCase):
 
     def setUp(self):
         self.helper = Mock()
+        self.helper.move_oversized_customers = Mock(side_effect=lambda sequence, offsets, capacities: (sequence, offsets))
         self.adjustment = Adjustment(helper=self.helper)
 
     def mock_helper(self, split_return, remove_return, return_value):
-        self.helper.split_route_by_capacity = Mock(return_value=split_return)
-        self.helper.remove_duplicated_sequencial_depots = Mock(return_value=remove_return)
-        self.helper.calculate_distance = Mock(return_value=return_value)
+        self.helper.split_itinerary = Mock(return_value=split_return)
+        self.helper.remove_duplicated_sequencial_depots_from_itinerary = Mock(return_value=remove_return)
+        self.helper.calculate_itinerary_distance = Mock(return_value=return_value)
 
     def test_applies_adjustment_to_solution_with_single_vehicle(self):
-        vehicle = create_vehicle()
-        solution = create_solution([vehicle])
-        self.mock_helper(Route([0, 1, 2, 0]), Route([0, 1, 2, 0]), 10.0)
-        result = self.adjustment.apply(solution)
-        self.assertEqual(len(result.vehicles), 1)
-        self.assertEqual(result.vehicles[0].customers(), [0, 1, 2, 0])
+        genome = create_genome([[0, 1, 2, 0]])
+        self.mock_helper([0, 1, 2, 0], [0, 1, 2, 0], 10.0)
+        result = self.adjustment.apply(genome)
+        self.assertEqual(result.number_vehicles, 1)
+        self.assertEqual(result.route(0).tolist(), [0, 1, 2, 0])
         self.assertEqual(result.total_distance(), 10)
+        self.helper.split_itinerary.assert_called_once_with([0, 1, 2, 0], 50, 100)
 
     def test_handles_solution_with_no_vehicles(self):
-        solution = create_solution([])
-        result = self.adjustment.apply(solution)
-        self.assertEqual(len(result.vehicles), 0)
+        genome = create_genome([])
+        result = self.adjustment.apply(genome)
+        self.assertEqual(result.number_vehicles, 0)
         self.assertEqual(result.total_distance(), 0)
 
     def test_applies_adjustment_to_solution_with_multiple_vehicles(self):
-        vehicle1 = create_vehicle()
-        vehicle2 = create_vehicle(autonomy=80, capacity=30)
-        solution = create_solution([vehicle1, vehicle2])
-        self.helper.split_route_by_capacity = Mock(side_effect=[Route([0, 1, 0]), Route([0, 2, 0])])
-        self.helper.remove_duplicated_sequencial_depots = Mock(side_effect=[Route([0, 1, 0]), Route([0, 2, 0])])
-        self.helper.calculate_distance = Mock(return_value=10.0)
-        result = self.adjustment.apply(solution)
-        self.assertEqual(len(result.vehicles), 2)
-        self.assertEqual(result.vehicles[0].customers(), [0, 1, 0])
-        self.assertEqual(result.vehicles[1].customers(), [0, 2, 0])
+        genome = create_genome([[0, 1, 2, 0], [0, 3, 0]], capacities=[50, 30], autonomies=[100, 80])
+        self.helper.split_itinerary = Mock(side_effect=[[0, 1, 0], [0, 2, 0]])
+        self.helper.remove_duplicated_sequencial_depots_from_itinerary = Mock(side_effect=[[0, 1, 0], [0, 2, 0]])
+        self.helper.calculate_itinerary_distance = Mock(return_value=10.0)
+        result = self.adjustment.apply(genome)
+        self.assertEqual(result.number_vehicles, 2)
+        self.assertEqual(result.route(0).tolist(), [0, 1, 0])
+        self.assertEqual(result.route(1).tolist(), [0, 2, 0])
         self.assertEqual(result.total_distance(), 20)
+        self.assertEqual(result.capacities.tolist(), [50, 30])
+        self.assertEqual(result.autonomies.tolist(), [100, 80])
 
     def test_handles_empty_itinerary_correctly(self):
-        vehicle = create_vehicle()
-        solution = create_solution([vehicle])
-        self.mock_helper(Route([]), Route([]), 0.0)
-        result = self.adjustment.apply(solution)
-        self.assertEqual(len(result.vehicles), 1)
-        self.assertEqual(result.vehicles[0].customers(), [])
+        genome = create_genome([[0, 1, 2, 0]])
+        self.mock_helper([], [], 0.0)
+        result = self.adjustment.apply(genome)
+        self.assertEqual(result.number_vehicles, 1)
+        self.assertEqual(result.route(0).tolist(), [])
         self.assertEqual(result.total_distance(), 0)
+
+    def test_moves_oversized_customers_before_splitting(self):
+        genome = create_genome([[0, 1, 2, 0], [0, 3, 0]], capacities=[5, 30])
+        self.helper.move_oversized_customers = Mock(return_value=(np.array([0, 1, 0, 0, 3, 2, 0]), np.array([0, 3, 7])))
+        self.helper.split_itinerary = Mock(side_effect=lambda itinerary, capacity, autonomy: itinerary)
+        self.helper.remove_duplicated_sequencial_depots_from_itinerary = Mock(side_effect=lambda itinerary: itinerary)
+        self.helper.calculate_itinerary_distance = Mock(return_value=10.0)
+        result = self.adjustment.apply(genome)
+        self.assertEqual(result.route(0).tolist(), [0, 1, 0])
+        self.assertEqual(result.route(1).tolist(), [0, 3, 2, 0])
+        self.helper.split_itinerary.assert_any_call([0, 3, 2, 0], 30, 100)
+
+    def test_does_not_change_the_original_genome(self):
+        genome = create_genome([[0, 1, 2, 0]])
+        self.mock_helper([0, 1, 0, 2, 0], [0, 1, 0, 2, 0], 12.0)
+        result = self.adjustment.apply(genome)
+        self.assertIsNot(result, genome)
+        self.assertEqual(genome.flatten_routes(), [0, 1, 2, 0])
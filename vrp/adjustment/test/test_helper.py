@@ -28,6 +28,13 @@ class TestHelper(TestCase):
 
         self.assertEqual(result.customers, [0, 1, 0, 2, 3])
 
+    def test_split_resets_load_at_existing_depots(self):
+        route = Route([0, 1, 0, 2, 3])
+
+        result = self.helper.split_route_by_capacity(route, 15)
+
+        self.assertEqual(result.customers, [0, 1, 0, 2, 3])
+
     def test_removes_duplicated_sequential_depots_correctly(self):
         route = Route([0, 1, 0, 0, 2, 0])
 
@@ -51,11 +58,65 @@ class TestHelper(TestCase):
 
     def test_calculates_distance_correctly(self):
         route = Route([0, 1, 2])
-        self.graph.get_edge_by_node_ids.side_effect = [
-            MagicMock(distance=10.0),
-            MagicMock(distance=20.0)
-        ]
+        self.graph.get_distance.side_effect = [10.0, 20.0]
 
         result = self.helper.calculate_distance(route)
 
-        self.assertEqual(result, 30.0)
\ No newline at end of file
+        self.assertEqual(result, 30.0)
+
+class TestHelperAutonomy(TestCase):
+
+    def setUp(self):
+        from domain.graph import Graph, Node
+
+        nodes = [Node(identifier=0, x=0, y=0), Node(identifier=1, x=10, y=0, demand=1),
+                 Node(identifier=2, x=20, y=0, demand=1), Node(identifier=3, x=100, y=0, demand=1)]
+        self.helper = Helper(Graph(nodes), depot_identifier=0)
+
+    def test_inserts_depot_return_before_trip_exceeds_autonomy(self):
+        result = self.helper.split_itinerary([0, 1, 2, 0], vehicle_capacity=10, vehicle_autonomy=30)
+
+        self.assertEqual(result, [0, 1, 0, 2, 0])
+
+    def test_keeps_trip_within_autonomy(self):
+        result = self.helper.split_itinerary([0, 2, 1, 0], vehicle_capacity=10, vehicle_autonomy=40)
+
+        self.assertEqual(result, [0, 2, 1, 0])
+
+    def test_serves_customer_out_of_range_alone(self):
+        result = self.helper.split_itinerary([0, 1, 3, 2, 0], vehicle_capacity=10, vehicle_autonomy=50)
+
+        self.assertEqual(result, [0, 1, 0, 3, 0, 2, 0])
+
+
+class TestHelperOversizedCustomers(TestCase):
+
+    def setUp(self):
+        import numpy as np
+        from domain.graph import Graph, Node
+
+        self.np = np
+        nodes = [Node(identifier=0, x=0, y=0), Node(identifier=1, x=10, y=0, demand=2),
+                 Node(identifier=2, x=20, y=0, demand=8), Node(identifier=3, x=30, y=0, demand=3),
+                 Node(identifier=4, x=40, y=0, demand=50)]
+        self.helper = Helper(Graph(nodes), depot_identifier=0)
+
+    def test_serves_customer_heavier_than_the_capacity_alone(self):
+        result = self.helper.split_itinerary([0, 1, 2, 3, 0], vehicle_capacity=5)
+
+        self.assertEqual(result, [0, 1, 0, 2, 0, 3, 0])
+
+    def test_moves_oversized_customer_to_a_vehicle_able_to_carry_it(self):
+        sequence, offsets = self.helper.move_oversized_customers(
+            self.np.array([0, 1, 2, 0, 0, 3, 0]), self.np.array([0, 4, 7]), self.np.array([5, 10]))
+
+        self.assertEqual(sequence.tolist(), [0, 1, 0, 0, 2, 3, 0])
+        self.assertEqual(offsets.tolist(), [0, 3, 7])
+
+    def test_keeps_customers_that_fit_and_those_no_vehicle_can_carry(self):
+        sequence, offsets = self.np.array([0, 1, 4, 0, 0, 3, 0]), self.np.array([0, 4, 7])
+
+        result = self.helper.move_oversized_customers(sequence, offsets, self.np.array([5, 10]))
+
+        self.assertIs(result[0], sequence)
+        self.assertIs(result[1], offsets)
@@ -1,14 +1,49 @@
+from bisect import bisect_right
+from typing import Optional
+
 import numpy as np
 
 from domain import Route
+from domain.graph import Graph
+
+SPLIT_MODES = ("equal", "optimal")
+# Elements of the trip cost blocks of the optimal split (rows of cut points times the band of trip sizes)
+SPLIT_BLOCK_ELEMENTS = 1 << 18
 
 
 class RouteSplitter:
-    def __init__(self, depot_identifier: int, number_vehicles: int) -> None:
+    """
+    Splits the giant tour (customers without the depot) into one itinerary per vehicle.
+    In "equal" mode the tour is cut into chunks of equal size. In "optimal" mode the tour is cut into trips with
+    Prins' split (shortest path over the prefix sums of the distance matrix, trips limited by the vehicle capacity
+    and autonomy), and the trips are then grouped in order into the vehicles minimizing the longest vehicle.
+    With a heterogeneous fleet (per-vehicle capacity, autonomy and cost arrays) the trips are limited by the
+    largest vehicle and weighted by the cost of the cheapest vehicle able to serve them, and an assignment step
+    gives each trip to a vehicle able to serve it. The "equal" mode leaves the per-vehicle limits to the adjustment.
+    """
+
+    def __init__(self, depot_identifier: int, number_vehicles: int, mode: str = "equal", graph: Optional[Graph] = None,
+                 vehicle_capacity=None, vehicle_autonomy=None, vehicle_cost=None) -> None:
         if number_vehicles <= 0:
             raise ValueError("Number of vehicles must be greater than zero.")
+        if mode not in SPLIT_MODES:
+            raise ValueError(f"Split mode must be one of {SPLIT_MODES}.")
+        if mode == "optimal" and graph is None:
+            raise ValueError("The optimal split requires the graph.")
         self.number_vehicles = number_vehicles
         self.depot_identifier = depot_identifier
+        self.mode = mode
+        self.__graph = graph
+        self.__capacities = self.__per_vehicle(np.inf if vehicle_capacity is None else vehicle_capacity)
+        self.__autonomies = self.__per_vehicle(np.inf if vehicle_autonomy is None else vehicle_autonomy)
+        self.__costs = self.__per_vehicle(0.0 if vehicle_cost is None else vehicle_cost)
+        self.__vehicle_capacity = float(self.__capacities.max())
+        self.__vehicle_autonomy = float(self.__autonomies.max())
+        self.__vehicle_types = np.unique(np.column_stack([self.__capacities, self.__autonomies, self.__costs]), axis=0)
+        self.heterogeneous = len(self.__vehicle_types) > 1
+
+    def __per_vehicle(self, values) -> np.ndarray:
+        return np.broadcast_to(np.asarray(values, dtype=np.float64), (self.number_vehicles,))
 
     def split(self, route: Route) -> list[Route]:
         """
@@ -19,6 +54,182 @@ class RouteSplitter:
         Returns:
             a list of Route objects, each representing a split route.
         """
-        chunks = np.array_split(route.customers, self.number_vehicles)
+        sequence, offsets = self.split_customers(route.customers)
+        return [Route(sequence[offsets[i]:offsets[i + 1]].tolist()) for i in range(self.number_vehicles)]
+
+    def split_customers(self, customers) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Splits the giant tour into one itinerary per vehicle, without building Route objects.
+        Args:
+            customers: Sequence of customer identifiers, without the depot.
+
+        Returns:
+            Tuple with the itineraries of all vehicles concatenated (each starting and ending at the depot)
+            and the offsets delimiting each vehicle.
+        """
+        customers = np.asarray(customers, dtype=np.int32)
+        if self.mode == "optimal" and len(customers):
+            return self.__split_optimal(customers)
+        base, extra = divmod(len(customers), self.number_vehicles)
+        sizes = np.full(self.number_vehicles, base, dtype=np.int64)
+        sizes[:extra] += 1
+        offsets = np.concatenate([[0], np.cumsum(sizes + 2)])
+        sequence = np.full(offsets[-1], self.depot_identifier, dtype=np.int32)
+        owners = np.repeat(np.arange(self.number_vehicles), sizes)
+        sequence[np.arange(len(customers)) + 2 * owners + 1] = customers
+        return sequence, offsets
+
+    def __split_optimal(self, customers: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        boundaries, trip_distances = self.optimal_trips(customers)
+        if self.heterogeneous:
+            return self.__assign_trips(customers, boundaries, trip_distances)
+        groups = self.__group_trips(trip_distances)
+        sequence: list[int] = []
+        offsets = [0]
+        for first, last in groups:
+            sequence.append(self.depot_identifier)
+            for trip in range(first, last):
+                sequence.extend(customers[boundaries[trip]:boundaries[trip + 1]].tolist())
+                sequence.append(self.depot_identifier)
+            offsets.append(len(sequence))
+        for _ in range(self.number_vehicles - len(groups)):
+            sequence.extend([self.depot_identifier, self.depot_identifier])
+            offsets.append(len(sequence))
+        return np.array(sequence, dtype=np.int32), np.array(offsets, dtype=np.int64)
+
+    def optimal_trips(self, customers) -> tuple[list[int], list[float]]:
+        """
+        Prins' split: cuts the giant tour into the trips (depot - customers - depot) of minimum total distance,
+        each trip within the vehicle capacity and autonomy. A customer alone always forms a valid trip.
+        The cost of the trip i..j-1 comes from the prefix sums of the legs, so the shortest path over the n + 1
+        cut points takes O(n * b), b being the maximum number of customers per trip by capacity and autonomy. The
+        trip costs are built in blocks of cut points of at most SPLIT_BLOCK_ELEMENTS, so the memory does not grow
+        with n * b when the limits do not bound the trips. With a heterogeneous fleet
+        the limits are those of the largest vehicle and the distance of each trip is weighted by 1 + the cost of
+        the cheapest vehicle type able to serve it.
+        Args:
+            customers: Sequence of customer identifiers, without the depot.
+
+        Returns:
+            Tuple with the cut points (the trip t is customers[cuts[t]:cuts[t + 1]]) and the distance of each trip.
+        """
+        indices = self.__graph.indices_of(customers)
+        depot = self.__graph.index_of(self.depot_identifier)
+        distances = self.__graph.distance_matrix
+        number_customers = len(indices)
+        outbound, inbound = distances[depot, indices], distances[indices, depot]
+        path = np.concatenate([[0.0], np.cumsum(distances[indices[:-1], indices[1:]])])
+        load = np.concatenate([[0.0], np.cumsum(self.__graph.demands[indices])])
+
+        # Longest feasible trip by capacity and by autonomy (a trip is at least as long as its path) bounds the
+        # band of the DP
+        starts = np.arange(number_customers)
+        by_capacity = np.searchsorted(load, load[:-1] + self.__vehicle_capacity, side="right") - 1 - starts
+        by_autonomy = np.searchsorted(path, path + self.__vehicle_autonomy, side="right") - starts
+        band = int(max(1, np.minimum(by_capacity, by_autonomy).max()))
+
+        best = np.full(number_customers + 1, np.inf)
+        best[0] = 0.0
+        predecessor = np.zeros(number_customers + 1, dtype=np.int64)
+        rows = max(1, SPLIT_BLOCK_ELEMENTS // band)
+        for block in range(0, number_customers, rows):
+            # trip_cost[j, t]: trip with t + 1 customers ending at customer block + j
+            last = np.arange(block, min(block + rows, number_customers))[:, None]
+            first = last - np.arange(band)[None, :]
+            valid_first = np.maximum(first, 0)
+            trip_cost = outbound[valid_first] + path[last] - path[valid_first] + inbound[last]
+            trip_load = load[last + 1] - load[valid_first]
+            feasible = (first >= 0) & (trip_load <= self.__vehicle_capacity) & (trip_cost <= self.__vehicle_autonomy)
+            feasible[:, 0] = True
+            trip_cost = np.where(feasible, trip_cost, np.inf)
+            weighted_cost = trip_cost
+            if self.heterogeneous:
+                cheapest = np.full(trip_cost.shape, np.inf)
+                for capacity, autonomy, cost in self.__vehicle_types:
+                    fits = (trip_load <= capacity) & (trip_cost <= autonomy)
+                    cheapest = np.where(fits, np.minimum(cheapest, 1.0 + cost), cheapest)
+                weighted_cost = trip_cost * np.where(np.isfinite(cheapest), cheapest, 1.0 + self.__costs.min())
+
+            for row, costs in enumerate(weighted_cost):
+                end = block + row + 1
+                candidates = best[valid_first[row]] + costs
+                size = int(np.argmin(candidates))
+                best[end] = candidates[size]
+                predecessor[end] = end - 1 - size
+
+        cuts = [number_customers]
+        while cuts[-1] > 0:
+            cuts.append(int(predecessor[cuts[-1]]))
+        cuts.reverse()
+        trip_distances = [float(outbound[start] + path[end - 1] - path[start] + inbound[end - 1])
+                          for start, end in zip(cuts[:-1], cuts[1:])]
+        return cuts, trip_distances
+
+    def __assign_trips(self, customers: np.ndarray, boundaries: list[int],
+                       trip_distances: list[float]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Vehicle assignment of a heterogeneous fleet: trips are taken from the longest, each one given to the
+        vehicle able to serve it (capacity and autonomy) with the lowest cost-weighted distance after the trip.
+        A trip no vehicle can serve goes to the vehicles with enough capacity (the fitness penalizes the excess).
+        Every vehicle keeps its trips in the order of the giant tour.
+        """
+        loads = np.add.reduceat(self.__graph.demands[self.__graph.indices_of(customers)], boundaries[:-1])
+        assigned = np.zeros(self.number_vehicles)
+        trips: list[list[int]] = [[] for _ in range(self.number_vehicles)]
+        weights = 1.0 + self.__costs
+        for trip in sorted(range(len(trip_distances)), key=lambda index: -trip_distances[index]):
+            distance = trip_distances[trip]
+            candidates = np.flatnonzero((self.__capacities >= loads[trip]) & (self.__autonomies >= distance))
+            if not len(candidates):
+                candidates = np.flatnonzero(self.__capacities >= loads[trip])
+            if not len(candidates):
+                candidates = np.arange(self.number_vehicles)
+            vehicle = int(candidates[np.argmin((assigned[candidates] + distance) * weights[candidates])])
+            assigned[vehicle] += distance
+            trips[vehicle].append(trip)
+
+        sequence: list[int] = []
+        offsets = [0]
+        for vehicle_trips in trips:
+            sequence.append(self.depot_identifier)
+            for trip in sorted(vehicle_trips):
+                sequence.extend(customers[boundaries[trip]:boundaries[trip + 1]].tolist())
+                sequence.append(self.depot_identifier)
+            if not vehicle_trips:
+                sequence.append(self.depot_identifier)
+            offsets.append(len(sequence))
+        return np.array(sequence, dtype=np.int32), np.array(offsets, dtype=np.int64)
+
+    def __group_trips(self, trip_distances: list[float]) -> list[tuple[int, int]]:
+        """
+        Groups consecutive trips into at most number_vehicles vehicles minimizing the longest vehicle distance
+        (binary search on the limit, greedy grouping), returning the range of trips of each vehicle.
+        """
+        number_trips = len(trip_distances)
+        if number_trips <= self.number_vehicles:
+            return [(trip, trip + 1) for trip in range(number_trips)]
+        accumulated = [0.0]
+        for distance in trip_distances:
+            accumulated.append(accumulated[-1] + distance)
+
+        def group(limit: float) -> Optional[list[tuple[int, int]]]:
+            groups, start = [], 0
+            for vehicle in range(self.number_vehicles):
+                # Leaves at least one trip to each of the remaining vehicles
+                end = min(bisect_right(accumulated, accumulated[start] + limit) - 1,
+                          number_trips - (self.number_vehicles - vehicle - 1))
+                end = max(end, start + 1)
+                groups.append((start, end))
+                start = end
+                if start == number_trips:
+                    return groups
+            return None
 
-        return [Route([self.depot_identifier] + chunk.tolist() + [self.depot_identifier]) for chunk in chunks]
\ No newline at end of file
+        low, high = max(max(trip_distances), accumulated[-1] / self.number_vehicles), accumulated[-1]
+        for _ in range(30):
+            middle = (low + high) / 2
+            if group(middle) is None:
+                low = middle
+            else:
+                high = middle
+        return group(high)
@@ -1,6 +1,9 @@
-from unittest import TestCase
+import random
+from unittest import TestCase, mock
+from vrp import route_spliter
 from vrp.route_spliter import RouteSplitter
 from domain.route import Route
+from domain.graph import Graph, Node
 
 
 class TestRouteSpliter(TestCase):
@@ -15,3 +18,97 @@ class TestRouteSpliter(TestCase):
         self.assertEqual(split_routes[1].customers, [0, 6, 7, 8, 9, 10, 0])
         self.assertEqual(split_routes[2].customers, [0, 11, 12, 13, 14, 15, 0])
         self.assertEqual(split_routes[3].customers, [0, 16, 17, 18, 19, 20, 0])
+
+    def test_split_customers_matches_split(self):
+        for size in [0, 3, 4, 11, 20]:
+            customers = list(range(1, size + 1))
+            sequence, offsets = self.route_spliter.split_customers(customers)
+            routes = [sequence[offsets[i]:offsets[i + 1]].tolist() for i in range(len(offsets) - 1)]
+            self.assertEqual(routes, [route.customers for route in self.route_spliter.split(Route(customers))])
+
+
+class TestOptimalSplit(TestCase):
+
+    def setUp(self):
+        rng = random.Random(5)
+        nodes = [Node(identifier=i, x=rng.uniform(0, 100), y=rng.uniform(0, 100), demand=rng.randint(1, 6))
+                 for i in range(9)]
+        self.graph = Graph(nodes)
+        self.customers = [4, 7, 1, 8, 3, 6, 2, 5]
+        self.capacity = 10
+        self.autonomy = 200
+
+    def trip_distance(self, trip):
+        itinerary = [0] + trip + [0]
+        return sum(self.graph.get_distance(a, b) for a, b in zip(itinerary[:-1], itinerary[1:]))
+
+    @staticmethod
+    def trips(itinerary):
+        trips, trip = [], []
+        for customer in itinerary:
+            if customer != 0:
+                trip.append(customer)
+            elif trip:
+                trips.append(trip)
+                trip = []
+        return trips
+
+    def test_optimal_trips_match_exhaustive_search(self):
+        splitter = RouteSplitter(0, 2, "optimal", self.graph, self.capacity, self.autonomy)
+        cuts, distances = splitter.optimal_trips(self.customers)
+
+        best = float("inf")
+        for mask in range(2 ** (len(self.customers) - 1)):
+            points = [0] + [i + 1 for i in range(len(self.customers) - 1) if mask >> i & 1] + [len(self.customers)]
+            trips = [self.customers[a:b] for a, b in zip(points[:-1], points[1:])]
+            if all(len(trip) == 1 or (sum(self.graph.get_node_demand(c) for c in trip) <= self.capacity
+                                      and self.trip_distance(trip) <= self.autonomy) for trip in trips):
+                best = min(best, sum(self.trip_distance(trip) for trip in trips))
+
+        self.assertAlmostEqual(sum(distances), best)
+        self.assertEqual(cuts[0], 0)
+        self.assertEqual(cuts[-1], len(self.customers))
+
+    def test_optimal_trips_in_blocks_match_a_single_block(self):
+        # Without a capacity limit the band covers every customer: the trip costs are built a few rows at a time
+        splitter = RouteSplitter(0, 2, "optimal", self.graph, None, self.autonomy)
+        expected = splitter.optimal_trips(self.customers)
+        with mock.patch.object(route_spliter, "SPLIT_BLOCK_ELEMENTS", 3):
+            self.assertEqual(splitter.optimal_trips(self.customers), expected)
+
+    def test_split_customers_groups_trips_into_vehicles(self):
+        splitter = RouteSplitter(0, 2, "optimal", self.graph, self.capacity, self.autonomy)
+        sequence, offsets = splitter.split_customers(self.customers)
+
+        self.assertEqual(len(offsets), 3)
+        self.assertEqual([c for c in sequence.tolist() if c != 0], self.customers)
+        for index in range(2):
+            itinerary = sequence[offsets[index]:offsets[index + 1]].tolist()
+            self.assertEqual(itinerary[0], 0)
+            self.assertEqual(itinerary[-1], 0)
+
+    def test_heterogeneous_fleet_assigns_trips_to_vehicles_able_to_serve_them(self):
+        capacities, autonomies = [4, 10, 10], [150, 200, 200]
+        splitter = RouteSplitter(0, 3, "optimal", self.graph, capacities, autonomies, [0.0, 0.5, 0.5])
+        sequence, offsets = splitter.split_customers(self.customers)
+
+        self.assertTrue(splitter.heterogeneous)
+        self.assertEqual(len(offsets), 4)
+        self.assertEqual(sorted(c for c in sequence.tolist() if c != 0), sorted(self.customers))
+        for index in range(3):
+            for trip in self.trips(sequence[offsets[index]:offsets[index + 1]].tolist()):
+                self.assertLessEqual(sum(self.graph.get_node_demand(c) for c in trip), capacities[index])
+                if len(trip) > 1:
+                    self.assertLessEqual(self.trip_distance(trip), autonomies[index])
+
+    def test_homogeneous_fleet_arrays_keep_the_grouping(self):
+        homogeneous = RouteSplitter(0, 2, "optimal", self.graph, [self.capacity] * 2, [self.autonomy] * 2)
+        scalar = RouteSplitter(0, 2, "optimal", self.graph, self.capacity, self.autonomy)
+
+        self.assertFalse(homogeneous.heterogeneous)
+        self.assertEqual([array.tolist() for array in homogeneous.split_customers(self.customers)],
+                         [array.tolist() for array in scalar.split_customers(self.customers)])
+
+    def test_optimal_split_requires_graph(self):
+        with self.assertRaises(ValueError):
+            RouteSplitter(0, 2, "optimal")
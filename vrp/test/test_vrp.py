@@ -34,16 +34,20 @@ class TestVRP(TestCase):
         self.fitness.calculate_tolls_penality.return_value = 1
         self.fitness.calculate_priority_violation_penality.return_value = 2
         self.fitness.calculate_capacity_violation_penality.return_value = 3
+        self.fitness.calculate_autonomy_violation_penality.return_value = 5
         self.fitness.calculate_vehicle_unbalanced_distance_penality.return_value = 4
+        self.fitness.calculate_operating_cost.return_value = 6
 
         self.vrp.fitness(solution)
 
         self.fitness.calculate_tolls_penality.assert_called_once_with(solution.vehicles)
         self.fitness.calculate_priority_violation_penality.assert_called_once_with(solution.vehicles)
         self.fitness.calculate_capacity_violation_penality.assert_called_once_with(solution.vehicles)
+        self.fitness.calculate_autonomy_violation_penality.assert_called_once_with(solution.vehicles)
         self.fitness.calculate_vehicle_unbalanced_distance_penality.assert_called_once_with(solution.vehicles)
+        self.fitness.calculate_operating_cost.assert_called_once_with(solution.vehicles)
         solution.total_distance.assert_called_once()
-        self.assertEqual(solution.fitness, 10 + 1 + 2 + 3 + 4)
+        self.assertEqual(solution.fitness, 10 + 1 + 2 + 3 + 5 + 4 + 6)
 
     def test_sort_population(self):
         s1 = Mock()
@@ -73,3 +77,69 @@ class TestVRP(TestCase):
         self.adjustment.apply.assert_any_call(solution2)
         self.assertEqual(result1, adjusted_solution1)
         self.assertEqual(result2, adjusted_solution2)
+
+    def test_mutate_uses_incremental_evaluation(self):
+        from domain.genome import Genome
+
+        solution = Genome([0, 1, 2, 3, 0], [0, 5], 10, 100, fitness=10.0, penalty=0.0)
+        move = Mock()
+        moved = Mock()
+        self.mutation.propose.return_value = move
+        self.fitness.evaluate_move.return_value = moved
+
+        self.assertEqual(self.vrp.mutate(solution), moved)
+        self.fitness.evaluate_move.assert_called_with(solution, move)
+
+    def test_mutate_falls_back_to_adjustment(self):
+        from domain.genome import Genome
+
+        solution = Genome([0, 1, 2, 3, 0], [0, 5], 10, 100, fitness=10.0, penalty=0.0)
+        mutated = Mock()
+        adjusted = Mock()
+        self.mutation.propose.return_value = Mock()
+        self.mutation.apply_move.return_value = mutated
+        self.fitness.evaluate_move.return_value = None
+        self.adjustment.apply.side_effect = None
+        self.adjustment.apply.return_value = adjusted
+
+        self.assertEqual(self.vrp.mutate(solution), adjusted)
+        self.adjustment.apply.assert_called_with(mutated)
+
+    def test_evaluate_population_reuses_cached_fitness(self):
+        from domain.genome import Genome
+        from genetic_algorithm.fitness_cache import FitnessCache
+
+        fitness = Mock()
+
+        def evaluate(genomes):
+            for genome in genomes:
+                genome.fitness, genome.penalty = 42.0, 2.0
+        fitness.evaluate_genomes.side_effect = evaluate
+        cache = FitnessCache(10)
+        vrp = VRP(self.adjustment, self.route_splitter, fitness=fitness, fitness_cache=cache)
+
+        vrp.evaluate_population([Genome([0, 1, 2, 0], [0, 4], 10, 100)])
+        twin = Genome([0, 1, 2, 0], [0, 4], 10, 100)
+        vrp.evaluate_population([twin])
+
+        fitness.evaluate_genomes.assert_called_once()
+        self.assertEqual((twin.fitness, twin.penalty), (42.0, 2.0))
+        self.assertEqual(vrp.cache_statistics()["hits"], 1)
+        self.assertEqual(vrp.cache_statistics()["misses"], 1)
+
+    def test_select_parents_uses_the_population_fitness(self):
+        import random
+        from genetic_algorithm.selection import Selection
+
+        selection = Mock()
+        selection.select.return_value = "pairs"
+        rng = random.Random(1)
+        vrp = VRP(self.adjustment, self.route_splitter, rng=rng, selection=selection)
+        population = [Mock(fitness=3.0), Mock(fitness=1.0), Mock(fitness=2.0)]
+
+        self.assertEqual(vrp.select_parents(population, 4), "pairs")
+        fitness, number_pairs, generator = selection.select.call_args.args
+        self.assertEqual(fitness.tolist(), [3.0, 1.0, 2.0])
+        self.assertEqual((number_pairs, generator), (4, rng))
+        self.assertIsInstance(VRP(self.adjustment, self.route_splitter).select_parents(population, 2),
+                              type(Selection().select([1.0, 2.0], 1)))
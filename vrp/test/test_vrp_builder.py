@@ -1,3 +1,5 @@
+import numpy as np
+
 from domain.graph.graph import Graph
 from vrp.vrp_builder import VrpFactory
 from vrp.vrp import VRP
@@ -9,6 +11,8 @@ class DummyNode:
 class DummyGraph(Graph):
     def __init__(self):
         self._nodes = {0: DummyNode(0)}
+        self._index = {0: 0}
+        self._demands = np.zeros(1, dtype=np.int64)
     def get_node(self, idx):
         return self._nodes[idx]
 
@@ -22,3 +26,30 @@ def test_create_vrp_returns_vrp_instance():
     factory = VrpFactory(graph, population_size=10, number_vehicles=2)
     vrp = factory.create_vrp()
     assert isinstance(vrp, VRP)
+
+def test_subproblem_takes_the_options_and_vehicles():
+    from domain.fleet import Fleet
+    from domain.graph import Node
+    graph = Graph([Node(identifier=i, x=i, y=i % 3, demand=1) for i in range(8)])
+    factory = VrpFactory(graph, population_size=6, number_vehicles=3, seed=1, split_mode="optimal",
+                         fleet=Fleet([5, 10, 20], [100, 200, 300], [0.0, 0.1, 0.2]))
+    subproblem = factory.subproblem(graph.subgraph([0, 2, 5, 7]), [0, 2])
+    assert subproblem.number_nodes == 4
+    assert subproblem.fleet.capacities.tolist() == [5, 20]
+    assert subproblem.fleet.costs.tolist() == [0.0, 0.2]
+    population = subproblem.create_vrp().generate_initial_population()
+    assert len(population) == 6
+    assert all(sorted(genome.customers(0).tolist()) == [2, 5, 7] for genome in population)
+    assert all(genome.number_vehicles == 2 for genome in population)
+
+
+def test_depot_other_than_node_zero():
+    from domain.graph import Node
+    graph = Graph([Node(identifier=i, x=i * 10, y=i % 2, demand=1) for i in range(6)])
+    factory = VrpFactory(graph, population_size=4, number_vehicles=2, depot_identifier=3)
+    vrp = factory.create_vrp()
+    population = vrp.generate_initial_population()
+    vrp.evaluate_population(population)
+    assert factory.depot_identifier == 3
+    assert all(genome.route(0)[0] == 3 and sorted(genome.customers(3).tolist()) == [0, 1, 2, 4, 5]
+               for genome in population)
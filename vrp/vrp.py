@@ -1,43 +1,127 @@
-from domain.solution import Solution
+import random
+from typing import Optional
+
+import numpy as np
+
+from domain.genome import Genome
 from genetic_algorithm.mutation import Mutation
 from vrp.adjustment.adjustment import Adjustment
 from genetic_algorithm.crossover import Crossover
 from genetic_algorithm.fitness import Fitness
+from genetic_algorithm.fitness_cache import FitnessCache
 from genetic_algorithm.initial_population import InitialPopulationGenerator
+from genetic_algorithm.profiler import GenerationProfiler
+from genetic_algorithm.selection import Selection
 from vrp.route_spliter import RouteSplitter
 
 
 class VRP:
     def __init__(self, adjustment: Adjustment, route_splitter: RouteSplitter, crossover: Crossover = None,
                  mutation: Mutation = None,
-                 initial_population_generator: InitialPopulationGenerator = None, fitness: Fitness = None) -> None:
+                 initial_population_generator: InitialPopulationGenerator = None, fitness: Fitness = None,
+                 fitness_cache: Optional[FitnessCache] = None, profiler: Optional[GenerationProfiler] = None,
+                 rng: Optional[random.Random] = None, selection: Optional[Selection] = None) -> None:
         self.__adjustment = adjustment
         self.__route_splitter = route_splitter
         self.__crossover = crossover
         self.__mutation = mutation
         self.__initial_population_generator = initial_population_generator
         self.__fitness = fitness
+        self.__fitness_cache = fitness_cache
+        self.__profiler = profiler or GenerationProfiler(enabled=False)
+        self.__random = rng or random.Random()
+        self.__selection = selection or Selection()
+
+    @property
+    def profiler(self) -> GenerationProfiler:
+        return self.__profiler
 
-    def generate_initial_population(self) -> list[Solution]:
+    @property
+    def random(self) -> random.Random:
+        """
+        Random generator shared by the operators of the run (see VrpFactory).
+        """
+        return self.__random
+
+    def generate_initial_population(self) -> list[Genome]:
         return self.__initial_population_generator.generate()
 
-    def fitness(self, solution: Solution) -> None:
+    def fitness(self, solution: Genome) -> None:
         penalty = self.__fitness.calculate_tolls_penality(solution.vehicles)
         penalty += self.__fitness.calculate_priority_violation_penality(solution.vehicles)
         penalty += self.__fitness.calculate_capacity_violation_penality(solution.vehicles)
+        penalty += self.__fitness.calculate_autonomy_violation_penality(solution.vehicles)
         penalty += self.__fitness.calculate_vehicle_unbalanced_distance_penality(solution.vehicles)
+        penalty += self.__fitness.calculate_operating_cost(solution.vehicles)
 
         solution.fitness = solution.total_distance() + penalty
 
-    def sort_population(self, population: list[Solution]) -> list[Solution]:
-        return sorted(population, key=lambda solution: solution.fitness)
+    def evaluate_population(self, population: list[Genome]) -> None:
+        """
+        Evaluates the individuals of the population that were not evaluated yet.
+        Genomes are never changed in place, so a known fitness is still valid; with a fitness cache, chromosomes
+        identical to an already evaluated one take its fitness without being scored again.
+        """
+        with self.__profiler.section("fitness"):
+            pending = [individual for individual in population if not self.__is_evaluated(individual)]
+            if self.__fitness_cache is not None:
+                pending = [individual for individual in pending if not self.__fitness_cache.lookup(individual)]
+            if pending:
+                self.__fitness.evaluate_genomes(pending)
+                if self.__fitness_cache is not None:
+                    for individual in pending:
+                        self.__fitness_cache.store(individual)
+        self.__profiler.count_evaluations(len(pending))
+
+    def cache_statistics(self) -> Optional[dict]:
+        return self.__fitness_cache.statistics() if self.__fitness_cache is not None else None
 
-    def crossover(self, p1: Solution, p2: Solution) -> tuple[Solution, Solution]:
-        solution1, solution2 = self.__crossover.apply(p1, p2)
-        adjusted_solution1 = self.__adjustment.apply(solution1)
-        adjusted_solution2 = self.__adjustment.apply(solution2)
+    def sort_population(self, population: list[Genome]) -> list[Genome]:
+        with self.__profiler.section("sort"):
+            return sorted(population, key=lambda solution: solution.fitness)
+
+    def select_parents(self, population: list[Genome], number_pairs: int) -> np.ndarray:
+        """
+        Selects the parents of a generation on the fitness array of the evaluated population.
+        Returns:
+            Array (number_pairs, 2) with the indices of the parents in the population.
+        """
+        with self.__profiler.section("selection"):
+            fitness = np.fromiter((individual.fitness for individual in population), dtype=np.float64,
+                                  count=len(population))
+            return self.__selection.select(fitness, number_pairs, self.__random)
+
+    def crossover(self, p1: Genome, p2: Genome) -> tuple[Genome, Genome]:
+        with self.__profiler.section("crossover"):
+            solution1, solution2 = self.__crossover.apply(p1, p2)
+        adjusted_solution1 = self.__adjust(solution1)
+        adjusted_solution2 = self.__adjust(solution2)
         return adjusted_solution1, adjusted_solution2
 
-    def mutate(self, solution: Solution) -> Solution:
-        mutated_solution = self.__mutation.apply(solution)
-        return self.__adjustment.apply(mutated_solution)
\ No newline at end of file
+    def mutate(self, solution: Genome) -> Genome:
+        with self.__profiler.section("mutation"):
+            move = self.__mutation.propose(solution)
+        if move is None:
+            return self.__adjust(solution)
+        if self.__is_evaluated(solution):
+            # Moves inside a single trip are evaluated incrementally, without adjustment or full evaluation
+            with self.__profiler.section("fitness"):
+                moved_solution = self.__fitness.evaluate_move(solution, move)
+            if moved_solution is not None:
+                self.__profiler.count_evaluations(1)
+                return moved_solution
+        with self.__profiler.section("mutation"):
+            mutated_solution = self.__mutation.apply_move(solution, move)
+        with self.__profiler.section("adjustment"):
+            return self.__adjustment.apply(mutated_solution)
+
+    def __adjust(self, solution: Genome) -> Genome:
+        # Evaluated genomes come from the population and are already adjusted
+        if self.__is_evaluated(solution):
+            return solution
+        with self.__profiler.section("adjustment"):
+            return self.__adjustment.apply(solution)
+
+    @staticmethod
+    def __is_evaluated(solution: Genome) -> bool:
+        return isinstance(solution, Genome) and solution.fitness is not None
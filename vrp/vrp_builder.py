@@ -1,30 +1,140 @@
+import random
+from typing import Optional
+
+from domain.fleet import Fleet
 from domain.graph import Graph
 from vrp import VRP
 from genetic_algorithm.mutation import Mutation
 from vrp.adjustment.adjustment import Adjustment
 from vrp.adjustment.helper import Helper
+from genetic_algorithm.construction import CONSTRUCTION_HEURISTICS
 from genetic_algorithm.crossover import Crossover
 from genetic_algorithm.fitness import Fitness
+from genetic_algorithm.fitness_cache import FitnessCache
 from genetic_algorithm.initial_population import InitialPopulationGenerator
+from genetic_algorithm.local_search import LocalSearch
+from genetic_algorithm.profiler import GenerationProfiler
+from genetic_algorithm.selection import Selection
 from vrp.route_spliter import RouteSplitter
 
 
 class VrpFactory:
 
     def __init__(self, graph: Graph, population_size: int, number_vehicles: int, mutation_probability: float = 0.5,
-                 vehicle_autonomy: float = 500.0, vehicle_capacity: int = 100, crossover_probability: float = 1.0) -> None:
-        self.__depot = graph.get_node(0)
+                 vehicle_autonomy: float = 500.0, vehicle_capacity: int = 100, crossover_probability: float = 1.0,
+                 split_mode: str = "equal", fitness_cache_size: int = 10000, profiling: bool = False,
+                 seed: Optional[int] = None, selection_method: str = "tournament",
+                 fleet: Optional[Fleet] = None, seeding: float = 0.0,
+                 seeding_heuristics: tuple[str, ...] = CONSTRUCTION_HEURISTICS, depot_identifier: int = 0) -> None:
+        self.__graph = graph
+        # Options shared by the factories of the subproblems (see subproblem)
+        self.__options = {"population_size": population_size, "mutation_probability": mutation_probability,
+                          "crossover_probability": crossover_probability, "split_mode": split_mode,
+                          "fitness_cache_size": fitness_cache_size, "profiling": profiling,
+                          "selection_method": selection_method, "seeding": seeding,
+                          "seeding_heuristics": seeding_heuristics}
+        # A fleet replaces the number, capacity and autonomy of the (homogeneous) vehicles
+        self.fleet = fleet or Fleet.homogeneous(number_vehicles, vehicle_capacity, vehicle_autonomy)
+        # Single generator of the run, shared by every operator: a seed makes the run reproducible and its state
+        # is what checkpoints store
+        self.random = random.Random(seed)
+        number_vehicles = self.number_vehicles = self.fleet.number_vehicles
+        capacities, autonomies, costs = self.fleet.capacities, self.fleet.autonomies, self.fleet.costs
+        self.__depot = graph.get_node(depot_identifier)
+        self.__validate_demands(graph, self.__depot.identifier, self.fleet)
         self.__adjustment = Adjustment(Helper(graph, self.__depot.identifier))
-        self.__route_splitter = RouteSplitter(self.__depot.identifier, number_vehicles)
-        self.__crossover = Crossover(self.__depot.identifier, number_vehicles, vehicle_autonomy,
-                                     vehicle_capacity, crossover_probability)
-        self.__mutation = Mutation(mutation_probability, self.__route_splitter)
+        self.__route_splitter = RouteSplitter(self.__depot.identifier, number_vehicles, split_mode, graph,
+                                              capacities, autonomies, costs)
+        self.__crossover = Crossover(self.__depot.identifier, number_vehicles, autonomies,
+                                     capacities, crossover_probability, self.__route_splitter, self.random, costs)
+        self.__mutation = Mutation(mutation_probability, self.__route_splitter, self.random)
         self.__initial_population_generator = InitialPopulationGenerator(graph, population_size,
-                                                                         self.__adjustment, vehicle_capacity,
-                                                                         vehicle_autonomy,
+                                                                         self.__adjustment, capacities,
+                                                                         autonomies,
                                                                          number_vehicles,
-                                                                         self.__depot.identifier)
-        self.__fitness = Fitness(graph)
+                                                                         self.__depot.identifier,
+                                                                         self.__route_splitter, self.random,
+                                                                         costs, seeding,
+                                                                         heuristics=seeding_heuristics)
+        self.__fitness = Fitness(graph, self.__depot.identifier)
+        self.__fitness_cache_size = fitness_cache_size
+        self.__selection = Selection(selection_method)
+        self.profiling = profiling
+
+    @staticmethod
+    def __validate_demands(graph: Graph, depot_identifier: int, fleet: Fleet) -> None:
+        """
+        Every customer must fit in some vehicle of the fleet: a customer heavier than a vehicle is moved by the
+        adjustment to a vehicle able to carry it, so only a customer heavier than the largest vehicle is an error.
+        Raises:
+            ValueError: If a customer's demand is greater than the capacity of every vehicle.
+        """
+        demands = graph.demands.copy()
+        demands[graph.index_of(depot_identifier)] = 0
+        heaviest = int(demands.argmax()) if len(demands) else 0
+        capacity = fleet.capacities.max().item()
+        if len(demands) and demands[heaviest] > capacity:
+            customer = graph.get_nodes()[heaviest].identifier
+            raise ValueError(f"Customer {customer} demand ({demands[heaviest]}) exceeds vehicle capacity ({capacity}) "
+                             f"of the largest vehicle")
+
+    @property
+    def graph(self) -> Graph:
+        return self.__graph
+
+    @property
+    def depot_identifier(self) -> int:
+        return self.__depot.identifier
+
+    @property
+    def adjustment(self) -> Adjustment:
+        return self.__adjustment
+
+    @property
+    def number_nodes(self) -> int:
+        return len(self.__graph.get_nodes())
+
+    def subproblem(self, graph: Graph, vehicles, depot_identifier: Optional[int] = None,
+                   fleet: Optional[Fleet] = None) -> "VrpFactory":
+        """
+        Factory of a part of the problem (e.g. a cluster of customers) with the same options as this one.
+        Args:
+            graph: Graph of the part (see Graph.subgraph).
+            vehicles: Indices of the vehicles of the fleet assigned to the part.
+            depot_identifier: Depot of the part (the depot of this problem by default).
+            fleet: Fleet the vehicles belong to (the fleet of this problem by default).
+
+        Returns:
+            The factory, seeded from the random generator of this one.
+        """
+        vehicles = list(vehicles)
+        fleet = fleet or self.fleet
+        fleet = Fleet(fleet.capacities[vehicles], fleet.autonomies[vehicles], fleet.costs[vehicles])
+        return VrpFactory(graph, number_vehicles=len(vehicles), fleet=fleet, seed=self.random.getrandbits(63),
+                          depot_identifier=self.depot_identifier if depot_identifier is None else depot_identifier,
+                          **self.__options)
+
+    def with_graph(self, graph: Graph) -> "VrpFactory":
+        """
+        Factory of the same problem (options, fleet and depot) on a changed graph, e.g. with customers added to a
+        running solve.
+        Args:
+            graph: The changed graph, with the depot of this problem.
+
+        Returns:
+            The factory, its random generator in the state of the generator of this one.
+        """
+        factory = VrpFactory(graph, number_vehicles=self.number_vehicles, fleet=self.fleet,
+                             depot_identifier=self.depot_identifier, **self.__options)
+        factory.random.setstate(self.random.getstate())
+        return factory
 
     def create_vrp(self) -> VRP:
-        return VRP(self.__adjustment, self.__route_splitter, self.__crossover, self.__mutation, self.__initial_population_generator, self.__fitness)
+        # Each VRP (one per worker process) owns its cache; a size of zero disables memoization
+        fitness_cache = FitnessCache(self.__fitness_cache_size) if self.__fitness_cache_size > 0 else None
+        return VRP(self.__adjustment, self.__route_splitter, self.__crossover, self.__mutation, self.__initial_population_generator, self.__fitness,
+                   fitness_cache, GenerationProfiler(self.profiling), self.random, self.__selection)
+
+    def create_local_search(self, neighbors: int = 10, time_budget: float = 0.05, elite_size: int = 1) -> LocalSearch:
+        return LocalSearch(self.__graph, self.__adjustment, self.__fitness, self.__depot.identifier,
+                           neighbors, time_budget, elite_size, self.random)